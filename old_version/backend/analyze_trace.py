@@ -0,0 +1,92 @@
+"""Offline bottleneck and deadlock report for a recorded trace (IPC_TRACE_DIR).
+
+Replays the trace on its own clock through the live server's heuristics
+(core/trace_analysis.py), so an hour of recorded traffic is analyzed in
+seconds rather than replayed in real time.
+
+Usage:
+    python analyze_trace.py TRACE_DIR [--window-ms 5000] [--threshold name=value ...] [--top 10] [--json]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+from core.bottleneck_analyzer import DEFAULT_THRESHOLDS
+from core.trace_analysis import TraceAnalyzer
+
+
+def parse_thresholds(pairs):
+    thresholds = {}
+    for pair in pairs:
+        name, _, value = pair.partition('=')
+        if name not in DEFAULT_THRESHOLDS or not value:
+            raise SystemExit(f'unknown threshold {pair!r}; known: {", ".join(DEFAULT_THRESHOLDS)}')
+        thresholds[name] = float(value)
+    return thresholds
+
+
+def print_report(report, elapsed, top):
+    trace = report['trace']
+    rate = trace['events'] / elapsed if elapsed else 0
+    print(f"{trace['events']:,} events over {trace['durationMs'] / 1000:,.1f} s of trace time "
+          f"({trace['windows']:,} windows of {trace['windowMs']} ms)")
+    print(f'analyzed in {elapsed:.2f} s ({rate:,.0f} events/s)')
+
+    print('\nIssues')
+    by_issue = sorted(report['summary']['byIssue'].items(), key=lambda item: -item[1]['windows'])
+    if not by_issue:
+        print('  none')
+    for issue_type, summary in by_issue:
+        print(f"  {issue_type:32} {summary['severity']:8} {summary['windows']:>7,} windows "
+              f"{summary['resources']:>5,} resources")
+
+    print(f'\nMost affected resources (top {top})')
+    for entry in report['summary']['byResource'][:top]:
+        issues = ', '.join(f'{name} x{count}' for name, count in sorted(entry['issues'].items()))
+        print(f"  {entry['type']:6} {entry['resourceId']:38} {entry['windows']:>6,} windows  {issues}")
+
+    print(f'\nSlowest latencies by p99 (top {top})')
+    latencies = sorted(report['latency'].values(), key=lambda l: -(l['p99'] or 0))
+    if not latencies:
+        print('  none')
+    for entry in latencies[:top]:
+        print(f"  {entry['type']:9} {entry['resourceId']:38} n={entry['count']:<8,} p50={entry['p50']:.2f} ms "
+              f"p99={entry['p99']:.2f} ms max={entry['max']:.2f} ms")
+
+    deadlocks = report['deadlocks']
+    print('\nDeadlocks')
+    print(f"  detected: {deadlocks['summary']['total']}, still active at end of trace: "
+          f"{deadlocks['summary']['active']}, potential: {len(deadlocks['potential'])}")
+    for deadlock in deadlocks['detected'][:top]:
+        print(f"  {deadlock['id']}: {' -> '.join(map(str, deadlock['cycle']))}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('trace_dir')
+    parser.add_argument('--window-ms', type=int, default=5000)
+    parser.add_argument('--threshold', action='append', default=[], metavar='NAME=VALUE',
+                        help='override a BottleneckAnalyzer threshold')
+    parser.add_argument('--top', type=int, default=10)
+    parser.add_argument('--json', action='store_true', help='print the full report as JSON')
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.trace_dir):
+        raise SystemExit(f'{args.trace_dir} is not a directory')
+    analyzer = TraceAnalyzer(args.window_ms, parse_thresholds(args.threshold))
+    start = time.perf_counter()
+    report = analyzer.analyze_directory(args.trace_dir)
+    elapsed = time.perf_counter() - start
+
+    if args.json:
+        report['elapsedSeconds'] = elapsed
+        json.dump(report, sys.stdout)
+        print()
+    else:
+        print_report(report, elapsed, args.top)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,197 @@
+"""asyncio server mode: the REST and WebSocket API of server.py on aiohttp.
+
+Every request and WebSocket is served from a single event loop instead of a
+thread each, so thousands of dashboards can stay connected. Endpoint logic is
+the same IPCService the Flask app uses. With the simulated backend manager
+calls are short and never block, so handlers run them directly on the loop;
+with IPC_BACKEND=os they can wait on real pipes and queues (a receive waits up
+to QUEUE_GET_TIMEOUT, a full pipe blocks the writer, workers are spawned), so
+endpoints run in the loop's default thread pool instead. Broadcasts go to
+per-client bounded queues drained by one task per client (AsyncClientChannel)
+and the coalesced stream mode ticks from a loop task.
+
+Usage:
+    python async_server.py [--host 0.0.0.0] [--port 5000]
+"""
+import argparse
+import asyncio
+import functools
+import os
+
+from aiohttp import web, WSMsgType
+
+from core.ipc_service import IPCService, ROUTES
+from core.broadcaster import Broadcaster, AsyncClientChannel, STREAM_MODES
+from core.wire_format import ENCODINGS
+from core.trace_recorder import TraceRecorder
+from core.metrics_registry import CONTENT_TYPE as METRICS_CONTENT_TYPE
+from core.resource_views import respond
+from core.state_export import Stream
+from config import (WS_QUEUE_SIZE, WS_OVERFLOW_POLICY, WS_DEFAULT_MODE, WS_DEFAULT_ENCODING,
+                    WS_STREAM_TICK_MS, WS_STREAM_SAMPLES, IPC_BACKEND, LOCK_FAIRNESS,
+                    LOCK_WAIT_TIMEOUT_MS, TRACE_DIR, TRACE_SEGMENT_MB, TRACE_MAX_SEGMENTS, TRANSFER_LOG_CAPACITY,
+                    ROLLUP_MAX_SERIES, ANALYSIS_QUEUE_SIZE, ANALYSIS_BATCH_SIZE, ANALYSIS_INTERVAL_MS)
+
+# Frontend directory
+FRONTEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'frontend')
+
+
+# Same open policy as flask_cors.CORS(app) in server.py
+CORS_HEADERS = {
+    'Access-Control-Allow-Origin': '*',
+    'Access-Control-Allow-Methods': 'GET, POST, DELETE, OPTIONS',
+    'Access-Control-Allow-Headers': 'Content-Type, If-None-Match',
+    'Access-Control-Expose-Headers': 'ETag'
+}
+
+
+@web.middleware
+async def cors_middleware(request, handler):
+    if request.method == 'OPTIONS':
+        response = web.Response()
+    else:
+        response = await handler(request)
+    if not response.prepared:  # Streamed responses carry their CORS headers from the start
+        response.headers.update(CORS_HEADERS)
+    return response
+
+
+def make_handler(service, method, name):
+    endpoint = getattr(service, name)
+    # OS backend calls block on kernel objects: keep them off the loop
+    blocking = service.backend == 'os'
+
+    async def handler(request):
+        args = list(request.match_info.values())
+        if method == 'POST':
+            try:
+                args.append(await request.json())
+            except ValueError:
+                args.append(None)
+        elif method == 'GET':
+            args.append(dict(request.query))
+        call = functools.partial(call_endpoint, endpoint, args, request.headers.get('If-None-Match'))
+        loop = asyncio.get_running_loop()
+        body, status, headers = await loop.run_in_executor(None, call) if blocking else call()
+        if status == 304:
+            return web.Response(status=304, headers=headers)
+        if isinstance(body, Stream):
+            response = web.StreamResponse(status=status, headers={**CORS_HEADERS, **body.headers,
+                                                                  'Content-Type': body.content_type})
+            await response.prepare(request)
+            if blocking:
+                chunks = iter(body.chunks)
+                while (chunk := await loop.run_in_executor(None, next, chunks, None)) is not None:
+                    await response.write(chunk)
+            else:
+                for chunk in body.chunks:
+                    await response.write(chunk)
+            await response.write_eof()
+            return response
+        if isinstance(body, str):
+            return web.Response(text=body, status=status, headers={'Content-Type': METRICS_CONTENT_TYPE})
+        return web.json_response(body, status=status, headers=headers)
+
+    return handler
+
+
+def call_endpoint(endpoint, args, if_none_match):
+    return respond(*endpoint(*args), if_none_match)
+
+
+async def websocket(request):
+    service = request.app['service']
+    broadcaster = service.broadcaster
+    ws = web.WebSocketResponse()
+    await ws.prepare(request)
+
+    # Mode and encoding can be picked at connect time (?mode=stream&encoding=binary) or
+    # switched later with a {"type": "SUBSCRIBE", "mode": ..., "encoding": ...} message
+    mode = request.query.get('mode', WS_DEFAULT_MODE)
+    encoding = request.query.get('encoding', WS_DEFAULT_ENCODING)
+    broadcaster.add_client(ws, mode if mode in STREAM_MODES else 'events',
+                           encoding if encoding in ENCODINGS else 'json')
+
+    try:
+        async for message in ws:
+            if message.type == WSMsgType.TEXT:
+                service.handle_client_message(ws, message.data)
+    finally:
+        broadcaster.remove_client(ws)
+    return ws
+
+
+async def serve_frontend(request):
+    return web.FileResponse(os.path.join(FRONTEND_DIR, 'index.html'))
+
+
+async def event_stream_ticker(app):
+    """Drive EventStream.flush() from the loop (the Flask mode uses a thread)"""
+    service = app['service']
+    stream = service.event_stream
+
+    async def tick():
+        interval = stream.tick_ms / 1000
+        while True:
+            await asyncio.sleep(interval)
+            frame = stream.flush()
+            if frame is not None:
+                service.broadcaster.publish('STREAM_TICK', frame, mode='stream')
+
+    task = asyncio.get_running_loop().create_task(tick())
+    yield
+    task.cancel()
+
+
+async def trace_writer(app):
+    """Run the trace recorder's writer thread (disk I/O stays off the loop) for the app's lifetime"""
+    trace = app['service'].trace
+    if trace is not None:
+        trace.start()
+    yield
+    if trace is not None:
+        trace.close()
+
+
+async def analysis_worker(app):
+    """Run the bottleneck analysis thread (heuristics stay off the loop) for the app's lifetime"""
+    analysis = app['service'].analysis
+    analysis.start()
+    yield
+    analysis.stop()
+
+
+def create_app():
+    broadcaster = Broadcaster(max_queue=WS_QUEUE_SIZE, overflow_policy=WS_OVERFLOW_POLICY,
+                              channel_class=AsyncClientChannel)
+    trace = TraceRecorder(TRACE_DIR, TRACE_SEGMENT_MB << 20, TRACE_MAX_SEGMENTS) if TRACE_DIR else None
+    service = IPCService(broadcaster, stream_tick_ms=WS_STREAM_TICK_MS, stream_samples=WS_STREAM_SAMPLES,
+                         backend=IPC_BACKEND, lock_fairness=LOCK_FAIRNESS,
+                         lock_wait_timeout_ms=LOCK_WAIT_TIMEOUT_MS, trace=trace,
+                         transfer_log_capacity=TRANSFER_LOG_CAPACITY, rollup_max_series=ROLLUP_MAX_SERIES,
+                         analysis_queue_size=ANALYSIS_QUEUE_SIZE, analysis_batch_size=ANALYSIS_BATCH_SIZE,
+                         analysis_interval_ms=ANALYSIS_INTERVAL_MS)
+
+    app = web.Application(middlewares=[cors_middleware])
+    app['service'] = service
+    for method, path, name in ROUTES:
+        app.router.add_route(method, path, make_handler(service, method, name))
+    app.router.add_get('/ws', websocket)
+    app.router.add_get('/', serve_frontend)
+    app.router.add_static('/', FRONTEND_DIR)
+    app.cleanup_ctx.append(event_stream_ticker)
+    app.cleanup_ctx.append(trace_writer)
+    app.cleanup_ctx.append(analysis_worker)
+    return app
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='IPC Debugger server (asyncio mode)')
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=5000)
+    args = parser.parse_args()
+
+    print('IPC Debugger server starting (asyncio mode)...')
+    print(f'Server running on http://localhost:{args.port}')
+    print(f'WebSocket endpoint: ws://localhost:{args.port}/ws')
+    web.run_app(create_app(), host=args.host, port=args.port, print=None)
@@ -0,0 +1,81 @@
+"""Request latency of the send handlers with inline vs background bottleneck analysis.
+
+Calls IPCService.send_queue_message from a few threads, once with
+the analyzer run inline as handlers used to (submit swapped for
+record_transfer) and once through the AnalysisPipeline worker. An
+optional artificial cost per heuristic pass shows request latency
+tracking the heuristics inline and staying flat in the background.
+
+Usage:
+    python benchmarks/bench_analysis_pipeline.py [--threads 4] [--ops 2000] [--heuristic-ms 0,0.5]
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from core.broadcaster import Broadcaster
+from core.ipc_service import IPCService
+
+
+def run(service, threads, ops):
+    queues = [service.create_queue({'name': f'q{i}', 'maxSize': ops + 1})[0]['id'] for i in range(threads)]
+    latencies = [[] for _ in range(threads)]
+
+    def worker(index):
+        record = latencies[index].append
+        body = {'queueId': queues[index], 'sender': f'P{index}', 'message': 'x' * 64}
+        for _ in range(ops):
+            start = time.perf_counter()
+            service.send_queue_message(body)
+            record(time.perf_counter() - start)
+
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    start = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    samples = sorted(value for values in latencies for value in values)
+    return elapsed, samples[len(samples) // 2], samples[int(len(samples) * 0.99)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--ops', type=int, default=2000)
+    parser.add_argument('--heuristic-ms', default='0,0.5')
+    args = parser.parse_args()
+
+    print(f'{args.threads} threads x {args.ops} queue sends')
+    for cost in (float(ms) for ms in args.heuristic_ms.split(',')):
+        for mode in ('inline', 'background'):
+            service = IPCService(Broadcaster())
+            analyzer = service.bottleneck_analyzer
+            if cost:
+                analyze = analyzer.analyze_bottleneck
+
+                def slow_analyze(*a, **kw):
+                    time.sleep(cost / 1000)
+                    return analyze(*a, **kw)
+                analyzer.analyze_bottleneck = slow_analyze
+            if mode == 'inline':
+                service.analysis.submit = analyzer.record_transfer
+            else:
+                service.analysis.start()
+            elapsed, median, p99 = run(service, args.threads, args.ops)
+            if mode == 'background':
+                service.analysis.stop()
+                service.analysis.drain()
+            metrics = service.analysis.get_metrics()
+            print(f'heuristics +{cost:4.1f} ms  {mode:10}  {args.threads * args.ops / elapsed:8,.0f} req/s  '
+                  f'p50 {median * 1e6:7.1f} us  p99 {p99 * 1e6:8.1f} us  '
+                  f'batches {metrics["batches"]:4}  dropped {metrics["droppedTotal"]}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""Time to first byte, throughput and peak memory of the streaming state export.
+
+Fills pipes and queues with growing backlogs and drains GET /api/export
+through the Flask app chunk by chunk, plain and gzip-compressed, then
+once more under tracemalloc for the peak allocated during the export.
+The peak should stay flat as the backlog grows.
+
+Usage:
+    python benchmarks/bench_export.py [--resources 10] [--backlogs 1000,4000,16000]
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+
+def drain(client, path):
+    start = time.perf_counter()
+    response = client.get(path, buffered=False)
+    chunks = iter(response.response)
+    size = len(next(chunks))
+    first = time.perf_counter() - start
+    for chunk in chunks:
+        size += len(chunk)
+    response.close()
+    return first, time.perf_counter() - start, size
+
+
+def peak_memory(client, path):
+    # A second pass, since tracing allocations slows the export several times over
+    tracemalloc.start()
+    drain(client, path)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--resources', type=int, default=10)
+    parser.add_argument('--backlogs', default='1000,4000,16000')
+    args = parser.parse_args()
+
+    import server
+    client = server.app.test_client()
+    payload = 'x' * 256
+    print(f'{args.resources} pipes and {args.resources} queues per run')
+    print(f'{"backlog":>8} {"mode":5} {"first byte":>11} {"total":>10} {"MB/s":>7} {"size":>10} {"peak":>9}')
+    for backlog in (int(b) for b in args.backlogs.split(',')):
+        pipes, queues = [], []
+        for i in range(args.resources):
+            pipe = client.post('/api/pipes/create', json={'processA': 'A', 'processB': 'B',
+                                                          'capacity': backlog}).get_json()
+            client.post('/api/pipes/send-batch', json={'pipeId': pipe['id'], 'direction': 'AtoB',
+                                                       'messages': [payload] * backlog})
+            queue = client.post('/api/queues/create', json={'name': f'q{i}', 'maxSize': backlog}).get_json()
+            client.post('/api/queues/send-batch', json={'queueId': queue['id'], 'sender': 'S',
+                                                        'messages': [payload] * backlog})
+            pipes.append(pipe['id'])
+            queues.append(queue['id'])
+
+        for mode, path in (('plain', '/api/export'), ('gzip', '/api/export?compress=gzip')):
+            first, elapsed, size = drain(client, path)
+            peak = peak_memory(client, path)
+            print(f'{backlog:>8,} {mode:5} {first * 1000:8.2f} ms {elapsed * 1000:7.0f} ms '
+                  f'{size / elapsed / 1e6:7.1f} {size / 1024:8.0f} KB {peak / 1024:6.0f} KB')
+
+        for pipe_id in pipes:
+            client.delete(f'/api/pipes/{pipe_id}')
+        for queue_id in queues:
+            client.delete(f'/api/queues/{queue_id}')
+    server.service.event_stream.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,369 @@
+"""End-to-end HTTP load benchmark for the REST API.
+
+Drives the Flask app through its full request path (routing, JSON, managers,
+analyzer, broadcast) with parameterized workloads and reports throughput and
+p50/p95/p99 latency per endpoint:
+
+    pipe      ping-pong: each worker owns a pipe and bounces a payload A->B->A
+    queue     producers send at the given priorities, consumers receive;
+              also reports queue wait time per priority
+    memory    workers contend for one segment with lock / write / unlock
+
+Targets:
+    (default)       in-process via app.test_client()
+    --serve         start the app on a local threaded werkzeug server and go over HTTP
+    --url URL       an already running server, e.g. http://127.0.0.1:5000
+
+--json writes the results (plus git revision and parameters) so runs can be
+compared across versions; --baseline compares against such a file and exits
+non-zero if any endpoint's p99 regressed by more than --tolerance.
+
+Usage:
+    python benchmarks/bench_http.py [--workloads pipe queue memory] [--workers 8]
+        [--duration 3] [--payload 64] [--priorities 0 5 9] [--json out.json]
+"""
+import argparse
+import http.client
+import json
+import logging
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+from urllib.parse import urlsplit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+WORKLOADS = ('pipe', 'queue', 'memory')
+
+
+def percentile(sorted_values, q):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0
+    rank = max(1, math.ceil(q / 100 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def summarize(samples_ms, elapsed):
+    """Latency percentiles (ms) and throughput for one list of samples"""
+    values = sorted(samples_ms)
+    return {
+        'count': len(values),
+        'throughput': len(values) / elapsed if elapsed > 0 else 0,
+        'mean': sum(values) / len(values) if values else 0,
+        'p50': percentile(values, 50),
+        'p95': percentile(values, 95),
+        'p99': percentile(values, 99),
+        'max': values[-1] if values else 0
+    }
+
+
+class InProcessClient:
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def request(self, method, path, body=None):
+        response = self.client.open(path, method=method, json=body)
+        return response.status_code, response.get_json(silent=True)
+
+    def close(self):
+        pass
+
+
+class HttpClient:
+    """One keep-alive connection per worker thread"""
+
+    def __init__(self, base_url):
+        parts = urlsplit(base_url)
+        self.host, self.port = parts.hostname, parts.port or 80
+        self.conn = http.client.HTTPConnection(self.host, self.port, timeout=30)
+
+    def request(self, method, path, body=None):
+        payload = json.dumps(body) if body is not None else None
+        headers = {'Content-Type': 'application/json'} if payload is not None else {}
+        try:
+            self.conn.request(method, path, body=payload, headers=headers)
+            response = self.conn.getresponse()
+        except (http.client.HTTPException, OSError):
+            # Server closed the keep-alive connection; retry once on a fresh one
+            self.conn.close()
+            self.conn = http.client.HTTPConnection(self.host, self.port, timeout=30)
+            self.conn.request(method, path, body=payload, headers=headers)
+            response = self.conn.getresponse()
+        raw = response.read()
+        try:
+            return response.status, json.loads(raw) if raw else None
+        except ValueError:
+            return response.status, None
+
+    def close(self):
+        self.conn.close()
+
+
+class Recorder:
+    """Per-worker latency samples keyed by endpoint; merged after the run"""
+
+    def __init__(self, client):
+        self.client = client
+        self.samples = defaultdict(list)
+        self.rejected = defaultdict(int)
+        self.errors = defaultdict(int)
+        self.extra = defaultdict(list)
+
+    def call(self, method, path, body=None):
+        endpoint = f'{method} {path}'
+        start = time.perf_counter()
+        try:
+            status, data = self.client.request(method, path, body)
+        except Exception:
+            self.errors[endpoint] += 1
+            return None
+        self.samples[endpoint].append((time.perf_counter() - start) * 1000)
+        if status >= 500:
+            self.errors[endpoint] += 1
+        elif status >= 400:
+            self.rejected[endpoint] += 1
+        return data or {}
+
+
+def pipe_workload(args):
+    def setup(rec, index):
+        pipe = rec.call('POST', '/api/pipes/create', {'processA': f'ping{index}', 'processB': f'pong{index}'})
+        return {'pipeId': pipe['id']}
+
+    def step(rec, state, rng, payload):
+        for direction in ('AtoB', 'BtoA'):
+            rec.call('POST', '/api/pipes/send', {'pipeId': state['pipeId'], 'data': payload, 'direction': direction})
+            rec.call('POST', '/api/pipes/read', {'pipeId': state['pipeId'], 'direction': direction})
+
+    def teardown(rec, state):
+        rec.client.request('DELETE', f"/api/pipes/{state['pipeId']}")
+
+    return None, setup, step, teardown
+
+
+def queue_workload(args):
+    def shared(client):
+        status, queue = client.request('POST', '/api/queues/create', {'name': 'bench', 'maxSize': args.queue_size})
+        return {'queueId': queue['id']}
+
+    def setup(rec, index):
+        # Even workers produce, odd workers consume
+        return {'producer': index % 2 == 0, 'name': f'w{index}'}
+
+    def step(rec, state, rng, payload):
+        if state['producer']:
+            message = {'payload': payload, 'priority': rng.choice(args.priorities)}
+            rec.call('POST', '/api/queues/send', {'queueId': state['queueId'], 'message': message, 'sender': state['name']})
+        else:
+            result = rec.call('POST', '/api/queues/receive', {'queueId': state['queueId'], 'receiver': state['name']})
+            if result and result.get('success'):
+                priority = result['message']['priority']
+                rec.extra[f'waitTime[priority={priority}]'].append(result['waitTime'])
+
+    def teardown(rec, state):
+        pass
+
+    return shared, setup, step, teardown
+
+
+def memory_workload(args):
+    def shared(client):
+        status, memory = client.request('POST', '/api/shared-memory/create', {'name': 'bench', 'size': 1 << 20})
+        return {'memoryId': memory['id']}
+
+    def setup(rec, index):
+        return {'processId': f'P{index}'}
+
+    def step(rec, state, rng, payload):
+        body = {'memoryId': state['memoryId'], 'processId': state['processId']}
+        locked = rec.call('POST', '/api/shared-memory/lock', body)
+        if locked and locked.get('acquired'):
+            rec.call('POST', '/api/shared-memory/write', {**body, 'data': {state['processId']: payload}})
+            rec.call('POST', '/api/shared-memory/unlock', body)
+        else:
+            rec.extra['lockContended'].append(1)
+
+    def teardown(rec, state):
+        pass
+
+    return shared, setup, step, teardown
+
+
+def run_workload(name, args, make_client):
+    shared_setup, setup, step, teardown = {'pipe': pipe_workload, 'queue': queue_workload, 'memory': memory_workload}[name](args)
+    admin = make_client()
+    shared = shared_setup(admin) if shared_setup else {}
+    payload = 'x' * args.payload
+    recorders = []
+    barrier = threading.Barrier(args.workers + 1)
+
+    def work(index):
+        rec = Recorder(make_client())
+        state = {**shared, **setup(rec, index)}
+        rec.samples.clear()  # Setup calls are not part of the measurement
+        recorders.append(rec)
+        rng = random.Random(args.seed * 1000 + index)
+        barrier.wait()
+        deadline = time.perf_counter() + args.duration
+        iterations = 0
+        while time.perf_counter() < deadline and (not args.iterations or iterations < args.iterations):
+            step(rec, state, rng, payload)
+            iterations += 1
+        teardown(rec, state)
+        rec.client.close()
+
+    threads = [threading.Thread(target=work, args=(i,)) for i in range(args.workers)]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    for resource, path in (('queueId', '/api/queues/'), ('memoryId', '/api/shared-memory/')):
+        if resource in shared:
+            admin.request('DELETE', path + shared[resource])
+    admin.close()
+
+    endpoints = defaultdict(list)
+    rejected, errors, extra = defaultdict(int), defaultdict(int), defaultdict(list)
+    for rec in recorders:
+        for endpoint, samples in rec.samples.items():
+            endpoints[endpoint].extend(samples)
+        for endpoint, n in rec.rejected.items():
+            rejected[endpoint] += n
+        for endpoint, n in rec.errors.items():
+            errors[endpoint] += n
+        for key, values in rec.extra.items():
+            extra[key].extend(values)
+
+    result = {
+        'elapsed': elapsed,
+        'requests': sum(len(s) for s in endpoints.values()),
+        'endpoints': {
+            endpoint: {**summarize(samples, elapsed), 'rejected': rejected[endpoint], 'errors': errors[endpoint]}
+            for endpoint, samples in sorted(endpoints.items())
+        }
+    }
+    result['throughput'] = result['requests'] / elapsed if elapsed > 0 else 0
+    if 'lockContended' in extra:
+        result['lockContended'] = len(extra.pop('lockContended'))
+    if extra:
+        result['distributions'] = {key: summarize(values, elapsed) for key, values in sorted(extra.items())}
+    return result
+
+
+def start_local_server():
+    """Serve the app on an ephemeral port in a background thread; returns the base URL"""
+    from werkzeug.serving import make_server
+    from server import app
+
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)  # No per-request access log
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f'http://127.0.0.1:{server.server_port}'
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'],
+                                       cwd=os.path.dirname(os.path.abspath(__file__)),
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_report(name, result):
+    print(f"\n{name}: {result['requests']} requests in {result['elapsed']:.2f}s "
+          f"({result['throughput']:,.0f} req/s)")
+    print(f"  {'endpoint':34} {'count':>8} {'req/s':>9} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8} {'rej':>6} {'err':>5}")
+    for endpoint, s in result['endpoints'].items():
+        print(f"  {endpoint:34} {s['count']:>8} {s['throughput']:>9,.0f} {s['p50']:>8.2f} {s['p95']:>8.2f} "
+              f"{s['p99']:>8.2f} {s['max']:>8.2f} {s['rejected']:>6} {s['errors']:>5}")
+    for key, s in result.get('distributions', {}).items():
+        print(f"  {key:34} {s['count']:>8} {'':>9} {s['p50']:>8.2f} {s['p95']:>8.2f} {s['p99']:>8.2f} {s['max']:>8.2f}")
+    if 'lockContended' in result:
+        print(f"  lock attempts that had to wait: {result['lockContended']}")
+
+
+def compare(results, baseline, tolerance):
+    """Endpoints whose p99 grew by more than tolerance (fraction) over the baseline run"""
+    regressions = []
+    for name, result in results.items():
+        before = baseline.get('workloads', {}).get(name, {}).get('endpoints', {})
+        for endpoint, s in result['endpoints'].items():
+            old = before.get(endpoint)
+            if old and old['p99'] > 0 and s['p99'] > old['p99'] * (1 + tolerance):
+                regressions.append(f"{name} {endpoint}: p99 {old['p99']:.2f}ms -> {s['p99']:.2f}ms")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workloads', nargs='+', choices=WORKLOADS, default=list(WORKLOADS))
+    parser.add_argument('--workers', type=int, default=8, help='concurrent client threads')
+    parser.add_argument('--duration', type=float, default=3.0, help='seconds per workload')
+    parser.add_argument('--iterations', type=int, default=0, help='cap on steps per worker (0 = duration only)')
+    parser.add_argument('--payload', type=int, default=64, help='payload size in bytes')
+    parser.add_argument('--priorities', type=int, nargs='+', default=[0, 5, 9])
+    parser.add_argument('--queue-size', type=int, default=10_000)
+    parser.add_argument('--seed', type=int, default=1)
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument('--serve', action='store_true', help='start a local threaded server and use real HTTP')
+    target.add_argument('--url', help='benchmark an already running server')
+    parser.add_argument('--json', help='write results to this file')
+    parser.add_argument('--baseline', help='previous --json output to compare p99 against')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed p99 growth vs baseline (0.2 = 20%%)')
+    args = parser.parse_args()
+
+    if args.url or args.serve:
+        base_url = args.url or start_local_server()
+        target_name = base_url
+        make_client = lambda: HttpClient(base_url)
+    else:
+        from server import app
+        target_name = 'in-process'
+        make_client = lambda: InProcessClient(app)
+
+    results = {}
+    for name in args.workloads:
+        results[name] = run_workload(name, args, make_client)
+        print_report(name, results[name])
+
+    if args.json:
+        report = {
+            'meta': {
+                'timestamp': datetime.now().isoformat(),
+                'revision': git_revision(),
+                'python': platform.python_version(),
+                'target': target_name,
+                'params': {k: v for k, v in vars(args).items() if k not in ('json', 'baseline')}
+            },
+            'workloads': results
+        }
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f'\nwrote {args.json}')
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print(f'\n{len(regressions)} p99 regression(s) over {args.tolerance:.0%}:')
+            for line in regressions:
+                print('  ' + line)
+            sys.exit(1)
+        print('\nno p99 regressions against baseline')
+
+
+if __name__ == '__main__':
+    main()
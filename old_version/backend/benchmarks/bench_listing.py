@@ -0,0 +1,58 @@
+"""Dashboard poll cost of the listing endpoints with large backlogs.
+
+Fills pipes and queues, then times GET /api/pipes and /api/queues through
+the Flask app in the full view, the summary view, and as a conditional
+re-poll (If-None-Match) of an unchanged listing, plus one page of messages.
+
+Usage:
+    python benchmarks/bench_listing.py [--resources 20] [--backlog 1000] [--polls 20]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+
+def timed(client, path, polls, headers=None):
+    start = time.perf_counter()
+    for _ in range(polls):
+        response = client.get(path, headers=headers or {})
+    return (time.perf_counter() - start) / polls, response
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--resources', type=int, default=20)
+    parser.add_argument('--backlog', type=int, default=1000)
+    parser.add_argument('--polls', type=int, default=20)
+    args = parser.parse_args()
+
+    import server
+    client = server.app.test_client()
+    payload = 'x' * 256
+    for i in range(args.resources):
+        pipe = client.post('/api/pipes/create', json={'processA': 'A', 'processB': 'B',
+                                                      'capacity': args.backlog}).get_json()
+        client.post('/api/pipes/send-batch', json={'pipeId': pipe['id'], 'direction': 'AtoB',
+                                                   'messages': [payload] * args.backlog})
+        queue = client.post('/api/queues/create', json={'name': f'q{i}', 'maxSize': args.backlog}).get_json()
+        client.post('/api/queues/send-batch', json={'queueId': queue['id'], 'sender': 'S',
+                                                    'messages': [payload] * args.backlog})
+
+    print(f'{args.resources} pipes and {args.resources} queues, {args.backlog:,} messages each')
+    for collection in ('pipes', 'queues'):
+        for label, path in (('full', f'/api/{collection}'), ('summary', f'/api/{collection}?view=summary')):
+            elapsed, response = timed(client, path, args.polls)
+            etag = response.headers['ETag']
+            print(f'{collection:6} {label:12} {elapsed * 1000:8.2f} ms  {len(response.data) / 1024:9.1f} KB')
+            elapsed, response = timed(client, path, args.polls, {'If-None-Match': etag})
+            print(f'{collection:6} {label + " 304":12} {elapsed * 1000:8.2f} ms  status {response.status_code}')
+    elapsed, response = timed(client, f"/api/pipes/{pipe['id']}/messages?limit=100", args.polls)
+    print(f'pipe   {"page of 100":12} {elapsed * 1000:8.2f} ms  {len(response.data) / 1024:9.1f} KB')
+    server.service.event_stream.stop()
+
+
+if __name__ == '__main__':
+    main()
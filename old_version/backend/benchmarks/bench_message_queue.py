@@ -0,0 +1,101 @@
+"""Compare send/receive cost of the queue message store at different depths.
+
+Runs the legacy list-based store (linear priority scan + list.insert,
+list.pop(0)) against PriorityStore with the queue pre-filled to each depth,
+then times a burst of sends followed by a burst of receives.
+
+Usage:
+    python benchmarks/bench_message_queue.py [--depths 1000 100000 1000000]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from core.priority_store import PriorityStore
+
+PRIORITIES = range(0, 10)
+
+
+class LegacyListStore:
+    """The original MessageQueueManager storage, kept here for comparison"""
+
+    def __init__(self):
+        self.messages = []
+
+    def __len__(self):
+        return len(self.messages)
+
+    def push(self, message, priority=0):
+        for i, msg in enumerate(self.messages):
+            if priority > msg['priority']:
+                self.messages.insert(i, message)
+                return
+        self.messages.append(message)
+
+    def pop(self):
+        return self.messages.pop(0)
+
+    def prefill(self, messages):
+        # Building the prefix through push() would be quadratic, sort once instead
+        self.messages = sorted(messages, key=lambda m: -m['priority'])
+
+
+def make_messages(count, rng):
+    return [{'id': i, 'priority': rng.choice(PRIORITIES)} for i in range(count)]
+
+
+def time_ops(store, messages):
+    start = time.perf_counter()
+    for msg in messages:
+        store.push(msg, msg['priority'])
+    send_elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(len(messages)):
+        store.pop()
+    receive_elapsed = time.perf_counter() - start
+
+    return send_elapsed / len(messages), receive_elapsed / len(messages)
+
+
+def run(depths, ops, seed):
+    rng = random.Random(seed)
+    rows = []
+    for depth in depths:
+        backlog = make_messages(depth, rng)
+        burst = make_messages(ops, rng)
+
+        store = PriorityStore()
+        for msg in backlog:
+            store.push(msg, msg['priority'])
+        heap_send, heap_recv = time_ops(store, burst)
+
+        # The legacy store is O(n) per op, so shrink the burst at large depths
+        legacy_ops = max(10, min(ops, 10_000_000 // depth))
+        legacy = LegacyListStore()
+        legacy.prefill(backlog)
+        legacy_send, legacy_recv = time_ops(legacy, burst[:legacy_ops])
+
+        rows.append((depth, legacy_send, legacy_recv, heap_send, heap_recv))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--depths', type=int, nargs='+', default=[1000, 100_000, 1_000_000])
+    parser.add_argument('--ops', type=int, default=10_000, help='sends and receives timed per depth')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    print(f"{'depth':>10} {'legacy send':>14} {'legacy recv':>14} {'store send':>14} {'store recv':>14}")
+    for depth, legacy_send, legacy_recv, heap_send, heap_recv in run(args.depths, args.ops, args.seed):
+        print(f"{depth:>10} {legacy_send * 1e6:>11.2f} us {legacy_recv * 1e6:>11.2f} us "
+              f"{heap_send * 1e6:>11.2f} us {heap_recv * 1e6:>11.2f} us")
+
+
+if __name__ == '__main__':
+    main()
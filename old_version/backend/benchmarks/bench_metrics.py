@@ -0,0 +1,75 @@
+"""Cost of the /metrics counters on the request path, and of a scrape.
+
+Creates pipes, queues and segments through IPCService, drives traffic over
+them, then compares a /metrics scrape with /api/analysis/bottlenecks (which
+recomputes from the analyzer's history) at the same resource count.
+
+Usage:
+    python benchmarks/bench_metrics.py [--resources 300] [--ops 100000] [--scrapes 20]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from core.broadcaster import Broadcaster
+from core.ipc_service import IPCService
+from core.metrics_registry import MetricsRegistry
+
+
+def timed(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--resources', type=int, default=300)
+    parser.add_argument('--ops', type=int, default=100000)
+    parser.add_argument('--scrapes', type=int, default=20)
+    args = parser.parse_args()
+
+    # Request-path cost of one counter update, on a registry with the same resource count
+    registry = MetricsRegistry()
+    ids = [f'pipe-{i}' for i in range(args.resources)]
+    for resource_id in ids:
+        registry.record('create', 'pipe', resource_id)
+    record = registry.record
+    start = time.perf_counter()
+    for i in range(args.ops):
+        record('send', 'pipe', ids[i % args.resources], 64, 1, False)
+    per_op = (time.perf_counter() - start) / args.ops
+
+    service = IPCService(Broadcaster())
+    third = max(args.resources // 3, 1)
+    pipes = [service.create_pipe({'processA': 'A', 'processB': 'B'})[0]['id'] for _ in range(third)]
+    queues = [service.create_queue({'name': f'q{i}'})[0]['id'] for i in range(third)]
+    segments = [service.create_memory({'name': f'm{i}'})[0]['id'] for i in range(third)]
+    for i in range(args.ops // 10):
+        service.send_pipe_data({'pipeId': pipes[i % third], 'data': 'x' * 64, 'direction': 'AtoB'})
+        service.read_pipe_data({'pipeId': pipes[i % third], 'direction': 'AtoB'})
+        service.send_queue_message({'queueId': queues[i % third], 'message': 'x' * 64, 'sender': 'S'})
+        service.receive_queue_message({'queueId': queues[i % third], 'receiver': 'R'})
+        memory_id = segments[i % third]
+        service.lock_memory({'memoryId': memory_id, 'processId': 'P'})
+        service.write_memory({'memoryId': memory_id, 'processId': 'P', 'data': {'k': i}})
+        service.unlock_memory({'memoryId': memory_id, 'processId': 'P'})
+        service.analysis.drain()  # No worker thread here; analyze as we go so nothing is dropped
+
+    body, _ = service.get_metrics()
+    scrape = timed(service.get_metrics, args.scrapes)
+    bottlenecks = timed(service.get_bottlenecks, args.scrapes)
+    service.event_stream.stop()
+
+    print(f'{args.resources} resources, {len(body.splitlines()):,} exposition lines ({len(body) / 1024:.0f} KB)')
+    print(f'counter update:   {per_op * 1e9:8.0f} ns/operation (request path)')
+    print(f'/metrics scrape:  {scrape * 1000:8.2f} ms')
+    print(f'bottlenecks:      {bottlenecks * 1000:8.2f} ms')
+
+
+if __name__ == '__main__':
+    main()
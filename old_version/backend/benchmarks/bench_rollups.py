@@ -0,0 +1,52 @@
+"""Recording cost, query latency and memory of the analyzer's tiered rollups.
+
+Feeds a RollupEngine a day of synthetic transfers (one per resource every
+few seconds, compressed in time) and times chart queries that land on
+each tier: the last minute, hour, day and month.
+
+Usage:
+    python benchmarks/bench_rollups.py [--resources 50] [--events 500000]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from core.rollups import RollupEngine
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--resources', type=int, default=50)
+    parser.add_argument('--events', type=int, default=500_000)
+    args = parser.parse_args()
+
+    engine = RollupEngine(max_series=args.resources)
+    day = 86_400_000
+    end = time.time() * 1000
+    step = day / args.events
+    resources = [f'resource-{i}' for i in range(args.resources)]
+
+    start = time.perf_counter()
+    for i in range(args.events):
+        engine.record_transfer(end - day + i * step, 'queue', resources[i % args.resources], 256, 1.5)
+    elapsed = time.perf_counter() - start
+    status = engine.get_status()
+    print(f'{args.events:,} events in {elapsed:.2f}s ({elapsed / args.events * 1e6:.1f} us/event), '
+          f'{status["series"]} series, {status["bytes"] / 2**20:.1f} MB')
+
+    for label, span in (('minute', 60_000), ('hour', 3_600_000), ('day', day), ('month', 30 * day)):
+        for resource_id in (None, resources[0]):
+            now = time.time() * 1000
+            start = time.perf_counter()
+            result = engine.query(now - span, now, 'queue', resource_id)
+            elapsed = time.perf_counter() - start
+            scope = 'resource' if resource_id else 'type'
+            print(f'last {label:6} {scope:8} tier {result["tier"]:2} {len(result["count"]):5} points '
+                  f'{sum(result["count"]):8,} transfers  {elapsed * 1000:6.2f} ms')
+
+
+if __name__ == '__main__':
+    main()
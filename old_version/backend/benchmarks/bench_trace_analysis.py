@@ -0,0 +1,141 @@
+"""Offline analysis speed on a synthetic trace spanning an hour of traffic.
+
+Writes a trace with TraceRecorder.record_at - pipes with a lagging reader,
+queues, lock/write/unlock cycles on shared segments with some contention,
+and one lock-order deadlock - then times TraceAnalyzer over it and checks
+that the planted slow reader and deadlock are reported.
+
+Usage:
+    python benchmarks/bench_trace_analysis.py [--events 1000000] [--minutes 60]
+"""
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from core.trace_recorder import TraceRecorder, SHARED, WAITING, FAILED, segment_paths
+from core.trace_analysis import TraceAnalyzer
+
+
+def synthesize(recorder, events, minutes, rng):
+    pipes = [f'pipe-{i}' for i in range(20)]
+    queues = [f'queue-{i}' for i in range(10)]
+    memories = [f'memory-{i}' for i in range(10)]
+    start = 1_700_000_000_000.0
+    step = minutes * 60000 / events
+    record = recorder.record_at
+    for resource_id in pipes:
+        record(start, 'create', 'pipe', resource_id, 'A', 100)
+    for resource_id in queues:
+        record(start, 'create', 'queue', resource_id, None, 1000)
+    for resource_id in memories:
+        record(start, 'create', 'memory', resource_id, None, 4096)
+
+    backlog = {p: 0 for p in pipes}
+    queued = {q: 0 for q in queues}
+    processes = [f'P{i}' for i in range(16)]
+    holder = {}
+    waiters = {m: [] for m in memories}
+    busy = set()
+    ts = start
+    for _ in range(events):
+        ts += step
+        kind = rng.random()
+        if kind < 0.5:
+            pipe = rng.choice(pipes)
+            if backlog[pipe] >= 100:
+                record(ts, 'send', 'pipe', pipe, 'A', 0, 0, FAILED)
+            elif rng.random() < 0.55 or not backlog[pipe]:
+                record(ts, 'send', 'pipe', pipe, f'W{rng.randrange(4)}', rng.randrange(16, 512))
+                backlog[pipe] += 1
+            elif pipe != 'pipe-0' or rng.random() < 0.05:  # pipe-0's reader falls behind
+                record(ts, 'read', 'pipe', pipe, None, 128)
+                backlog[pipe] -= 1
+        elif kind < 0.75:
+            queue = rng.choice(queues)
+            if queued[queue] and rng.random() < 0.5:
+                record(ts, 'read', 'queue', queue, 'consumer', 64)
+                queued[queue] -= 1
+            else:
+                record(ts, 'send', 'queue', queue, 'producer', 64)
+                queued[queue] += 1
+        else:
+            # A process holds or waits for one segment at a time; unlock hands over to the first waiter
+            memory = rng.choice(memories)
+            owner = holder.get(memory)
+            free = [p for p in processes if p not in busy]
+            if owner is None and free:
+                process = rng.choice(free)
+                shared = rng.random() < 0.3
+                record(ts, 'lock', 'memory', memory, process, 0, 1, SHARED if shared else 0)
+                holder[memory] = (process, shared)
+                busy.add(process)
+            elif owner is not None and (rng.random() < 0.6 or not free):
+                if not owner[1]:
+                    record(ts, 'write', 'memory', memory, owner[0], 32)
+                record(ts, 'unlock', 'memory', memory, owner[0])
+                busy.discard(owner[0])
+                del holder[memory]
+                if waiters[memory]:
+                    process = waiters[memory].pop(0)
+                    record(ts, 'lock', 'memory', memory, process)
+                    holder[memory] = (process, False)
+            elif owner is not None:
+                process = rng.choice(free)
+                record(ts, 'lock', 'memory', memory, process, 0, 1, WAITING)
+                waiters[memory].append(process)
+                busy.add(process)
+        if len(recorder._pending) >= 65536:
+            recorder.flush()
+
+    # Lock-order deadlock between two processes on two fresh segments
+    for offset, (process, memory) in enumerate((('D1', 'deadlock-a'), ('D2', 'deadlock-b'))):
+        record(ts + offset, 'create', 'memory', memory, None, 4096)
+        record(ts + offset, 'lock', 'memory', memory, process)
+    record(ts + 10, 'lock', 'memory', 'deadlock-b', 'D1', 0, 1, WAITING)
+    record(ts + 11, 'lock', 'memory', 'deadlock-a', 'D2', 0, 1, WAITING)
+    recorder.flush()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--events', type=int, default=1000000)
+    parser.add_argument('--minutes', type=int, default=60)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix='ipc-trace-analysis-')
+    try:
+        recorder = TraceRecorder(directory, segment_bytes=16 << 20)
+        synthesize(recorder, args.events, args.minutes, random.Random(7))
+        recorder.close()
+        size = sum(os.path.getsize(p) for p in segment_paths(directory))
+
+        start = time.perf_counter()
+        report = TraceAnalyzer().analyze_directory(directory)
+        elapsed = time.perf_counter() - start
+
+        trace = report['trace']
+        print(f"{trace['events']:,} events, {trace['durationMs'] / 60000:.0f} min of trace time, "
+              f"{size / 1e6:.1f} MB in {len(segment_paths(directory))} segments")
+        print(f"analyzed in {elapsed:.2f} s ({trace['events'] / elapsed:,.0f} events/s, "
+              f"{trace['durationMs'] / 1000 / elapsed:,.0f}x real time)")
+        print(f"{len(report['bottlenecks']):,} flagged windows; issues: "
+              f"{', '.join(sorted(report['summary']['byIssue']))}")
+        print(f"deadlocks detected: {report['deadlocks']['summary']['total']}")
+
+        slow_reader = any(b['resourceId'] == 'pipe-0' and any(i['type'] == 'pipe-buffer-full' for i in b['issues'])
+                          for b in report['bottlenecks'])
+        if not slow_reader or not report['deadlocks']['summary']['total']:
+            print('MISSING: planted slow reader or deadlock not reported')
+            sys.exit(1)
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
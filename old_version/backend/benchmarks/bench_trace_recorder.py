@@ -0,0 +1,71 @@
+"""Request-path cost of the binary trace recorder, and its write throughput.
+
+Times TraceRecorder.record() - all an API request pays - in bursts the
+size of one flush interval at the request rate, then the writer's encode
+and write cost per event (spent on its own thread), and checks that the
+trace reads back event for event.
+
+Usage:
+    python benchmarks/bench_trace_recorder.py [--events 500000] [--burst 20000] [--resources 100] [--segment-mb 4]
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from core.trace_recorder import TraceRecorder, read_trace, segment_paths
+
+OPERATIONS = ('send', 'read', 'write', 'lock', 'unlock')
+TYPES = ('pipe', 'queue', 'memory', 'memory', 'memory')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--events', type=int, default=500000)
+    parser.add_argument('--burst', type=int, default=20000)
+    parser.add_argument('--resources', type=int, default=100)
+    parser.add_argument('--segment-mb', type=int, default=4)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix='ipc-trace-bench-')
+    try:
+        resources = [f'resource-{i:04d}' for i in range(args.resources)]
+        processes = [f'P{i}' for i in range(16)]
+        recorder = TraceRecorder(directory, segment_bytes=args.segment_mb << 20)
+
+        record = recorder.record
+        record_time = write_time = 0.0
+        for burst_start in range(0, args.events, args.burst):
+            start = time.perf_counter()
+            for i in range(burst_start, min(burst_start + args.burst, args.events)):
+                kind = i % 5
+                record(OPERATIONS[kind], TYPES[kind], resources[i % args.resources], processes[i % 16], 256)
+            record_time += time.perf_counter() - start
+            # What the writer thread does every flush_ms
+            start = time.perf_counter()
+            recorder.flush()
+            write_time += time.perf_counter() - start
+        recorder.close()
+
+        read_back = sum(1 for _ in read_trace(directory))
+        segments = segment_paths(directory)
+        size = sum(os.path.getsize(p) for p in segments)
+
+        print(f'{args.events:,} events, {args.resources} resources')
+        print(f'record():         {record_time / args.events * 1e9:8.0f} ns/event (request path)')
+        print(f'writer:           {write_time / args.events * 1e9:8.0f} ns/event (encode + write, off the request path)')
+        print(f'on disk:          {size / args.events:8.1f} bytes/event in {len(segments)} segments')
+        print(f'read back:        {read_back:,} events, {recorder.dropped} dropped')
+        if read_back + recorder.dropped != args.events:
+            print('MISMATCH: events lost')
+            sys.exit(1)
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
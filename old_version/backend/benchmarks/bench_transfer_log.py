@@ -0,0 +1,62 @@
+"""Memory and windowed-query cost of the analyzer's columnar transfer log.
+
+Appends transfers spread over a few hundred resources to a TransferLog and,
+for comparison, to a list of per-transfer dicts like the log used to keep,
+then times window sums over the whole log, its newest half, one type
+and one resource.
+
+Usage:
+    python benchmarks/bench_transfer_log.py [--entries 1000000] [--resources 300]
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from core.transfer_log import TransferLog
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--entries', type=int, default=1_000_000)
+    parser.add_argument('--resources', type=int, default=300)
+    args = parser.parse_args()
+
+    resources = [f'resource-{i}' for i in range(args.resources)]
+    writers = [f'P{i}' for i in range(8)]
+
+    start = time.perf_counter()
+    log = TransferLog(args.entries)
+    for i in range(args.entries):
+        log.append(float(i), 'pipe', resources[i % args.resources], 256, 1.5 if i % 2 else None, 1, writers[i % 8])
+    elapsed = time.perf_counter() - start
+    columns = (log.timestamps, log.sizes, log.counts, log.latencies, log.flags, log.resource_ids, log.writer_ids)
+    memory = sum(sys.getsizeof(column) for column in columns)
+    print(f'TransferLog  {args.entries:,} entries  {memory / args.entries:6.1f} B/entry  '
+          f'{args.entries / elapsed:10,.0f} appends/s')
+
+    sample = min(args.entries, 100_000)
+    tracemalloc.start()
+    dicts = [{'type': 'pipe', 'resourceId': resources[i % args.resources], 'size': 256,
+              'latency': 1.5 if i % 2 else None, 'count': 1, 'writerId': writers[i % 8],
+              'timestamp': float(i)} for i in range(sample)]
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print(f'dict list    {sample:,} entries  {memory / sample:6.1f} B/entry')
+    del dicts
+
+    for label, since, transfer_type, resource_id in (('whole log', 0, None, None),
+                                                     ('newest half', args.entries / 2, None, None),
+                                                     ('one type', 0, 'pipe', None),
+                                                     ('one resource', 0, None, resources[7])):
+        start = time.perf_counter()
+        sums = log.window(since, transfer_type, resource_id)
+        elapsed = time.perf_counter() - start
+        print(f'window {label:13} {sums["entries"]:>10,} matching  {elapsed * 1000:8.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,245 @@
+"""Compare the threaded Flask server with the asyncio server under many WebSocket clients.
+
+For each mode the server is started in a subprocess on a free port, then:
+
+  1. --connections WebSocket clients connect (at most --connect-concurrency at a time)
+  2. --events pipe writes are posted over REST by --writers concurrent writers;
+     each one is broadcast to every connected client
+  3. the run waits until every client has seen every event (or --timeout)
+
+Reported per mode: connect success and time, REST latency while fanning out,
+end-to-end delivery latency (server event timestamp -> client receive),
+frames delivered, and server threads / RSS at the end.
+
+Usage:
+    python benchmarks/bench_websocket.py [--modes flask async] [--connections 1000]
+        [--events 200] [--writers 4] [--json out.json]
+"""
+import argparse
+import asyncio
+import json
+import os
+import resource
+import socket
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+import aiohttp
+
+from bench_http import summarize
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+FLASK_COMMAND = (
+    'import sys; sys.path.insert(0, {backend!r}); '
+    'import logging; logging.getLogger("werkzeug").setLevel(logging.ERROR); '
+    'from werkzeug.serving import run_simple; from server import app; '
+    'run_simple("127.0.0.1", {port}, app, threaded=True)'
+)
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_server(mode, port):
+    if mode == 'flask':
+        command = [sys.executable, '-c', FLASK_COMMAND.format(backend=BACKEND_DIR, port=port)]
+    else:
+        command = [sys.executable, os.path.join(BACKEND_DIR, 'async_server.py'), '--host', '127.0.0.1', '--port', str(port)]
+    return subprocess.Popen(command, cwd=BACKEND_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+async def wait_ready(session, base_url, timeout=20):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            async with session.get(base_url + '/api/pipes') as response:
+                if response.status == 200:
+                    return
+        except aiohttp.ClientError:
+            pass
+        await asyncio.sleep(0.1)
+    raise RuntimeError(f'server at {base_url} did not come up')
+
+
+def process_stats(pid):
+    """Thread count and resident memory (MB) of the server process, from /proc"""
+    stats = {}
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                key, _, value = line.partition(':')
+                if key == 'Threads':
+                    stats['threads'] = int(value)
+                elif key == 'VmRSS':
+                    stats['rssMb'] = int(value.split()[0]) / 1024
+    except OSError:
+        pass
+    return stats
+
+
+class Client:
+    def __init__(self):
+        self.received = 0
+        self.latencies = []
+
+
+async def read_events(ws, client, event_type):
+    async for message in ws:
+        if message.type != aiohttp.WSMsgType.TEXT:
+            break
+        frame = json.loads(message.data)
+        if frame['type'] == event_type:
+            client.received += 1
+            client.latencies.append(datetime.now().timestamp() * 1000 - frame['data']['timestamp'])
+
+
+async def run_mode(mode, args):
+    port = free_port()
+    base_url = f'http://127.0.0.1:{port}'
+    server = start_server(mode, port)
+    timeout = aiohttp.ClientTimeout(total=None, sock_connect=30)
+    connector = aiohttp.TCPConnector(limit=0)
+    try:
+        async with aiohttp.ClientSession(timeout=timeout, connector=connector) as session:
+            await wait_ready(session, base_url)
+
+            # 1. Connect every client
+            gate = asyncio.Semaphore(args.connect_concurrency)
+            clients, sockets, connect_ms, failed = [], [], [], 0
+
+            async def connect():
+                nonlocal failed
+                async with gate:
+                    start = time.perf_counter()
+                    try:
+                        ws = await session.ws_connect(base_url + '/ws', autoping=True)
+                    except (aiohttp.ClientError, OSError, asyncio.TimeoutError):
+                        failed += 1
+                        return
+                    connect_ms.append((time.perf_counter() - start) * 1000)
+                    client = Client()
+                    clients.append(client)
+                    sockets.append(ws)
+                    readers.append(asyncio.create_task(read_events(ws, client, 'PIPE_DATA_TRANSFER')))
+
+            readers = []
+            start = time.perf_counter()
+            await asyncio.gather(*(connect() for _ in range(args.connections)))
+            connect_elapsed = time.perf_counter() - start
+
+            # 2. Broadcast load: pipe writes over REST
+            async with session.post(base_url + '/api/pipes/create',
+                                    json={'processA': 'bench', 'processB': 'ws', 'capacity': args.events + 1}) as response:
+                pipe_id = (await response.json())['id']
+            await asyncio.sleep(0.5)  # Let the PIPE_CREATED fan-out settle
+
+            rest_ms = []
+            remaining = iter(range(args.events))
+
+            async def writer():
+                for i in remaining:
+                    start = time.perf_counter()
+                    async with session.post(base_url + '/api/pipes/send',
+                                            json={'pipeId': pipe_id, 'data': {'seq': i}, 'direction': 'AtoB'}) as response:
+                        await response.read()
+                    rest_ms.append((time.perf_counter() - start) * 1000)
+
+            start = time.perf_counter()
+            await asyncio.gather(*(writer() for _ in range(args.writers)))
+            send_elapsed = time.perf_counter() - start
+
+            # 3. Wait for delivery to every client
+            expected = len(clients) * args.events
+            deadline = time.monotonic() + args.timeout
+            while sum(c.received for c in clients) < expected and time.monotonic() < deadline:
+                await asyncio.sleep(0.05)
+            delivery_elapsed = time.perf_counter() - start
+            delivered = sum(c.received for c in clients)
+
+            server_stats = process_stats(server.pid)
+            for ws in sockets:
+                await ws.close()
+            for task in readers:
+                task.cancel()
+    finally:
+        server.terminate()
+        server.wait()
+
+    latencies = [ms for c in clients for ms in c.latencies]
+    return {
+        'connections': {
+            'requested': args.connections,
+            'connected': len(clients),
+            'failed': failed,
+            'elapsed': connect_elapsed,
+            'latencyMs': summarize(connect_ms, connect_elapsed)
+        },
+        'rest': summarize(rest_ms, send_elapsed),
+        'delivery': {
+            'expected': expected,
+            'delivered': delivered,
+            'ratio': delivered / expected if expected else 0,
+            'elapsed': delivery_elapsed,
+            'framesPerSec': delivered / delivery_elapsed if delivery_elapsed > 0 else 0,
+            'latencyMs': summarize(latencies, delivery_elapsed)
+        },
+        'server': server_stats
+    }
+
+
+def print_report(mode, result):
+    conn, rest, delivery = result['connections'], result['rest'], result['delivery']
+    print(f'\n{mode}:')
+    print(f"  connect   {conn['connected']}/{conn['requested']} in {conn['elapsed']:.2f}s "
+          f"(failed {conn['failed']}, p50 {conn['latencyMs']['p50']:.1f}ms, p99 {conn['latencyMs']['p99']:.1f}ms)")
+    print(f"  rest      {rest['count']} sends, {rest['throughput']:,.0f} req/s, "
+          f"p50 {rest['p50']:.2f}ms p95 {rest['p95']:.2f}ms p99 {rest['p99']:.2f}ms")
+    lat = delivery['latencyMs']
+    print(f"  delivery  {delivery['delivered']}/{delivery['expected']} frames ({delivery['ratio']:.1%}) "
+          f"in {delivery['elapsed']:.2f}s, {delivery['framesPerSec']:,.0f} frames/s, "
+          f"p50 {lat['p50']:.1f}ms p95 {lat['p95']:.1f}ms p99 {lat['p99']:.1f}ms max {lat['max']:.1f}ms")
+    server = result['server']
+    if server:
+        print(f"  server    {server.get('threads', '?')} threads, {server.get('rssMb', 0):.0f} MB RSS")
+
+
+def raise_fd_limit(needed):
+    """Each connection costs a descriptor on both ends; lift the soft limit if we can"""
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < needed:
+        target = needed if hard == resource.RLIM_INFINITY else min(needed, hard)
+        resource.setrlimit(resource.RLIMIT_NOFILE, (target, hard))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--modes', nargs='+', choices=('flask', 'async'), default=['flask', 'async'])
+    parser.add_argument('--connections', type=int, default=1000)
+    parser.add_argument('--connect-concurrency', type=int, default=100)
+    parser.add_argument('--events', type=int, default=200, help='pipe writes broadcast to every client')
+    parser.add_argument('--writers', type=int, default=4, help='concurrent REST writers')
+    parser.add_argument('--timeout', type=float, default=60, help='seconds to wait for full delivery')
+    parser.add_argument('--json', help='write results to this file')
+    args = parser.parse_args()
+
+    raise_fd_limit(args.connections * 2 + 256)  # Inherited by the server subprocesses too
+
+    results = {}
+    for mode in args.modes:
+        results[mode] = asyncio.run(run_mode(mode, args))
+        print_report(mode, results[mode])
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'params': vars(args), 'modes': results}, f, indent=2)
+        print(f'\nwrote {args.json}')
+
+
+if __name__ == '__main__':
+    main()
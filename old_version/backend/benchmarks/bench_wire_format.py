@@ -0,0 +1,90 @@
+"""Encode cost and frame size of WebSocket events: JSON vs the binary wire format.
+
+Builds events shaped like the ones IPCService broadcasts (a few hundred
+resources, so ids repeat the way they do in a live session) and times the
+per-event encode of each encoding, plus the bytes a client receives (binary
+includes the one-off DEFINE records for resource ids).
+
+Usage:
+    python benchmarks/bench_wire_format.py [--events 100000] [--resources 200]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+import uuid
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from core.wire_format import ResourceInterner, encode_binary, decode_frames
+
+
+def sample_events(count, resources, rng):
+    pipes = [str(uuid.uuid4()) for _ in range(resources)]
+    queues = [str(uuid.uuid4()) for _ in range(resources)]
+    memories = [str(uuid.uuid4()) for _ in range(resources)]
+    makers = [
+        lambda: ('PIPE_DATA_READ', {'pipeId': rng.choice(pipes), 'message': None, 'direction': 'AtoB'}),
+        lambda: ('PIPE_DATA_TRANSFER', {'pipeId': rng.choice(pipes), 'data': {'seq': rng.randrange(10 ** 6)},
+                                        'direction': rng.choice(('AtoB', 'BtoA'))}),
+        lambda: ('QUEUE_MESSAGE_SENT', {'queueId': rng.choice(queues), 'message': {'priority': rng.randrange(10)},
+                                        'sender': f'P{rng.randrange(16)}'}),
+        lambda: ('MEMORY_LOCKED', {'memoryId': rng.choice(memories), 'processId': f'P{rng.randrange(16)}'}),
+        lambda: ('MEMORY_UNLOCKED', {'memoryId': rng.choice(memories), 'processId': f'P{rng.randrange(16)}'}),
+    ]
+    events = []
+    for _ in range(count):
+        event_type, data = rng.choice(makers)()
+        data['timestamp'] = datetime.now().timestamp() * 1000
+        events.append((event_type, data))
+    return events
+
+
+def best_of(repeat, encode):
+    """Fastest of several runs (single-core hosts are noisy) and the frames it produced"""
+    best, frames = None, None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        frames = encode()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, frames
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--events', type=int, default=100_000)
+    parser.add_argument('--resources', type=int, default=200)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    events = sample_events(args.events, args.resources, random.Random(args.seed))
+
+    json_time, json_frames = best_of(args.repeat, lambda: [json.dumps({'type': t, 'data': d}) for t, d in events])
+    interner = ResourceInterner()
+    binary_time, binary_frames = best_of(args.repeat, lambda: [encode_binary(t, d, interner) for t, d in events])
+
+    known = set()
+    wire = [frame.bytes_for(known) for frame in binary_frames]
+    json_bytes = sum(len(f) for f in json_frames)
+    binary_bytes = sum(len(b) for b in wire)
+
+    # Sanity: binary frames decode back to the same events
+    table = {}
+    for raw, (event_type, data) in zip(wire[:1000], events[:1000]):
+        (decoded,) = decode_frames(raw, table)
+        assert decoded == {'type': event_type, 'data': data}, (decoded, data)
+
+    print(f'{args.events} events over {args.resources * 3} resources')
+    print(f"{'encoding':10} {'us/event':>10} {'bytes/event':>12} {'total MB':>10}")
+    for name, elapsed, total in (('json', json_time, json_bytes), ('binary', binary_time, binary_bytes)):
+        print(f'{name:10} {elapsed / args.events * 1e6:>10.2f} {total / args.events:>12.1f} {total / 1e6:>10.2f}')
+    print(f'binary: {binary_bytes / json_bytes:.0%} of JSON bytes, {binary_time / json_time:.0%} of JSON encode time')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,264 @@
+"""Hammer every REST endpoint from many threads and check manager invariants.
+
+Worker threads share a small set of pipes, queues and memory segments and
+issue single and batch operations against them concurrently, while a churn
+thread keeps creating and deleting throwaway resources (and the workers
+poke those too, racing the deletes). Afterwards the final state has to add
+up with what the clients saw:
+
+    pipes     messages sent == messages read + messages still buffered (per direction)
+    queues    totalSent == totalReceived + currentSize, currentSize <= maxSize,
+              totalSent == accepted sends counted by the clients
+    memory    currentSize == len(json.dumps(data)), writes == accepted writes,
+              no lock left held, no read under a shared lock saw a writer
+    all       no request answered with a 500
+
+Exits non-zero when any invariant is violated.
+
+Usage:
+    python benchmarks/stress_endpoints.py [--threads 16] [--ops 500] [--resources 3]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from server import app
+
+DIRECTIONS = ('AtoB', 'BtoA')
+
+
+class Tally:
+    """Client-side counts merged from all workers"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counts = Counter()
+        self.errors = []
+
+    def merge(self, counts, errors):
+        with self.lock:
+            self.counts.update(counts)
+            self.errors.extend(errors)
+
+
+def setup(client, resources, queue_size):
+    pipes = [client.post('/api/pipes/create', json={'processA': f'A{i}', 'processB': f'B{i}', 'capacity': 50}).get_json()['id']
+             for i in range(resources)]
+    queues = [client.post('/api/queues/create', json={'name': f'q{i}', 'maxSize': queue_size}).get_json()['id']
+              for i in range(resources)]
+    memories = [client.post('/api/shared-memory/create', json={'name': f'm{i}', 'size': 4096}).get_json()['id']
+                for i in range(resources)]
+    return pipes, queues, memories
+
+
+def worker(index, ops, pipes, queues, memories, doomed, tally, seed):
+    rng = random.Random(seed)
+    client = app.test_client()
+    counts = Counter()
+    errors = []
+    process_id = f'P{index}'
+
+    def call(method, url, body=None):
+        response = client.open(url, method=method, json=body)
+        if response.status_code >= 500:
+            errors.append(f'{method} {url} -> {response.status_code}: {response.get_data(as_text=True)[:200]}')
+        return response.get_json(silent=True) or {}
+
+    for _ in range(ops):
+        op = rng.randrange(12)
+        pipe_id, queue_id, memory_id = rng.choice(pipes), rng.choice(queues), rng.choice(memories)
+        direction = rng.choice(DIRECTIONS)
+
+        if op == 0:
+            result = call('POST', '/api/pipes/send', {'pipeId': pipe_id, 'data': {'n': rng.random()}, 'direction': direction})
+            if result.get('success'):
+                counts[('pipe-sent', pipe_id, direction)] += 1
+        elif op == 1:
+            result = call('POST', '/api/pipes/read', {'pipeId': pipe_id, 'direction': direction})
+            if result.get('message') is not None:
+                counts[('pipe-read', pipe_id, direction)] += 1
+        elif op == 2:
+            items = [{'n': i} for i in range(rng.randint(1, 8))]
+            result = call('POST', '/api/pipes/send-batch', {'pipeId': pipe_id, 'messages': items, 'direction': direction})
+            counts[('pipe-sent', pipe_id, direction)] += result.get('sent', 0)
+        elif op == 3:
+            result = call('POST', '/api/pipes/read-batch', {'pipeId': pipe_id, 'direction': direction, 'count': rng.randint(1, 8)})
+            counts[('pipe-read', pipe_id, direction)] += result.get('count', 0)
+        elif op == 4:
+            message = {'n': rng.random(), 'priority': rng.randrange(5)}
+            result = call('POST', '/api/queues/send', {'queueId': queue_id, 'message': message, 'sender': process_id})
+            if result.get('success'):
+                counts[('queue-sent', queue_id)] += 1
+        elif op == 5:
+            call('POST', '/api/queues/receive', {'queueId': queue_id, 'receiver': process_id})
+        elif op == 6:
+            messages = [{'n': i, 'priority': rng.randrange(5)} for i in range(rng.randint(1, 8))]
+            result = call('POST', '/api/queues/send-batch', {'queueId': queue_id, 'messages': messages, 'sender': process_id})
+            counts[('queue-sent', queue_id)] += result.get('sent', 0)
+        elif op == 7:
+            call('POST', '/api/queues/receive-batch', {'queueId': queue_id, 'receiver': process_id, 'count': rng.randint(1, 8)})
+        elif op == 8:
+            locked = call('POST', '/api/shared-memory/lock', {'memoryId': memory_id, 'processId': process_id})
+            if locked.get('acquired'):
+                result = call('POST', '/api/shared-memory/write', {
+                    'memoryId': memory_id,
+                    'processId': process_id,
+                    'data': {process_id: rng.random(), 'last': process_id}
+                })
+                if result.get('success'):
+                    counts[('memory-writes', memory_id)] += 1
+                call('POST', '/api/shared-memory/unlock', {'memoryId': memory_id, 'processId': process_id})
+        elif op == 9:
+            if rng.random() < 0.5:
+                call('POST', '/api/shared-memory/read', {'memoryId': memory_id, 'processId': process_id})
+            else:
+                # Readers under a shared lock must never overlap a writer
+                locked = call('POST', '/api/shared-memory/lock',
+                              {'memoryId': memory_id, 'processId': process_id, 'mode': 'shared'})
+                if locked.get('acquired'):
+                    result = call('POST', '/api/shared-memory/read', {'memoryId': memory_id, 'processId': process_id})
+                    if result.get('writeConflict'):
+                        counts[('shared-read-conflicts', memory_id)] += 1
+                    call('POST', '/api/shared-memory/unlock', {'memoryId': memory_id, 'processId': process_id})
+        elif op == 10:
+            url = rng.choice(('/api/pipes', '/api/queues', '/api/shared-memory',
+                              '/api/analysis/bottlenecks', '/api/analysis/deadlocks'))
+            call('GET', url)
+        else:
+            # Operations on resources the churn thread may be deleting right now
+            with doomed['lock']:
+                targets = list(doomed['ids'])
+            if targets:
+                kind, resource_id = rng.choice(targets)
+                if kind == 'pipe':
+                    call('POST', '/api/pipes/send-batch', {'pipeId': resource_id, 'messages': [1, 2, 3], 'direction': direction})
+                elif kind == 'queue':
+                    call('POST', '/api/queues/receive-batch', {'queueId': resource_id, 'receiver': process_id, 'count': 3})
+                else:
+                    call('POST', '/api/shared-memory/lock', {'memoryId': resource_id, 'processId': process_id})
+                    call('POST', '/api/shared-memory/write', {'memoryId': resource_id, 'processId': process_id, 'data': {'x': 1}})
+                    call('POST', '/api/shared-memory/unlock', {'memoryId': resource_id, 'processId': process_id})
+
+    tally.merge(counts, errors)
+
+
+def churn(stop, doomed, tally):
+    client = app.test_client()
+    errors = []
+    while not stop.is_set():
+        pipe = client.post('/api/pipes/create', json={'processA': 'tmpA', 'processB': 'tmpB'}).get_json()
+        queue = client.post('/api/queues/create', json={'name': 'tmp'}).get_json()
+        memory = client.post('/api/shared-memory/create', json={'name': 'tmp'}).get_json()
+        created = [('pipe', pipe['id']), ('queue', queue['id']), ('memory', memory['id'])]
+        with doomed['lock']:
+            doomed['ids'].extend(created)
+        time.sleep(0.005)
+        for kind, resource_id in created:
+            url = {'pipe': '/api/pipes/', 'queue': '/api/queues/', 'memory': '/api/shared-memory/'}[kind]
+            response = client.delete(url + resource_id)
+            if response.status_code >= 500:
+                errors.append(f'DELETE {url}{resource_id} -> {response.status_code}')
+        with doomed['lock']:
+            for entry in created:
+                doomed['ids'].remove(entry)
+    tally.merge(Counter(), errors)
+
+
+def check(client, pipes, queues, memories, tally):
+    violations = list(tally.errors)
+    counts = tally.counts
+
+    all_pipes = {p['id']: p for p in client.get('/api/pipes').get_json()}
+    for pipe_id in pipes:
+        pipe = all_pipes[pipe_id]
+        for direction, buffer_key in (('AtoB', 'bufferA'), ('BtoA', 'bufferB')):
+            sent = counts[('pipe-sent', pipe_id, direction)]
+            read = counts[('pipe-read', pipe_id, direction)]
+            buffered = len(pipe[buffer_key])
+            if sent != read + buffered:
+                violations.append(f'pipe {pipe_id} {direction}: sent {sent} != read {read} + buffered {buffered}')
+            if buffered > pipe['capacity']:
+                violations.append(f'pipe {pipe_id} {direction}: {buffered} buffered over capacity {pipe["capacity"]}')
+
+    all_queues = {q['id']: q for q in client.get('/api/queues').get_json()}
+    for queue_id in queues:
+        queue = all_queues[queue_id]
+        stats = queue['stats']
+        if stats['totalSent'] != stats['totalReceived'] + queue['currentSize']:
+            violations.append(f"queue {queue_id}: totalSent {stats['totalSent']} != "
+                              f"totalReceived {stats['totalReceived']} + currentSize {queue['currentSize']}")
+        if queue['currentSize'] > queue['maxSize']:
+            violations.append(f"queue {queue_id}: currentSize {queue['currentSize']} > maxSize {queue['maxSize']}")
+        if stats['totalSent'] != counts[('queue-sent', queue_id)]:
+            violations.append(f"queue {queue_id}: totalSent {stats['totalSent']} != "
+                              f"{counts[('queue-sent', queue_id)]} accepted sends")
+
+    all_memory = {m['id']: m for m in client.get('/api/shared-memory').get_json()}
+    for memory_id in memories:
+        memory = all_memory[memory_id]
+        expected_size = len(json.dumps(memory['data']))
+        if memory['currentSize'] != expected_size:
+            violations.append(f"memory {memory_id}: currentSize {memory['currentSize']} != {expected_size}")
+        if memory['stats']['writes'] != counts[('memory-writes', memory_id)]:
+            violations.append(f"memory {memory_id}: writes {memory['stats']['writes']} != "
+                              f"{counts[('memory-writes', memory_id)]} accepted writes")
+        if memory['lock']['isLocked']:
+            violations.append(f"memory {memory_id}: still locked by {memory['lock']['owner']}")
+        if counts[('shared-read-conflicts', memory_id)]:
+            violations.append(f"memory {memory_id}: {counts[('shared-read-conflicts', memory_id)]} "
+                              f"reads under a shared lock overlapped a writer")
+
+    return violations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--ops', type=int, default=500, help='operations per thread')
+    parser.add_argument('--resources', type=int, default=3, help='pipes, queues and segments each')
+    parser.add_argument('--queue-size', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    client = app.test_client()
+    pipes, queues, memories = setup(client, args.resources, args.queue_size)
+    tally = Tally()
+    doomed = {'lock': threading.Lock(), 'ids': []}
+    stop = threading.Event()
+
+    churner = threading.Thread(target=churn, args=(stop, doomed, tally))
+    workers = [
+        threading.Thread(target=worker, args=(i, args.ops, pipes, queues, memories, doomed, tally, args.seed * 1000 + i))
+        for i in range(args.threads)
+    ]
+    start = time.perf_counter()
+    churner.start()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    stop.set()
+    churner.join()
+    elapsed = time.perf_counter() - start
+
+    total = args.threads * args.ops
+    print(f'{total} operations from {args.threads} threads in {elapsed:.2f}s ({total / elapsed:,.0f} ops/s)')
+
+    violations = check(client, pipes, queues, memories, tally)
+    if violations:
+        print(f'{len(violations)} invariant violation(s):')
+        for violation in violations[:50]:
+            print('  ' + violation)
+        sys.exit(1)
+    print('all invariants hold')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,37 @@
+import os
+
+# WebSocket fan-out (both server modes)
+WS_QUEUE_SIZE = int(os.environ.get('IPC_WS_QUEUE_SIZE', 1000))
+WS_OVERFLOW_POLICY = os.environ.get('IPC_WS_OVERFLOW_POLICY', 'drop-oldest')  # drop-oldest | coalesce | disconnect
+
+# Coalesced stream mode for high-rate dashboards; 'events' mode keeps one frame per event
+WS_DEFAULT_MODE = os.environ.get('IPC_WS_MODE', 'events')
+WS_STREAM_TICK_MS = int(os.environ.get('IPC_WS_STREAM_TICK_MS', 50))
+WS_STREAM_SAMPLES = int(os.environ.get('IPC_WS_STREAM_SAMPLES', 3))
+
+# Default event encoding for clients that don't ask (?encoding=binary); see core/wire_format.py
+WS_DEFAULT_ENCODING = os.environ.get('IPC_WS_ENCODING', 'json')
+
+# Data path of pipes, queues and shared memory: 'simulated' (in-process) or 'os' (core/os_ipc.py)
+IPC_BACKEND = os.environ.get('IPC_BACKEND', 'simulated')
+
+# Shared memory lock fairness: writer-preferring | reader-preferring | phase-fair (core/rw_lock.py)
+LOCK_FAIRNESS = os.environ.get('IPC_LOCK_FAIRNESS', 'writer-preferring')
+# A process queued for a lock that has not retried for this long loses its place
+LOCK_WAIT_TIMEOUT_MS = int(os.environ.get('IPC_LOCK_WAIT_TIMEOUT_MS', 30_000))
+
+# Binary operation trace (core/trace_recorder.py): set a directory to record every manager operation
+TRACE_DIR = os.environ.get('IPC_TRACE_DIR') or None
+TRACE_SEGMENT_MB = int(os.environ.get('IPC_TRACE_SEGMENT_MB', 64))
+TRACE_MAX_SEGMENTS = int(os.environ.get('IPC_TRACE_MAX_SEGMENTS', 0))  # Oldest segments deleted beyond this; 0 keeps all
+
+# Entries kept by the analyzer's columnar transfer log (core/transfer_log.py), 33 bytes each
+TRANSFER_LOG_CAPACITY = int(os.environ.get('IPC_TRANSFER_LOG_CAPACITY', 1_000_000))
+
+# Per-resource series kept by the analyzer's 1s/1m/1h rollups (core/rollups.py), about 270 KB each
+ROLLUP_MAX_SERIES = int(os.environ.get('IPC_ROLLUP_MAX_SERIES', 100))
+
+# Background bottleneck analysis (core/analysis_pipeline.py): transfers queued before drops, batch size, schedule
+ANALYSIS_QUEUE_SIZE = int(os.environ.get('IPC_ANALYSIS_QUEUE_SIZE', 50_000))
+ANALYSIS_BATCH_SIZE = int(os.environ.get('IPC_ANALYSIS_BATCH_SIZE', 2000))
+ANALYSIS_INTERVAL_MS = int(os.environ.get('IPC_ANALYSIS_INTERVAL_MS', 50))
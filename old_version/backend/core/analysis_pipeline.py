@@ -0,0 +1,162 @@
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+DEFAULT_CAPACITY = 50_000   # Queued transfers before new ones are dropped
+DEFAULT_BATCH_SIZE = 2000   # Transfers per analyzer pass
+DEFAULT_INTERVAL_MS = 50    # Worker schedule; a queue past half capacity wakes it early
+
+_DISCARD = object()  # Control event: the resource was deleted
+
+
+class AnalysisPipeline:
+    """Runs BottleneckAnalyzer off the request path.
+
+    Handlers call submit(), which only stamps the transfer and appends it
+    to a bounded deque (append and popleft are atomic, so submitters never
+    take a lock). A worker thread drains the deque in batches on a fixed
+    schedule and hands each batch to BottleneckAnalyzer.record_batch, which
+    runs the heuristics once per resource instead of once per transfer.
+    When the queue is full, new transfers are dropped and counted per type
+    rather than slowing the handlers down; past half capacity the worker is
+    woken early. Deletes go through the same queue (never dropped) so they
+    apply after the transfers before them; resets wait for the batch in
+    progress and discard the rest. A transfer the analyzer fails on is
+    counted and skipped, never taking the worker down with it.
+    """
+
+    def __init__(self, analyzer, capacity=DEFAULT_CAPACITY, batch_size=DEFAULT_BATCH_SIZE,
+                 interval_ms=DEFAULT_INTERVAL_MS):
+        self.analyzer = analyzer
+        self.capacity = capacity
+        self.batch_size = batch_size
+        self.interval_ms = interval_ms
+        self._events = deque()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._process_lock = threading.Lock()  # One batch at a time (worker, drain or reset)
+        self._drop_lock = threading.Lock()     # Only taken on the drop path
+        self.dropped = {}  # {type: transfers dropped on a full queue}
+        self.processed = 0
+        self.errors = 0
+        self.last_error = None
+        self.batches = 0
+        self.last_batch = {'size': 0, 'durationMs': 0, 'lagMs': 0}
+        self.max_lag_ms = 0
+
+    def submit(self, transfer_type, resource_id, size, latency=None, extra=None, count=1):
+        """Queue a transfer for analysis (BottleneckAnalyzer.record_transfer arguments); False if dropped"""
+        events = self._events
+        # The length check and append are not atomic together: concurrent
+        # submitters can overshoot capacity by at most one event each
+        if len(events) >= self.capacity:
+            with self._drop_lock:
+                self.dropped[transfer_type] = self.dropped.get(transfer_type, 0) + 1
+            self._wake.set()
+            return False
+        events.append((datetime.now().timestamp() * 1000, transfer_type, resource_id, size, latency, extra, count))
+        if len(events) * 2 >= self.capacity:
+            self._wake.set()
+        return True
+
+    def discard_resource(self, resource_id):
+        """Drop a deleted resource's aggregates once the transfers queued before the delete are analyzed"""
+        self._events.append((None, _DISCARD, resource_id))
+
+    def reset(self):
+        """Forget queued transfers and reset the analyzer, between batches"""
+        with self._process_lock:
+            self._events.clear()
+            self.analyzer.reset()
+
+    def drain(self):
+        """Analyze everything queued so far on the calling thread"""
+        while self._events:
+            self._process_batch()
+
+    def get_metrics(self):
+        with self._drop_lock:
+            dropped = dict(self.dropped)
+        return {
+            'running': self._thread is not None and self._thread.is_alive(),
+            'queued': len(self._events),
+            'capacity': self.capacity,
+            'batchSize': self.batch_size,
+            'intervalMs': self.interval_ms,
+            'processed': self.processed,
+            'errors': self.errors,
+            'lastError': self.last_error,
+            'dropped': dropped,
+            'droppedTotal': sum(dropped.values()),
+            'batches': self.batches,
+            'lastBatch': dict(self.last_batch),
+            'maxLagMs': self.max_lag_ms
+        }
+
+    def start(self):
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self):
+        interval = self.interval_ms / 1000
+        while not self._stop.is_set():
+            self._wake.wait(interval)
+            self._wake.clear()
+            # Keep going while a backlog remains; each batch is bounded
+            while self._events and not self._stop.is_set():
+                try:
+                    self._process_batch()
+                except Exception as e:
+                    # The batch is lost; later ones still get analyzed
+                    self._failed(e)
+
+    def _process_batch(self):
+        with self._process_lock:
+            # Only holders of the process lock pop, so the length can only grow meanwhile
+            events = self._events
+            batch = [events.popleft() for _ in range(min(len(events), self.batch_size))]
+            if not batch:
+                return
+            started = time.perf_counter()
+            transfers = []
+            analyzed = 0
+            for event in batch:
+                if event[1] is _DISCARD:
+                    analyzed += self._record(transfers)
+                    transfers = []
+                    try:
+                        self.analyzer.discard_resource(event[2])
+                    except Exception as e:
+                        self._failed(e)
+                else:
+                    transfers.append(event)
+            analyzed += self._record(transfers)
+
+            oldest = next((event[0] for event in batch if event[0] is not None), None)
+            lag = datetime.now().timestamp() * 1000 - oldest if oldest is not None else 0
+            self.processed += analyzed
+            self.batches += 1
+            self.last_batch = {'size': len(batch), 'durationMs': (time.perf_counter() - started) * 1000, 'lagMs': lag}
+            self.max_lag_ms = max(self.max_lag_ms, lag)
+
+    def _record(self, transfers):
+        """Hand transfers to the analyzer, counting what it failed on; how many were handed over"""
+        if transfers:
+            for error in self.analyzer.record_batch(transfers):
+                self._failed(error)
+        return len(transfers)
+
+    def _failed(self, error):
+        self.errors += 1
+        self.last_error = repr(error)
@@ -1,76 +1,185 @@
+import threading
+from collections import deque
 from datetime import datetime
 
+from .sliding_window import SlidingWindow
+from .latency_histogram import LatencyHistogram
 from .pipe_bottlenecks import analyze_pipe_bottlenecks
 from .queue_bottlenecks import analyze_queue_bottlenecks
 from .memory_bottlenecks import analyze_memory_bottlenecks
+from .transfer_log import TransferLog, DEFAULT_CAPACITY as TRANSFER_LOG_CAPACITY
+from .rollups import RollupEngine, DEFAULT_MAX_SERIES as ROLLUP_MAX_SERIES
+
+RESOURCE_WINDOW_MS = 5000  # Per-resource analysis window
+SYSTEM_WINDOW_MS = 10000   # Window for calculate_system_metrics
+# Newest transfers per resource the heuristics look at, which bounds their cost per event. Frequency
+# heuristics see a lower bound once a busy resource fills it, still above the default thresholds
+# (50 small writes/sec or writes/sec over RESOURCE_WINDOW_MS is 250 entries)
+RECENT_TRANSFERS = 512
+
+DEFAULT_THRESHOLDS = {
+    'high_latency': 1000,  # ms
+    'queue_size_warning': 50,
+    'transfer_rate_warning': 1000,  # bytes/sec
+    # Pipe-specific heuristic thresholds
+    'pipe_full_ratio': 0.9,       # buffer >90% full
+    'pipe_empty_ratio': 0.1,      # buffer <10% used
+    'small_write_size': 64,       # bytes
+    'small_write_frequency': 50,  # per second
+    'contention_writers': 3,      # distinct writers
+    'busy_poll_interval': 50,     # ms between reads (very tight loop)
+    # Queue-specific thresholds
+    'queue_high_occupancy_ratio': 0.8,
+    'queue_low_occupancy_ratio': 0.1,
+    'queue_blocked_send_rate': 5,   # blocked sends/sec
+    'queue_blocked_recv_rate': 5,    # blocked receives/sec
+    # Memory-specific thresholds
+    'memory_high_lock_wait': 500,    # ms
+    'memory_moderate_lock_wait': 200,  # ms
+    'memory_high_contention_queue': 5,  # processes
+    'memory_moderate_contention_queue': 3,  # processes
+    'memory_write_ratio_threshold': 0.7,  # 70% writes
+    'memory_read_ratio_threshold': 0.9,   # 90% reads
+    'memory_write_frequency': 50,   # writes per second
+    'memory_conflict_rate_high': 10,  # conflicts/sec
+    'memory_conflict_rate_moderate': 5,  # conflicts/sec
+    'memory_fragmentation_threshold': 10,  # fragmented blocks
+    'memory_high_utilization': 0.9,  # 90% full
+    'memory_low_utilization': 0.1    # 10% used
+}
+
+
+def detect_generic_issues(metrics, thresholds):
+    """Latency, frequency and throughput checks on window metrics (SlidingWindow.metrics())"""
+    issues = []
+    avg_latency = metrics['avgLatency']
+    frequency = metrics['frequency']
+    transfer_rate = metrics['transferRate']
+    
+    # Check for high latency
+    if avg_latency > thresholds['high_latency']:
+        issues.append({
+            'type': 'high-latency',
+            'severity': 'high',
+            'message': f"Average latency {avg_latency:.2f}ms exceeds threshold",
+            'value': avg_latency,
+            'threshold': thresholds['high_latency']
+        })
+    
+    # Check for high frequency (potential flooding)
+    if frequency > 100:
+        issues.append({
+            'type': 'high-frequency',
+            'severity': 'medium',
+            'message': f"High transfer frequency: {frequency:.2f} transfers/sec",
+            'value': frequency,
+            'threshold': 100
+        })
+    
+    # Check for low throughput relative to frequency
+    if frequency > 10 and transfer_rate < thresholds['transfer_rate_warning']:
+        issues.append({
+            'type': 'low-throughput',
+            'severity': 'medium',
+            'message': f"Low throughput: {transfer_rate:.2f} bytes/sec despite high frequency",
+            'value': transfer_rate,
+            'threshold': thresholds['transfer_rate_warning']
+        })
+    return issues
+
 
 class BottleneckAnalyzer:
-    def __init__(self):
-        self.transfers = []
+    def __init__(self, transfer_log_capacity=TRANSFER_LOG_CAPACITY, rollup_max_series=ROLLUP_MAX_SERIES):
+        self.transfers = TransferLog(transfer_log_capacity)  # Columnar, for windows of any length
+        self.rollups = RollupEngine(rollup_max_series)        # 1s/1m/1h history for days-long trends
+        # Per-(type, resource) aggregates, so analysis never scans other resources
+        self.windows = {}          # {(type, resourceId): SlidingWindow}
+        self.recent_transfers = {}  # {(type, resourceId): deque of the newest transfers inside the window}
+        self.resource_totals = {}  # {(type, resourceId): lifetime count/bytes/latency/timespan}
+        self.latency_histograms = {}  # {(type, resourceId): LatencyHistogram of measured latencies}
+        self.system_window = SlidingWindow(SYSTEM_WINDOW_MS)
+        self.type_windows = {}     # {type: SlidingWindow} for systemMetrics.byType
         # Live bottlenecks (sliding window) and persistent history
         self.bottlenecks = []
         self.bottleneck_history = []
-        self.thresholds = {
-            'high_latency': 1000,  # ms
-            'queue_size_warning': 50,
-            'transfer_rate_warning': 1000,  # bytes/sec
-            # Pipe-specific heuristic thresholds
-            'pipe_full_ratio': 0.9,       # buffer >90% full
-            'pipe_empty_ratio': 0.1,      # buffer <10% used
-            'small_write_size': 64,       # bytes
-            'small_write_frequency': 50,  # per second
-            'contention_writers': 3,      # distinct writers
-            'busy_poll_interval': 50,     # ms between reads (very tight loop)
-            # Queue-specific thresholds
-            'queue_high_occupancy_ratio': 0.8,
-            'queue_low_occupancy_ratio': 0.1,
-            'queue_blocked_send_rate': 5,   # blocked sends/sec
-            'queue_blocked_recv_rate': 5,    # blocked receives/sec
-            # Memory-specific thresholds
-            'memory_high_lock_wait': 500,    # ms
-            'memory_moderate_lock_wait': 200,  # ms
-            'memory_high_contention_queue': 5,  # processes
-            'memory_moderate_contention_queue': 3,  # processes
-            'memory_write_ratio_threshold': 0.7,  # 70% writes
-            'memory_read_ratio_threshold': 0.9,   # 90% reads
-            'memory_write_frequency': 50,   # writes per second
-            'memory_conflict_rate_high': 10,  # conflicts/sec
-            'memory_conflict_rate_moderate': 5,  # conflicts/sec
-            'memory_fragmentation_threshold': 10,  # fragmented blocks
-            'memory_high_utilization': 0.9,  # 90% full
-            'memory_low_utilization': 0.1    # 10% used
-        }
+        # Shared structures (transfer log, system windows, bottleneck lists) sit behind
+        # one lock; each resource's window and heuristics behind its own
+        self._lock = threading.Lock()
+        self._resource_locks = {}  # {resourceId: Lock}, covers its pipe/pipe-read keys
+        self.thresholds = dict(DEFAULT_THRESHOLDS)
     
-    def record_transfer(self, transfer_type, resource_id, size, latency=0, extra=None):
+    def record_transfer(self, transfer_type, resource_id, size, latency=None, extra=None, count=1, timestamp=None):
         """Record a data transfer.
-
+        
+        latency: measured latency in ms (pipe enqueue -> dequeue, queue wait,
+            lock -> write), or None when the operation has none to report.
         extra: optional dict with type-specific metadata (see analyze_bottleneck).
+        count: number of messages aggregated into this entry (batch endpoints);
+            size is then the total bytes and latency the mean per message.
+        timestamp: when the transfer happened (ms), if earlier than now.
+        """
+        self._capture(transfer_type, resource_id, size, latency, extra, count, timestamp)
+        
+        # Pipe-read vs generic pipe write differentiation for busy-polling detection
+        if transfer_type == 'pipe-read':
+            # For reads we only store the event; analysis happens when writes arrive
+            return
+        
+        # Analyze for bottlenecks
+        self.analyze_bottleneck(transfer_type, resource_id, extra=extra)
+    
+    def record_batch(self, transfers):
+        """Record (timestamp, type, resourceId, size, latency, extra, count) transfers, then analyze
+        each resource once (see AnalysisPipeline).
+        
+        The analysis sees the extra of the resource's latest transfer, with
+        boolean flags (blocked_send, ...) set if any transfer in the batch set them.
+        A transfer or analysis that raises is skipped so the rest of the batch
+        still counts; returns the exceptions raised.
         """
+        errors = []
+        latest = {}
+        for timestamp, transfer_type, resource_id, size, latency, extra, count in transfers:
+            try:
+                self._capture(transfer_type, resource_id, size, latency, extra, count, timestamp)
+            except Exception as e:
+                errors.append(e)
+                continue
+            if transfer_type == 'pipe-read':
+                continue
+            key = (transfer_type, resource_id)
+            previous = latest.get(key)
+            if previous and extra:
+                extra = {**extra, **{name: True for name, value in previous.items()
+                                     if value is True and name in extra}}
+            latest[key] = extra or previous
+        for (transfer_type, resource_id), extra in latest.items():
+            try:
+                self.analyze_bottleneck(transfer_type, resource_id, extra=extra)
+            except Exception as e:
+                errors.append(e)
+        return errors
+    
+    def _capture(self, transfer_type, resource_id, size, latency, extra, count, timestamp):
         transfer = {
             'type': transfer_type,
             'resourceId': resource_id,
             'size': size,
             'latency': latency,
-            'timestamp': datetime.now().timestamp() * 1000
+            'count': count,
+            'writerId': extra.get('writer_id') if extra else None,
+            'timestamp': datetime.now().timestamp() * 1000 if timestamp is None else timestamp
         }
         
-        self.transfers.append(transfer)
-        
-        # Keep only last 1000 transfers
-        if len(self.transfers) > 1000:
-            self.transfers = self.transfers[-1000:]
+        with self._lock:
+            self.transfers.append(transfer['timestamp'], transfer_type, resource_id, size, latency, count,
+                                  transfer['writerId'])
         
-        # Pipe-read vs generic pipe write differentiation for busy-polling detection
-        if transfer_type == 'pipe-read':
-            # For reads we only store the event; analysis happens when writes arrive
-            return
-
-        # Analyze for bottlenecks
-        self.analyze_bottleneck(transfer_type, resource_id, extra=extra)
+        self._update_aggregates(transfer)
     
     def analyze_bottleneck(self, transfer_type, resource_id, extra=None):
         """Analyze for bottlenecks in transfers.
-
+        
         extra: optional dict for type-specific metrics, e.g. for pipes:
             {
               'bufferA_size': int,
@@ -81,75 +190,54 @@ class BottleneckAnalyzer:
               'last_read_timestamps': {'AtoB': ts|None, 'BtoA': ts|None}
             }
         """
-        # Get recent transfers for this resource
-        recent_window = 5000  # 5 seconds
         now = datetime.now().timestamp() * 1000
+        with self._resource_lock(resource_id):
+            bottleneck = self._detect_issues(transfer_type, resource_id, extra, now)
         
-        recent_transfers = [
-            t for t in self.transfers
-            if t['resourceId'] == resource_id and
-               t['type'] == transfer_type and
-               now - t['timestamp'] < recent_window
-        ]
+        # Only record if issues were found
+        if bottleneck and bottleneck['issues']:
+            with self._lock:
+                self._record_bottleneck(bottleneck, now)
+            severities = [issue['severity'] for issue in bottleneck['issues']]
+            self.rollups.record_bottleneck(now, transfer_type, resource_id,
+                                           severities.count('high'), severities.count('medium'))
+    
+    def _detect_issues(self, transfer_type, resource_id, extra, now):
+        """Run the heuristics for one resource; caller holds its resource lock"""
+        # Window metrics come from this resource's running sums - O(1) per event
+        recent_window = RESOURCE_WINDOW_MS
+        key = (transfer_type, resource_id)
         
-        if not recent_transfers:
-            return
+        window = self.windows.get(key)
+        if window is None:
+            return None
+        metrics = window.metrics(now)
+        if not metrics['count']:
+            return None
         
-        # Calculate metrics
-        total_size = sum(t['size'] for t in recent_transfers)
-        avg_latency = sum(t['latency'] for t in recent_transfers) / len(recent_transfers)
-        transfer_rate = total_size / (recent_window / 1000)  # bytes per second
-        frequency = len(recent_transfers) / (recent_window / 1000)  # transfers per second
+        # Heuristics only see this resource's own recent transfers
+        recent_transfers = self._recent(key, now)
+        
+        if transfer_type == 'pipe':
+            # A pipe's enqueue -> dequeue latency is measured on the read side
+            read_window = self.windows.get(('pipe-read', resource_id))
+            read_metrics = read_window.metrics(now) if read_window is not None else None
+            if read_metrics and read_metrics['latencyCount']:
+                metrics['avgLatency'] = read_metrics['avgLatency']
         
         # Detect generic bottlenecks
         bottleneck = {
             'type': transfer_type,
             'resourceId': resource_id,
             'timestamp': now,
-            'metrics': {
-                'transferRate': transfer_rate,
-                'avgLatency': avg_latency,
-                'frequency': frequency,
-                'totalSize': total_size,
-                'count': len(recent_transfers)
-            },
-            'issues': []
+            'metrics': metrics,
+            'issues': detect_generic_issues(metrics, self.thresholds)
         }
         
-        # Check for high latency
-        if avg_latency > self.thresholds['high_latency']:
-            bottleneck['issues'].append({
-                'type': 'high-latency',
-                'severity': 'high',
-                'message': f"Average latency {avg_latency:.2f}ms exceeds threshold",
-                'value': avg_latency,
-                'threshold': self.thresholds['high_latency']
-            })
-        
-        # Check for high frequency (potential flooding)
-        if frequency > 100:
-            bottleneck['issues'].append({
-                'type': 'high-frequency',
-                'severity': 'medium',
-                'message': f"High transfer frequency: {frequency:.2f} transfers/sec",
-                'value': frequency,
-                'threshold': 100
-            })
-        
-        # Check for low throughput relative to frequency
-        if frequency > 10 and transfer_rate < self.thresholds['transfer_rate_warning']:
-            bottleneck['issues'].append({
-                'type': 'low-throughput',
-                'severity': 'medium',
-                'message': f"Low throughput: {transfer_rate:.2f} bytes/sec despite high frequency",
-                'value': transfer_rate,
-                'threshold': self.thresholds['transfer_rate_warning']
-            })
-        
         # Pipe-specific bottleneck patterns
         if transfer_type == 'pipe':
             history_ctx = {
-                'all_transfers': self.transfers,
+                'all_transfers': self._recent(('pipe-read', resource_id), now),
                 'resource_id': resource_id
             }
             bottleneck['issues'].extend(
@@ -162,7 +250,7 @@ class BottleneckAnalyzer:
                     history_context=history_ctx
                 )
             )
-
+        
         # Queue-specific bottleneck patterns (slow consumer / slow producer)
         if transfer_type == 'queue':
             bottleneck['issues'].extend(
@@ -174,7 +262,7 @@ class BottleneckAnalyzer:
                     self.thresholds
                 )
             )
-
+        
         # Shared-memory-specific bottlenecks (placeholder hook)
         if transfer_type == 'memory':
             bottleneck['issues'].extend(
@@ -187,52 +275,56 @@ class BottleneckAnalyzer:
                     memory_stats=None
                 )
             )
-
-        # Only record if issues were found
-        if bottleneck['issues']:
-            # Check if we already have a recent bottleneck for this resource
-            existing_index = None
-            for i, b in enumerate(self.bottlenecks):
-                if (b['resourceId'] == resource_id and
-                    b['type'] == transfer_type and
-                    now - b['timestamp'] < 10000):
-                    existing_index = i
-                    break
-            
-            if existing_index is not None:
-                # Update existing bottleneck
-                self.bottlenecks[existing_index] = bottleneck
-            else:
-                self.bottlenecks.append(bottleneck)
-            
-            # Append to persistent history as well
-            self.bottleneck_history.append(bottleneck)
-            # Keep history reasonably bounded
-            if len(self.bottleneck_history) > 500:
-                self.bottleneck_history = self.bottleneck_history[-500:]
-            
-            # Keep only last 50 live bottlenecks
-            if len(self.bottlenecks) > 50:
-                self.bottlenecks = self.bottlenecks[-50:]
+        
+        return bottleneck
+    
+    def _record_bottleneck(self, bottleneck, now):
+        """Add to the live list and history; caller holds self._lock"""
+        # Check if we already have a recent bottleneck for this resource
+        existing_index = None
+        for i, b in enumerate(self.bottlenecks):
+            if (b['resourceId'] == bottleneck['resourceId'] and
+                b['type'] == bottleneck['type'] and
+                now - b['timestamp'] < 10000):
+                existing_index = i
+                break
+        
+        if existing_index is not None:
+            # Update existing bottleneck
+            self.bottlenecks[existing_index] = bottleneck
+        else:
+            self.bottlenecks.append(bottleneck)
+        
+        # Append to persistent history as well
+        self.bottleneck_history.append(bottleneck)
+        # Keep history reasonably bounded
+        if len(self.bottleneck_history) > 500:
+            self.bottleneck_history = self.bottleneck_history[-500:]
+        
+        # Keep only last 50 live bottlenecks
+        if len(self.bottlenecks) > 50:
+            self.bottlenecks = self.bottlenecks[-50:]
     
     def get_bottlenecks(self):
         """Get live bottlenecks, persistent history and system metrics"""
         now = datetime.now().timestamp() * 1000
         recent_window = 30000  # 30 seconds
         
-        # Filter to recent bottlenecks
-        recent = [b for b in self.bottlenecks if now - b['timestamp'] < recent_window]
+        with self._lock:
+            # Filter to recent bottlenecks
+            recent = [b for b in self.bottlenecks if now - b['timestamp'] < recent_window]
+            history = list(self.bottleneck_history)
         
         # Calculate overall system metrics
         system_metrics = self.calculate_system_metrics()
         
         high_severity = [b for b in recent if any(i['severity'] == 'high' for i in b['issues'])]
         medium_severity = [b for b in recent if any(i['severity'] == 'medium' for i in b['issues'])]
-
+        
         # History summary (no time filter)
-        history_high = [b for b in self.bottleneck_history if any(i['severity'] == 'high' for i in b['issues'])]
-        history_medium = [b for b in self.bottleneck_history if any(i['severity'] == 'medium' for i in b['issues'])]
-
+        history_high = [b for b in history if any(i['severity'] == 'high' for i in b['issues'])]
+        history_medium = [b for b in history if any(i['severity'] == 'medium' for i in b['issues'])]
+        
         return {
             'bottlenecks': recent,
             'summary': {
@@ -246,9 +338,9 @@ class BottleneckAnalyzer:
                 }
             },
             'history': {
-                'items': self.bottleneck_history,
+                'items': history,
                 'summary': {
-                    'total': len(self.bottleneck_history),
+                    'total': len(history),
                     'highSeverity': len(history_high),
                     'mediumSeverity': len(history_medium)
                 }
@@ -259,62 +351,186 @@ class BottleneckAnalyzer:
     def calculate_system_metrics(self):
         """Calculate overall system metrics"""
         now = datetime.now().timestamp() * 1000
-        window = 10000  # 10 seconds
-        
-        recent_transfers = [t for t in self.transfers if now - t['timestamp'] < window]
+        with self._lock:
+            metrics = self.system_window.metrics(now)
+            
+            if not metrics['count']:
+                return {
+                    'totalTransfers': 0,
+                    'totalBytes': 0,
+                    'avgTransferSize': 0,
+                    'transferRate': 0,
+                    'avgLatency': 0
+                }
+            
+            by_type = {}
+            for transfer_type in ('pipe', 'queue', 'memory'):
+                window = self.type_windows.get(transfer_type)
+                by_type[transfer_type] = window.metrics(now)['count'] if window else 0
         
-        if not recent_transfers:
-            return {
-                'totalTransfers': 0,
-                'totalBytes': 0,
-                'avgTransferSize': 0,
-                'transferRate': 0,
-                'avgLatency': 0
+        return {
+            'totalTransfers': metrics['count'],
+            'totalBytes': metrics['totalSize'],
+            'avgTransferSize': metrics['totalSize'] / metrics['count'],
+            'transferRate': metrics['transferRate'],
+            'avgLatency': metrics['avgLatency'],
+            'byType': by_type
+        }
+    
+    def get_transfer_window(self, window_ms, transfer_type=None, resource_id=None):
+        """Transfers of the last window_ms from the transfer log, optionally for one type/resource"""
+        now = datetime.now().timestamp() * 1000
+        with self._lock:
+            sums = self.transfers.window(now - window_ms, transfer_type, resource_id)
+            log = {
+                'entries': len(self.transfers),
+                'capacity': self.transfers.capacity,
+                'bytes': self.transfers.nbytes,
+                'appended': self.transfers.appended,
+                'resources': len(self.transfers.resources)
             }
         
-        total_bytes = sum(t['size'] for t in recent_transfers)
-        total_latency = sum(t['latency'] for t in recent_transfers)
-        
+        seconds = window_ms / 1000
         return {
-            'totalTransfers': len(recent_transfers),
-            'totalBytes': total_bytes,
-            'avgTransferSize': total_bytes / len(recent_transfers),
-            'transferRate': total_bytes / (window / 1000),
-            'avgLatency': total_latency / len(recent_transfers),
-            'byType': {
-                'pipe': len([t for t in recent_transfers if t['type'] == 'pipe']),
-                'queue': len([t for t in recent_transfers if t['type'] == 'queue']),
-                'memory': len([t for t in recent_transfers if t['type'] == 'memory'])
-            }
+            'windowMs': window_ms,
+            'type': transfer_type,
+            'resourceId': resource_id,
+            'entries': sums['entries'],
+            'count': sums['count'],
+            'totalSize': sums['bytes'],
+            'transferRate': sums['bytes'] / seconds,
+            'frequency': sums['count'] / seconds,
+            'avgLatency': sums['latencySum'] / sums['latencyCount'] if sums['latencyCount'] else 0,
+            'latencyCount': sums['latencyCount'],
+            'writers': sums['writers'],
+            'log': log
         }
     
     def get_resource_analysis(self, resource_id, transfer_type):
         """Get analysis for a specific resource"""
-        transfers = [
-            t for t in self.transfers
-            if t['resourceId'] == resource_id and t['type'] == transfer_type
-        ]
+        with self._resource_lock(resource_id):
+            totals = self.resource_totals.get((transfer_type, resource_id))
+            totals = dict(totals) if totals else None
+            histogram = self.latency_histograms.get((transfer_type, resource_id))
+            latency = histogram.summary() if histogram is not None else None
         
-        if not transfers:
+        if not totals:
             return None
         
-        total_size = sum(t['size'] for t in transfers)
-        avg_latency = sum(t['latency'] for t in transfers) / len(transfers)
-        timespan = transfers[-1]['timestamp'] - transfers[0]['timestamp']
+        timespan = totals['last'] - totals['first']
         
         return {
             'resourceId': resource_id,
             'type': transfer_type,
-            'totalTransfers': len(transfers),
-            'totalBytes': total_size,
-            'avgTransferSize': total_size / len(transfers),
-            'avgLatency': avg_latency,
-            'transferRate': total_size / (timespan / 1000) if timespan > 0 else 0,
+            'totalTransfers': totals['count'],
+            'totalBytes': totals['bytes'],
+            'avgTransferSize': totals['bytes'] / totals['count'] if totals['count'] else 0,
+            'avgLatency': totals['latency'] / totals['latencyCount'] if totals['latencyCount'] else 0,
+            'latency': latency,
+            'transferRate': totals['bytes'] / (timespan / 1000) if timespan > 0 else 0,
             'timespan': timespan
         }
     
+    def get_latency_histograms(self, buckets=False):
+        """Measured latency percentiles (ms) per resource, keyed 'type:resourceId'"""
+        with self._lock:
+            keys = list(self.latency_histograms)
+        result = {}
+        for key in keys:
+            with self._resource_lock(key[1]):
+                histogram = self.latency_histograms.get(key)
+                if not histogram:
+                    continue
+                summary = histogram.summary()
+                if buckets:
+                    summary['buckets'] = histogram.buckets()
+            result[f'{key[0]}:{key[1]}'] = {'type': key[0], 'resourceId': key[1], **summary}
+        return result
+    
+    def get_history(self, start, end, transfer_type=None, resource_id=None, tier=None):
+        """Rolled-up throughput, latency and bottleneck counts for a time range (see RollupEngine.query)"""
+        return {**self.rollups.query(start, end, transfer_type, resource_id, tier),
+                'rollups': self.rollups.get_status()}
+    
+    def discard_resource(self, resource_id):
+        """Drop per-resource aggregates once a pipe, queue or segment is deleted; its rollups stay"""
+        self.rollups.discard_resource(resource_id)
+        with self._lock:
+            for key in [k for k in self.windows if k[1] == resource_id]:
+                del self.windows[key]
+                self.recent_transfers.pop(key, None)
+                self.resource_totals.pop(key, None)
+                self.latency_histograms.pop(key, None)
+            self._resource_locks.pop(resource_id, None)
+    
+    def _update_aggregates(self, transfer):
+        key = (transfer['type'], transfer['resourceId'])
+        ts = transfer['timestamp']
+        size, latency, count = transfer['size'], transfer['latency'], transfer['count']
+        
+        with self._lock:
+            window = self.windows.get(key)
+            if window is None:
+                window = self.windows[key] = SlidingWindow(RESOURCE_WINDOW_MS)
+                self.recent_transfers[key] = deque(maxlen=RECENT_TRANSFERS)
+                self.resource_totals[key] = {'count': 0, 'bytes': 0, 'latency': 0, 'latencyCount': 0,
+                                             'first': ts, 'last': ts}
+                self.latency_histograms[key] = LatencyHistogram()
+            recent = self.recent_transfers[key]
+            totals = self.resource_totals[key]
+            histogram = self.latency_histograms[key]
+            
+            self.system_window.add(ts, size, latency, count)
+            type_window = self.type_windows.get(transfer['type'])
+            if type_window is None:
+                type_window = self.type_windows[transfer['type']] = SlidingWindow(SYSTEM_WINDOW_MS)
+            type_window.add(ts, size, latency, count)
+        
+        self.rollups.record_transfer(ts, transfer['type'], transfer['resourceId'], size, latency, count)
+        
+        with self._resource_lock(transfer['resourceId']):
+            window.add(ts, size, latency, count)
+            recent.append(transfer)
+            while ts - recent[0]['timestamp'] >= RESOURCE_WINDOW_MS:
+                recent.popleft()
+            
+            totals['count'] += count
+            totals['bytes'] += size
+            totals['last'] = ts
+            if latency is not None:
+                totals['latency'] += latency * count
+                totals['latencyCount'] += count
+                histogram.record(latency, count)
+    
+    def _resource_lock(self, resource_id):
+        lock = self._resource_locks.get(resource_id)
+        if lock is None:
+            with self._lock:
+                lock = self._resource_locks.setdefault(resource_id, threading.Lock())
+        return lock
+    
+    def _recent(self, key, now):
+        """This resource's newest transfers inside the analysis window, oldest first.
+
+        The bounded deque itself, not a copy; caller holds the resource lock.
+        """
+        recent = self.recent_transfers.get(key)
+        if not recent:
+            return ()
+        while recent and now - recent[0]['timestamp'] >= RESOURCE_WINDOW_MS:
+            recent.popleft()
+        return recent
+    
     def reset(self):
         """Reset all tracking"""
-        self.transfers = []
-        self.bottlenecks = []
-        self.bottleneck_history = []
+        with self._lock:
+            self.transfers.clear()
+            self.windows = {}
+            self.recent_transfers = {}
+            self.resource_totals = {}
+            self.latency_histograms = {}
+            self.system_window.clear()
+            self.type_windows = {}
+            self.bottlenecks = []
+            self.bottleneck_history = []
+        self.rollups.clear()
@@ -0,0 +1,293 @@
+import asyncio
+import json
+import threading
+from collections import deque
+
+from .wire_format import ENCODINGS, BinaryFrame, ResourceInterner, encode_binary
+
+OVERFLOW_POLICIES = ('drop-oldest', 'coalesce', 'disconnect')
+
+# 'events' sends every event as it happens, 'stream' sends coalesced ticks (see EventStream)
+STREAM_MODES = ('events', 'stream')
+
+# Keys that identify the resource an event is about, used to coalesce frames
+RESOURCE_KEYS = ('pipeId', 'queueId', 'memoryId', 'id')
+
+
+def coalesce_key(event_type, data):
+    """(event type, resource id) - newer frames with the same key supersede older ones"""
+    if isinstance(data, dict):
+        for key in RESOURCE_KEYS:
+            if key in data:
+                return (event_type, data[key])
+    return None
+
+
+class ClientChannel:
+    """Bounded outbound queue for one WebSocket client, drained by its own sender thread"""
+
+    def __init__(self, client, max_queue, overflow_policy, on_close, mode='events', encoding='json'):
+        self.client = client
+        self.mode = mode
+        self.encoding = encoding
+        self._known = set()    # Interned resource indexes already defined for this client
+        self.max_queue = max_queue
+        self.overflow_policy = overflow_policy
+        self._on_close = on_close
+        self._queue = deque()  # [coalesce key, frame] entries, oldest first
+        self._latest = {}      # {coalesce key: queued entry} for the coalesce policy
+        self._cond = threading.Condition()
+        self.closed = False
+        self.evicted = False
+        self.stats = {'sent': 0, 'bytesSent': 0, 'dropped': 0, 'coalesced': 0, 'peakDepth': 0}
+        self._start()
+
+    def _start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _notify(self):
+        """Wake the sender; called with self._cond held"""
+        self._cond.notify()
+
+    def depth(self):
+        return len(self._queue)
+
+    def offer(self, frame, key=None):
+        """Queue a frame without blocking; applies the overflow policy when full"""
+        with self._cond:
+            if self.closed:
+                return False
+            if len(self._queue) >= self.max_queue:
+                if self.overflow_policy == 'disconnect':
+                    self.stats['dropped'] += 1
+                    self.evicted = True
+                    self._close_locked()
+                    return False
+                entry = self._latest.get(key) if key is not None and self.overflow_policy == 'coalesce' else None
+                if entry is not None:
+                    # Replace the pending frame for this resource in place
+                    entry[1] = frame
+                    self.stats['coalesced'] += 1
+                    return True
+                self._forget(self._queue.popleft())
+                self.stats['dropped'] += 1
+            entry = [key, frame]
+            self._queue.append(entry)
+            if key is not None:
+                self._latest[key] = entry
+            self.stats['peakDepth'] = max(self.stats['peakDepth'], len(self._queue))
+            self._notify()
+            return True
+
+    def close(self):
+        with self._cond:
+            self._close_locked()
+
+    def _wire(self, frame):
+        """Bytes/str to send for a queued frame; only the sender calls this"""
+        data = frame.bytes_for(self._known) if isinstance(frame, BinaryFrame) else frame
+        self.stats['bytesSent'] += len(data)
+        return data
+
+    def _forget(self, entry):
+        if entry[0] is not None and self._latest.get(entry[0]) is entry:
+            del self._latest[entry[0]]
+
+    def _close_locked(self):
+        if not self.closed:
+            self.closed = True
+            self._queue.clear()
+            self._latest.clear()
+            self._notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._queue and not self.closed:
+                    self._cond.wait()
+                if self.closed:
+                    break
+                entry = self._queue.popleft()
+                self._forget(entry)
+                frame = entry[1]
+            try:
+                self.client.send(self._wire(frame))
+                self.stats['sent'] += 1
+            except Exception:
+                self.close()
+                break
+        if self.evicted:
+            # Too slow for the disconnect policy - drop the connection itself
+            try:
+                self.client.close()
+            except Exception:
+                pass
+        self._on_close(self)
+
+
+class AsyncClientChannel(ClientChannel):
+    """ClientChannel drained by an asyncio task instead of a thread.
+
+    For aiohttp WebSocketResponse clients; create it on the event loop.
+    offer and close may also come from other threads (endpoints run in a
+    thread pool with the OS backend): the wakeup is then handed to the loop.
+    """
+
+    def _start(self):
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+        self._wakeup = asyncio.Event()
+        self._task = self._loop.create_task(self._drain())
+
+    def _notify(self):
+        if threading.get_ident() == self._loop_thread:
+            self._wakeup.set()
+        else:
+            try:
+                self._loop.call_soon_threadsafe(self._wakeup.set)
+            except RuntimeError:
+                pass  # Loop already closed
+
+    async def _drain(self):
+        while True:
+            while not self._queue and not self.closed:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+            with self._cond:  # Held briefly; offers from pool threads also pop on overflow
+                if self.closed:
+                    break
+                if not self._queue:
+                    continue
+                entry = self._queue.popleft()
+                self._forget(entry)
+            data = self._wire(entry[1])
+            try:
+                if isinstance(data, bytes):
+                    await self.client.send_bytes(data)
+                else:
+                    await self.client.send_str(data)
+                self.stats['sent'] += 1
+            except Exception:
+                self.close()
+                break
+        if self.evicted:
+            try:
+                await self.client.close()
+            except Exception:
+                pass
+        self._on_close(self)
+
+
+class Broadcaster:
+    """Fan-out of server events to WebSocket clients off the request path.
+
+    publish() serializes an event once per encoding in use (see wire_format)
+    and hands the frame to every client's bounded queue; a dedicated sender thread per client does the actual
+    send(), so a slow dashboard only ever delays itself.
+    """
+
+    def __init__(self, max_queue=1000, overflow_policy='drop-oldest', channel_class=ClientChannel):
+        if overflow_policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"overflow_policy must be one of {OVERFLOW_POLICIES}")
+        self.max_queue = max_queue
+        self.overflow_policy = overflow_policy
+        self.channel_class = channel_class  # AsyncClientChannel when serving from an event loop
+        self._channels = {}  # {id(client): ClientChannel}
+        self._lock = threading.Lock()
+        self.stats = {'published': 0, 'disconnected': 0}
+        self.interner = ResourceInterner()  # Resource ids -> indexes for binary clients
+
+    def add_client(self, client, mode='events', encoding='json'):
+        if mode not in STREAM_MODES:
+            raise ValueError(f"mode must be one of {STREAM_MODES}")
+        if encoding not in ENCODINGS:
+            raise ValueError(f"encoding must be one of {ENCODINGS}")
+        channel = self.channel_class(client, self.max_queue, self.overflow_policy, self._channel_closed, mode, encoding)
+        with self._lock:
+            self._channels[id(client)] = channel
+        return channel
+
+    def set_mode(self, client, mode):
+        if mode not in STREAM_MODES:
+            raise ValueError(f"mode must be one of {STREAM_MODES}")
+        with self._lock:
+            channel = self._channels.get(id(client))
+        if channel:
+            channel.mode = mode
+        return channel is not None
+
+    def set_encoding(self, client, encoding):
+        if encoding not in ENCODINGS:
+            raise ValueError(f"encoding must be one of {ENCODINGS}")
+        with self._lock:
+            channel = self._channels.get(id(client))
+        if channel:
+            channel.encoding = encoding
+        return channel is not None
+
+    def remove_client(self, client):
+        with self._lock:
+            channel = self._channels.pop(id(client), None)
+        if channel:
+            channel.close()
+
+    def client_count(self, mode=None):
+        with self._lock:
+            if mode is None:
+                return len(self._channels)
+            return sum(1 for c in self._channels.values() if c.mode == mode)
+
+    def publish(self, event_type, data, mode='events'):
+        """Send to every client subscribed in the given mode"""
+        with self._lock:
+            channels = [c for c in self._channels.values() if c.mode == mode]
+        self.stats['published'] += 1
+        if not channels:
+            return
+        frames = {}
+        key = coalesce_key(event_type, data)
+        for channel in channels:
+            frame = frames.get(channel.encoding)
+            if frame is None:
+                frame = frames[channel.encoding] = self._encode(event_type, data, channel.encoding)
+            channel.offer(frame, key)
+
+    def _encode(self, event_type, data, encoding):
+        if encoding == 'binary':
+            return encode_binary(event_type, data, self.interner)
+        return json.dumps({'type': event_type, 'data': data})
+
+    def get_metrics(self):
+        with self._lock:
+            channels = list(self._channels.values())
+        clients = [
+            {
+                'id': id(channel.client),
+                'mode': channel.mode,
+                'encoding': channel.encoding,
+                'queueDepth': channel.depth(),
+                **channel.stats
+            }
+            for channel in channels
+        ]
+        return {
+            'clients': clients,
+            'summary': {
+                'clients': len(clients),
+                'overflowPolicy': self.overflow_policy,
+                'maxQueue': self.max_queue,
+                'published': self.stats['published'],
+                'disconnected': self.stats['disconnected'],
+                'queueDepth': sum(c['queueDepth'] for c in clients),
+                'bytesSent': sum(c['bytesSent'] for c in clients),
+                'dropped': sum(c['dropped'] for c in clients),
+                'coalesced': sum(c['coalesced'] for c in clients)
+            }
+        }
+
+    def _channel_closed(self, channel):
+        with self._lock:
+            if self._channels.get(id(channel.client)) is channel:
+                del self._channels[id(channel.client)]
+                self.stats['disconnected'] += 1
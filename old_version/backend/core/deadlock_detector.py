@@ -1,27 +1,63 @@
+import functools
+import threading
 from datetime import datetime
 
+from .wait_for_graph import WaitForGraph
+
+
+def _locked(method):
+    """Serialize a public method on the detector's lock (requests arrive on many threads)"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+def wall_clock_ms():
+    return datetime.now().timestamp() * 1000
+
+
 class DeadlockDetector:
-    def __init__(self):
+    def __init__(self, clock=wall_clock_ms, on_deadlock=None):
         self.resource_graph = {}  # Resource allocation graph
         self.process_locks = {}  # Track locks held by each process
         self.waiting_for = {}  # Track what each process is waiting for
+        self.wait_for = WaitForGraph()  # Process -> owner edges, checked incrementally
         self.detected_deadlocks = []
+        self.clock = clock  # () -> ms; offline trace analysis replays on the trace's own clock
+        self.on_deadlock = on_deadlock  # callable(deadlock), e.g. the /metrics counter
+        self._lock = threading.RLock()
     
-    def record_lock_acquisition(self, resource_id, process_id):
-        """Record that process has acquired lock on resource"""
+    @_locked
+    def record_lock_acquisition(self, resource_id, process_id, mode='exclusive'):
+        """Record that process has acquired lock on resource (shared locks have many holders)"""
+        # The new holder is no longer waiting on anything
+        self._clear_wait(process_id)
+        
+        resource = self._resource(resource_id)
+        holders = resource['holders']
+        
+        # An exclusive grant displaces every other holder; a shared one displaces a stale writer
+        for previous in list(holders):
+            if previous != process_id and (mode == 'exclusive' or holders[previous] == 'exclusive'):
+                self._drop_holder(resource_id, previous)
+        
         if process_id not in self.process_locks:
             self.process_locks[process_id] = set()
         self.process_locks[process_id].add(resource_id)
+        if holders.get(process_id) != 'exclusive':
+            holders[process_id] = mode
+        self._sync_owner(resource)
         
-        # Remove from waiting list
-        if process_id in self.waiting_for:
-            del self.waiting_for[process_id]
-        
-        # Update resource graph
-        if resource_id not in self.resource_graph:
-            self.resource_graph[resource_id] = {'owner': None, 'waiters': []}
-        self.resource_graph[resource_id]['owner'] = process_id
+        # Remaining waiters now also wait on the new holder, which may close a cycle
+        cycle = None
+        for waiter in resource['waiters']:
+            if waiter != process_id:
+                cycle = self.wait_for.add_edge(waiter, process_id) or cycle
+        return self._record_deadlock(cycle) if cycle else None
     
+    @_locked
     def record_lock_release(self, resource_id, process_id):
         """Remove lock from process"""
         if process_id in self.process_locks:
@@ -29,91 +65,71 @@ class DeadlockDetector:
         
         # Update resource graph
         if resource_id in self.resource_graph:
-            self.resource_graph[resource_id]['owner'] = None
+            self._drop_holder(resource_id, process_id)
+    
+    @_locked
+    def record_wait_withdrawn(self, resource_id, process_id):
+        """Process stopped waiting for resource without getting it (gave up or timed out)"""
+        if self.waiting_for.get(process_id) == resource_id:
+            self._clear_wait(process_id)
     
+    @_locked
     def record_waiting_for(self, process_id, resource_id):
-        """Record that process is waiting for resource"""
+        """Record that process is waiting for resource.
+
+        Returns the wait-for cycle closed by this wait, or None.
+        """
+        if self.waiting_for.get(process_id) != resource_id:
+            self._clear_wait(process_id)
         self.waiting_for[process_id] = resource_id
         
         # Add to resource waiters
-        if resource_id not in self.resource_graph:
-            self.resource_graph[resource_id] = {'owner': None, 'waiters': []}
+        resource = self._resource(resource_id)
         
-        if process_id not in self.resource_graph[resource_id]['waiters']:
-            self.resource_graph[resource_id]['waiters'].append(process_id)
+        if process_id not in resource['waiters']:
+            resource['waiters'].append(process_id)
+        
+        # A waiter waits on every current holder (all readers of a shared lock);
+        # only the newly added edges need to be checked for a cycle
+        cycle = None
+        for holder in resource['holders']:
+            if holder != process_id:
+                cycle = self.wait_for.add_edge(process_id, holder) or cycle
+        return cycle
     
+    @_locked
     def check_deadlock(self, resource_id, process_id, operation):
         """Check for deadlock when a process tries to access a resource"""
         if operation in ['write', 'lock']:
             if resource_id in self.resource_graph:
                 resource = self.resource_graph[resource_id]
                 
-                if resource['owner'] and resource['owner'] != process_id:
-                    self.record_waiting_for(process_id, resource_id)
-                    
-                    # Detect circular wait
-                    cycle = self.detect_cycle(process_id)
+                if any(holder != process_id for holder in resource['holders']):
+                    cycle = self.record_waiting_for(process_id, resource_id)
                     
                     if cycle:
-                        deadlock = {
-                            'id': f"deadlock-{int(datetime.now().timestamp() * 1000)}",
-                            'timestamp': datetime.now().timestamp() * 1000,
-                            'type': 'circular-wait',
-                            'cycle': cycle,
-                            'processes': cycle,
-                            'resources': self.get_resources_in_cycle(cycle),
-                            'severity': 'high'
-                        }
-                        
-                        self.detected_deadlocks.append(deadlock)
-                        
                         return {
                             'detected': True,
-                            'deadlock': deadlock
+                            'deadlock': self._record_deadlock(cycle)
                         }
         
         return {'detected': False}
     
+    @_locked
     def detect_cycle(self, start_process):
-        """Detect circular wait using DFS"""
-        visited = set()
-        recursion_stack = set()
-        path = []
-        
-        def dfs(process_id):
-            if process_id in recursion_stack:
-                # Cycle detected - extract the cycle
-                try:
-                    cycle_start = path.index(process_id)
-                    return path[cycle_start:]
-                except ValueError:
-                    return []
-            
-            if process_id in visited:
-                return []
-            
-            visited.add(process_id)
-            recursion_stack.add(process_id)
-            path.append(process_id)
-            
-            # Check what resource this process is waiting for
-            if process_id in self.waiting_for:
-                waiting_for_resource = self.waiting_for[process_id]
-                
-                if waiting_for_resource in self.resource_graph:
-                    resource = self.resource_graph[waiting_for_resource]
-                    
-                    if resource['owner']:
-                        cycle = dfs(resource['owner'])
-                        if cycle:
-                            return cycle
-            
-            recursion_stack.discard(process_id)
-            path.pop()
-            
-            return []
-        
-        return dfs(start_process)
+        """Return the wait-for cycle through start_process, or [] if it is not deadlocked"""
+        return self.wait_for.find_cycle_from(start_process)
+    
+    @_locked
+    def detect_all_cycles(self):
+        """Full pass over the wait-for graph: every deadlocked group of processes at once"""
+        return [
+            {
+                'processes': component,
+                'resources': self.get_resources_in_cycle(component)
+            }
+            for component in self.wait_for.strongly_connected_components()
+        ]
     
     def get_resources_in_cycle(self, cycle):
         """Get resources involved in the deadlock cycle"""
@@ -122,76 +138,135 @@ class DeadlockDetector:
         for process_id in cycle:
             if process_id in self.waiting_for:
                 resource_id = self.waiting_for[process_id]
-                owner = self.resource_graph.get(resource_id, {}).get('owner')
+                resource = self.resource_graph.get(resource_id, {})
                 
                 resources.append({
                     'resourceId': resource_id,
-                    'owner': owner,
+                    'owner': resource.get('owner'),
+                    'holders': dict(resource.get('holders', {})),
                     'waitingProcess': process_id
                 })
         
         return resources
     
+    @_locked
     def get_deadlocks(self):
         """Get all detected deadlocks and potential deadlocks"""
         potential_deadlocks = self.analyze_potential_deadlocks()
         
-        now = datetime.now().timestamp() * 1000
+        now = self.clock()
         recent = [d for d in self.detected_deadlocks if now - d['timestamp'] < 60000]
+        active = self.detect_all_cycles()
         
         return {
-            'detected': self.detected_deadlocks,
+            'detected': list(self.detected_deadlocks),
             'potential': potential_deadlocks,
+            'active': active,
             'summary': {
                 'total': len(self.detected_deadlocks),
-                'recent': len(recent)
+                'recent': len(recent),
+                'active': len(active)
             }
         }
     
+    @_locked
     def analyze_potential_deadlocks(self):
         """Analyze for potential deadlocks"""
         potential = []
         
-        # Check for processes waiting too long
+        # A waiter whose lock holder is itself waiting on something the waiter holds.
+        # One dict/set lookup per waiter and holder instead of scanning every lock it holds.
         for process_id, resource_id in self.waiting_for.items():
-            if resource_id in self.resource_graph:
-                resource = self.resource_graph[resource_id]
+            for holder in self.resource_graph.get(resource_id, {}).get('holders', ()):
+                if holder == process_id:
+                    continue
                 
-                if resource['owner']:
-                    locks_held_by_owner = self.process_locks.get(resource['owner'], set())
-                    locks_held_by_waiter = self.process_locks.get(process_id, set())
-                    
-                    # Check for potential circular dependency
-                    for held_resource in locks_held_by_waiter:
-                        if held_resource in self.resource_graph:
-                            held = self.resource_graph[held_resource]
-                            if resource['owner'] in held.get('waiters', []):
-                                potential.append({
-                                    'type': 'potential-circular',
-                                    'processA': process_id,
-                                    'processB': resource['owner'],
-                                    'resourceA': resource_id,
-                                    'resourceB': held_resource,
-                                    'severity': 'medium',
-                                    'timestamp': datetime.now().timestamp() * 1000
-                                })
+                holder_waits_on = self.waiting_for.get(holder)
+                if holder_waits_on is not None and holder_waits_on in self.process_locks.get(process_id, ()):
+                    potential.append({
+                        'type': 'potential-circular',
+                        'processA': process_id,
+                        'processB': holder,
+                        'resourceA': resource_id,
+                        'resourceB': holder_waits_on,
+                        'severity': 'medium',
+                        'timestamp': self.clock()
+                    })
         
         return potential
     
+    @_locked
     def reset(self):
         """Reset all tracking"""
         self.resource_graph = {}
         self.process_locks = {}
         self.waiting_for = {}
+        self.wait_for.clear()
         self.detected_deadlocks = []
     
+    def _clear_wait(self, process_id):
+        """Drop the process's current wait and its outgoing wait-for edges, and nodes left without edges"""
+        resource_id = self.waiting_for.pop(process_id, None)
+        if resource_id is None:
+            return
+        resource = self.resource_graph.get(resource_id)
+        if resource:
+            if process_id in resource['waiters']:
+                resource['waiters'].remove(process_id)
+            for holder in resource['holders']:
+                self.wait_for.remove_edge(process_id, holder)
+                self.wait_for.prune(holder)
+        self.wait_for.prune(process_id)
+    
+    def _resource(self, resource_id):
+        if resource_id not in self.resource_graph:
+            # owner: the exclusive holder, kept alongside holders for existing consumers
+            self.resource_graph[resource_id] = {'owner': None, 'holders': {}, 'waiters': []}
+        return self.resource_graph[resource_id]
+    
+    def _drop_holder(self, resource_id, process_id):
+        """Remove a holder and the wait-for edges pointing at it for this resource, and nodes left without edges"""
+        resource = self.resource_graph[resource_id]
+        if resource['holders'].pop(process_id, None) is None:
+            return
+        if process_id in self.process_locks:
+            self.process_locks[process_id].discard(resource_id)
+        for waiter in resource['waiters']:
+            self.wait_for.remove_edge(waiter, process_id)
+            self.wait_for.prune(waiter)
+        self.wait_for.prune(process_id)
+        self._sync_owner(resource)
+    
+    @staticmethod
+    def _sync_owner(resource):
+        exclusive = [p for p, mode in resource['holders'].items() if mode == 'exclusive']
+        resource['owner'] = exclusive[0] if exclusive else None
+    
+    def _record_deadlock(self, cycle):
+        now = self.clock()
+        deadlock = {
+            'id': f"deadlock-{int(now)}",
+            'timestamp': now,
+            'type': 'circular-wait',
+            'cycle': cycle,
+            'processes': cycle,
+            'resources': self.get_resources_in_cycle(cycle),
+            'severity': 'high'
+        }
+        self.detected_deadlocks.append(deadlock)
+        if self.on_deadlock is not None:
+            self.on_deadlock(deadlock)
+        return deadlock
+    
+    @_locked
     def get_system_state(self):
         """Get current system state"""
         resources = [
             {
                 'id': res_id,
                 'owner': data['owner'],
-                'waiters': data['waiters']
+                'holders': dict(data['holders']),
+                'waiters': list(data['waiters'])
             }
             for res_id, data in self.resource_graph.items()
         ]
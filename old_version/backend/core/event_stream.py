@@ -0,0 +1,120 @@
+import threading
+import time
+from datetime import datetime
+
+# Event type prefix -> resource type, and the data key holding the resource id
+RESOURCE_TYPES = {
+    'PIPE_': ('pipe', 'pipeId'),
+    'QUEUE_': ('queue', 'queueId'),
+    'MEMORY_': ('memory', 'memoryId')
+}
+
+# Low-rate lifecycle events are forwarded to stream clients as they happen
+PASSTHROUGH_SUFFIXES = ('_CREATED', '_DELETED')
+
+
+def classify(event_type, data):
+    """Return (resource type, resource id) for an aggregatable event, else None"""
+    if event_type.endswith(PASSTHROUGH_SUFFIXES) or not isinstance(data, dict):
+        return None
+    for prefix, (resource_type, id_key) in RESOURCE_TYPES.items():
+        if event_type.startswith(prefix) and data.get(id_key) is not None:
+            return resource_type, data[id_key]
+    return None
+
+
+class EventStream:
+    """Coalesces high-rate per-resource events into periodic STREAM_TICK frames.
+
+    Every tick, each resource that saw activity contributes one entry with
+    per-event-type counters, its current buffer/queue gauges and their
+    deltas since the previous tick, plus a handful of sampled payloads -
+    instead of one frame per message. Frames go to clients that subscribed
+    in 'stream' mode; 'events' clients keep receiving every event.
+    """
+
+    def __init__(self, broadcaster, tick_ms=50, sample_limit=3, gauges=None):
+        self.broadcaster = broadcaster
+        self.tick_ms = tick_ms
+        self.sample_limit = sample_limit
+        self.gauges = gauges  # callable(resource_type, resource_id) -> dict of numeric gauges, or None
+        self._pending = {}    # {(resource type, id): aggregate for the current tick}
+        self._last_gauges = {}
+        self._lock = threading.Lock()
+        self._seq = 0
+        self._thread = None
+        self._stop = threading.Event()
+
+    def record(self, event_type, data):
+        """Fold an event into the current tick; no-op while nobody streams"""
+        if not self.broadcaster.client_count('stream'):
+            return
+        resource = classify(event_type, data)
+        if resource is None:
+            if event_type.endswith('_DELETED') and isinstance(data, dict):
+                with self._lock:
+                    for resource_type, id_key in RESOURCE_TYPES.values():
+                        self._last_gauges.pop((resource_type, data.get(id_key)), None)
+            self.broadcaster.publish(event_type, data, mode='stream')
+            return
+
+        with self._lock:
+            entry = self._pending.get(resource)
+            if entry is None:
+                entry = self._pending[resource] = {'events': {}, 'count': 0, 'deadlocks': 0, 'samples': []}
+            entry['events'][event_type] = entry['events'].get(event_type, 0) + 1
+            entry['count'] += 1
+            if (data.get('deadlock') or {}).get('detected'):
+                entry['deadlocks'] += 1
+            if len(entry['samples']) < self.sample_limit:
+                payload = data.get('data', data.get('message'))
+                if payload is not None:
+                    entry['samples'].append(payload)
+
+    def flush(self):
+        """Build the frame for everything recorded since the last flush (None if idle)"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return None
+
+        resources = []
+        for (resource_type, resource_id), entry in pending.items():
+            item = {
+                'resourceType': resource_type,
+                'resourceId': resource_id,
+                **entry
+            }
+            current = self.gauges(resource_type, resource_id) if self.gauges else None
+            if current is not None:
+                last = self._last_gauges.get((resource_type, resource_id), {})
+                item['gauges'] = current
+                item['deltas'] = {k: v - last.get(k, 0) for k, v in current.items()}
+                self._last_gauges[(resource_type, resource_id)] = current
+            resources.append(item)
+
+        self._seq += 1
+        return {
+            'seq': self._seq,
+            'timestamp': datetime.now().timestamp() * 1000,
+            'intervalMs': self.tick_ms,
+            'resources': resources
+        }
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        interval = self.tick_ms / 1000
+        next_tick = time.monotonic() + interval
+        while not self._stop.wait(max(0, next_tick - time.monotonic())):
+            # Skip missed ticks rather than bursting to catch up
+            next_tick = max(next_tick + interval, time.monotonic())
+            frame = self.flush()
+            if frame is not None:
+                self.broadcaster.publish('STREAM_TICK', frame, mode='stream')
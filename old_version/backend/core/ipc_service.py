@@ -0,0 +1,1013 @@
+import base64
+import binascii
+import json
+import math
+from datetime import datetime
+
+from .pipes import PipeManager, DEFAULT_BUFFER_CAPACITY, MAX_BUFFER_CAPACITY
+from .message_queue import MessageQueueManager
+from .shared_memory import SharedMemoryManager
+from .rw_lock import LOCK_MODES, WAIT_TIMEOUT_MS
+from .os_ipc import BACKENDS, PIPE_WORKERS, OsPipeManager, OsMessageQueueManager, OsSharedMemoryManager
+from .deadlock_detector import DeadlockDetector
+from .bottleneck_analyzer import BottleneckAnalyzer, TRANSFER_LOG_CAPACITY, ROLLUP_MAX_SERIES
+from .rollups import TIER_NAMES
+from .analysis_pipeline import (AnalysisPipeline, DEFAULT_CAPACITY as ANALYSIS_QUEUE_SIZE,
+                                DEFAULT_BATCH_SIZE as ANALYSIS_BATCH_SIZE, DEFAULT_INTERVAL_MS as ANALYSIS_INTERVAL_MS)
+from .event_stream import EventStream
+from .broadcaster import STREAM_MODES
+from .wire_format import ENCODINGS
+from .trace_recorder import FAILED, SHARED, WAITING, BTOA
+from .metrics_registry import MetricsRegistry
+from .state_export import Stream, export_records, ndjson_chunks, SECTIONS, COMPRESSIONS, CONTENT_TYPE as NDJSON
+from .resource_views import (ResourceVersions, Conditional, parse_view, parse_fields, parse_limit,
+                             needs_contents, project, encode_cursor, decode_cursor)
+
+
+def mean_latency(results):
+    """Mean measured latency (ms) of a batch's per-message results; None when none measured"""
+    latencies = [r['latency'] for r in results if 'latency' in r]
+    return sum(latencies) / len(latencies) if latencies else None
+
+
+def check_priority(message):
+    """ValueError unless a queue message's priority (if it names one) is a finite number"""
+    if isinstance(message, dict) and 'priority' in message:
+        priority = message['priority']
+        if isinstance(priority, bool) or not isinstance(priority, (int, float)) or not math.isfinite(priority):
+            raise ValueError('priority must be a number')
+
+
+def pipe_writer(data):
+    """The writer named in a pipe send as a str, or None; bodies can carry any JSON value there"""
+    writer = data.get('writerId') or data.get('processId')
+    return None if writer is None else str(writer)
+
+
+def positive_int(data, field, default, maximum):
+    """data[field] (default when absent) as an integer in 1..maximum; ValueError names the field otherwise"""
+    value = data.get(field, default)
+    # JSON numbers and numeric strings; bools and floats are not counts
+    if isinstance(value, bool) or not isinstance(value, (int, str)):
+        raise ValueError(f'{field} must be an integer')
+    try:
+        value = int(value)
+    except ValueError:
+        raise ValueError(f'{field} must be an integer') from None
+    if not 1 <= value <= maximum:
+        raise ValueError(f'{field} must be between 1 and {maximum}')
+    return value
+
+
+# Most messages one read-batch/receive-batch call may ask for
+MAX_BATCH_COUNT = 10_000
+
+# Message and data fields left out of view=summary listings; fields= can still ask for them
+CONTENT_FIELDS = {
+    'pipe': ('bufferA', 'bufferB'),
+    'queue': ('messages',),
+    'memory': ('data', 'accessHistory')
+}
+
+
+# (HTTP method, path, IPCService method); path parameters use {name} and are passed positionally,
+# followed by the JSON body for POST and the query parameters (a dict) for GET
+ROUTES = [
+    ('POST', '/api/pipes/create', 'create_pipe'),
+    ('POST', '/api/pipes/send', 'send_pipe_data'),
+    ('GET', '/api/pipes', 'get_all_pipes'),
+    ('GET', '/api/pipes/{pipe_id}', 'get_pipe'),
+    ('GET', '/api/pipes/{pipe_id}/messages', 'get_pipe_messages'),
+    ('POST', '/api/pipes/read', 'read_pipe_data'),
+    ('POST', '/api/pipes/send-batch', 'send_pipe_batch'),
+    ('POST', '/api/pipes/read-batch', 'read_pipe_batch'),
+    ('DELETE', '/api/pipes/{pipe_id}', 'delete_pipe'),
+    ('POST', '/api/queues/create', 'create_queue'),
+    ('POST', '/api/queues/send', 'send_queue_message'),
+    ('POST', '/api/queues/receive', 'receive_queue_message'),
+    ('POST', '/api/queues/send-batch', 'send_queue_batch'),
+    ('POST', '/api/queues/receive-batch', 'receive_queue_batch'),
+    ('GET', '/api/queues', 'get_all_queues'),
+    ('GET', '/api/queues/{queue_id}', 'get_queue'),
+    ('GET', '/api/queues/{queue_id}/messages', 'get_queue_messages'),
+    ('DELETE', '/api/queues/{queue_id}', 'delete_queue'),
+    ('POST', '/api/shared-memory/create', 'create_memory'),
+    ('POST', '/api/shared-memory/write', 'write_memory'),
+    ('POST', '/api/shared-memory/read', 'read_memory'),
+    ('POST', '/api/shared-memory/lock', 'lock_memory'),
+    ('POST', '/api/shared-memory/unlock', 'unlock_memory'),
+    ('GET', '/api/shared-memory', 'get_all_memory'),
+    ('GET', '/api/shared-memory/{memory_id}', 'get_memory'),
+    ('DELETE', '/api/shared-memory/{memory_id}', 'delete_memory'),
+    ('GET', '/api/shared-memory/{memory_id}/lock-stats', 'get_lock_stats'),
+    ('GET', '/api/analysis/bottlenecks', 'get_bottlenecks'),
+    ('GET', '/api/analysis/deadlocks', 'get_deadlocks'),
+    ('GET', '/api/analysis/latency', 'get_latency'),
+    ('GET', '/api/analysis/transfers', 'get_transfer_window'),
+    ('GET', '/api/analysis/history', 'get_history'),
+    ('GET', '/api/analysis/pipeline', 'get_analysis_pipeline'),
+    ('POST', '/api/analysis/reset', 'reset_analysis'),
+    ('GET', '/api/analysis/broadcast', 'get_broadcast_metrics'),
+    ('GET', '/api/trace', 'get_trace_status'),
+    ('GET', '/api/export', 'export_state'),
+    ('GET', '/metrics', 'get_metrics'),
+    ('POST', '/api/simulation/start', 'start_simulation')
+]
+
+
+class IPCService:
+    """The REST API independent of the web framework serving it.
+
+    Owns the managers and analyzers; each endpoint method takes the parsed
+    JSON body (or path parameter) and returns (response body, HTTP status).
+    server.py (Flask, threaded) and async_server.py (aiohttp) are thin route
+    tables over one instance, so both modes behave identically. A str body
+    (/metrics) is served as Prometheus text rather than JSON, a Conditional
+    body (core/resource_views.py) carries an ETag and is only built when the
+    client's If-None-Match does not match it, and a Stream body
+    (core/state_export.py) is written out chunk by chunk.
+    """
+    
+    def __init__(self, broadcaster, stream_tick_ms=50, stream_samples=3, backend='simulated',
+                 lock_fairness='writer-preferring', lock_wait_timeout_ms=WAIT_TIMEOUT_MS, trace=None,
+                 transfer_log_capacity=TRANSFER_LOG_CAPACITY, rollup_max_series=ROLLUP_MAX_SERIES,
+                 analysis_queue_size=ANALYSIS_QUEUE_SIZE, analysis_batch_size=ANALYSIS_BATCH_SIZE,
+                 analysis_interval_ms=ANALYSIS_INTERVAL_MS):
+        if backend not in BACKENDS:
+            raise ValueError(f"backend must be one of {BACKENDS}")
+        # 'os' moves the data through kernel pipes, multiprocessing queues and shared memory
+        # blocks (core/os_ipc.py); results then carry measured latencies for the analyzer
+        self.backend = backend
+        if backend == 'os':
+            self.pipe_manager = OsPipeManager()
+            self.queue_manager = OsMessageQueueManager()
+            self.memory_manager = OsSharedMemoryManager(lock_fairness, lock_wait_timeout_ms)
+        else:
+            self.pipe_manager = PipeManager()
+            self.queue_manager = MessageQueueManager()
+            self.memory_manager = SharedMemoryManager(lock_fairness, lock_wait_timeout_ms)
+        self.bottleneck_analyzer = BottleneckAnalyzer(transfer_log_capacity, rollup_max_series)
+        # Handlers only queue transfers; the analyzer runs on the pipeline's worker, started by the server
+        self.analysis = AnalysisPipeline(self.bottleneck_analyzer, analysis_queue_size, analysis_batch_size,
+                                         analysis_interval_ms)
+        # /metrics counters, updated alongside the trace on every manager operation
+        self.metrics = MetricsRegistry(gauges=self.stream_gauges, analysis=self.analysis.get_metrics)
+        self.versions = ResourceVersions()  # Per-resource change counters behind the GET ETags
+        self.deadlock_detector = DeadlockDetector(on_deadlock=self.metrics.deadlock_detected)
+        self.broadcaster = broadcaster
+        self.trace = trace  # Optional TraceRecorder (core/trace_recorder.py) logging every manager operation
+        # Started by the server: a ticker thread for Flask, an event-loop task for aiohttp
+        self.event_stream = EventStream(broadcaster, tick_ms=stream_tick_ms,
+                                        sample_limit=stream_samples, gauges=self.stream_gauges)
+    
+    def broadcast(self, event_type, data):
+        """Publish to WebSocket clients - never blocks on a client"""
+        self.broadcaster.publish(event_type, data)
+        self.event_stream.record(event_type, data)
+    
+    def record_operation(self, operation, resource_type, resource_id, process_id=None, size=0, count=1, flags=0):
+        """Count a completed manager operation for /metrics and the ETags, and trace it if recording"""
+        self.metrics.record(operation, resource_type, resource_id, size, count, bool(flags & FAILED))
+        self.versions.bump(resource_type, resource_id, deleted=operation == 'delete')
+        if self.trace is not None:
+            self.trace.record(operation, resource_type, resource_id, process_id, size, count, flags)
+    
+    def stream_gauges(self, resource_type, resource_id):
+        """Current buffer/queue/segment sizes reported (with deltas) in STREAM_TICK frames"""
+        if resource_type == 'pipe':
+            pipe = self.pipe_manager.get_pipe(resource_id)
+            return {'bufferA': len(pipe['bufferA']), 'bufferB': len(pipe['bufferB'])} if pipe else None
+        if resource_type == 'queue':
+            queue = self.queue_manager.queues.get(resource_id)
+            return {'queueSize': len(queue['messages'])} if queue else None
+        if resource_type == 'memory':
+            lock = self.memory_manager.locks.get(resource_id)
+            sizes = self.memory_manager.sizes.get(resource_id)
+            # sizes is falsy while the segment is empty
+            if lock is None or sizes is None:
+                return None
+            return {'usedBytes': sizes.total, 'lockQueue': len(lock['queue'])}
+        return None
+    
+    def handle_client_message(self, client, raw):
+        """Messages from WebSocket clients: SUBSCRIBE switches mode and/or encoding"""
+        try:
+            message = json.loads(raw)
+        except (TypeError, ValueError):
+            return
+        if not isinstance(message, dict) or message.get('type') != 'SUBSCRIBE':
+            return
+        if message.get('mode') in STREAM_MODES:
+            self.broadcaster.set_mode(client, message['mode'])
+        if message.get('encoding') in ENCODINGS:
+            self.broadcaster.set_encoding(client, message['encoding'])
+    
+    # ===== PIPE ENDPOINTS =====
+    def create_pipe(self, data):
+        try:
+            if not data or 'processA' not in data or 'processB' not in data:
+                return {'success': False, 'error': 'Missing required fields: processA and processB'}, 400
+            
+            # An endpoint worker ('echo') runs process B as a real child process
+            options = {}
+            if data.get('worker'):
+                if self.backend != 'os':
+                    return {'success': False, 'error': 'Endpoint workers need IPC_BACKEND=os'}, 400
+                if data['worker'] not in PIPE_WORKERS:
+                    return {'success': False, 'error': f"worker must be one of {PIPE_WORKERS}"}, 400
+                options['worker'] = data['worker']
+            try:
+                capacity = positive_int(data, 'capacity', DEFAULT_BUFFER_CAPACITY, MAX_BUFFER_CAPACITY)
+            except ValueError as e:
+                return {'success': False, 'error': str(e)}, 400
+            
+            pipe = self.pipe_manager.create_pipe(
+                data['processA'],
+                data['processB'],
+                capacity,
+                **options
+            )
+            self.record_operation('create', 'pipe', pipe['id'], data['processA'], pipe['capacity'])
+            self.broadcast('PIPE_CREATED', pipe)
+            return pipe, 200
+        except Exception as e:
+            return {'success': False, 'error': str(e)}, 500
+    
+    def send_pipe_data(self, data):
+        try:
+            if not data or 'pipeId' not in data or 'data' not in data or 'direction' not in data:
+                return {'success': False, 'error': 'Missing required fields: pipeId, data, and direction'}, 400
+            
+            result = self.pipe_manager.send_data(data['pipeId'], data['data'], data['direction'])
+            
+            # Writes rejected by a full buffer are still recorded so the analyzer sees the stall
+            if not result.get('success') and not result.get('bottleneck'):
+                return result, 400
+            
+            # Enrich pipe transfer with buffer stats and writer info for detailed bottleneck analysis
+            pipe = self.pipe_manager.get_pipe(data['pipeId'])
+            if pipe:
+                extra = {
+                    'bufferA_size': len(pipe['bufferA']),
+                    'bufferB_size': len(pipe['bufferB']),
+                    'buffer_capacity': pipe['capacity'],
+                    'writer_id': pipe_writer(data),
+                    'direction': data['direction'],
+                    'last_read_timestamps': self.pipe_manager.read_activity.get(data['pipeId'], {})
+                }
+            else:
+                extra = None
+            
+            self.analysis.submit(
+                'pipe',
+                data['pipeId'],
+                result['message']['size'] if result.get('success') else 0,
+                latency=result.get('latency'),
+                extra=extra
+            )
+            sent = bool(result.get('success'))
+            self.record_operation('send', 'pipe', data['pipeId'], extra and extra['writer_id'],
+                                  result['message']['size'] if sent else 0, int(sent),
+                                  (0 if sent else FAILED) | (BTOA if data['direction'] == 'BtoA' else 0))
+            
+            if not result.get('success'):
+                return result, 400
+            
+            self.broadcast('PIPE_DATA_TRANSFER', {
+                'pipeId': data['pipeId'],
+                'data': data['data'],
+                'direction': data['direction'],
+                'timestamp': datetime.now().timestamp() * 1000
+            })
+            
+            return result, 200
+        except Exception as e:
+            return {'success': False, 'error': str(e)}, 500
+    
+    def get_all_pipes(self, query=None):
+        return self.listing('pipe', self.pipe_manager.get_all_pipes, query)
+    
+    def get_pipe(self, pipe_id, query=None):
+        return self.resource_view('pipe', pipe_id, self.pipe_manager.describe_pipe, query, 'Pipe not found')
+    
+    def get_pipe_messages(self, pipe_id, query=None):
+        """One page of a direction's buffered messages, oldest first; nextCursor continues after it"""
+        try:
+            direction = (query or {}).get('direction', 'AtoB')
+            cursor, limit = decode_cursor(query, 1), parse_limit(query)
+        except ValueError as e:
+            return {'success': False, 'error': str(e)}, 400
+        
+        def build():
+            result = self.pipe_manager.page_messages(pipe_id, direction, cursor[0] if cursor else None, limit)
+            if not result.get('success'):
+                return result, 404 if result['error'] == 'Pipe not found' else 400
+            result['nextCursor'] = encode_cursor(result.pop('position'))
+            return result, 200
+        
+        etag = self.versions.etag(self.versions.version('pipe', pipe_id), direction, cursor, limit)
+        return Conditional(etag, build), 200
+    
+    def read_pipe_data(self, data):
+        try:
+            if not data or 'pipeId' not in data or 'direction' not in data:
+                return {'success': False, 'error': 'Missing required fields: pipeId and direction'}, 400
+            
+            result = self.pipe_manager.read_data(data['pipeId'], data['direction'])
+            
+            if result.get('success'):
+                # Every read attempt feeds busy-poll detection; non-empty ones carry enqueue -> dequeue latency
+                message = result.get('message')
+                self.analysis.submit(
+                    'pipe-read',
+                    data['pipeId'],
+                    message['size'] if message else 0,
+                    latency=result.get('latency')
+                )
+                self.record_operation('read', 'pipe', data['pipeId'], data.get('processId'),
+                                      message['size'] if message else 0, 1 if message else 0,
+                                      (0 if message else FAILED) | (BTOA if data['direction'] == 'BtoA' else 0))
+                self.broadcast('PIPE_DATA_READ', {
+                    'pipeId': data['pipeId'],
+                    'message': result.get('message'),
+                    'direction': data['direction'],
+                    'timestamp': datetime.now().timestamp() * 1000
+                })
+            
+            return result, 200
+        except Exception as e:
+            return {'success': False, 'error': str(e)}, 500
+    
+    def send_pipe_batch(self, data):
+        try:
+            if not data or 'pipeId' not in data or 'messages' not in data or 'direction' not in data:
+                return {'success': False, 'error': 'Missing required fields: pipeId, messages, and direction'}, 400
+            if not isinstance(data['messages'], list):
+                return {'success': False, 'error': 'messages must be a list'}, 400
+            
+            result = self.pipe_manager.send_batch(data['pipeId'], data['messages'], data['direction'])
+            
+            if not result.get('success'):
+                return result, 400
+            
+            # One aggregated analyzer entry covers every write attempt in the batch
+            pipe = self.pipe_manager.get_pipe(data['pipeId'])
+            if pipe:
+                extra = {
+                    'bufferA_size': len(pipe['bufferA']),
+                    'bufferB_size': len(pipe['bufferB']),
+                    'buffer_capacity': pipe['capacity'],
+                    'writer_id': pipe_writer(data),
+                    'direction': data['direction'],
+                    'last_read_timestamps': self.pipe_manager.read_activity.get(data['pipeId'], {})
+                }
+            else:
+                extra = None  # Deleted by another request since the batch ran
+            if data['messages']:
+                self.analysis.submit(
+                    'pipe',
+                    data['pipeId'],
+                    result['bytes'],
+                    latency=mean_latency(result['results']),
+                    extra=extra,
+                    count=len(data['messages'])
+                )
+                self.record_operation('send', 'pipe', data['pipeId'], pipe_writer(data),
+                                      result['bytes'], result['sent'],
+                                      (FAILED if result['rejected'] else 0) | (BTOA if data['direction'] == 'BtoA' else 0))
+            
+            self.broadcast('PIPE_BATCH_TRANSFER', {
+                'pipeId': data['pipeId'],
+                'direction': data['direction'],
+                'sent': result['sent'],
+                'rejected': result['rejected'],
+                'bytes': result['bytes'],
+                'bufferSize': result['bufferSize'],
+                'timestamp': datetime.now().timestamp() * 1000
+            })
+            
+            return result, 200
+        except Exception as e:
+            return {'success': False, 'error': str(e)}, 500
+    
+    def read_pipe_batch(self, data):
+        try:
+            if not data or 'pipeId' not in data or 'direction' not in data:
+                return {'success': False, 'error': 'Missing required fields: pipeId and direction'}, 400
+            try:
+                count = positive_int(data, 'count', 1, MAX_BATCH_COUNT)
+            except ValueError as e:
+                return {'success': False, 'error': str(e)}, 400
+            
+            result = self.pipe_manager.read_batch(data['pipeId'], data['direction'], count)
+            
+            if result.get('success'):
+                self.analysis.submit(
+                    'pipe-read',
+                    data['pipeId'],
+                    sum(m['size'] for m in result['messages']),
+                    latency=result.get('latency'),
+                    count=max(result['count'], 1)
+                )
+                self.record_operation('read', 'pipe', data['pipeId'], data.get('processId'),
+                                      sum(m['size'] for m in result['messages']), result['count'],
+                                      (0 if result['count'] else FAILED) | (BTOA if data['direction'] == 'BtoA' else 0))
+                self.broadcast('PIPE_BATCH_READ', {
+                    'pipeId': data['pipeId'],
+                    'count': result['count'],
+                    'direction': data['direction'],
+                    'bufferSize': result['bufferSize'],
+                    'timestamp': datetime.now().timestamp() * 1000
+                })
+            
+            return result, 200
+        except Exception as e:
+            return {'success': False, 'error': str(e)}, 500
+    
+    def delete_pipe(self, pipe_id):
+        try:
+            success = self.pipe_manager.delete_pipe(pipe_id)
+            if success:
+                self.analysis.discard_resource(pipe_id)
+                self.record_operation('delete', 'pipe', pipe_id)
+                self.broadcast('PIPE_DELETED', {'pipeId': pipe_id})
+                return {'success': True}, 200
+            return {'success': False, 'error': 'Pipe not found'}, 404
+        except Exception as e:
+            return {'success': False, 'error': str(e)}, 500
+    
+    # ===== MESSAGE QUEUE ENDPOINTS =====
+    def create_queue(self, data):
+        try:
+            if not data or 'name' not in data:
+                return {'success': False, 'error': 'Missing required field: name'}, 400
+            
+            queue = self.queue_manager.create_queue(data['name'], data.get('maxSize', 1000))
+            self.record_operation('create', 'queue', queue['id'], size=queue['maxSize'])
+            self.broadcast('QUEUE_CREATED', queue)
+            return queue, 200
+        except Exception as e:
+            return {'success': False, 'error': str(e)}, 500
+    
+    def send_queue_message(self, data):
+        try:
+            if not data or 'queueId' not in data or 'message' not in data or 'sender' not in data:
+                return {'success': False, 'error': 'Missing required fields: queueId, message, and sender'}, 400
+            try:
+                check_priority(data['message'])
+            except ValueError as e:
+                return {'success': False, 'error': str(e)}, 400
+            
+            result = self.queue_manager.send_message(data['queueId'], data['message'], data['sender'])
+            
+            # Enrich queue transfer with occupancy and block information
+            queue = self.queue_manager.queues.get(data['queueId'])
+            queue_size = len(queue['messages']) if queue else 0
+            max_size = queue['maxSize'] if queue else 1
+            extra = {
+                'queue_size': queue_size,
+                'queue_max': max_size,
+                'blocked_send': bool(result.get('bottleneck')),
+                'blocked_recv': False
+            }
+            
+            self.analysis.submit(
+                'queue',
+                data['queueId'],
+                result['message']['size'] if result.get('success') else 0,
+                latency=result.get('latency'),
+                extra=extra
+            )
+            sent = bool(result.get('success'))
+            self.record_operation('send', 'queue', data['queueId'], data['sender'],
+                                  result['message']['size'] if sent else 0, int(sent), 0 if sent else FAILED)
+            
+            self.broadcast('QUEUE_MESSAGE_SENT', {
+                'queueId': data['queueId'],
+                'message': data['message'],
+                'sender': data['sender'],
+                'timestamp': datetime.now().timestamp() * 1000
+            })
+            
+            return result, 200
+        except Exception as e:
+            return {'success': False, 'error': str(e)}, 500
+    
+    def receive_queue_message(self, data):
+        try:
+            if not data or 'queueId' not in data or 'receiver' not in data:
+                return {'success': False, 'error': 'Missing required fields: queueId and receiver'}, 400
+            
+            message = self.queue_manager.receive_message(data['queueId'], data['receiver'])
+            
+            # Record queue receive characteristics for slow-producer detection
+            queue = self.queue_manager.queues.get(data['queueId'])
+            queue_size = len(queue['messages']) if queue else 0
+            max_size = queue['maxSize'] if queue else 1
+            blocked_recv = not message.get('success') and message.get('error') == 'Queue is empty'
+            
+            extra = {
+                'queue_size': queue_size,
+                'queue_max': max_size,
+                'blocked_send': False,
+                'blocked_recv': blocked_recv
+            }
+            
+            # Use size 0 for empty receive attempts, or message size if successful
+            msg_size = message['message']['size'] if message.get('success') else 0
+            self.analysis.submit('queue', data['queueId'], msg_size, latency=message.get('latency'), extra=extra)
+            received = bool(message.get('success'))
+            self.record_operation('read', 'queue', data['queueId'], data['receiver'], msg_size, int(received),
+                                  0 if received else FAILED)
+            
+            self.broadcast('QUEUE_MESSAGE_RECEIVED', {
+                'queueId': data['queueId'],
+                'message': message,
+                'receiver': data['receiver'],
+                'timestamp': datetime.now().timestamp() * 1000
+            })
+            
+            return message, 200
+        except Exception as e:
+            return {'success': False, 'error': str(e)}, 500
+    
+    def send_queue_batch(self, data):
+        try:
+            if not data or 'queueId' not in data or 'messages' not in data or 'sender' not in data:
+                return {'success': False, 'error': 'Missing required fields: queueId, messages, and sender'}, 400
+            if not isinstance(data['messages'], list):
+                return {'success': False, 'error': 'messages must be a list'}, 400
+            try:
+                for message in data['messages']:
+                    check_priority(message)
+            except ValueError as e:
+                return {'success': False, 'error': str(e)}, 400
+            
+            result = self.queue_manager.send_batch(data['queueId'], data['messages'], data['sender'])
+            
+            if not result.get('success'):
+                return result, 400
+            
+            queue = self.queue_manager.queues.get(data['queueId'])
+            extra = {
+                'queue_size': result['queueSize'],
+                'queue_max': queue['maxSize'],
+                'blocked_send': result['bottleneck'],
+                'blocked_recv': False
+            } if queue else None
+            if data['messages']:
+                self.analysis.submit(
+                    'queue',
+                    data['queueId'],
+                    result['bytes'],
+                    latency=mean_latency(result['results']),
+                    extra=extra,
+                    count=len(data['messages'])
+                )
+                self.record_operation('send', 'queue', data['queueId'], data['sender'], result['bytes'],
+                                      result['sent'], FAILED if result['rejected'] else 0)
+            
+            self.broadcast('QUEUE_BATCH_SENT', {
+                'queueId': data['queueId'],
+                'sender': data['sender'],
+                'sent': result['sent'],
+                'rejected': result['rejected'],
+                'queueSize': result['queueSize'],
+                'timestamp': datetime.now().timestamp() * 1000
+            })
+            
+            return result, 200
+        except Exception as e:
+            return {'success': False, 'error': str(e)}, 500
+    
+    def receive_queue_batch(self, data):
+        try:
+            if not data or 'queueId' not in data or 'receiver' not in data:
+                return {'success': False, 'error': 'Missing required fields: queueId and receiver'}, 400
+            try:
+                count = positive_int(data, 'count', 1, MAX_BATCH_COUNT)
+            except ValueError as e:
+                return {'success': False, 'error': str(e)}, 400
+            
+            result = self.queue_manager.receive_batch(data['queueId'], data['receiver'], count)
+            
+            if not result.get('success'):
+                return result, 400
+            
+            queue = self.queue_manager.queues.get(data['queueId'])
+            extra = {
+                'queue_size': result['queueSize'],
+                'queue_max': queue['maxSize'],
+                'blocked_send': False,
+                'blocked_recv': result['drained']
+            } if queue else None
+            
+            # An empty batch still counts as one blocked receive attempt, like /api/queues/receive
+            avg_wait = sum(r['waitTime'] for r in result['results']) / result['count'] if result['count'] else 0
+            self.analysis.submit(
+                'queue',
+                data['queueId'],
+                result['bytes'],
+                latency=mean_latency(result['results']),
+                extra=extra,
+                count=max(result['count'], 1)
+            )
+            self.record_operation('read', 'queue', data['queueId'], data['receiver'], result['bytes'],
+                                  result['count'], 0 if result['count'] else FAILED)
+            
+            self.broadcast('QUEUE_BATCH_RECEIVED', {
+                'queueId': data['queueId'],
+                'receiver': data['receiver'],
+                'count': result['count'],
+                'queueSize': result['queueSize'],
+                'avgWaitTime': avg_wait,
+                'timestamp': datetime.now().timestamp() * 1000
+            })
+            
+            return result, 200
+        except Exception as e:
+            return {'success': False, 'error': str(e)}, 500
+    
+    def get_all_queues(self, query=None):
+        return self.listing('queue', self.queue_manager.get_all_queues, query)
+    
+    def get_queue(self, queue_id, query=None):
+        return self.resource_view('queue', queue_id, self.queue_manager.get_queue, query, 'Queue not found')
+    
+    def get_queue_messages(self, queue_id, query=None):
+        """One page of queued messages in delivery order; nextCursor continues after it"""
+        try:
+            cursor, limit = decode_cursor(query, 2), parse_limit(query)
+        except ValueError as e:
+            return {'success': False, 'error': str(e)}, 400
+        
+        def build():
+            result = self.queue_manager.page_messages(queue_id, cursor, limit)
+            if not result.get('success'):
+                return result, 404
+            next_cursor = result.pop('cursor')
+            result['nextCursor'] = encode_cursor(*next_cursor) if next_cursor else None
+            return result, 200
+        
+        etag = self.versions.etag(self.versions.version('queue', queue_id), cursor, limit)
+        return Conditional(etag, build), 200
+    
+    def delete_queue(self, queue_id):
+        try:
+            success = self.queue_manager.delete_queue(queue_id)
+            if success:
+                self.analysis.discard_resource(queue_id)
+                self.record_operation('delete', 'queue', queue_id)
+                self.broadcast('QUEUE_DELETED', {'queueId': queue_id})
+                return {'success': True}, 200
+            return {'success': False, 'error': 'Queue not found'}, 404
+        except Exception as e:
+            return {'success': False, 'error': str(e)}, 500
+    
+    # ===== SHARED MEMORY ENDPOINTS =====
+    def create_memory(self, data):
+        try:
+            if not data or 'name' not in data:
+                return {'success': False, 'error': 'Missing required field: name'}, 400
+            
+            # kind 'mapped' is a byte-addressable mmap segment, optionally with a record layout
+            memory = self.memory_manager.create_memory(
+                data['name'],
+                data.get('size', 1024),
+                data.get('kind', 'dict'),
+                data.get('layout'),
+                data.get('fairness')
+            )
+            self.record_operation('create', 'memory', memory['id'], size=memory['size'])
+            self.broadcast('MEMORY_CREATED', memory)
+            return memory, 200
+        except ValueError as e:
+            return {'success': False, 'error': str(e)}, 400
+        except Exception as e:
+            return {'success': False, 'error': str(e)}, 500
+    
+    def write_memory(self, data):
+        try:
+            if not data or 'memoryId' not in data or 'processId' not in data or 'data' not in data:
+                return {'success': False, 'error': 'Missing required fields: memoryId, processId, and data'}, 400
+            
+            # Mapped segments: base64 bytes at 'offset', or field values for record index 'record'
+            payload = data['data']
+            if 'offset' in data:
+                try:
+                    payload = base64.b64decode(payload, validate=True)
+                except (TypeError, binascii.Error):
+                    return {'success': False, 'error': 'data must be base64 when writing at an offset'}, 400
+            
+            result = self.memory_manager.write(data['memoryId'], data['processId'], payload,
+                                               data.get('offset'), data.get('record'))
+            
+            # Get bottleneck metrics for analysis
+            written = bool(result.get('success'))
+            self.record_operation('write', 'memory', data['memoryId'], data['processId'], result.get('dataSize', 0),
+                                  int(written), 0 if written else FAILED)
+            
+            metrics = self.memory_manager.get_bottleneck_metrics(data['memoryId'])
+            if metrics:
+                self.forget_waits(data['memoryId'], metrics)
+                metrics['operation'] = 'write'
+            
+            self.analysis.submit(
+                'memory',
+                data['memoryId'],
+                result.get('dataSize', 0),
+                latency=result.get('latency'),
+                extra=metrics
+            )
+            
+            # Check for deadlocks
+            deadlock = self.deadlock_detector.check_deadlock(data['memoryId'], data['processId'], 'write')
+            
+            self.broadcast('MEMORY_WRITE', {
+                'memoryId': data['memoryId'],
+                'processId': data['processId'],
+                # Raw byte writes can be megabytes: clients get the range, not the bytes
+                'data': data['data'] if 'offset' not in data else None,
+                'offset': data.get('offset'),
+                'dataSize': result.get('dataSize', 0),
+                'timestamp': datetime.now().timestamp() * 1000,
+                'deadlock': deadlock
+            })
+            
+            result['deadlock'] = deadlock
+            return result, 200
+        except Exception as e:
+            return {'success': False, 'error': str(e)}, 500
+    
+    def read_memory(self, data):
+        try:
+            if not data or 'memoryId' not in data or 'processId' not in data:
+                return {'success': False, 'error': 'Missing required fields: memoryId and processId'}, 400
+            
+            result = self.memory_manager.read(data['memoryId'], data['processId'], data.get('offset'),
+                                              data.get('length'), data.get('record'), data.get('count', 1))
+            if isinstance(result.get('data'), bytes):
+                result['data'] = base64.b64encode(result['data']).decode()
+                result['encoding'] = 'base64'
+            
+            # Get bottleneck metrics for analysis
+            read = bool(result.get('success'))
+            self.record_operation('read', 'memory', data['memoryId'], data['processId'], result.get('dataSize', 0),
+                                  int(read), 0 if read else FAILED)
+            
+            metrics = self.memory_manager.get_bottleneck_metrics(data['memoryId'])
+            if metrics:
+                self.forget_waits(data['memoryId'], metrics)
+                metrics['operation'] = 'read'
+            
+            self.analysis.submit(
+                'memory',
+                data['memoryId'],
+                result.get('dataSize', 0),
+                latency=result.get('latency'),
+                extra=metrics
+            )
+            
+            # Check for deadlocks
+            deadlock = self.deadlock_detector.check_deadlock(data['memoryId'], data['processId'], 'read')
+            
+            self.broadcast('MEMORY_READ', {
+                'memoryId': data['memoryId'],
+                'processId': data['processId'],
+                'timestamp': datetime.now().timestamp() * 1000,
+                'deadlock': deadlock
+            })
+            
+            result['deadlock'] = deadlock
+            return result, 200
+        except Exception as e:
+            return {'success': False, 'error': str(e)}, 500
+    
+    def lock_memory(self, data):
+        try:
+            if not data or 'memoryId' not in data or 'processId' not in data:
+                return {'success': False, 'error': 'Missing required fields: memoryId and processId'}, 400
+            
+            mode = data.get('mode', 'exclusive')
+            if mode not in LOCK_MODES:
+                return {'success': False, 'error': f"mode must be one of {LOCK_MODES}"}, 400
+            
+            # Hold the segment so the detector sees lock/unlock in the order the manager applied them
+            with self.memory_manager.resource_locks.hold(data['memoryId']):
+                result = self.memory_manager.acquire_lock(data['memoryId'], data['processId'], mode)
+                
+                self.forget_waits(data['memoryId'], result)
+                # Only a granted lock changes ownership; a queued request becomes a wait-for edge
+                if result.get('acquired'):
+                    # The grant makes the remaining waiters wait on this process, which may close a cycle
+                    deadlock = self.deadlock_detector.record_lock_acquisition(data['memoryId'], data['processId'],
+                                                                              result['mode'])
+                    result['deadlock'] = {'detected': True, 'deadlock': deadlock} if deadlock else {'detected': False}
+                elif result.get('waiting'):
+                    result['deadlock'] = self.deadlock_detector.check_deadlock(data['memoryId'], data['processId'], 'lock')
+            
+            if result.get('waiting'):
+                flags = WAITING
+            else:
+                flags = 0 if result.get('success') else FAILED
+            self.record_operation('lock', 'memory', data['memoryId'], data['processId'],
+                                  flags=flags | (SHARED if mode == 'shared' else 0))
+            if 'waitTime' in result:
+                self.metrics.observe_lock_wait('memory', data['memoryId'], result['waitTime'])
+            
+            self.broadcast('MEMORY_LOCKED', {
+                'memoryId': data['memoryId'],
+                'processId': data['processId'],
+                'mode': mode,
+                'timestamp': datetime.now().timestamp() * 1000
+            })
+            
+            return result, 200
+        except Exception as e:
+            return {'success': False, 'error': str(e)}, 500
+    
+    def unlock_memory(self, data):
+        try:
+            if not data or 'memoryId' not in data or 'processId' not in data:
+                return {'success': False, 'error': 'Missing required fields: memoryId and processId'}, 400
+            
+            with self.memory_manager.resource_locks.hold(data['memoryId']):
+                result = self.memory_manager.release_lock(data['memoryId'], data['processId'])
+                
+                self.forget_waits(data['memoryId'], result)
+                if result.get('withdrawn'):
+                    self.deadlock_detector.record_wait_withdrawn(data['memoryId'], data['processId'])
+                elif result.get('success'):
+                    self.deadlock_detector.record_lock_release(data['memoryId'], data['processId'])
+            
+            self.record_operation('unlock', 'memory', data['memoryId'], data['processId'],
+                                  flags=0 if result.get('success') else FAILED)
+            
+            self.broadcast('MEMORY_UNLOCKED', {
+                'memoryId': data['memoryId'],
+                'processId': data['processId'],
+                'timestamp': datetime.now().timestamp() * 1000
+            })
+            
+            return result, 200
+        except Exception as e:
+            return {'success': False, 'error': str(e)}, 500
+    
+    def forget_waits(self, memory_id, result):
+        """Drop the wait-for edges of queued processes the manager expired (see rw_lock.expire_waits)"""
+        for process_id in result.get('expired', ()):
+            self.deadlock_detector.record_wait_withdrawn(memory_id, process_id)
+    
+    def get_lock_stats(self, memory_id, query=None):
+        stats = self.memory_manager.get_lock_stats(memory_id, buckets=True)
+        if stats is None:
+            return {'success': False, 'error': 'Memory segment not found'}, 404
+        return stats, 200
+    
+    def get_all_memory(self, query=None):
+        return self.listing('memory', self.memory_manager.get_all_memory, query)
+    
+    def get_memory(self, memory_id, query=None):
+        return self.resource_view('memory', memory_id, self.memory_manager.get_memory, query,
+                                  'Memory segment not found')
+    
+    def listing(self, resource_type, get_all, query):
+        """GET of every resource of a type: view=full|summary, fields=a,b,... and an ETag"""
+        try:
+            view, fields = parse_view(query), parse_fields(query)
+        except ValueError as e:
+            return {'success': False, 'error': str(e)}, 400
+        contents = needs_contents(view, fields, CONTENT_FIELDS[resource_type])
+        
+        def build():
+            # Versions are read before the snapshot so none is newer than what it describes
+            versions = self.versions.versions(resource_type)
+            items = get_all(contents)
+            for item in items:
+                item['version'] = versions.get(item['id'], 0)
+            return [project(item, fields) for item in items], 200
+        
+        etag = self.versions.etag(self.versions.version(resource_type), view, fields)
+        return Conditional(etag, build), 200
+    
+    def resource_view(self, resource_type, resource_id, describe, query, missing):
+        """GET of one resource with the listing's view and fields options"""
+        try:
+            view, fields = parse_view(query), parse_fields(query)
+        except ValueError as e:
+            return {'success': False, 'error': str(e)}, 400
+        contents = needs_contents(view, fields, CONTENT_FIELDS[resource_type])
+        version = self.versions.version(resource_type, resource_id)
+        
+        def build():
+            item = describe(resource_id, contents)
+            if item is None:
+                return {'success': False, 'error': missing}, 404
+            item['version'] = version
+            return project(item, fields), 200
+        
+        return Conditional(self.versions.etag(version, view, fields), build), 200
+    
+    def delete_memory(self, memory_id):
+        try:
+            success = self.memory_manager.delete_memory(memory_id)
+            if success:
+                self.analysis.discard_resource(memory_id)
+                self.record_operation('delete', 'memory', memory_id)
+                self.broadcast('MEMORY_DELETED', {'memoryId': memory_id})
+                return {'success': True}, 200
+            return {'success': False, 'error': 'Memory segment not found'}, 404
+        except Exception as e:
+            return {'success': False, 'error': str(e)}, 500
+    
+    # ===== ANALYSIS ENDPOINTS =====
+    def get_bottlenecks(self, query=None):
+        return self.bottleneck_analyzer.get_bottlenecks(), 200
+    
+    def get_deadlocks(self, query=None):
+        return self.deadlock_detector.get_deadlocks(), 200
+    
+    def get_latency(self, query=None):
+        """Per-resource histograms of measured latency: pipe reads, queue receives, lock -> write"""
+        return self.bottleneck_analyzer.get_latency_histograms(buckets=True), 200
+    
+    def get_transfer_window(self, query=None):
+        """Windowed sums over the transfer log (?windowMs=, ?type=, ?resourceId=)"""
+        query = query or {}
+        try:
+            window_ms = float(query.get('windowMs', 60000))
+        except ValueError:
+            return {'success': False, 'error': 'windowMs must be a number'}, 400
+        if not 0 < window_ms < math.inf:
+            return {'success': False, 'error': 'windowMs must be a positive number'}, 400
+        return self.bottleneck_analyzer.get_transfer_window(window_ms, query.get('type'), query.get('resourceId')), 200
+    
+    def get_history(self, query=None):
+        """Rolled-up history for charts (?start=&end= in ms, ?type=, ?resourceId=, ?tier=1s|1m|1h)"""
+        query = query or {}
+        try:
+            end = float(query['end']) if query.get('end') else datetime.now().timestamp() * 1000
+            start = float(query['start']) if query.get('start') else end - 3600_000
+        except ValueError:
+            return {'success': False, 'error': 'start and end must be timestamps in ms'}, 400
+        if not (math.isfinite(start) and math.isfinite(end)) or start > end:
+            return {'success': False, 'error': 'start must not be after end'}, 400
+        tier = query.get('tier') or None
+        if tier is not None and tier not in TIER_NAMES:
+            return {'success': False, 'error': f"tier must be one of {TIER_NAMES}"}, 400
+        if query.get('resourceId') and not query.get('type'):
+            return {'success': False, 'error': 'type is required with resourceId'}, 400
+        return self.bottleneck_analyzer.get_history(start, end, query.get('type'), query.get('resourceId'), tier), 200
+    
+    def get_analysis_pipeline(self, query=None):
+        """Queue depth, drop counters and batch timings of the background analysis"""
+        return self.analysis.get_metrics(), 200
+    
+    def reset_analysis(self, data=None):
+        try:
+            self.analysis.reset()
+            self.deadlock_detector.reset()
+            self.broadcast('ANALYSIS_RESET', {})
+            return {'success': True}, 200
+        except Exception as e:
+            return {'success': False, 'error': str(e)}, 500
+    
+    def get_broadcast_metrics(self, query=None):
+        return self.broadcaster.get_metrics(), 200
+    
+    def get_metrics(self, query=None):
+        return self.metrics.render(), 200
+    
+    def get_trace_status(self, query=None):
+        if self.trace is None:
+            return {'enabled': False}, 200
+        return self.trace.get_status(), 200
+    
+    def export_state(self, query=None):
+        """Every resource, its messages and the analysis as streamed NDJSON (?include=, ?compress=gzip)"""
+        query = query or {}
+        include = query.get('include')
+        sections = tuple(s.strip() for s in include.split(',') if s.strip()) if include else SECTIONS
+        if any(s not in SECTIONS for s in sections):
+            return {'success': False, 'error': f"include must be a subset of {SECTIONS}"}, 400
+        compress = query.get('compress') or None
+        if compress is not None and compress not in COMPRESSIONS:
+            return {'success': False, 'error': f"compress must be one of {COMPRESSIONS}"}, 400
+        
+        chunks = ndjson_chunks(export_records(self, sections), compress)
+        headers = {'Content-Disposition': 'attachment; filename="ipc-state.ndjson"'}
+        if compress:
+            headers['Content-Encoding'] = compress
+        return Stream(chunks, NDJSON, headers), 200
+    
+    # ===== PROCESS SIMULATION ENDPOINTS =====
+    def start_simulation(self, data):
+        try:
+            if not data or 'scenario' not in data:
+                return {'success': False, 'error': 'Missing required field: scenario'}, 400
+            
+            scenario = data.get('scenario')
+            self.broadcast('SIMULATION_STARTED', {'scenario': scenario})
+            return {'success': True, 'scenario': scenario}, 200
+        except Exception as e:
+            return {'success': False, 'error': str(e)}, 500
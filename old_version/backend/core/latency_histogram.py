@@ -0,0 +1,119 @@
+from collections import Counter
+from itertools import chain, repeat
+from operator import add, lshift, mul, rshift
+
+
+class LatencyHistogram:
+    """Log-linear latency histogram with bounded relative error.
+
+    Values (ms) are counted in whole microseconds. Below 2**SUB_BITS us every
+    value has its own bucket; above, each power of two is split into
+    2**SUB_BITS linear sub-buckets, so any recorded value is reported within
+    1/2**SUB_BITS (~6%) of its true value. A histogram covering 1us to an hour
+    needs under 500 counters, and record() is a few integer operations.
+    """
+
+    SUB_BITS = 4
+    SUB_COUNT = 1 << SUB_BITS
+
+    def __init__(self):
+        self._counts = []
+        self.count = 0
+        self.total = 0.0  # ms, for the mean
+        self.min = None
+        self.max = None
+
+    def __len__(self):
+        return self.count
+
+    def record(self, value_ms, count=1):
+        value_ms = max(value_ms, 0.0)
+        index = self._index(int(value_ms * 1000))
+        if index >= len(self._counts):
+            self._counts.extend([0] * (index + 1 - len(self._counts)))
+        self._counts[index] += count
+        self.count += count
+        self.total += value_ms * count
+        self.min = value_ms if self.min is None else min(self.min, value_ms)
+        self.max = value_ms if self.max is None else max(self.max, value_ms)
+
+    def record_many(self, values_ms, counts=None):
+        """record() each value with its count (default 1), reducing the columns at once"""
+        if not values_ms:
+            return
+        if min(values_ms) < 0.0:
+            values_ms = list(map(max, values_ms, repeat(0.0)))
+        values_us = list(map(int, map(mul, values_ms, repeat(1000))))
+        # _index over the column: the shift, bit_length - SUB_BITS - 1 clamped at 0, is the bit_length
+        # of value >> (SUB_BITS + 1), and the index is shift * SUB_COUNT + (value >> shift)
+        shifts = list(map(int.bit_length, map(rshift, values_us, repeat(self.SUB_BITS + 1))))
+        indexes = list(map(add, map(lshift, shifts, repeat(self.SUB_BITS)), map(rshift, values_us, shifts)))
+        total = len(indexes) if counts is None else sum(counts)
+        buckets = Counter(indexes if total == len(indexes) else chain.from_iterable(map(repeat, indexes, counts)))
+        top = max(buckets)
+        if top >= len(self._counts):
+            self._counts.extend([0] * (top + 1 - len(self._counts)))
+        for index, count in buckets.items():
+            self._counts[index] += count
+        self.count += total
+        self.total += sum(values_ms if counts is None else map(mul, values_ms, counts))
+        low, high = min(values_ms), max(values_ms)
+        self.min = low if self.min is None else min(self.min, low)
+        self.max = high if self.max is None else max(self.max, high)
+
+    def merge(self, other):
+        if len(other._counts) > len(self._counts):
+            self._counts.extend([0] * (len(other._counts) - len(self._counts)))
+        for index, count in enumerate(other._counts):
+            self._counts[index] += count
+        if other.count:
+            self.count += other.count
+            self.total += other.total
+            self.min = other.min if self.min is None else min(self.min, other.min)
+            self.max = other.max if self.max is None else max(self.max, other.max)
+
+    def percentile(self, p):
+        """Value (ms) at or below which p percent of recordings fall; None when empty"""
+        if not self.count:
+            return None
+        rank = max(1, -(-self.count * p // 100))  # Nearest rank, ceil without floats
+        seen = 0
+        for index, count in enumerate(self._counts):
+            seen += count
+            if seen >= rank:
+                # Top of the bucket, but never beyond what was actually recorded
+                return min(max(self._upper(index) / 1000, self.min), self.max)
+        return self.max
+
+    def summary(self):
+        return {
+            'count': self.count,
+            'mean': self.total / self.count if self.count else None,
+            'p50': self.percentile(50),
+            'p90': self.percentile(90),
+            'p99': self.percentile(99),
+            'max': self.max
+        }
+
+    def buckets(self):
+        """Non-empty buckets as [upper bound ms, count] pairs"""
+        return [[self._upper(index) / 1000, count] for index, count in enumerate(self._counts) if count]
+
+    def clear(self):
+        self.__init__()
+
+    @classmethod
+    def _index(cls, value_us):
+        if value_us < cls.SUB_COUNT:
+            return value_us
+        shift = value_us.bit_length() - cls.SUB_BITS - 1
+        return (shift + 1) * cls.SUB_COUNT + (value_us >> shift) - cls.SUB_COUNT
+
+    @classmethod
+    def _upper(cls, index):
+        """Largest microsecond value that falls in bucket index"""
+        if index < cls.SUB_COUNT:
+            return index
+        shift = index // cls.SUB_COUNT - 1
+        sub = index % cls.SUB_COUNT + cls.SUB_COUNT
+        return ((sub + 1) << shift) - 1
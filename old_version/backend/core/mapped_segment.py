@@ -0,0 +1,153 @@
+import mmap
+import struct
+import tempfile
+
+# Struct codes a record field may use; 'Ns' (N-byte string) is also accepted
+FIELD_CODES = set('bBhHiIqQfd?')
+
+
+class RecordLayout:
+    """Fixed-size typed records packed back to back from offset 0.
+
+    Built from [[name, struct code], ...] (e.g. [["pid", "I"], ["tag", "8s"]]);
+    fields are little-endian with no padding. String fields read back as str
+    with trailing NULs stripped.
+    """
+    
+    def __init__(self, fields):
+        if not isinstance(fields, list) or not fields:
+            raise ValueError('layout must be a non-empty list of [name, type] pairs')
+        names, codes = [], []
+        for field in fields:
+            if not isinstance(field, (list, tuple)) or len(field) != 2:
+                raise ValueError(f'invalid layout field: {field!r}')
+            name, code = field
+            if not isinstance(code, str) or not (code in FIELD_CODES or (code[-1:] == 's' and code[:-1].isdigit())):
+                raise ValueError(f'unsupported type {code!r} for field {name!r}')
+            if name in names:
+                raise ValueError(f'duplicate field {name!r}')
+            names.append(name)
+            codes.append(code)
+        self.fields = [[name, code] for name, code in zip(names, codes)]
+        self.names = names
+        self.text = [code.endswith('s') for code in codes]
+        self.struct = struct.Struct('<' + ''.join(codes))
+    
+    @property
+    def size(self):
+        return self.struct.size
+    
+    def decode(self, values):
+        return {
+            name: value.rstrip(b'\0').decode(errors='replace') if text else value
+            for name, text, value in zip(self.names, self.text, values)
+        }
+    
+    def encode(self, record):
+        return [
+            record[name].encode() if text and isinstance(record[name], str) else record[name]
+            for name, text in zip(self.names, self.text)
+        ]
+
+
+class MappedSegment:
+    """A fixed-size, byte-addressable segment backed by a memory-mapped file.
+
+    Reads and writes address byte ranges (or typed records when a layout is
+    given), so touching a few bytes of a multi-megabyte segment costs only
+    those bytes. The file lives in the temp directory and is removed on
+    close; other processes can map it through `path` while it is open.
+    """
+    
+    def __init__(self, size, layout=None, directory=None):
+        if size <= 0:
+            raise ValueError('size must be positive')
+        self.size = size
+        self.layout = RecordLayout(layout) if layout is not None else None
+        self._file = tempfile.NamedTemporaryFile(prefix='ipc-segment-', dir=directory)
+        self._file.truncate(size)
+        self._map = mmap.mmap(self._file.fileno(), size)
+        self.path = self._file.name
+        self.extent = 0  # Highest byte written so far
+    
+    @property
+    def total(self):
+        """Bytes in use (the written extent) - same interface as KeyedSizeTracker.total"""
+        return self.extent
+    
+    @property
+    def record_count(self):
+        return self.size // self.layout.size if self.layout else 0
+    
+    def view(self, offset=0, length=None):
+        """Zero-copy memoryview of a byte range; release it before the segment is closed"""
+        end = self._check_range(offset, self.size - offset if length is None else length)
+        return memoryview(self._map)[offset:end]
+    
+    def read(self, offset, length):
+        end = self._check_range(offset, length)
+        return self._map[offset:end]
+    
+    def write(self, offset, payload):
+        end = self._check_range(offset, len(payload))
+        self._map[offset:end] = payload
+        self.extent = max(self.extent, end)
+        return end - offset
+    
+    def read_records(self, index, count=1):
+        """Decode count records starting at index, unpacking straight from the mapping"""
+        layout = self._require_layout()
+        offset = self._record_offset(index, count)
+        with self.view(offset, count * layout.size) as view:
+            return [layout.decode(values) for values in layout.struct.iter_unpack(view)]
+    
+    def write_record(self, index, values):
+        """Update fields of one record; fields not given keep their current values"""
+        layout = self._require_layout()
+        unknown = set(values) - set(layout.names)
+        if unknown:
+            raise ValueError(f'unknown fields: {sorted(unknown)}')
+        offset = self._record_offset(index, 1)
+        record = {**layout.decode(layout.struct.unpack_from(self._map, offset)), **values}
+        try:
+            layout.struct.pack_into(self._map, offset, *layout.encode(record))
+        except struct.error as e:
+            raise ValueError(f'record does not fit the layout: {e}')
+        self.extent = max(self.extent, offset + layout.size)
+        return layout.size
+    
+    def clear(self):
+        """Zero the bytes written so far"""
+        self._map[:self.extent] = bytes(self.extent)
+        self.extent = 0
+    
+    def close(self):
+        self._map.close()
+        self._file.close()
+    
+    def describe(self):
+        return {
+            'path': self.path,
+            'layout': self.layout.fields if self.layout else None,
+            'recordSize': self.layout.size if self.layout else None,
+            'recordCount': self.record_count if self.layout else None
+        }
+    
+    def _check_range(self, offset, length):
+        if not isinstance(offset, int) or not isinstance(length, int) or offset < 0 or length < 0:
+            raise ValueError('offset and length must be non-negative integers')
+        if offset + length > self.size:
+            raise ValueError(f'range {offset}+{length} exceeds segment size {self.size}')
+        return offset + length
+    
+    def _record_offset(self, index, count):
+        if not isinstance(index, int) or not isinstance(count, int) or index < 0 or count < 1:
+            raise ValueError('record and count must be non-negative integers (count >= 1)')
+        if index + count > self.record_count:
+            raise ValueError(f'records {index}..{index + count - 1} exceed the {self.record_count} in the segment')
+        return index * self.layout.size
+    
+    def _require_layout(self):
+        if self.layout is None:
+            raise ValueError('Segment has no record layout')
+        return self.layout
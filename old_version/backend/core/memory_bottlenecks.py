@@ -6,8 +6,13 @@ def analyze_memory_bottlenecks(transfers, now_ms, recent_window_ms, extra, thres
     recent_window_ms: analysis window in ms
     extra: optional dict with memory stats (lock waits, access patterns, etc.)
         Expected keys:
-        - lock_wait_time: time spent waiting for locks (ms)
-        - lock_queue_length: number of processes waiting for lock
+        - lock_wait_time: time spent waiting for locks (ms) - p99 of measured
+          enqueue-to-grant waits, or the longest current wait if that is higher
+        - oldest_wait_time: how long the longest-queued process has waited for
+          the held lock (ms); 0 while the lock is free
+        - lock_queue_length: number of processes waiting for the held lock
+        - lock_mode: 'shared', 'exclusive' or None (unlocked)
+        - shared_holders: number of processes holding the lock shared
         - access_history: list of recent access events with type (read/write)
         - total_reads: count of read operations
         - total_writes: count of write operations
@@ -92,7 +97,7 @@ def analyze_memory_bottlenecks(transfers, now_ms, recent_window_ms, extra, thres
                 'severity': 'low',
                 'message': f"Read-heavy access pattern: {read_ratio*100:.1f}% reads - optimization opportunity",
                 'value': {'reads': total_reads, 'writes': total_writes, 'ratio': read_ratio},
-                'recommendation': 'Consider using read-write locks to allow concurrent reads'
+                'recommendation': 'Have readers take the lock in shared mode so reads run concurrently'
             })
 
         # Excessive write frequency
@@ -189,12 +194,14 @@ def analyze_memory_bottlenecks(transfers, now_ms, recent_window_ms, extra, thres
             })
 
     # Starvation detection
-    if lock_queue_length > 0 and lock_wait_time > 2000:  # >2 seconds
+    oldest_wait_time = extra.get('oldest_wait_time', lock_wait_time)
+    contended = extra.get('lock_mode', 'exclusive') is not None  # Nobody starves on a free lock
+    if contended and lock_queue_length > 0 and oldest_wait_time > 2000:  # >2 seconds
         issues.append({
             'type': 'potential-starvation',
             'severity': 'critical',
-            'message': f"Potential starvation: processes waiting {lock_wait_time:.2f}ms with {lock_queue_length} in queue",
-            'value': {'waitTime': lock_wait_time, 'queueLength': lock_queue_length},
+            'message': f"Potential starvation: processes waiting {oldest_wait_time:.2f}ms with {lock_queue_length} in queue",
+            'value': {'waitTime': oldest_wait_time, 'queueLength': lock_queue_length},
             'recommendation': 'Implement fair locking policy or timeout mechanisms'
         })
 
@@ -1,10 +1,13 @@
 import uuid
 from datetime import datetime
-import json
+from .priority_store import PriorityStore
+from .resource_locks import ResourceLocks
+from .size_accounting import payload_size
 
 class MessageQueueManager:
     def __init__(self):
         self.queues = {}
+        self.resource_locks = ResourceLocks()  # One lock per queue + registry lock
     
     def create_queue(self, name, max_size=1000):
         queue_id = str(uuid.uuid4())
@@ -12,7 +15,7 @@ class MessageQueueManager:
             'id': queue_id,
             'name': name,
             'maxSize': max_size,
-            'messages': [],
+            'messages': PriorityStore(),
             'subscribers': set(),
             'status': 'active',
             'created': datetime.now().timestamp() * 1000,
@@ -25,126 +28,197 @@ class MessageQueueManager:
             }
         }
         
-        self.queues[queue_id] = queue
+        with self.resource_locks.registry:
+            self.queues[queue_id] = queue
+            self.resource_locks.add(queue_id)
         return self._serialize_queue(queue)
     
     def send_message(self, queue_id, message, sender):
-        if queue_id not in self.queues:
-            return {'success': False, 'error': 'Queue not found'}
-        
-        queue = self.queues[queue_id]
-        
-        if len(queue['messages']) >= queue['maxSize']:
+        with self.resource_locks.hold(queue_id) as found:
+            if not found:
+                return {'success': False, 'error': 'Queue not found'}
+            
+            queue = self.queues[queue_id]
+            
+            if len(queue['messages']) >= queue['maxSize']:
+                return {
+                    'success': False,
+                    'error': 'Queue is full',
+                    'bottleneck': True,
+                    'queueSize': len(queue['messages'])
+                }
+            
+            timestamp = datetime.now().timestamp() * 1000
+            queue_message = {
+                'id': str(uuid.uuid4()),
+                'data': message,
+                'sender': sender,
+                'timestamp': timestamp,
+                'size': payload_size(message),
+                'priority': message.get('priority', 0) if isinstance(message, dict) else 0
+            }
+            
+            # Higher priority is delivered first, FIFO within the same priority
+            queue['messages'].push(queue_message, queue_message['priority'])
+            
+            queue['stats']['totalSent'] += 1
+            queue['stats']['peakSize'] = max(queue['stats']['peakSize'], len(queue['messages']))
+            queue['stats']['lastActivity'] = timestamp
+            
+            # Check for bottleneck warning
+            utilization_percent = (len(queue['messages']) / queue['maxSize']) * 100
+            warning = f"Queue {utilization_percent:.1f}% full - potential bottleneck" if utilization_percent > 80 else None
+            
             return {
-                'success': False,
-                'error': 'Queue is full',
-                'bottleneck': True,
-                'queueSize': len(queue['messages'])
+                'success': True,
+                'message': queue_message,
+                'queueSize': len(queue['messages']),
+                'utilization': utilization_percent,
+                'warning': warning
             }
-        
-        timestamp = datetime.now().timestamp() * 1000
-        queue_message = {
-            'id': str(uuid.uuid4()),
-            'data': message,
-            'sender': sender,
-            'timestamp': timestamp,
-            'size': len(json.dumps(message)),
-            'priority': message.get('priority', 0) if isinstance(message, dict) else 0
-        }
-        
-        # Insert based on priority (higher priority first)
-        inserted = False
-        for i, msg in enumerate(queue['messages']):
-            if queue_message['priority'] > msg['priority']:
-                queue['messages'].insert(i, queue_message)
-                inserted = True
-                break
-        
-        if not inserted:
-            queue['messages'].append(queue_message)
-        
-        queue['stats']['totalSent'] += 1
-        queue['stats']['peakSize'] = max(queue['stats']['peakSize'], len(queue['messages']))
-        queue['stats']['lastActivity'] = timestamp
-        
-        # Check for bottleneck warning
-        utilization_percent = (len(queue['messages']) / queue['maxSize']) * 100
-        warning = f"Queue {utilization_percent:.1f}% full - potential bottleneck" if utilization_percent > 80 else None
-        
-        return {
-            'success': True,
-            'message': queue_message,
-            'queueSize': len(queue['messages']),
-            'utilization': utilization_percent,
-            'warning': warning
-        }
     
     def receive_message(self, queue_id, receiver):
-        if queue_id not in self.queues:
-            return {'success': False, 'error': 'Queue not found'}
-        
-        queue = self.queues[queue_id]
-        
-        if len(queue['messages']) == 0:
+        with self.resource_locks.hold(queue_id) as found:
+            if not found:
+                return {'success': False, 'error': 'Queue not found'}
+            
+            queue = self.queues[queue_id]
+            
+            if len(queue['messages']) == 0:
+                return {
+                    'success': False,
+                    'error': 'Queue is empty',
+                    'queueSize': 0
+                }
+            
+            message = queue['messages'].pop()
+            wait_time = datetime.now().timestamp() * 1000 - message['timestamp']
+            
+            queue['stats']['totalReceived'] += 1
+            queue['stats']['averageWaitTime'] = \
+                (queue['stats']['averageWaitTime'] * (queue['stats']['totalReceived'] - 1) + wait_time) / \
+                queue['stats']['totalReceived']
+            queue['stats']['lastActivity'] = datetime.now().timestamp() * 1000
+            
             return {
-                'success': False,
-                'error': 'Queue is empty',
-                'queueSize': 0
+                'success': True,
+                'message': message,
+                'receiver': receiver,
+                'waitTime': wait_time,
+                'queueSize': len(queue['messages']),
+                'latency': wait_time  # Enqueue -> dequeue, what the analyzer records
+            }
+    
+    def send_batch(self, queue_id, messages, sender):
+        """Send several messages in one pass; sends past maxSize fail individually"""
+        with self.resource_locks.hold(queue_id) as found:
+            if not found:
+                return {'success': False, 'error': 'Queue not found'}
+            
+            results = [self.send_message(queue_id, message, sender) for message in messages]
+            sent = [r['message'] for r in results if r.get('success')]
+            queue = self.queues[queue_id]
+            
+            return {
+                'success': True,
+                'results': results,
+                'sent': len(sent),
+                'rejected': len(results) - len(sent),
+                'bytes': sum(m['size'] for m in sent),
+                'queueSize': len(queue['messages']),
+                'bottleneck': len(sent) < len(results)
+            }
+    
+    def receive_batch(self, queue_id, receiver, count):
+        """Receive up to count messages in one pass, stopping early when the queue drains"""
+        with self.resource_locks.hold(queue_id) as found:
+            if not found:
+                return {'success': False, 'error': 'Queue not found'}
+            
+            queue = self.queues[queue_id]
+            results = []
+            while len(results) < count and len(queue['messages']) > 0:
+                result = self.receive_message(queue_id, receiver)
+                if not result.get('success'):
+                    break  # OS backend: the message has not come out of the kernel queue yet
+                results.append(result)
+            
+            return {
+                'success': True,
+                'results': results,
+                'count': len(results),
+                'bytes': sum(r['message']['size'] for r in results),
+                'receiver': receiver,
+                'queueSize': len(queue['messages']),
+                'drained': len(results) < count
             }
-        
-        message = queue['messages'].pop(0)
-        wait_time = datetime.now().timestamp() * 1000 - message['timestamp']
-        
-        queue['stats']['totalReceived'] += 1
-        queue['stats']['averageWaitTime'] = \
-            (queue['stats']['averageWaitTime'] * (queue['stats']['totalReceived'] - 1) + wait_time) / \
-            queue['stats']['totalReceived']
-        queue['stats']['lastActivity'] = datetime.now().timestamp() * 1000
-        
-        return {
-            'success': True,
-            'message': message,
-            'receiver': receiver,
-            'waitTime': wait_time,
-            'queueSize': len(queue['messages'])
-        }
     
     def subscribe(self, queue_id, process_id):
-        if queue_id not in self.queues:
-            return {'success': False, 'error': 'Queue not found'}
-        
-        self.queues[queue_id]['subscribers'].add(process_id)
-        return {'success': True, 'subscribers': list(self.queues[queue_id]['subscribers'])}
+        with self.resource_locks.hold(queue_id) as found:
+            if not found:
+                return {'success': False, 'error': 'Queue not found'}
+            
+            self.queues[queue_id]['subscribers'].add(process_id)
+            return {'success': True, 'subscribers': list(self.queues[queue_id]['subscribers'])}
     
     def unsubscribe(self, queue_id, process_id):
-        if queue_id not in self.queues:
-            return {'success': False, 'error': 'Queue not found'}
-        
-        self.queues[queue_id]['subscribers'].discard(process_id)
-        return {'success': True, 'subscribers': list(self.queues[queue_id]['subscribers'])}
+        with self.resource_locks.hold(queue_id) as found:
+            if not found:
+                return {'success': False, 'error': 'Queue not found'}
+            
+            self.queues[queue_id]['subscribers'].discard(process_id)
+            return {'success': True, 'subscribers': list(self.queues[queue_id]['subscribers'])}
+    
+    def get_all_queues(self, contents=True):
+        result = []
+        for queue_id in self.resource_locks.ids():
+            with self.resource_locks.hold(queue_id) as found:
+                if found:
+                    result.append(self._serialize_queue(self.queues[queue_id], contents))
+        return result
     
-    def get_all_queues(self):
-        return [self._serialize_queue(q) for q in self.queues.values()]
+    def get_queue(self, queue_id, contents=True):
+        with self.resource_locks.hold(queue_id) as found:
+            return self._serialize_queue(self.queues[queue_id], contents) if found else None
     
-    def get_queue(self, queue_id):
-        queue = self.queues.get(queue_id)
-        return self._serialize_queue(queue) if queue else None
+    def page_messages(self, queue_id, cursor=None, limit=100):
+        """Queued messages in delivery order; cursor is (priority, position) from a previous page"""
+        with self.resource_locks.hold(queue_id) as found:
+            if not found:
+                return {'success': False, 'error': 'Queue not found'}
+            
+            queue = self.queues[queue_id]
+            messages, cursor, more = queue['messages'].page(cursor, limit)
+            return {
+                'success': True,
+                'messages': messages,
+                'cursor': cursor,
+                'hasMore': more,
+                'queueSize': len(queue['messages'])
+            }
     
     def delete_queue(self, queue_id):
-        if queue_id in self.queues:
+        with self.resource_locks.removing(queue_id) as found:
+            if not found:
+                return False
             del self.queues[queue_id]
             return True
-        return False
     
     def clear_queue(self, queue_id):
-        if queue_id in self.queues:
-            self.queues[queue_id]['messages'] = []
-            return {'success': True}
-        return {'success': False, 'error': 'Queue not found'}
+        with self.resource_locks.hold(queue_id) as found:
+            if found:
+                self.queues[queue_id]['messages'].clear()
+                return {'success': True}
+            return {'success': False, 'error': 'Queue not found'}
     
-    def _serialize_queue(self, queue):
-        """Convert set to list for JSON serialization"""
+    def _serialize_queue(self, queue, contents=True):
+        """Convert set and message store to lists for JSON serialization; without contents, no messages"""
         q = queue.copy()
         q['subscribers'] = list(q['subscribers'])
-        q['currentSize'] = len(q['messages'])
+        if contents:
+            q['messages'] = queue['messages'].to_list()
+        else:
+            del q['messages']
+        q['currentSize'] = len(queue['messages'])
+        q['stats'] = queue['stats'].copy()
         return q
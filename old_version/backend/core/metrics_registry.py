@@ -0,0 +1,234 @@
+import threading
+from bisect import bisect_left
+
+# Prometheus text exposition format
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Operations that move messages (and bytes); lock/unlock only count failures
+MESSAGE_OPERATIONS = ('send', 'read', 'write')
+
+LOCK_WAIT_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0)  # Seconds
+
+# stream_gauges() key -> (gauge family, extra label)
+GAUGES = {
+    'bufferA': ('buffer_depth', 'direction="AtoB"'),
+    'bufferB': ('buffer_depth', 'direction="BtoA"'),
+    'queueSize': ('buffer_depth', ''),
+    'usedBytes': ('memory_used_bytes', ''),
+    'lockQueue': ('lock_waiters', '')
+}
+
+HELP = {
+    'messages_total': ('counter', 'Messages moved by successful operations'),
+    'bytes_total': ('counter', 'Payload bytes moved by successful operations'),
+    'failed_operations_total': ('counter', 'Rejected operations (full buffer, empty queue, lock not held, ...)'),
+    'lock_wait_seconds': ('histogram', 'Lock request to grant; 0 for uncontended grants'),
+    'buffer_depth': ('gauge', 'Messages buffered (per pipe direction, per queue)'),
+    'memory_used_bytes': ('gauge', 'Bytes stored in a shared memory segment'),
+    'lock_waiters': ('gauge', 'Processes queued for a segment lock')
+}
+
+
+def label_value(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class BucketHistogram:
+    """Fixed-bound histogram in the Prometheus shape (cumulative le buckets, sum, count)"""
+
+    def __init__(self, bounds=LOCK_WAIT_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # Last slot: above every bound (+Inf only)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def lines(self, name, labels):
+        prefix = f'{labels},' if labels else ''
+        cumulative = 0
+        lines = []
+        for bound, count in zip(self.bounds, self.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{prefix}le="{bound!r}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{{prefix}le="+Inf"}} {self.count}')
+        lines.append(f'{name}_sum{{{labels}}} {self.sum!r}')
+        lines.append(f'{name}_count{{{labels}}} {self.count}')
+        return lines
+
+
+class MetricsRegistry:
+    """Counters and histograms for /metrics, updated as each operation completes.
+
+    Every series is kept per resource type (lifetime totals, never removed)
+    and per resource (dropped when the resource is deleted). Label strings
+    are escaped once when a resource is first seen, and gauges are read from
+    the managers' own buffer lengths, so a scrape formats existing values
+    instead of recomputing anything from history.
+    """
+
+    def __init__(self, gauges=None, prefix='ipc', analysis=None):
+        self.gauges = gauges  # callable(resource_type, resource_id) -> dict of numeric gauges, or None
+        self.analysis = analysis  # callable() -> AnalysisPipeline.get_metrics(), or None
+        self.prefix = prefix
+        self._retired = {}      # {(type, operation): [messages, bytes, failed]} of deleted or unknown resources
+        self._lock_waits = {}   # {type: BucketHistogram}
+        self._resources = {}    # {(type, id): {'labels', 'ops': {operation: [messages, bytes, failed]}, 'lockWait'}}
+        self._deadlocks = 0
+        self._lock = threading.Lock()
+
+    def record(self, operation, resource_type, resource_id, size=0, count=1, failed=False):
+        """Fold one manager operation in; 'delete' drops the resource's own series"""
+        with self._lock:
+            resource = self._resources.get((resource_type, resource_id))
+            counters = resource['ops'].get(operation) if resource is not None else None
+            if counters is None:
+                counters = self._counters(operation, resource_type, resource_id, resource)
+                if counters is None:
+                    return
+            counters[0] += count
+            counters[1] += size
+            counters[2] += failed
+
+    def observe_lock_wait(self, resource_type, resource_id, wait_ms):
+        with self._lock:
+            histogram = self._lock_waits.get(resource_type)
+            if histogram is None:
+                histogram = self._lock_waits[resource_type] = BucketHistogram()
+            histogram.observe(wait_ms / 1000)
+            resource = self._resources.get((resource_type, resource_id))
+            if resource is not None:
+                if resource['lockWait'] is None:
+                    resource['lockWait'] = BucketHistogram()
+                resource['lockWait'].observe(wait_ms / 1000)
+
+    def deadlock_detected(self, deadlock=None):
+        with self._lock:
+            self._deadlocks += 1
+
+    def render(self):
+        """The current values in Prometheus text exposition format"""
+        with self._lock:
+            resources = list(self._resources.items())
+        # Gauges come from the managers (their own locking); a resource deleted meanwhile reads None
+        gauge_lines = {family: [] for family, _ in GAUGES.values()}
+        depth_by_type = {}
+        for (resource_type, resource_id), resource in resources:
+            current = self.gauges(resource_type, resource_id) if self.gauges else None
+            for key, value in (current or {}).items():
+                if key not in GAUGES:
+                    continue
+                family, extra = GAUGES[key]
+                labels = f"{resource['labels']},{extra}" if extra else resource['labels']
+                gauge_lines[family].append(f'{self.prefix}_resource_{family}{{{labels}}} {number(value)}')
+                if family == 'buffer_depth':
+                    depth_by_type[resource_type] = depth_by_type.get(resource_type, 0) + value
+
+        p = self.prefix
+        out = []
+        with self._lock:
+            # Type totals: live resources plus what deleted ones had counted
+            counts = {}
+            totals = {key: list(values) for key, values in self._retired.items()}
+            for (resource_type, _), resource in resources:
+                counts[resource_type] = counts.get(resource_type, 0) + 1
+                for operation, values in resource['ops'].items():
+                    total = totals.setdefault((resource_type, operation), [0, 0, 0])
+                    for column in range(3):
+                        total[column] += values[column]
+            self._family(out, f'{p}_resources', 'gauge', 'Live resources',
+                         [f'{p}_resources{{type="{t}"}} {n}' for t, n in sorted(counts.items())])
+            self._family(out, f'{p}_buffer_depth', 'gauge', HELP['buffer_depth'][1],
+                         [f'{p}_buffer_depth{{type="{t}"}} {number(n)}' for t, n in sorted(depth_by_type.items())])
+            self._family(out, f'{p}_deadlocks_detected_total', 'counter', 'Circular waits found by the deadlock detector',
+                         [f'{p}_deadlocks_detected_total {self._deadlocks}'])
+
+            for column, name in enumerate(('messages_total', 'bytes_total', 'failed_operations_total')):
+                kind, text = HELP[name]
+                self._family(out, f'{p}_{name}', kind, text, [
+                    f'{p}_{name}{{type="{t}",operation="{op}"}} {values[column]}'
+                    for (t, op), values in sorted(totals.items())
+                    if column == 2 or op in MESSAGE_OPERATIONS
+                ])
+                self._family(out, f'{p}_resource_{name}', kind, text, [
+                    f'{p}_resource_{name}{{{resource["labels"]},operation="{op}"}} {values[column]}'
+                    for _, resource in resources
+                    for op, values in resource['ops'].items()
+                    if column == 2 or op in MESSAGE_OPERATIONS
+                ])
+
+            kind, text = HELP['lock_wait_seconds']
+            lines = []
+            for resource_type, histogram in sorted(self._lock_waits.items()):
+                lines.extend(histogram.lines(f'{p}_lock_wait_seconds', f'type="{resource_type}"'))
+            self._family(out, f'{p}_lock_wait_seconds', kind, text, lines)
+            lines = []
+            for _, resource in resources:
+                if resource['lockWait'] is not None:
+                    lines.extend(resource['lockWait'].lines(f'{p}_resource_lock_wait_seconds', resource['labels']))
+            self._family(out, f'{p}_resource_lock_wait_seconds', kind, text, lines)
+
+        for family, lines in gauge_lines.items():
+            kind, text = HELP[family]
+            self._family(out, f'{p}_resource_{family}', kind, text, lines)
+        if self.analysis is not None:
+            self._analysis_families(out, self.analysis())
+        out.append('')
+        return '\n'.join(out)
+
+    def _analysis_families(self, out, analysis):
+        p = self.prefix
+        self._family(out, f'{p}_analysis_queue_depth', 'gauge', 'Transfers waiting for bottleneck analysis',
+                     [f'{p}_analysis_queue_depth {analysis["queued"]}'])
+        self._family(out, f'{p}_analysis_transfers_total', 'counter', 'Transfers analyzed by the background worker',
+                     [f'{p}_analysis_transfers_total {analysis["processed"]}'])
+        self._family(out, f'{p}_analysis_dropped_total', 'counter', 'Transfers dropped on a full analysis queue',
+                     [f'{p}_analysis_dropped_total{{type="{label_value(t)}"}} {n}'
+                      for t, n in sorted(analysis['dropped'].items())])
+        self._family(out, f'{p}_analysis_errors_total', 'counter', 'Transfers or analyses the worker failed on',
+                     [f'{p}_analysis_errors_total {analysis["errors"]}'])
+        self._family(out, f'{p}_analysis_lag_seconds', 'gauge', 'Capture to analysis delay of the last batch',
+                     [f'{p}_analysis_lag_seconds {analysis["lastBatch"]["lagMs"] / 1000!r}'])
+
+    def _counters(self, operation, resource_type, resource_id, resource):
+        """Slow path of record(): lifecycle events and first use of an operation"""
+        if operation == 'create':
+            self._resource(resource_type, resource_id)
+            return None
+        if operation == 'delete':
+            if resource is not None:
+                del self._resources[(resource_type, resource_id)]
+                for name, values in resource['ops'].items():
+                    retired = self._retired.setdefault((resource_type, name), [0, 0, 0])
+                    for column in range(3):
+                        retired[column] += values[column]
+            return None
+        if resource is None:
+            # Ids that were never created (requests for unknown resources) only reach the type totals
+            return self._retired.setdefault((resource_type, operation), [0, 0, 0])
+        counters = resource['ops'][operation] = [0, 0, 0]
+        return counters
+
+    def _resource(self, resource_type, resource_id):
+        resource = self._resources.get((resource_type, resource_id))
+        if resource is None:
+            resource = self._resources[(resource_type, resource_id)] = {
+                'labels': f'type="{label_value(resource_type)}",resource="{label_value(resource_id)}"',
+                'ops': {},
+                'lockWait': None
+            }
+        return resource
+
+    @staticmethod
+    def _family(out, name, kind, text, lines):
+        if lines:
+            out.append(f'# HELP {name} {text}')
+            out.append(f'# TYPE {name} {kind}')
+            out.extend(lines)
@@ -0,0 +1,593 @@
+"""OS-backed managers: the same API as the simulated managers on real kernel IPC.
+
+    pipes     a pair of os.pipe()s per pipe, framed messages, non-blocking ends;
+              optionally an 'echo' worker process acts as process B
+    queues    one multiprocessing queue (pipe + feeder thread) per priority level
+    memory    a multiprocessing.shared_memory block per segment holding the
+              JSON document, decoded straight out of a memoryview
+
+Each subclass keeps its simulated parent's bookkeeping (ownership, stats,
+history, per-resource locks) for the dashboard and analyzer, while the data
+itself goes through the kernel. Results carry raw nanosecond syscall/transit
+figures and stats keep running averages of them; 'latency' (ms, what the
+analyzer records) is the kernel-measured transit on pipe reads and queue
+receives. Linux only (F_GETPIPE_SZ, FIONREAD).
+"""
+import atexit
+import fcntl
+import json
+import os
+import queue as queue_module
+import select
+import struct
+import subprocess
+import sys
+import termios
+import time
+import uuid
+import multiprocessing
+from datetime import datetime
+from multiprocessing import shared_memory
+
+from .pipes import PipeManager, DEFAULT_BUFFER_CAPACITY
+from .ring_buffer import RingBuffer
+from .message_queue import MessageQueueManager
+from .shared_memory import SharedMemoryManager
+from .rw_lock import WAIT_TIMEOUT_MS
+from .size_accounting import payload_size
+
+BACKENDS = ('simulated', 'os')
+PIPE_WORKERS = ('echo',)
+
+# Pipe frame: payload length, sender's time.monotonic_ns(); then the JSON payload
+FRAME_HEADER = struct.Struct('<IQ')
+# Shared memory block: document length, write sequence; then the JSON document
+BLOCK_HEADER = struct.Struct('<IQ')
+
+F_GETPIPE_SZ = getattr(fcntl, 'F_GETPIPE_SZ', 1032)
+READ_CHUNK = 1 << 16
+QUEUE_GET_TIMEOUT = 5     # seconds; a put is in the kernel pipe well before this
+WORKER_EXIT_TIMEOUT = 2   # seconds
+
+
+def _running_mean(stats, key, count_key, value):
+    stats[key] += (value - stats[key]) / stats[count_key]
+
+
+class OsPipeManager(PipeManager):
+    def __init__(self):
+        super().__init__()
+        self.channels = {}  # {pipe_id: {direction: channel dict}}
+        self.workers = {}   # {pipe_id: subprocess.Popen}
+        atexit.register(self.close_all)
+    
+    def create_pipe(self, process_a, process_b, capacity=DEFAULT_BUFFER_CAPACITY, worker=None):
+        if worker is not None and worker not in PIPE_WORKERS:
+            raise ValueError(f"worker must be one of {PIPE_WORKERS}")
+        
+        pipe_id = str(uuid.uuid4())
+        a_read, a_write = os.pipe()
+        b_read, b_write = os.pipe()
+        pipe = {
+            'id': pipe_id,
+            'processA': process_a,
+            'processB': process_b,
+            'capacity': capacity,
+            'bufferA': RingBuffer(capacity),  # Metadata of messages in the kernel, A to B
+            'bufferB': RingBuffer(capacity),
+            'status': 'active',
+            'backend': 'os',
+            'worker': worker,
+            'pipeBytes': fcntl.fcntl(a_write, F_GETPIPE_SZ),
+            'created': datetime.now().timestamp() * 1000,
+            'stats': {
+                'messagesAtoB': 0,
+                'messagesBtoA': 0,
+                'messagesRead': 0,
+                'bytesTransferred': 0,
+                'avgWriteUs': 0,
+                'avgTransitUs': 0,
+                'maxTransitUs': 0,
+                'lastActivity': datetime.now().timestamp() * 1000
+            }
+        }
+        
+        channels = {
+            'AtoB': {'read_fd': a_read, 'write_fd': a_write, 'inflight': pipe['bufferA'], 'pending': bytearray()},
+            'BtoA': {'read_fd': b_read, 'write_fd': b_write, 'inflight': pipe['bufferB'], 'pending': bytearray()}
+        }
+        if worker == 'echo':
+            # Process B is a real process: it owns the A->B read end and the B->A write end
+            process = subprocess.Popen(
+                [sys.executable, '-m', 'core.os_ipc_worker', worker, str(a_read), str(b_write)],
+                pass_fds=(a_read, b_write),
+                cwd=os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+            )
+            os.close(a_read)
+            os.close(b_write)
+            channels['AtoB']['read_fd'] = None
+            channels['BtoA']['write_fd'] = None
+            # Echoed messages come out on B->A in the order they went in on A->B
+            channels['BtoA']['inflight'] = pipe['bufferA']
+            pipe['workerPid'] = process.pid
+        for channel in channels.values():
+            for fd in (channel['read_fd'], channel['write_fd']):
+                if fd is not None:
+                    os.set_blocking(fd, False)
+        
+        with self.resource_locks.registry:
+            self.pipes[pipe_id] = pipe
+            self.channels[pipe_id] = channels
+            if worker:
+                self.workers[pipe_id] = process
+            self.read_activity[pipe_id] = {"AtoB": None, "BtoA": None}
+            self.resource_locks.add(pipe_id)
+        return self._serialize_pipe(pipe)
+    
+    def send_data(self, pipe_id, data, direction):
+        with self.resource_locks.hold(pipe_id) as found:
+            if not found:
+                return {'success': False, 'error': 'Pipe not found'}
+            if direction not in ('AtoB', 'BtoA'):
+                return {'success': False, 'error': 'Invalid direction'}
+            
+            pipe = self.pipes[pipe_id]
+            channel = self.channels[pipe_id][direction]
+            if channel['write_fd'] is None:
+                return {'success': False, 'error': f'{direction} is written by the pipe\'s {pipe["worker"]} worker'}
+            
+            payload = json.dumps(data).encode()
+            frame = FRAME_HEADER.pack(len(payload), time.monotonic_ns()) + payload
+            full = {
+                'success': False,
+                'error': 'Pipe buffer is full',
+                'bottleneck': True,
+                'isBlocking': True,
+                'bufferSize': len(channel['inflight']),
+                'capacity': pipe['capacity']
+            }
+            if len(frame) > pipe['pipeBytes']:
+                return {'success': False, 'error': 'Message larger than the kernel pipe buffer',
+                        'dataSize': len(payload), 'pipeBytes': pipe['pipeBytes']}
+            if channel['inflight'].is_full() or not self._has_room(channel, pipe, len(frame)):
+                return full
+            
+            start = time.perf_counter_ns()
+            try:
+                written = os.write(channel['write_fd'], frame)
+            except BlockingIOError:
+                return full  # Kernel buffer full (a worker may be holding data we can't see)
+            if written < len(frame):
+                # Only frames above PIPE_BUF can be split; the rest always fits (checked above)
+                self._write_all(channel['write_fd'], memoryview(frame)[written:], self._echo_channel(pipe_id, direction))
+            write_ns = time.perf_counter_ns() - start
+            
+            timestamp = datetime.now().timestamp() * 1000
+            message = {
+                'id': str(uuid.uuid4()),
+                'timestamp': timestamp,
+                'size': len(payload)
+            }
+            channel['inflight'].push(message)
+            
+            stats = pipe['stats']
+            stats['messagesAtoB' if direction == 'AtoB' else 'messagesBtoA'] += 1
+            stats['bytesTransferred'] += len(payload)
+            stats['lastActivity'] = timestamp
+            sent = stats['messagesAtoB'] + stats['messagesBtoA']
+            stats['avgWriteUs'] += (write_ns / 1000 - stats['avgWriteUs']) / sent
+            
+            is_blocking = channel['inflight'].is_full()
+            return {
+                'success': True,
+                'message': {**message, 'data': data},
+                'bufferSize': len(channel['inflight']),
+                'capacity': pipe['capacity'],
+                'isBlocking': is_blocking,
+                'warning': 'Buffer at capacity - potential bottleneck' if is_blocking else None,
+                'writeNs': write_ns
+            }
+    
+    def read_data(self, pipe_id, direction):
+        with self.resource_locks.hold(pipe_id) as found:
+            if not found:
+                return {'success': False, 'error': 'Pipe not found'}
+            if direction not in ('AtoB', 'BtoA'):
+                return {'success': False, 'error': 'Invalid direction'}
+            
+            pipe = self.pipes[pipe_id]
+            channel = self.channels[pipe_id][direction]
+            if channel['read_fd'] is None:
+                return {'success': False, 'error': f'{direction} is read by the pipe\'s {pipe["worker"]} worker'}
+            
+            start = time.perf_counter_ns()
+            frame = self._next_frame(channel)
+            read_ns = time.perf_counter_ns() - start
+            self.read_activity[pipe_id][direction] = datetime.now().timestamp() * 1000
+            
+            if frame is None:
+                return {'success': True, 'message': None, 'bufferSize': len(channel['inflight']), 'readNs': read_ns}
+            
+            sent_ns, payload = frame
+            transit_ns = time.monotonic_ns() - sent_ns
+            message = channel['inflight'].pop() or {'id': None, 'timestamp': None}
+            message = {**message, 'data': json.loads(payload), 'size': len(payload)}
+            
+            stats = pipe['stats']
+            stats['messagesRead'] += 1
+            _running_mean(stats, 'avgTransitUs', 'messagesRead', transit_ns / 1000)
+            stats['maxTransitUs'] = max(stats['maxTransitUs'], transit_ns / 1000)
+            
+            return {
+                'success': True,
+                'message': message,
+                'bufferSize': len(channel['inflight']),
+                'readNs': read_ns,
+                'transitNs': transit_ns,
+                'latency': transit_ns / 1e6
+            }
+    
+    def read_batch(self, pipe_id, direction, count):
+        """Read up to count messages, stopping at the first empty read"""
+        with self.resource_locks.hold(pipe_id) as found:
+            if not found:
+                return {'success': False, 'error': 'Pipe not found'}
+            
+            messages, latencies = [], []
+            while len(messages) < count:
+                result = self.read_data(pipe_id, direction)
+                if not result.get('success'):
+                    return result
+                if result['message'] is None:
+                    break
+                messages.append(result['message'])
+                latencies.append(result['latency'])
+            
+            result = {
+                'success': True,
+                'messages': messages,
+                'count': len(messages),
+                'bufferSize': len(self.channels[pipe_id][direction]['inflight'])
+            }
+            if latencies:
+                result['latency'] = sum(latencies) / len(latencies)
+            return result
+    
+    def delete_pipe(self, pipe_id):
+        with self.resource_locks.removing(pipe_id) as found:
+            if not found:
+                return False
+            self._close(pipe_id)
+            del self.pipes[pipe_id]
+            del self.read_activity[pipe_id]
+            return True
+    
+    def clear_buffers(self, pipe_id):
+        with self.resource_locks.hold(pipe_id) as found:
+            if not found:
+                return {'success': False, 'error': 'Pipe not found'}
+            for channel in self.channels[pipe_id].values():
+                if channel['read_fd'] is not None:
+                    self._drain(channel['read_fd'])
+                channel['pending'].clear()
+                channel['inflight'].clear()
+            return {'success': True}
+    
+    def close_all(self):
+        for pipe_id in self.resource_locks.ids():
+            self.delete_pipe(pipe_id)
+    
+    def _serialize_pipe(self, pipe, contents=True):
+        p = super()._serialize_pipe(pipe, contents)
+        p['stats'] = pipe['stats'].copy()
+        return p
+    
+    def _has_room(self, channel, pipe, size):
+        """Frames above PIPE_BUF are not atomic: only write one if it fits whole"""
+        if size <= select.PIPE_BUF or channel['read_fd'] is None:
+            return True  # Atomic write (EAGAIN if full), or a worker is draining the pipe
+        queued = struct.unpack('i', fcntl.ioctl(channel['read_fd'], termios.FIONREAD, b'\0\0\0\0'))[0]
+        return pipe['pipeBytes'] - queued >= size
+    
+    def _echo_channel(self, pipe_id, direction):
+        if self.pipes[pipe_id]['worker'] and direction == 'AtoB':
+            return self.channels[pipe_id]['BtoA']
+        return None
+    
+    def _write_all(self, fd, view, echo=None):
+        """Finish a partial write. With an echo worker, keep its output pipe drained
+        meanwhile (into echo['pending']) or it would stop reading ours"""
+        readers = [echo['read_fd']] if echo else []
+        while view:
+            readable, _, _ = select.select(readers, [fd], [])
+            if readable:
+                self._fill(echo)
+            try:
+                view = view[os.write(fd, view):]
+            except BlockingIOError:
+                continue
+    
+    def _next_frame(self, channel):
+        """(sender monotonic ns, payload bytes) of the next complete frame, or None"""
+        pending = channel['pending']
+        while True:
+            if len(pending) >= FRAME_HEADER.size:
+                length, sent_ns = FRAME_HEADER.unpack_from(pending)
+                end = FRAME_HEADER.size + length
+                if len(pending) >= end:
+                    payload = bytes(pending[FRAME_HEADER.size:end])
+                    del pending[:end]
+                    return sent_ns, payload
+            if not self._fill(channel):
+                return None
+    
+    def _fill(self, channel):
+        """Move whatever the kernel has for a channel into its pending bytes"""
+        try:
+            chunk = os.read(channel['read_fd'], READ_CHUNK)
+        except BlockingIOError:
+            return False
+        channel['pending'] += chunk
+        return bool(chunk)
+    
+    def _drain(self, fd):
+        try:
+            while os.read(fd, READ_CHUNK):
+                pass
+        except BlockingIOError:
+            pass
+    
+    def _close(self, pipe_id):
+        for channel in self.channels.pop(pipe_id).values():
+            for fd in (channel['write_fd'], channel['read_fd']):
+                if fd is not None:
+                    os.close(fd)
+        process = self.workers.pop(pipe_id, None)
+        if process is not None:
+            # The worker exits on EOF from A->B; don't leave it behind if it is stuck
+            try:
+                process.wait(WORKER_EXIT_TIMEOUT)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.wait()
+
+
+class OsMessageQueueManager(MessageQueueManager):
+    def __init__(self):
+        super().__init__()
+        self.context = multiprocessing.get_context('spawn')
+        self.channels = {}  # {queue_id: {priority: multiprocessing.Queue}}
+        atexit.register(self.close_all)
+    
+    def create_queue(self, name, max_size=1000):
+        queue = super().create_queue(name, max_size)
+        with self.resource_locks.hold(queue['id']):
+            self.queues[queue['id']]['backend'] = 'os'
+            self.queues[queue['id']]['stats'].update({'avgPutUs': 0, 'avgGetUs': 0, 'avgTransitUs': 0})
+            self.channels[queue['id']] = {}
+            return self._serialize_queue(self.queues[queue['id']])
+    
+    def send_message(self, queue_id, message, sender):
+        with self.resource_locks.hold(queue_id) as found:
+            if not found:
+                return {'success': False, 'error': 'Queue not found'}
+            
+            queue = self.queues[queue_id]
+            if len(queue['messages']) >= queue['maxSize']:
+                return {
+                    'success': False,
+                    'error': 'Queue is full',
+                    'bottleneck': True,
+                    'queueSize': len(queue['messages'])
+                }
+            
+            priority = message.get('priority', 0) if isinstance(message, dict) else 0
+            channel = self.channels[queue_id].get(priority)
+            if channel is None:
+                channel = self.channels[queue_id][priority] = self.context.Queue()
+            
+            timestamp = datetime.now().timestamp() * 1000
+            meta = {
+                'id': str(uuid.uuid4()),
+                'sender': sender,
+                'timestamp': timestamp,
+                'size': payload_size(message),
+                'priority': priority
+            }
+            start = time.perf_counter_ns()
+            channel.put((meta['id'], time.monotonic_ns(), message))
+            put_ns = time.perf_counter_ns() - start
+            queue['messages'].push(meta, priority)
+            
+            stats = queue['stats']
+            stats['totalSent'] += 1
+            stats['peakSize'] = max(stats['peakSize'], len(queue['messages']))
+            stats['lastActivity'] = timestamp
+            _running_mean(stats, 'avgPutUs', 'totalSent', put_ns / 1000)
+            
+            utilization_percent = (len(queue['messages']) / queue['maxSize']) * 100
+            return {
+                'success': True,
+                'message': {**meta, 'data': message},
+                'queueSize': len(queue['messages']),
+                'utilization': utilization_percent,
+                'warning': f"Queue {utilization_percent:.1f}% full - potential bottleneck" if utilization_percent > 80 else None,
+                'putNs': put_ns
+            }
+    
+    def receive_message(self, queue_id, receiver):
+        with self.resource_locks.hold(queue_id) as found:
+            if not found:
+                return {'success': False, 'error': 'Queue not found'}
+            
+            queue = self.queues[queue_id]
+            if len(queue['messages']) == 0:
+                return {'success': False, 'error': 'Queue is empty', 'queueSize': 0}
+            
+            # The shadow store picks the priority; that level's OS queue holds the data in FIFO order.
+            # Its entry is only popped once get() delivered, so a timeout leaves both in step
+            meta = queue['messages'].peek()
+            start = time.perf_counter_ns()
+            try:
+                message_id, sent_ns, data = self.channels[queue_id][meta['priority']].get(timeout=QUEUE_GET_TIMEOUT)
+            except queue_module.Empty:
+                return {'success': False, 'error': 'Message not yet delivered by the OS queue',
+                        'queueSize': len(queue['messages'])}
+            queue['messages'].pop()
+            get_ns = time.perf_counter_ns() - start
+            transit_ns = time.monotonic_ns() - sent_ns
+            wait_time = transit_ns / 1e6
+            
+            stats = queue['stats']
+            stats['totalReceived'] += 1
+            _running_mean(stats, 'averageWaitTime', 'totalReceived', wait_time)
+            _running_mean(stats, 'avgGetUs', 'totalReceived', get_ns / 1000)
+            _running_mean(stats, 'avgTransitUs', 'totalReceived', transit_ns / 1000)
+            stats['lastActivity'] = datetime.now().timestamp() * 1000
+            
+            return {
+                'success': True,
+                'message': {**meta, 'data': data},
+                'receiver': receiver,
+                'waitTime': wait_time,
+                'queueSize': len(queue['messages']),
+                'getNs': get_ns,
+                'transitNs': transit_ns,
+                'latency': wait_time
+            }
+    
+    def delete_queue(self, queue_id):
+        with self.resource_locks.removing(queue_id) as found:
+            if not found:
+                return False
+            self._close(queue_id)
+            del self.queues[queue_id]
+            return True
+    
+    def clear_queue(self, queue_id):
+        with self.resource_locks.hold(queue_id) as found:
+            if not found:
+                return {'success': False, 'error': 'Queue not found'}
+            # Take exactly what was put, so later gets stay in step with the shadow store
+            for meta in self.queues[queue_id]['messages'].to_list():
+                try:
+                    self.channels[queue_id][meta['priority']].get(timeout=QUEUE_GET_TIMEOUT)
+                except queue_module.Empty:
+                    pass
+            self.queues[queue_id]['messages'].clear()
+            return {'success': True}
+    
+    def close_all(self):
+        for queue_id in self.resource_locks.ids():
+            self.delete_queue(queue_id)
+    
+    def _close(self, queue_id):
+        for channel in self.channels.pop(queue_id).values():
+            channel.cancel_join_thread()  # Don't block on undelivered messages
+            channel.close()
+
+
+class OsSharedMemoryManager(SharedMemoryManager):
+    def __init__(self, fairness='writer-preferring', wait_timeout_ms=WAIT_TIMEOUT_MS):
+        super().__init__(fairness, wait_timeout_ms)
+        self.blocks = {}  # {memory_id: SharedMemory}
+        atexit.register(self.close_all)
+    
+    def create_memory(self, name, size=1024, kind='dict', layout=None, fairness=None):
+        memory = super().create_memory(name, size, kind, layout, fairness)
+        if kind == 'mapped':
+            return memory  # Already an OS-level mapping
+        memory_id = memory['id']
+        with self.resource_locks.hold(memory_id):
+            block = shared_memory.SharedMemory(create=True, size=BLOCK_HEADER.size + size)
+            self._store(block, b'{}', 0)
+            self.blocks[memory_id] = block
+            segment = self.memories[memory_id]
+            segment['backend'] = 'os'
+            segment['shmName'] = block.name  # Other processes attach with SharedMemory(name)
+            segment['stats'].update({'sequence': 0, 'avgWriteUs': 0, 'avgReadUs': 0})
+            return self._serialize_memory(memory_id)
+    
+    def write(self, memory_id, process_id, data, offset=None, record=None):
+        with self.resource_locks.hold(memory_id) as found:
+            if not found:
+                return {'success': False, 'error': 'Memory segment not found'}
+            if memory_id in self.mapped:
+                return super().write(memory_id, process_id, data, offset, record)
+            
+            memory = self.memories[memory_id]
+            lock = self.locks[memory_id]
+            payload = None
+            if lock['isLocked'] and lock['owner'] == process_id:
+                # The whole document has to fit in the block, not just this update
+                payload = json.dumps({**memory['data'], **data}).encode()
+                if len(payload) > memory['size']:
+                    return {
+                        'success': False,
+                        'error': 'Data size exceeds memory segment size',
+                        'dataSize': len(payload),
+                        'maxSize': memory['size']
+                    }
+            
+            # Ownership checks, cached document, stats and history as in the simulated manager
+            result = super().write(memory_id, process_id, data)
+            if not result.get('success'):
+                return result
+            
+            stats = memory['stats']
+            start = time.perf_counter_ns()
+            self._store(self.blocks[memory_id], payload, stats['sequence'] + 1)
+            write_ns = time.perf_counter_ns() - start
+            stats['sequence'] += 1
+            _running_mean(stats, 'avgWriteUs', 'writes', write_ns / 1000)
+            
+            result['writeNs'] = write_ns
+            return result
+    
+    def _read_document(self, memory_id):
+        """Decode the document from the block; the in-process dict is never copied"""
+        start = time.perf_counter_ns()
+        data, sequence = self._load(self.blocks[memory_id])
+        read_ns = time.perf_counter_ns() - start
+        stats = self.memories[memory_id]['stats']
+        # read() counts this read after taking the content
+        stats['avgReadUs'] += (read_ns / 1000 - stats['avgReadUs']) / (stats['reads'] + 1)
+        return {'data': data, 'dataSize': self.sizes[memory_id].total, 'sequence': sequence, 'readNs': read_ns}
+    
+    def view(self, memory_id, offset=0, length=None):
+        """Zero-copy memoryview of a segment's document bytes (valid until the next write)"""
+        block = self.blocks.get(memory_id)
+        if block is None:
+            return super().view(memory_id, offset, length)
+        length, _ = BLOCK_HEADER.unpack_from(block.buf)
+        return block.buf[BLOCK_HEADER.size:BLOCK_HEADER.size + length]
+    
+    def clear_memory(self, memory_id):
+        with self.resource_locks.hold(memory_id) as found:
+            result = super().clear_memory(memory_id)
+            if found and result.get('success') and memory_id in self.blocks:
+                stats = self.memories[memory_id]['stats']
+                stats['sequence'] += 1
+                self._store(self.blocks[memory_id], b'{}', stats['sequence'])
+            return result
+    
+    def _discard(self, memory_id):
+        block = self.blocks.pop(memory_id, None)
+        if block is not None:
+            block.close()
+            block.unlink()
+        super()._discard(memory_id)
+    
+    def close_all(self):
+        for memory_id in self.resource_locks.ids():
+            self.delete_memory(memory_id)
+    
+    def _store(self, block, payload, sequence):
+        block.buf[BLOCK_HEADER.size:BLOCK_HEADER.size + len(payload)] = payload
+        BLOCK_HEADER.pack_into(block.buf, 0, len(payload), sequence)
+    
+    def _load(self, block):
+        """Decode the document straight from shared memory: the UTF-8 decode json needs is the only copy"""
+        length, sequence = BLOCK_HEADER.unpack_from(block.buf)
+        with block.buf[BLOCK_HEADER.size:BLOCK_HEADER.size + length] as view:
+            return json.loads(str(view, 'utf-8')), sequence
@@ -0,0 +1,32 @@
+"""Endpoint process for OS-backed pipes, started by OsPipeManager.
+
+    python -m core.os_ipc_worker echo READ_FD WRITE_FD
+
+echo: process B of the pipe - copies the A->B byte stream back out on B->A
+unchanged (frames included), until A->B reaches EOF.
+"""
+import os
+import sys
+
+CHUNK = 1 << 16
+
+
+def echo(read_fd, write_fd):
+    while True:
+        chunk = os.read(read_fd, CHUNK)
+        if not chunk:
+            break
+        view = memoryview(chunk)
+        while view:
+            view = view[os.write(write_fd, view):]
+    os.close(write_fd)
+
+
+if __name__ == '__main__':
+    role, read_fd, write_fd = sys.argv[1], int(sys.argv[2]), int(sys.argv[3])
+    if role != 'echo':
+        sys.exit(f'unknown worker role: {role}')
+    try:
+        echo(read_fd, write_fd)
+    except BrokenPipeError:
+        pass  # Server closed B->A first (pipe deleted)
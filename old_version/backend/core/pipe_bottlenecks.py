@@ -42,9 +42,12 @@ def analyze_pipe_bottlenecks(transfers, now_ms, recent_window_ms, extra, thresho
             'value': {'count': len(transfers)}
         })
 
-    # Excessive small writes
-    small_writes = [t for t in transfers if t['size'] <= thresholds['small_write_size']]
-    small_freq = len(small_writes) / (recent_window_ms / 1000)
+    # Excessive small writes (batched entries are judged by their mean message size)
+    small_writes = sum(
+        t.get('count', 1) for t in transfers
+        if t['size'] / max(t.get('count', 1), 1) <= thresholds['small_write_size']
+    )
+    small_freq = small_writes / (recent_window_ms / 1000)
     if small_freq > thresholds['small_write_frequency']:
         issues.append({
             'type': 'excessive-small-writes',
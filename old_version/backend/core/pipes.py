@@ -1,6 +1,13 @@
 import uuid
 from datetime import datetime
-import json
+from .ring_buffer import RingBuffer
+from .resource_locks import ResourceLocks
+from .size_accounting import payload_size
+
+# Default number of messages each direction of a pipe can hold before writes block
+DEFAULT_BUFFER_CAPACITY = 100
+# Largest capacity a client may ask for; both directions preallocate their slots
+MAX_BUFFER_CAPACITY = 1_000_000
 
 class PipeManager:
     def __init__(self):
@@ -8,15 +15,17 @@ class PipeManager:
         # Track last read timestamps per direction to detect slow readers/writers
         # and busy polling (CPU hog) patterns
         self.read_activity = {}  # {pipe_id: {"AtoB": timestamp, "BtoA": timestamp}}
+        self.resource_locks = ResourceLocks()  # One lock per pipe + registry lock
     
-    def create_pipe(self, process_a, process_b):
+    def create_pipe(self, process_a, process_b, capacity=DEFAULT_BUFFER_CAPACITY):
         pipe_id = str(uuid.uuid4())
         pipe = {
             'id': pipe_id,
             'processA': process_a,
             'processB': process_b,
-            'bufferA': [],  # Data from A to B
-            'bufferB': [],  # Data from B to A
+            'capacity': capacity,
+            'bufferA': RingBuffer(capacity),  # Data from A to B
+            'bufferB': RingBuffer(capacity),  # Data from B to A
             'status': 'active',
             'created': datetime.now().timestamp() * 1000,
             'stats': {
@@ -27,90 +36,198 @@ class PipeManager:
             }
         }
         
-        self.pipes[pipe_id] = pipe
-        return pipe
+        with self.resource_locks.registry:
+            self.pipes[pipe_id] = pipe
+            self.read_activity[pipe_id] = {"AtoB": None, "BtoA": None}
+            self.resource_locks.add(pipe_id)
+        return self._serialize_pipe(pipe)
     
     def send_data(self, pipe_id, data, direction):
-        if pipe_id not in self.pipes:
-            return {'success': False, 'error': 'Pipe not found'}
-        
-        pipe = self.pipes[pipe_id]
-        timestamp = datetime.now().timestamp() * 1000
-        
-        message = {
-            'id': str(uuid.uuid4()),
-            'data': data,
-            'timestamp': timestamp,
-            'size': len(json.dumps(data))
-        }
-        
-        if direction == 'AtoB':
-            pipe['bufferA'].append(message)
-            pipe['stats']['messagesAtoB'] += 1
-        elif direction == 'BtoA':
-            pipe['bufferB'].append(message)
-            pipe['stats']['messagesBtoA'] += 1
-        else:
-            return {'success': False, 'error': 'Invalid direction'}
-        
-        pipe['stats']['bytesTransferred'] += message['size']
-        pipe['stats']['lastActivity'] = timestamp
-        
-        # Simulate potential blocking on full buffer (bottleneck detection)
-        buffer_limit = 100
-        is_blocking = (direction == 'AtoB' and len(pipe['bufferA']) > buffer_limit) or \
-                      (direction == 'BtoA' and len(pipe['bufferB']) > buffer_limit)
-
-        # Track write activity for busy polling and slow/fast side analysis
-        if pipe_id not in self.read_activity:
-            self.read_activity[pipe_id] = {"AtoB": None, "BtoA": None}
-
-        return {
-            'success': True,
-            'message': message,
-            'bufferSize': len(pipe['bufferA']) if direction == 'AtoB' else len(pipe['bufferB']),
-            'isBlocking': is_blocking,
-            'warning': 'Buffer near capacity - potential bottleneck' if is_blocking else None
-        }
+        with self.resource_locks.hold(pipe_id) as found:
+            if not found:
+                return {'success': False, 'error': 'Pipe not found'}
+            
+            pipe = self.pipes[pipe_id]
+            
+            if direction == 'AtoB':
+                buffer = pipe['bufferA']
+            elif direction == 'BtoA':
+                buffer = pipe['bufferB']
+            else:
+                return {'success': False, 'error': 'Invalid direction'}
+            
+            # Writer blocks on a full buffer - reject instead of growing past capacity
+            if buffer.is_full():
+                return {
+                    'success': False,
+                    'error': 'Pipe buffer is full',
+                    'bottleneck': True,
+                    'isBlocking': True,
+                    'bufferSize': len(buffer),
+                    'capacity': pipe['capacity']
+                }
+            
+            timestamp = datetime.now().timestamp() * 1000
+            
+            message = {
+                'id': str(uuid.uuid4()),
+                'data': data,
+                'timestamp': timestamp,
+                'size': payload_size(data)
+            }
+            
+            buffer.push(message)
+            if direction == 'AtoB':
+                pipe['stats']['messagesAtoB'] += 1
+            else:
+                pipe['stats']['messagesBtoA'] += 1
+            
+            pipe['stats']['bytesTransferred'] += message['size']
+            pipe['stats']['lastActivity'] = timestamp
+            
+            # Next write on this direction will block until the reader catches up
+            is_blocking = buffer.is_full()
+            
+            return {
+                'success': True,
+                'message': message,
+                'bufferSize': len(buffer),
+                'capacity': pipe['capacity'],
+                'isBlocking': is_blocking,
+                'warning': 'Buffer at capacity - potential bottleneck' if is_blocking else None
+            }
     
     def read_data(self, pipe_id, direction):
-        if pipe_id not in self.pipes:
-            return {'success': False, 'error': 'Pipe not found'}
-        
-        pipe = self.pipes[pipe_id]
-        message = None
-        
-        if direction == 'AtoB' and len(pipe['bufferA']) > 0:
-            message = pipe['bufferA'].pop(0)
-        elif direction == 'BtoA' and len(pipe['bufferB']) > 0:
-            message = pipe['bufferB'].pop(0)
-
-        # Record read activity timestamp for bottleneck patterns
-        if pipe_id not in self.read_activity:
-            self.read_activity[pipe_id] = {"AtoB": None, "BtoA": None}
-        self.read_activity[pipe_id][direction] = datetime.now().timestamp() * 1000
-
-        return {
-            'success': True,
-            'message': message,
-            'bufferSize': len(pipe['bufferA']) if direction == 'AtoB' else len(pipe['bufferB'])
-        }
+        with self.resource_locks.hold(pipe_id) as found:
+            if not found:
+                return {'success': False, 'error': 'Pipe not found'}
+            
+            if direction not in ('AtoB', 'BtoA'):
+                return {'success': False, 'error': 'Invalid direction'}
+            
+            pipe = self.pipes[pipe_id]
+            buffer = pipe['bufferA'] if direction == 'AtoB' else pipe['bufferB']
+            message = buffer.pop()
+            
+            # Record read activity timestamp for bottleneck patterns
+            now = datetime.now().timestamp() * 1000
+            self.read_activity[pipe_id][direction] = now
+            
+            result = {
+                'success': True,
+                'message': message,
+                'bufferSize': len(buffer)
+            }
+            if message is not None:
+                result['latency'] = now - message['timestamp']  # Enqueue -> dequeue
+            return result
     
-    def get_all_pipes(self):
-        return list(self.pipes.values())
+    def send_batch(self, pipe_id, items, direction):
+        """Write several messages in one pass; writes past capacity fail individually"""
+        with self.resource_locks.hold(pipe_id) as found:
+            if not found:
+                return {'success': False, 'error': 'Pipe not found'}
+            if direction not in ('AtoB', 'BtoA'):
+                return {'success': False, 'error': 'Invalid direction'}
+            
+            results = [self.send_data(pipe_id, data, direction) for data in items]
+            sent = [r['message'] for r in results if r.get('success')]
+            buffer = self.pipes[pipe_id]['bufferA' if direction == 'AtoB' else 'bufferB']
+            
+            return {
+                'success': True,
+                'results': results,
+                'sent': len(sent),
+                'rejected': len(results) - len(sent),
+                'bytes': sum(m['size'] for m in sent),
+                'bufferSize': len(buffer),
+                'capacity': self.pipes[pipe_id]['capacity'],
+                'isBlocking': buffer.is_full()
+            }
+    
+    def read_batch(self, pipe_id, direction, count):
+        """Read up to count messages in one pass, stopping early when the buffer drains"""
+        with self.resource_locks.hold(pipe_id) as found:
+            if not found:
+                return {'success': False, 'error': 'Pipe not found'}
+            if direction not in ('AtoB', 'BtoA'):
+                return {'success': False, 'error': 'Invalid direction'}
+            
+            buffer = self.pipes[pipe_id]['bufferA' if direction == 'AtoB' else 'bufferB']
+            messages = []
+            while len(messages) < count and not buffer.is_empty():
+                messages.append(buffer.pop())
+            
+            now = datetime.now().timestamp() * 1000
+            self.read_activity[pipe_id][direction] = now
+            
+            result = {
+                'success': True,
+                'messages': messages,
+                'count': len(messages),
+                'bufferSize': len(buffer)
+            }
+            if messages:
+                result['latency'] = sum(now - m['timestamp'] for m in messages) / len(messages)
+            return result
+    
+    def get_all_pipes(self, contents=True):
+        result = []
+        for pipe_id in self.resource_locks.ids():
+            with self.resource_locks.hold(pipe_id) as found:
+                if found:
+                    result.append(self._serialize_pipe(self.pipes[pipe_id], contents))
+        return result
     
     def get_pipe(self, pipe_id):
         return self.pipes.get(pipe_id)
     
+    def describe_pipe(self, pipe_id, contents=True):
+        with self.resource_locks.hold(pipe_id) as found:
+            return self._serialize_pipe(self.pipes[pipe_id], contents) if found else None
+    
+    def page_messages(self, pipe_id, direction, position=None, limit=100):
+        """Buffered messages of one direction, oldest first, from an absolute position"""
+        with self.resource_locks.hold(pipe_id) as found:
+            if not found:
+                return {'success': False, 'error': 'Pipe not found'}
+            if direction not in ('AtoB', 'BtoA'):
+                return {'success': False, 'error': 'Invalid direction'}
+            
+            buffer = self.pipes[pipe_id]['bufferA' if direction == 'AtoB' else 'bufferB']
+            messages, position, more = buffer.page(buffer.consumed if position is None else position, limit)
+            return {
+                'success': True,
+                'messages': messages,
+                'position': position,
+                'hasMore': more,
+                'bufferSize': len(buffer)
+            }
+    
     def delete_pipe(self, pipe_id):
-        if pipe_id in self.pipes:
+        with self.resource_locks.removing(pipe_id) as found:
+            if not found:
+                return False
             del self.pipes[pipe_id]
+            del self.read_activity[pipe_id]
             return True
-        return False
     
     def clear_buffers(self, pipe_id):
-        if pipe_id in self.pipes:
-            self.pipes[pipe_id]['bufferA'] = []
-            self.pipes[pipe_id]['bufferB'] = []
-            return {'success': True}
-        return {'success': False, 'error': 'Pipe not found'}
+        with self.resource_locks.hold(pipe_id) as found:
+            if found:
+                self.pipes[pipe_id]['bufferA'].clear()
+                self.pipes[pipe_id]['bufferB'].clear()
+                return {'success': True}
+            return {'success': False, 'error': 'Pipe not found'}
+    
+    def _serialize_pipe(self, pipe, contents=True):
+        """Convert ring buffers to lists for JSON serialization; without contents, only their sizes"""
+        p = pipe.copy()
+        p['bufferASize'] = len(pipe['bufferA'])
+        p['bufferBSize'] = len(pipe['bufferB'])
+        if contents:
+            p['bufferA'] = pipe['bufferA'].to_list()
+            p['bufferB'] = pipe['bufferB'].to_list()
+        else:
+            del p['bufferA'], p['bufferB']
+        return p
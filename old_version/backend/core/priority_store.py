@@ -0,0 +1,128 @@
+import heapq
+
+COMPACT_AFTER = 1024  # Popped slots a level may hold before it compacts (once they are half the list)
+
+
+class _Level:
+    """FIFO of one priority level: a list and the index of its oldest message.
+
+    Unlike a deque, any position is one index away, so a page costs O(limit)
+    however deep into the level it starts. Popped slots are released at once
+    and dropped from the list in bulk, which keeps popleft amortized O(1).
+    """
+
+    __slots__ = ('items', 'head')
+
+    def __init__(self):
+        self.items = []
+        self.head = 0
+
+    def __len__(self):
+        return len(self.items) - self.head
+
+    def __iter__(self):
+        return iter(self.items[self.head:])
+
+    def append(self, message):
+        self.items.append(message)
+
+    def popleft(self):
+        items, head = self.items, self.head
+        message = items[head]
+        items[head] = None
+        head += 1
+        if head >= COMPACT_AFTER and head * 2 >= len(items):
+            del items[:head]
+            head = 0
+        self.head = head
+        return message
+
+    def first(self):
+        return self.items[self.head]
+
+    def slice(self, start, stop):
+        """Messages start..stop-1, counted from the oldest"""
+        return self.items[self.head + start:self.head + stop]
+
+
+class PriorityStore:
+    """Priority-indexed message store with FIFO order inside each priority level.
+
+    Messages are kept in one FIFO per priority, and a heap of the active
+    priority levels finds the highest one. push/pop cost O(1) when the
+    priority level already exists and O(log P) otherwise, where P is the
+    number of distinct priorities currently queued.
+    """
+
+    def __init__(self):
+        self._levels = {}  # {priority: _Level of messages}
+        self._heap = []    # Negated priorities so heapq pops the highest first
+        self._size = 0
+        self._consumed = {}  # {priority: messages ever popped at that level}, for stable page cursors
+
+    def __len__(self):
+        return self._size
+
+    def __iter__(self):
+        """Iterate in delivery order (highest priority first, FIFO within a level)"""
+        for priority in sorted(self._levels, reverse=True):
+            yield from self._levels[priority]
+
+    def push(self, message, priority=0):
+        level = self._levels.get(priority)
+        if level is None:
+            level = self._levels[priority] = _Level()
+            heapq.heappush(self._heap, -priority)
+        level.append(message)
+        self._size += 1
+
+    def pop(self):
+        """Remove and return the next message, or None when empty"""
+        if not self._heap:
+            return None
+        priority = -self._heap[0]
+        level = self._levels[priority]
+        message = level.popleft()
+        self._consumed[priority] = self._consumed.get(priority, 0) + 1
+        if not level:
+            del self._levels[priority]
+            heapq.heappop(self._heap)
+        self._size -= 1
+        return message
+
+    def peek(self):
+        if not self._heap:
+            return None
+        return self._levels[-self._heap[0]].first()
+
+    def clear(self):
+        for priority, level in self._levels.items():
+            self._consumed[priority] = self._consumed.get(priority, 0) + len(level)
+        self._levels = {}
+        self._heap = []
+        self._size = 0
+
+    def page(self, cursor, limit):
+        """Up to limit messages in delivery order after cursor, the cursor to continue from,
+        and whether more messages follow.
+
+        A cursor is (priority, position within that level); positions count
+        every message ever pushed at the level, so they survive pops. Messages
+        pushed at a higher priority than the cursor after a walk has started
+        are delivered first and show up in the next walk, not this one.
+        """
+        messages = []
+        levels = [p for p in sorted(self._levels, reverse=True) if cursor is None or p <= cursor[0]]
+        for index, priority in enumerate(levels):
+            level = self._levels[priority]
+            base = self._consumed.get(priority, 0)
+            start = max(cursor[1] - base, 0) if cursor is not None and priority == cursor[0] else 0
+            taken = level.slice(start, start + limit - len(messages))
+            messages.extend(taken)
+            cursor = (priority, base + start + len(taken))
+            if len(messages) == limit:
+                return messages, cursor, start + len(taken) < len(level) or index + 1 < len(levels)
+        return messages, cursor, False
+
+    def to_list(self):
+        return list(self)
@@ -0,0 +1,45 @@
+import threading
+from contextlib import contextmanager
+
+
+class ResourceLocks:
+    """Registry lock for create/delete plus one re-entrant lock per resource.
+
+    Managers hold only the lock of the pipe, queue or segment they touch, so
+    operations on different resources run in parallel under threaded Flask.
+    The locks are re-entrant so batch operations can hold a resource across
+    a whole batch while reusing the single-item methods.
+    """
+
+    def __init__(self):
+        self.registry = threading.Lock()
+        self._locks = {}
+
+    def add(self, resource_id):
+        """Register a resource; call while holding self.registry"""
+        self._locks[resource_id] = threading.RLock()
+
+    @contextmanager
+    def removing(self, resource_id):
+        """Unregister a resource and wait out in-flight operations; yields False if absent"""
+        with self.registry:
+            lock = self._locks.pop(resource_id, None)
+        if lock is None:
+            yield False
+            return
+        with lock:
+            yield True
+
+    def ids(self):
+        with self.registry:
+            return list(self._locks)
+
+    @contextmanager
+    def hold(self, resource_id):
+        """Lock one resource; yields False if it does not exist (or was deleted meanwhile)"""
+        lock = self._locks.get(resource_id)
+        if lock is None:
+            yield False
+            return
+        with lock:
+            yield resource_id in self._locks
@@ -0,0 +1,136 @@
+import itertools
+import os
+import zlib
+
+VIEWS = ('full', 'summary')
+
+DEFAULT_PAGE_LIMIT = 100
+MAX_PAGE_LIMIT = 1000
+
+
+class ResourceVersions:
+    """Change counters behind the listing and per-resource ETags.
+
+    Every manager operation stamps its resource, and the resource's type,
+    with the next value of one global sequence. Versions are taken before a
+    response is built and stamped after the change, so a response can only
+    be newer than its ETag - a client may refetch once too often, but never
+    keeps a stale copy.
+    """
+
+    def __init__(self):
+        self._sequence = itertools.count(1)
+        self._epoch = os.urandom(4).hex()  # Tags from before a restart never match
+        self._resources = {}  # {type: {id: version}}
+        self._types = {}      # {type: version}
+
+    def bump(self, resource_type, resource_id, deleted=False):
+        version = next(self._sequence)
+        versions = self._resources.setdefault(resource_type, {})
+        if deleted:
+            versions.pop(resource_id, None)
+        else:
+            versions[resource_id] = version
+        self._types[resource_type] = version
+
+    def version(self, resource_type, resource_id=None):
+        if resource_id is None:
+            return self._types.get(resource_type, 0)
+        return self._resources.get(resource_type, {}).get(resource_id, 0)
+
+    def versions(self, resource_type):
+        """{id: version} for every resource of a type"""
+        return dict(self._resources.get(resource_type, {}))
+
+    def etag(self, version, *variant):
+        """Strong ETag for a version; variant (query parameters) tells representations apart"""
+        checksum = zlib.crc32(repr(variant).encode()) if variant else 0
+        return f'"{self._epoch}-{version}-{checksum:08x}"'
+
+
+class Conditional:
+    """Endpoint result whose body is only built when the client's copy is stale.
+
+    build() returns (body, status) like an endpoint method; the servers call
+    respond() to answer 304 Not Modified from the ETag alone.
+    """
+
+    def __init__(self, etag, build):
+        self.etag = etag
+        self.build = build
+
+
+def etag_matches(if_none_match, etag):
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    # Weak comparison, as If-None-Match requires
+    return any(tag.strip().removeprefix('W/') == etag for tag in if_none_match.split(','))
+
+
+def respond(body, status, if_none_match=None):
+    """Resolve an endpoint result to (body, status, headers) for the servers"""
+    if not isinstance(body, Conditional):
+        return body, status, {}
+    headers = {'ETag': body.etag}
+    if etag_matches(if_none_match, body.etag):
+        return None, 304, headers
+    body, status = body.build()
+    return body, status, headers if status == 200 else {}
+
+
+def parse_view(query):
+    view = (query or {}).get('view', 'full')
+    if view not in VIEWS:
+        raise ValueError(f"view must be one of {VIEWS}")
+    return view
+
+
+def parse_fields(query):
+    """fields=a,b,c as a tuple, or None for every field"""
+    fields = (query or {}).get('fields')
+    if not fields:
+        return None
+    return tuple(field for field in (f.strip() for f in fields.split(',')) if field)
+
+
+def parse_limit(query):
+    try:
+        limit = int((query or {}).get('limit', DEFAULT_PAGE_LIMIT))
+    except (TypeError, ValueError):
+        raise ValueError('limit must be an integer')
+    if not 1 <= limit <= MAX_PAGE_LIMIT:
+        raise ValueError(f'limit must be between 1 and {MAX_PAGE_LIMIT}')
+    return limit
+
+
+def needs_contents(view, fields, content_fields):
+    """Whether message/data contents must be serialized for this view and field selection"""
+    if fields is not None:
+        return any(field in content_fields for field in fields)
+    return view == 'full'
+
+
+def project(item, fields):
+    if fields is None:
+        return item
+    return {field: item[field] for field in fields if field in item}
+
+
+def encode_cursor(*parts):
+    return ':'.join(str(part) for part in parts)
+
+
+def decode_cursor(query, parts):
+    """cursor=... as a tuple of parts integers, or None to start from the beginning"""
+    cursor = (query or {}).get('cursor')
+    if not cursor:
+        return None
+    try:
+        values = tuple(int(part) for part in cursor.split(':'))
+    except ValueError:
+        values = ()
+    if len(values) != parts:
+        raise ValueError('invalid cursor')
+    return values
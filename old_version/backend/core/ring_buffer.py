@@ -0,0 +1,75 @@
+class RingBuffer:
+    """Bounded FIFO buffer backed by a preallocated circular array.
+
+    push/pop/peek are O(1) regardless of how many items are buffered, and
+    the buffer never grows past its capacity - push returns False when full.
+    """
+
+    def __init__(self, capacity):
+        if capacity <= 0:
+            raise ValueError('capacity must be a positive integer')
+        self.capacity = capacity
+        self._slots = [None] * capacity
+        self._head = 0  # Index of the oldest item
+        self._size = 0
+        self.consumed = 0  # Items ever popped or cleared: the oldest item's absolute position
+
+    def __len__(self):
+        return self._size
+
+    def __iter__(self):
+        """Iterate from oldest to newest without consuming items"""
+        for i in range(self._size):
+            yield self._slots[(self._head + i) % self.capacity]
+
+    def is_empty(self):
+        return self._size == 0
+
+    def is_full(self):
+        return self._size == self.capacity
+
+    def push(self, item):
+        """Append item at the tail. Returns False (and drops nothing) when full."""
+        if self._size == self.capacity:
+            return False
+        self._slots[(self._head + self._size) % self.capacity] = item
+        self._size += 1
+        return True
+
+    def pop(self):
+        """Remove and return the oldest item, or None when empty"""
+        if self._size == 0:
+            return None
+        item = self._slots[self._head]
+        self._slots[self._head] = None  # Drop reference so payloads can be collected
+        self._head = (self._head + 1) % self.capacity
+        self._size -= 1
+        self.consumed += 1
+        return item
+
+    def peek(self):
+        """Return the oldest item without removing it, or None when empty"""
+        if self._size == 0:
+            return None
+        return self._slots[self._head]
+
+    def clear(self):
+        self.consumed += self._size
+        self._slots = [None] * self.capacity
+        self._head = 0
+        self._size = 0
+
+    def page(self, position, limit):
+        """Up to limit items from absolute position on (oldest first), the position after them,
+        and whether more items follow.
+
+        Positions count every item ever pushed, so a cursor stays valid while
+        items are popped; one that has already been consumed starts at the oldest.
+        """
+        start = max(position - self.consumed, 0)
+        stop = min(start + limit, self._size)
+        items = [self._slots[(self._head + i) % self.capacity] for i in range(start, stop)]
+        return items, self.consumed + max(stop, start), stop < self._size
+
+    def to_list(self):
+        return list(self)
@@ -0,0 +1,229 @@
+import threading
+from array import array
+from collections import OrderedDict
+from datetime import datetime
+
+# (name, resolution ms, slots): 1s buckets for an hour, 1m for a day, 1h for 30 days
+TIERS = (
+    ('1s', 1000, 3600),
+    ('1m', 60_000, 1440),
+    ('1h', 3_600_000, 720),
+)
+TIER_NAMES = tuple(name for name, _, _ in TIERS)
+FIELDS = ('count', 'bytes', 'latencySum', 'latencyCount', 'highIssues', 'mediumIssues')
+_TYPECODES = ('Q', 'Q', 'd', 'Q', 'I', 'I')
+
+DEFAULT_MAX_SERIES = 100  # Per-resource series; type and system series come on top
+MAX_POINTS = 3600         # Finest tier whose bucket count for the range stays within this
+
+SYSTEM = '*'
+
+
+class Tier:
+    """Fixed ring of time buckets; a slot is reused once its bucket ages out"""
+
+    def __init__(self, name, resolution, slots):
+        self.name = name
+        self.resolution = resolution
+        self.slots = slots
+        self.stamps = array('q', [-1]) * slots  # Bucket number held by each slot
+        self.columns = [array(code, [0]) * slots for code in _TYPECODES]
+
+    @property
+    def nbytes(self):
+        return self.stamps.itemsize * self.slots + sum(column.itemsize * self.slots for column in self.columns)
+
+    def add(self, timestamp, values):
+        bucket = int(timestamp // self.resolution)
+        slot = bucket % self.slots
+        if self.stamps[slot] != bucket:
+            if self.stamps[slot] > bucket:
+                return  # Older than anything the ring still holds
+            self.stamps[slot] = bucket
+            for column in self.columns:
+                column[slot] = 0
+        for column, value in zip(self.columns, values):
+            column[slot] += value
+
+    def read(self, first, last):
+        """Per-field lists for buckets first..last, zeros where nothing was recorded"""
+        first = max(first, last - self.slots + 1)
+        result = [[] for _ in FIELDS]
+        for bucket in range(first, last + 1):
+            slot = bucket % self.slots
+            held = self.stamps[slot] == bucket
+            for values, column in zip(result, self.columns):
+                values.append(column[slot] if held else 0)
+        return first, result
+
+
+class Series:
+    """One metric series rolled up into every tier.
+
+    Events of the current second are summed into a pending bucket and
+    written through to the tiers when the second changes (or before a
+    query), so recording costs a few additions per event.
+    """
+
+    def __init__(self):
+        self.tiers = [Tier(*tier) for tier in TIERS]
+        self.pending_second = None
+        self.pending = [0] * len(FIELDS)
+        self.deleted = False
+
+    @property
+    def nbytes(self):
+        return sum(tier.nbytes for tier in self.tiers)
+
+    def add(self, timestamp, values):
+        second = int(timestamp // 1000)
+        if second != self.pending_second:
+            if self.pending_second is not None and second < self.pending_second:
+                # Late event from a concurrent writer: straight into the tiers
+                for tier in self.tiers:
+                    tier.add(timestamp, values)
+                return
+            self.flush()
+            self.pending_second = second
+        pending = self.pending
+        for i, value in enumerate(values):
+            pending[i] += value
+
+    def flush(self):
+        if self.pending_second is None or not any(self.pending):
+            return
+        timestamp = self.pending_second * 1000
+        for tier in self.tiers:
+            tier.add(timestamp, self.pending)
+        self.pending = [0] * len(FIELDS)
+
+
+class RollupEngine:
+    """Long-term throughput, latency and bottleneck history in fixed tiers.
+
+    Transfers and detected bottlenecks are rolled up per (type, resource),
+    per type and for the whole system. Every series preallocates its tiers,
+    so memory is series x SERIES_BYTES: at most max_series resource series
+    are kept, evicting deleted resources first and then the least recently
+    active one (whose history still counts in its type and system series).
+    """
+
+    def __init__(self, max_series=DEFAULT_MAX_SERIES):
+        self.max_series = max_series
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        with self._lock:
+            self.series = {}                     # {(type, None) or (SYSTEM, None): Series}
+            self.resource_series = OrderedDict()  # {(type, resourceId): Series}, least recently active first
+            self.evicted = 0
+
+    def record_transfer(self, timestamp, transfer_type, resource_id, size, latency=None, count=1):
+        latency_sum, latency_count = (0, 0) if latency is None else (latency * count, count)
+        self._record(timestamp, transfer_type, resource_id, (count, size, latency_sum, latency_count, 0, 0))
+
+    def record_bottleneck(self, timestamp, transfer_type, resource_id, high, medium):
+        self._record(timestamp, transfer_type, resource_id, (0, 0, 0, 0, high, medium))
+
+    def discard_resource(self, resource_id):
+        """Mark a deleted resource's series as first in line for eviction; its history stays queryable"""
+        with self._lock:
+            for key, series in self.resource_series.items():
+                if key[1] == resource_id:
+                    series.deleted = True
+
+    def query(self, start, end, transfer_type=None, resource_id=None, tier=None):
+        """Buckets of one series between start and end (ms) from a single tier, as columns.
+
+        Without a tier, the finest one that still holds start and covers the
+        range in at most MAX_POINTS buckets is used.
+        """
+        if tier is None:
+            tier_index = choose_tier(start, end)
+        else:
+            tier_index = TIER_NAMES.index(tier)
+        name, resolution, _ = TIERS[tier_index]
+        key = (transfer_type or SYSTEM, resource_id)
+
+        with self._lock:
+            series = self.resource_series.get(key) if resource_id is not None else self.series.get(key)
+            if series is None:
+                first, columns = int(start // resolution), [[] for _ in FIELDS]
+            else:
+                series.flush()
+                first, columns = series.tiers[tier_index].read(int(start // resolution), int(end // resolution))
+        values = dict(zip(FIELDS, columns))
+
+        seconds = resolution / 1000
+        timestamps = [(first + i) * resolution for i in range(len(values['count']))]
+        return {
+            'tier': name,
+            'resolutionMs': resolution,
+            'start': start,
+            'end': end,
+            'type': transfer_type,
+            'resourceId': resource_id,
+            'found': series is not None,
+            'timestamps': timestamps,
+            'count': values['count'],
+            'bytes': values['bytes'],
+            'transferRate': [size / seconds for size in values['bytes']],
+            'avgLatency': [total / measured if measured else 0
+                           for total, measured in zip(values['latencySum'], values['latencyCount'])],
+            'latencyCount': values['latencyCount'],
+            'highIssues': values['highIssues'],
+            'mediumIssues': values['mediumIssues']
+        }
+
+    def get_status(self):
+        with self._lock:
+            series = len(self.series) + len(self.resource_series)
+            return {
+                'tiers': [{'name': name, 'resolutionMs': resolution, 'buckets': slots,
+                           'retentionMs': resolution * slots} for name, resolution, slots in TIERS],
+                'series': series,
+                'resourceSeries': len(self.resource_series),
+                'maxResourceSeries': self.max_series,
+                'evicted': self.evicted,
+                'seriesBytes': SERIES_BYTES,
+                'bytes': series * SERIES_BYTES
+            }
+
+    def _record(self, timestamp, transfer_type, resource_id, values):
+        with self._lock:
+            for key in ((SYSTEM, None), (transfer_type, None)):
+                series = self.series.get(key)
+                if series is None:
+                    series = self.series[key] = Series()
+                series.add(timestamp, values)
+
+            key = (transfer_type, resource_id)
+            series = self.resource_series.get(key)
+            if series is None:
+                if len(self.resource_series) >= self.max_series:
+                    self._evict()
+                series = self.resource_series[key] = Series()
+            else:
+                self.resource_series.move_to_end(key)
+            series.add(timestamp, values)
+
+    def _evict(self):
+        """Drop a deleted resource's series if there is one, else the least recently active; caller holds self._lock"""
+        victim = next((key for key, series in self.resource_series.items() if series.deleted),
+                      next(iter(self.resource_series)))
+        del self.resource_series[victim]
+        self.evicted += 1
+
+
+def choose_tier(start, end, now=None):
+    """Index of the finest tier that still retains start and spans the range in MAX_POINTS buckets"""
+    now = datetime.now().timestamp() * 1000 if now is None else now
+    for index, (_, resolution, slots) in enumerate(TIERS):
+        # One bucket of grace: a range ending now starts inside the oldest, partly aged-out bucket
+        if start > now - resolution * (slots + 1) and (end - start) / resolution <= MAX_POINTS:
+            return index
+    return len(TIERS) - 1
+
+
+SERIES_BYTES = Series().nbytes
@@ -0,0 +1,118 @@
+"""Admission rules for the shared/exclusive segment locks of SharedMemoryManager.
+
+Locks are simulated: a refused acquire_lock queues the process and it retries
+later. These functions decide, from the lock state dict alone, whether a
+request can be granted now, so the fairness policy is applied consistently to
+new requests and to retries:
+
+    reader-preferring  readers join a shared phase even while writers wait
+    writer-preferring  a waiting writer blocks new readers
+    phase-fair         reader and writer phases alternate: readers that waited
+                       through a writer phase get the next phase, then a
+                       waiting writer gets the phase after that
+
+Under every policy, queued writers are granted in arrival order. A queued
+process leaves the queue when it is granted, when it unlocks without holding
+the lock (withdraw), or when it has not retried for wait_timeout_ms
+(expire_waits) - so an abandoned wait cannot hold the turn forever.
+"""
+
+LOCK_MODES = ('shared', 'exclusive')
+FAIRNESS_POLICIES = ('writer-preferring', 'reader-preferring', 'phase-fair')
+WAIT_TIMEOUT_MS = 30_000  # Default: a queued process that has not retried for this long gave up
+
+
+def new_lock(fairness):
+    return {
+        'isLocked': False,
+        'mode': None,       # 'shared' or 'exclusive' while held
+        'owner': None,      # Exclusive holder
+        'readers': {},      # Shared holders: {process_id: acquired timestamp}
+        'queue': [],        # Processes waiting for lock, in arrival order
+        'waiting': {},      # {process_id: {'mode', 'phase', 'since', 'retried'}} for queued processes
+        'acquired': None,   # Start of the current phase
+        'fairness': fairness,
+        'phase': 0,         # Incremented whenever the lock changes hands or mode
+        'lastPhase': None,  # Mode of the phase that ended most recently
+        'freedAt': None     # When the lock went free with processes still queued (handoff timing)
+    }
+
+
+def can_grant(lock, process_id, mode):
+    """Whether process_id may take the lock in mode right now"""
+    if lock['mode'] == 'exclusive':
+        return lock['owner'] == process_id  # Re-entrant, in either mode
+    if lock['mode'] == 'shared':
+        if mode == 'exclusive':
+            return set(lock['readers']) == {process_id}  # Upgrade by the only reader
+        if process_id in lock['readers']:
+            return True
+    return _admits(lock, process_id, mode)
+
+
+def admissible(lock):
+    """Queued processes that would be granted if they retried now (one writer, or readers)"""
+    granted = []
+    for process_id in lock['queue']:
+        mode = lock['waiting'][process_id]['mode']
+        if not can_grant(lock, process_id, mode):
+            continue
+        if mode == 'exclusive':
+            if not granted:
+                return [process_id]
+            continue
+        granted.append(process_id)
+    return granted
+
+
+def withdraw(lock, process_id):
+    """process_id gives up its wait; returns its wait entry, or None if it was not queued"""
+    waited = lock['waiting'].pop(process_id, None)
+    if waited is not None:
+        lock['queue'].remove(process_id)
+        if not lock['queue']:
+            lock['freedAt'] = None
+    return waited
+
+
+def expire_waits(lock, now, timeout):
+    """Withdraw queued processes that have not retried within timeout ms; returns their ids"""
+    expired = [p for p, w in lock['waiting'].items() if now - w['retried'] > timeout]
+    for process_id in expired:
+        withdraw(lock, process_id)
+    return expired
+
+
+def _writer_ahead(lock, process_id):
+    """Whether an exclusive request queued before process_id (or any, if it is not queued) is waiting"""
+    waiting = lock['waiting']
+    for queued in lock['queue']:
+        if queued == process_id:
+            return False
+        if waiting[queued]['mode'] == 'exclusive':
+            return True
+    return False
+
+
+def _admits(lock, process_id, mode):
+    """Fairness check for a new holder of a free lock, or a new reader of a shared one"""
+    if mode == 'exclusive' and _writer_ahead(lock, process_id):
+        return False  # Writers are served in arrival order
+    others = [w for p, w in lock['waiting'].items() if p != process_id]
+    writers_waiting = any(w['mode'] == 'exclusive' for w in others)
+    readers_waiting = any(w['mode'] == 'shared' for w in others)
+    policy = lock['fairness']
+
+    if policy == 'reader-preferring':
+        return True
+    if policy == 'writer-preferring':
+        return mode == 'exclusive' or not writers_waiting
+
+    # phase-fair
+    if lock['mode'] == 'shared':
+        # A writer is next: only readers that waited through an earlier phase may still join
+        request = lock['waiting'].get(process_id)
+        return not writers_waiting or (request is not None and request['phase'] < lock['phase'])
+    if mode == 'exclusive':
+        return not (readers_waiting and lock['lastPhase'] == 'exclusive')
+    return not (writers_waiting and lock['lastPhase'] == 'shared')
@@ -1,17 +1,43 @@
 import uuid
 from datetime import datetime
-import json
+from .resource_locks import ResourceLocks
+from .size_accounting import KeyedSizeTracker
+from .mapped_segment import MappedSegment
+from .latency_histogram import LatencyHistogram
+from .rw_lock import (LOCK_MODES, FAIRNESS_POLICIES, WAIT_TIMEOUT_MS, new_lock, can_grant, admissible,
+                      withdraw, expire_waits)
+
+# 'dict': a JSON document updated key by key; 'mapped': raw bytes in a memory-mapped file
+SEGMENT_KINDS = ('dict', 'mapped')
 
 class SharedMemoryManager:
-    def __init__(self):
+    def __init__(self, fairness='writer-preferring', wait_timeout_ms=WAIT_TIMEOUT_MS):
+        if fairness not in FAIRNESS_POLICIES:
+            raise ValueError(f"fairness must be one of {FAIRNESS_POLICIES}")
+        self.fairness = fairness  # Default lock fairness policy for new segments (core/rw_lock.py)
+        self.wait_timeout_ms = wait_timeout_ms  # Queued processes that stop retrying are dropped after this
         self.memories = {}
         self.locks = {}  # Track locks per memory segment
+        self.sizes = {}  # Running serialized size per memory segment (KeyedSizeTracker)
+        self.mapped = {}  # MappedSegment per 'mapped' segment
+        self.lock_timings = {}  # Lock wait/hold/handoff histograms per segment
+        self.resource_locks = ResourceLocks()  # One lock per segment + registry lock
     
-    def create_memory(self, name, size=1024):
+    def create_memory(self, name, size=1024, kind='dict', layout=None, fairness=None):
+        fairness = fairness or self.fairness
+        if fairness not in FAIRNESS_POLICIES:
+            raise ValueError(f"fairness must be one of {FAIRNESS_POLICIES}")
+        if kind not in SEGMENT_KINDS:
+            raise ValueError(f"kind must be one of {SEGMENT_KINDS}")
+        if layout is not None and kind != 'mapped':
+            raise ValueError("Record layouts need kind 'mapped'")
+        segment = MappedSegment(size, layout) if kind == 'mapped' else None
+        
         memory_id = str(uuid.uuid4())
         memory = {
             'id': memory_id,
             'name': name,
+            'kind': kind,
             'size': size,
             'data': {},
             'accessHistory': [],
@@ -24,266 +50,520 @@ class SharedMemoryManager:
             }
         }
         
-        self.memories[memory_id] = memory
-        self.locks[memory_id] = {
-            'isLocked': False,
-            'owner': None,
-            'queue': [],  # Processes waiting for lock
-            'acquired': None
-        }
-        
-        return memory
+        with self.resource_locks.registry:
+            self.memories[memory_id] = memory
+            self.locks[memory_id] = new_lock(fairness)
+            self.lock_timings[memory_id] = {
+                'wait': LatencyHistogram(),     # Enqueue -> grant, for processes that had to wait
+                'hold': LatencyHistogram(),     # Grant -> release
+                'handoff': LatencyHistogram(),  # Release -> grant to a waiter (lock idle with waiters queued)
+                'acquisitions': 0,
+                'contended': 0
+            }
+            if segment is not None:
+                # A mapped segment reports its written extent through the same .total/.clear()
+                self.mapped[memory_id] = segment
+                self.sizes[memory_id] = segment
+            else:
+                self.sizes[memory_id] = KeyedSizeTracker()
+            self.resource_locks.add(memory_id)
+            return self._serialize_memory(memory_id)
     
-    def acquire_lock(self, memory_id, process_id):
-        if memory_id not in self.memories or memory_id not in self.locks:
-            return {'success': False, 'error': 'Memory segment not found'}
-        
-        lock = self.locks[memory_id]
-        
-        if not lock['isLocked']:
-            # Lock is available
-            lock['isLocked'] = True
-            lock['owner'] = process_id
-            lock['acquired'] = datetime.now().timestamp() * 1000
+    def acquire_lock(self, memory_id, process_id, mode='exclusive'):
+        """Take the segment lock shared (concurrent readers) or exclusive (one writer)"""
+        if mode not in LOCK_MODES:
+            return {'success': False, 'error': f"mode must be one of {LOCK_MODES}"}
+        
+        with self.resource_locks.hold(memory_id) as found:
+            if not found:
+                return {'success': False, 'error': 'Memory segment not found'}
             
-            return {
-                'success': True,
-                'acquired': True,
-                'owner': process_id
-            }
-        elif lock['owner'] == process_id:
-            # Already owns the lock (reentrant)
-            return {
-                'success': True,
-                'acquired': True,
-                'owner': process_id,
-                'reentrant': True
-            }
-        else:
-            # Lock is held by another process
-            if process_id not in lock['queue']:
-                lock['queue'].append(process_id)
+            lock = self.locks[memory_id]
+            now = datetime.now().timestamp() * 1000
+            request = lock['waiting'].get(process_id)
+            if request is not None:
+                request['retried'] = now  # Still waiting - only the others' abandoned waits expire
+            expired = expire_waits(lock, now, self.wait_timeout_ms)
             
-            return {
-                'success': False,
-                'acquired': False,
-                'waiting': True,
-                'owner': lock['owner'],
-                'queuePosition': lock['queue'].index(process_id),
-                'queueLength': len(lock['queue']),
-                'warning': 'Process waiting for lock - potential deadlock risk'
-            }
+            if not can_grant(lock, process_id, mode):
+                # Held in a conflicting mode, or the fairness policy gives the turn to others
+                if request is None:
+                    lock['queue'].append(process_id)
+                    lock['waiting'][process_id] = {
+                        'mode': mode,
+                        'phase': lock['phase'],
+                        'since': now,
+                        'retried': now
+                    }
+                else:
+                    request['mode'] = mode
+                
+                result = {
+                    'success': False,
+                    'acquired': False,
+                    'waiting': True,
+                    'mode': mode,
+                    'owner': lock['owner'],
+                    'readers': list(lock['readers']),
+                    'queuePosition': lock['queue'].index(process_id),
+                    'queueLength': len(lock['queue']),
+                    'warning': 'Process waiting for lock - potential deadlock risk'
+                }
+            else:
+                result = self._grant(memory_id, process_id, mode, now)
+            return self._with_expired(result, expired)
     
-    def release_lock(self, memory_id, process_id):
-        if memory_id not in self.locks:
-            return {'success': False, 'error': 'Memory segment not found'}
-        
+    def _grant(self, memory_id, process_id, mode, now):
+        """Hand the lock to process_id once can_grant allowed it; called with the segment held"""
         lock = self.locks[memory_id]
+        waited = lock['waiting'].pop(process_id, None)
+        if waited is not None:
+            lock['queue'].remove(process_id)
         
-        if not lock['isLocked']:
-            return {'success': False, 'error': 'Lock is not held'}
-        
-        if lock['owner'] != process_id:
+        if lock['owner'] == process_id or (mode == 'shared' and process_id in lock['readers']):
+            # Already holds the lock (reentrant); an exclusive holder keeps exclusive
             return {
-                'success': False,
-                'error': 'Lock is held by another process',
-                'owner': lock['owner']
+                'success': True,
+                'acquired': True,
+                'mode': lock['mode'],
+                'owner': lock['owner'],
+                'readers': list(lock['readers']),
+                'reentrant': True
             }
         
-        # Release the lock
-        hold_time = datetime.now().timestamp() * 1000 - lock['acquired']
-        lock['isLocked'] = False
-        previous_owner = lock['owner']
-        lock['owner'] = None
-        lock['acquired'] = None
-        
-        # Check if there are waiting processes
-        next_process = lock['queue'].pop(0) if lock['queue'] else None
+        if mode == 'exclusive':
+            upgraded = process_id in lock['readers']
+            lock['readers'] = {}
+            lock['owner'] = process_id
+        else:
+            upgraded = False
+            lock['readers'][process_id] = now
+        if lock['mode'] != mode:
+            # A new phase starts (free -> held, or shared -> exclusive upgrade)
+            lock['phase'] += 1
+            lock['acquired'] = now
+        lock['isLocked'] = True
+        lock['mode'] = mode
+        self._record_grant(memory_id, waited, now)
         
         return {
             'success': True,
-            'released': True,
-            'previousOwner': previous_owner,
-            'holdTime': hold_time,
-            'nextInQueue': next_process,
-            'queueLength': len(lock['queue'])
+            'acquired': True,
+            'mode': mode,
+            'owner': lock['owner'],
+            'readers': list(lock['readers']),
+            'upgraded': upgraded,
+            'waitTime': now - waited['since'] if waited is not None else 0
         }
     
-    def write(self, memory_id, process_id, data):
-        if memory_id not in self.memories:
-            return {'success': False, 'error': 'Memory segment not found'}
-        
-        memory = self.memories[memory_id]
-        lock = self.locks[memory_id]
-        
-        # Check if process has lock
-        has_lock = lock['isLocked'] and lock['owner'] == process_id
-        
-        if not has_lock:
-            memory['stats']['conflicts'] += 1
+    def release_lock(self, memory_id, process_id):
+        with self.resource_locks.hold(memory_id) as found:
+            if not found:
+                return {'success': False, 'error': 'Memory segment not found'}
+            
+            lock = self.locks[memory_id]
+            now = datetime.now().timestamp() * 1000
+            expired = expire_waits(lock, now, self.wait_timeout_ms)
+            
+            if lock['owner'] != process_id and process_id not in lock['readers']:
+                waited = withdraw(lock, process_id)
+                if waited is not None:
+                    # A queued process gives up its wait; whoever it was holding back may go next
+                    admitted = admissible(lock)
+                    return self._with_expired({
+                        'success': True,
+                        'released': False,
+                        'withdrawn': True,
+                        'mode': waited['mode'],
+                        'waitTime': now - waited['since'],
+                        'nextInQueue': admitted[0] if admitted else None,
+                        'admissible': admitted,
+                        'queueLength': len(lock['queue']),
+                        'isLocked': lock['isLocked']
+                    }, expired)
+                if not lock['isLocked']:
+                    return self._with_expired({'success': False, 'error': 'Lock is not held'}, expired)
+                return self._with_expired({
+                    'success': False,
+                    'error': 'Lock is held by another process',
+                    'owner': lock['owner'],
+                    'readers': list(lock['readers'])
+                }, expired)
+            
+            # Release the lock (a reader only leaves the shared phase; the last one ends it)
+            mode = lock['mode']
+            if mode == 'shared':
+                hold_time = now - lock['readers'].pop(process_id)
+            else:
+                hold_time = now - lock['acquired']
+                lock['owner'] = None
+            if lock['owner'] is None and not lock['readers']:
+                lock['isLocked'] = False
+                lock['mode'] = None
+                lock['acquired'] = None
+                lock['lastPhase'] = mode
+                lock['freedAt'] = now if lock['queue'] else None
+            self.lock_timings[memory_id]['hold'].record(hold_time)
+            
+            # Waiting processes the fairness policy lets in next (they are granted when they retry)
+            admitted = admissible(lock)
+            
+            return self._with_expired({
+                'success': True,
+                'released': True,
+                'mode': mode,
+                'previousOwner': process_id,
+                'holdTime': hold_time,
+                'nextInQueue': admitted[0] if admitted else None,
+                'admissible': admitted,
+                'queueLength': len(lock['queue']),
+                'isLocked': lock['isLocked']
+            }, expired)
+    
+    @staticmethod
+    def _with_expired(result, expired):
+        if expired:
+            result['expired'] = expired  # Waits dropped for not retrying within wait_timeout_ms
+        return result
+    
+    def write(self, memory_id, process_id, data, offset=None, record=None):
+        """Update a dict segment with data, or a mapped segment at a byte offset / record index"""
+        with self.resource_locks.hold(memory_id) as found:
+            if not found:
+                return {'success': False, 'error': 'Memory segment not found'}
+            
+            memory = self.memories[memory_id]
+            lock = self.locks[memory_id]
+            
+            # Check if process has lock
+            has_lock = lock['isLocked'] and lock['owner'] == process_id
+            
+            if not has_lock:
+                memory['stats']['conflicts'] += 1
+                return {
+                    'success': False,
+                    'error': 'Write failed - lock not acquired',
+                    'conflict': True,
+                    'owner': lock['owner']
+                }
+            
+            timestamp = datetime.now().timestamp() * 1000
+            if memory_id in self.mapped:
+                return self._write_mapped(memory_id, process_id, data, offset, record, timestamp)
+            
+            entries, data_size = KeyedSizeTracker.measure(data)
+            
+            if data_size > memory['size']:
+                return {
+                    'success': False,
+                    'error': 'Data size exceeds memory segment size',
+                    'dataSize': data_size,
+                    'maxSize': memory['size']
+                }
+            
+            # Perform write
+            memory['data'].update(data)
+            sizes = self.sizes[memory_id]
+            sizes.apply(entries)
+            
+            self._record_access(memory, {
+                'type': 'write',
+                'processId': process_id,
+                'timestamp': timestamp,
+                'dataSize': data_size,
+                'keys': list(data.keys())
+            })
+            memory['stats']['writes'] += 1
+            
             return {
-                'success': False,
-                'error': 'Write failed - lock not acquired',
-                'conflict': True,
-                'owner': lock['owner']
+                'success': True,
+                'written': True,
+                'dataSize': data_size,
+                'timestamp': timestamp,
+                'currentSize': sizes.total,
+                'utilization': (sizes.total / memory['size']) * 100,
+                'latency': timestamp - lock['acquired']  # Lock -> write, what the analyzer records
             }
-        
-        timestamp = datetime.now().timestamp() * 1000
-        data_size = len(json.dumps(data))
-        
-        if data_size > memory['size']:
+    
+    def read(self, memory_id, process_id, offset=None, length=None, record=None, count=1):
+        """Read a dict segment whole, or a byte range / run of records of a mapped segment"""
+        with self.resource_locks.hold(memory_id) as found:
+            if not found:
+                return {'success': False, 'error': 'Memory segment not found'}
+            
+            memory = self.memories[memory_id]
+            lock = self.locks[memory_id]
+            
+            if memory_id in self.mapped:
+                content = self._read_mapped(memory_id, offset, length, record, count)
+                if not content.get('success', True):
+                    return content
+            else:
+                content = self._read_document(memory_id)
+            
+            # Reads can happen without lock (simulating shared read access)
+            # But we track if another process holds the write lock to detect potential race conditions;
+            # a shared phase excludes writers, so reading during it is safe
+            write_conflict = lock['mode'] == 'exclusive' and lock['owner'] != process_id
+            
+            timestamp = datetime.now().timestamp() * 1000
+            
+            self._record_access(memory, {
+                'type': 'read',
+                'processId': process_id,
+                'timestamp': timestamp,
+                'writeConflict': write_conflict
+            })
+            memory['stats']['reads'] += 1
+            
+            if write_conflict:
+                memory['stats']['conflicts'] += 1
+            
             return {
-                'success': False,
-                'error': 'Data size exceeds memory segment size',
-                'dataSize': data_size,
-                'maxSize': memory['size']
+                'success': True,
+                **content,
+                'timestamp': timestamp,
+                'warning': 'Reading while another process holds write lock - potential race condition' if write_conflict else None,
+                'writeConflict': write_conflict
             }
-        
-        # Perform write
-        memory['data'].update(data)
-        
-        memory['accessHistory'].append({
+    
+    def _read_document(self, memory_id):
+        """A dict segment's contents for read(); caller holds its resource lock"""
+        return {'data': self.memories[memory_id]['data'].copy(), 'dataSize': self.sizes[memory_id].total}
+    
+    def get_all_memory(self, contents=True):
+        result = []
+        for memory_id in self.resource_locks.ids():
+            with self.resource_locks.hold(memory_id) as found:
+                if found:
+                    result.append(self._serialize_memory(memory_id, contents))
+        return result
+    
+    def get_memory(self, memory_id, contents=True):
+        with self.resource_locks.hold(memory_id) as found:
+            return self._serialize_memory(memory_id, contents) if found else None
+    
+    def get_lock_stats(self, memory_id, buckets=False):
+        """Lock wait/hold/handoff percentiles (ms) and the processes waiting right now"""
+        with self.resource_locks.hold(memory_id) as found:
+            if not found:
+                return None
+            
+            lock = self.locks[memory_id]
+            timings = self.lock_timings[memory_id]
+            now = datetime.now().timestamp() * 1000
+            stats = {
+                'memoryId': memory_id,
+                'acquisitions': timings['acquisitions'],
+                'contended': timings['contended'],
+                'waiting': [
+                    {'processId': p, 'mode': lock['waiting'][p]['mode'], 'waitingFor': now - lock['waiting'][p]['since']}
+                    for p in lock['queue']
+                ]
+            }
+            for name in ('wait', 'hold', 'handoff'):
+                stats[f'{name}Time'] = timings[name].summary()
+                if buckets:
+                    stats[f'{name}Time']['buckets'] = timings[name].buckets()
+            return stats
+    
+    def read_extent(self, memory_id, offset, length):
+        """Up to length written bytes of a mapped segment from offset, without counting as a
+        process read (state export); None for dict segments or unknown ids"""
+        with self.resource_locks.hold(memory_id) as found:
+            segment = self.mapped.get(memory_id) if found else None
+            if segment is None:
+                return None
+            return segment.read(offset, max(min(length, segment.extent - offset), 0))
+    
+    def view(self, memory_id, offset=0, length=None):
+        """Zero-copy memoryview into a mapped segment (None for dict segments or unknown ids).
+
+        The view bypasses the segment lock; release it before deleting the segment.
+        """
+        segment = self.mapped.get(memory_id)
+        return segment.view(offset, length) if segment is not None else None
+    
+    def delete_memory(self, memory_id):
+        with self.resource_locks.removing(memory_id) as found:
+            if not found:
+                return False
+            self._discard(memory_id)
+            return True
+    
+    def clear_memory(self, memory_id):
+        with self.resource_locks.hold(memory_id) as found:
+            if found:
+                self.memories[memory_id]['data'] = {}
+                self.sizes[memory_id].clear()
+                return {'success': True}
+            return {'success': False, 'error': 'Memory segment not found'}
+    
+    def get_bottleneck_metrics(self, memory_id):
+        """Get metrics for bottleneck analysis"""
+        with self.resource_locks.hold(memory_id) as found:
+            if not found:
+                return None
+            
+            memory = self.memories[memory_id]
+            lock = self.locks[memory_id]
+            
+            # Measured waits (enqueue -> grant), and the wait of whoever has been queued longest. Abandoned
+            # waits are dropped first; waiters of a free lock are not contending, they just have yet to retry
+            now = datetime.now().timestamp() * 1000
+            timings = self.lock_timings[memory_id]
+            expired = expire_waits(lock, now, self.wait_timeout_ms)
+            contending = lock['waiting'].values() if lock['isLocked'] else ()
+            oldest_wait_time = max((now - w['since'] for w in contending), default=0)
+            lock_wait_time = max(timings['wait'].percentile(99) or 0, oldest_wait_time)
+            lock_hold_time = now - lock['acquired'] if lock['isLocked'] and lock['acquired'] else 0
+            
+            # Used memory is maintained incrementally on every write
+            used_memory = self.sizes[memory_id].total
+            
+            # Estimate fragmented blocks (count unique keys as blocks)
+            fragmented_blocks = len(memory['data'].keys())
+            
+            # Get recent access history for pattern analysis
+            recent_history = memory['accessHistory'][-20:] if len(memory['accessHistory']) > 0 else []
+            
+            return self._with_expired({
+                'lock_wait_time': lock_wait_time,
+                'oldest_wait_time': oldest_wait_time,
+                'lock_hold_time': lock_hold_time,
+                'lock_wait_p50': timings['wait'].percentile(50) or 0,
+                'lock_hold_p99': timings['hold'].percentile(99) or 0,
+                'lock_queue_length': len(contending),
+                'lock_mode': lock['mode'],
+                'shared_holders': len(lock['readers']),
+                'access_history': recent_history,
+                'total_reads': memory['stats']['reads'],
+                'total_writes': memory['stats']['writes'],
+                'conflicts': memory['stats']['conflicts'],
+                'memory_size': memory['size'],
+                'used_memory': used_memory,
+                'fragmented_blocks': fragmented_blocks
+            }, expired)
+    
+    def _write_mapped(self, memory_id, process_id, data, offset, record, timestamp):
+        """Write raw bytes at offset, or the fields in data to record index; caller holds the lock"""
+        memory = self.memories[memory_id]
+        segment = self.mapped[memory_id]
+        try:
+            if record is not None:
+                if not isinstance(data, dict):
+                    return {'success': False, 'error': 'Record writes take a dict of field values'}
+                data_size = segment.write_record(record, data)
+                offset = record * segment.layout.size
+            elif offset is not None:
+                if not isinstance(data, (bytes, bytearray, memoryview)):
+                    return {'success': False, 'error': 'Mapped segment writes take bytes'}
+                data_size = segment.write(offset, data)
+            else:
+                return {'success': False, 'error': 'Mapped segments are written by offset or record'}
+        except ValueError as e:
+            return {'success': False, 'error': str(e)}
+        
+        self._record_access(memory, {
             'type': 'write',
             'processId': process_id,
             'timestamp': timestamp,
             'dataSize': data_size,
-            'keys': list(data.keys())
+            'offset': offset
         })
-        
         memory['stats']['writes'] += 1
-        memory['stats']['lastAccess'] = timestamp
-        
-        # Keep history limited
-        if len(memory['accessHistory']) > 100:
-            memory['accessHistory'] = memory['accessHistory'][-100:]
         
         return {
             'success': True,
             'written': True,
             'dataSize': data_size,
+            'offset': offset,
             'timestamp': timestamp,
-            'currentSize': len(json.dumps(memory['data'])),
-            'utilization': (len(json.dumps(memory['data'])) / memory['size']) * 100
+            'currentSize': segment.total,
+            'utilization': (segment.total / memory['size']) * 100,
+            'latency': timestamp - self.locks[memory_id]['acquired']
         }
     
-    def read(self, memory_id, process_id):
-        if memory_id not in self.memories:
-            return {'success': False, 'error': 'Memory segment not found'}
-        
-        memory = self.memories[memory_id]
+    def _read_mapped(self, memory_id, offset, length, record, count):
+        """Only the requested bytes are touched, however large the segment"""
+        segment = self.mapped[memory_id]
+        try:
+            if record is not None:
+                records = segment.read_records(record, count)
+                return {'records': records, 'record': record, 'count': len(records),
+                        'dataSize': len(records) * segment.layout.size}
+            if offset is not None:
+                length = segment.size - offset if length is None else length
+                return {'data': segment.read(offset, length), 'offset': offset, 'dataSize': length}
+        except ValueError as e:
+            return {'success': False, 'error': str(e)}
+        return {'success': False, 'error': 'Mapped segments are read by offset/length or record/count'}
+    
+    def _record_grant(self, memory_id, waited, now):
+        """Timing of a grant; waited is the process's queue entry if it had to wait"""
         lock = self.locks[memory_id]
-        
-        # Reads can happen without lock (simulating shared read access)
-        # But we track if there's a write lock to detect potential race conditions
-        write_conflict = lock['isLocked'] and lock['owner'] != process_id
-        
-        timestamp = datetime.now().timestamp() * 1000
-        
-        memory['accessHistory'].append({
-            'type': 'read',
-            'processId': process_id,
-            'timestamp': timestamp,
-            'writeConflict': write_conflict
-        })
-        
-        memory['stats']['reads'] += 1
-        memory['stats']['lastAccess'] = timestamp
-        
-        if write_conflict:
-            memory['stats']['conflicts'] += 1
+        timings = self.lock_timings[memory_id]
+        timings['acquisitions'] += 1
+        if waited is not None:
+            timings['contended'] += 1
+            timings['wait'].record(now - waited['since'])
+            if lock['freedAt'] is not None:
+                timings['handoff'].record(now - lock['freedAt'])
+        lock['freedAt'] = None
+    
+    def _record_access(self, memory, entry):
+        memory['accessHistory'].append(entry)
+        memory['stats']['lastAccess'] = entry['timestamp']
         
         # Keep history limited
         if len(memory['accessHistory']) > 100:
             memory['accessHistory'] = memory['accessHistory'][-100:]
-        
-        return {
-            'success': True,
-            'data': memory['data'].copy(),
-            'timestamp': timestamp,
-            'warning': 'Reading while another process holds write lock - potential race condition' if write_conflict else None,
-            'writeConflict': write_conflict
-        }
     
-    def get_all_memory(self):
-        result = []
-        for mem in self.memories.values():
-            lock = self.locks[mem['id']]
-            result.append({
-                **mem,
-                'lock': {
-                    'isLocked': lock['isLocked'],
-                    'owner': lock['owner'],
-                    'queueLength': len(lock['queue']),
-                    'waitingProcesses': lock['queue'].copy()
-                },
-                'currentSize': len(json.dumps(mem['data'])),
-                'utilization': (len(json.dumps(mem['data'])) / mem['size']) * 100
-            })
-        return result
+    def _discard(self, memory_id):
+        """Drop a segment's state; caller has unregistered it with resource_locks.removing"""
+        segment = self.mapped.pop(memory_id, None)
+        if segment is not None:
+            segment.close()
+        del self.lock_timings[memory_id]
+        del self.locks[memory_id]
+        del self.sizes[memory_id]
+        del self.memories[memory_id]
     
-    def get_memory(self, memory_id):
-        if memory_id not in self.memories:
-            return None
-        
+    def _serialize_memory(self, memory_id, contents=True):
+        """Snapshot of a segment with lock state; caller holds the segment's lock.
+        Without contents, the stored data and access history are left out."""
         memory = self.memories[memory_id]
         lock = self.locks[memory_id]
+        used = self.sizes[memory_id].total
+        segment = self.mapped.get(memory_id)
         
-        return {
+        snapshot = {
             **memory,
+            **(segment.describe() if segment is not None else {}),
+            'stats': memory['stats'].copy(),
             'lock': {
                 'isLocked': lock['isLocked'],
+                'mode': lock['mode'],
                 'owner': lock['owner'],
+                'readers': list(lock['readers']),
+                'fairness': lock['fairness'],
                 'queueLength': len(lock['queue']),
-                'waitingProcesses': lock['queue'].copy()
+                'waitingProcesses': lock['queue'].copy(),
+                'waitingModes': {p: w['mode'] for p, w in lock['waiting'].items()},
+                'waitTime': self._brief(self.lock_timings[memory_id]['wait']),
+                'holdTime': self._brief(self.lock_timings[memory_id]['hold'])
             },
-            'currentSize': len(json.dumps(memory['data'])),
-            'utilization': (len(json.dumps(memory['data'])) / memory['size']) * 100
+            'currentSize': used,
+            'utilization': (used / memory['size']) * 100
         }
+        if contents:
+            snapshot['data'] = memory['data'].copy()
+            snapshot['accessHistory'] = memory['accessHistory'].copy()
+        else:
+            del snapshot['data'], snapshot['accessHistory']
+        return snapshot
     
-    def delete_memory(self, memory_id):
-        if memory_id in self.locks:
-            del self.locks[memory_id]
-        if memory_id in self.memories:
-            del self.memories[memory_id]
-            return True
-        return False
-    
-    def clear_memory(self, memory_id):
-        if memory_id in self.memories:
-            self.memories[memory_id]['data'] = {}
-            return {'success': True}
-        return {'success': False, 'error': 'Memory segment not found'}
-    
-    def get_bottleneck_metrics(self, memory_id):
-        """Get metrics for bottleneck analysis"""
-        if memory_id not in self.memories or memory_id not in self.locks:
-            return None
-        
-        memory = self.memories[memory_id]
-        lock = self.locks[memory_id]
-        
-        # Calculate lock wait time (average from queue perspective)
-        lock_wait_time = 0
-        if lock['isLocked'] and lock['acquired']:
-            lock_wait_time = datetime.now().timestamp() * 1000 - lock['acquired']
-        
-        # Calculate used memory
-        used_memory = len(json.dumps(memory['data']))
-        
-        # Estimate fragmented blocks (count unique keys as blocks)
-        fragmented_blocks = len(memory['data'].keys())
-        
-        # Get recent access history for pattern analysis
-        recent_history = memory['accessHistory'][-20:] if len(memory['accessHistory']) > 0 else []
-        
-        return {
-            'lock_wait_time': lock_wait_time,
-            'lock_queue_length': len(lock['queue']),
-            'access_history': recent_history,
-            'total_reads': memory['stats']['reads'],
-            'total_writes': memory['stats']['writes'],
-            'conflicts': memory['stats']['conflicts'],
-            'memory_size': memory['size'],
-            'used_memory': used_memory,
-            'fragmented_blocks': fragmented_blocks
-        }
+    @staticmethod
+    def _brief(histogram):
+        return {'count': histogram.count, 'p50': histogram.percentile(50),
+                'p99': histogram.percentile(99), 'max': histogram.max}
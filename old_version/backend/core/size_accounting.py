@@ -0,0 +1,55 @@
+import json
+
+
+def payload_size(data):
+    """Size in bytes of a payload as it is serialized on the wire.
+
+    Every manager and the bottleneck analyzer use this one definition, and
+    each payload is measured exactly once when it enters the system.
+    """
+    return len(json.dumps(data))
+
+
+class KeyedSizeTracker:
+    """Running serialized size of a dict that is updated key by key.
+
+    Keeps the size of every `"key": value` entry so that the size of the
+    whole dict - identical to len(json.dumps(d)) - is an O(1) read instead
+    of a re-serialization of every value.
+    """
+
+    def __init__(self):
+        self._entries = {}  # {key: serialized size of '"key": value'}
+        self._entries_total = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def total(self):
+        """Serialized size of the tracked dict: braces, entries and ', ' separators"""
+        count = len(self._entries)
+        return 2 + self._entries_total + 2 * (count - 1 if count else 0)
+
+    def entry_size(self, key):
+        return self._entries.get(key, 0)
+
+    @staticmethod
+    def measure(data):
+        """Return ({key: entry size}, serialized size of data) for an incoming dict"""
+        entries = {key: len(json.dumps(str(key))) + 2 + payload_size(value) for key, value in data.items()}
+        count = len(entries)
+        return entries, 2 + sum(entries.values()) + 2 * (count - 1 if count else 0)
+
+    def apply(self, entries):
+        """Merge entry sizes produced by measure(), as dict.update() merges the values"""
+        for key, size in entries.items():
+            self._entries_total += size - self._entries.get(key, 0)
+            self._entries[key] = size
+
+    def discard(self, key):
+        self._entries_total -= self._entries.pop(key, 0)
+
+    def clear(self):
+        self._entries = {}
+        self._entries_total = 0
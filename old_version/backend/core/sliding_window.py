@@ -0,0 +1,78 @@
+from collections import deque
+
+
+class SlidingWindow:
+    """Time-bucketed running sums of transfer count, bytes and latency.
+
+    Events are folded into fixed-width buckets and running totals are kept
+    for the whole window, so adding an event and reading the window metrics
+    are both O(1) amortized - expired buckets are subtracted as they fall out.
+    Latency is averaged over the events that measured one (latency not None).
+    """
+
+    def __init__(self, window_ms, bucket_ms=100):
+        self.window_ms = window_ms
+        self.bucket_ms = bucket_ms
+        self._buckets = deque()  # [bucket_start_ms, count, bytes, latency_sum, latency_count]
+        self.count = 0
+        self.bytes = 0
+        self.latency_sum = 0
+        self.latency_count = 0
+
+    def add(self, timestamp, size, latency=None, count=1):
+        """Fold an event (or a batch of count messages, latency their mean) into the window"""
+        start = timestamp - timestamp % self.bucket_ms
+        latency_sum, latency_count = (0, 0) if latency is None else (latency * count, count)
+        # Late events from concurrent writers land in the newest bucket
+        if self._buckets and start <= self._buckets[-1][0]:
+            bucket = self._buckets[-1]
+            bucket[1] += count
+            bucket[2] += size
+            bucket[3] += latency_sum
+            bucket[4] += latency_count
+        else:
+            self._buckets.append([start, count, size, latency_sum, latency_count])
+        self.count += count
+        self.bytes += size
+        self.latency_sum += latency_sum
+        self.latency_count += latency_count
+        self.expire(timestamp)
+
+    def expire(self, now):
+        cutoff = now - self.window_ms
+        buckets = self._buckets
+        while buckets and buckets[0][0] + self.bucket_ms <= cutoff:
+            _, count, size, latency_sum, latency_count = buckets.popleft()
+            self.count -= count
+            self.bytes -= size
+            self.latency_sum -= latency_sum
+            self.latency_count -= latency_count
+        if not buckets:
+            # Reset so float drift from repeated subtraction cannot accumulate
+            self.count = 0
+            self.bytes = 0
+            self.latency_sum = 0
+            self.latency_count = 0
+
+    def is_empty(self):
+        return not self._buckets
+
+    def metrics(self, now):
+        """Window metrics as used by BottleneckAnalyzer, after expiring old buckets"""
+        self.expire(now)
+        seconds = self.window_ms / 1000
+        return {
+            'transferRate': self.bytes / seconds,  # bytes per second
+            'avgLatency': self.latency_sum / self.latency_count if self.latency_count else 0,
+            'latencyCount': self.latency_count,  # Transfers that measured a latency
+            'frequency': self.count / seconds,  # transfers per second
+            'totalSize': self.bytes,
+            'count': self.count
+        }
+
+    def clear(self):
+        self._buckets.clear()
+        self.count = 0
+        self.bytes = 0
+        self.latency_sum = 0
+        self.latency_count = 0
@@ -0,0 +1,122 @@
+import base64
+import json
+import zlib
+from datetime import datetime
+
+FORMAT_VERSION = 1
+CONTENT_TYPE = 'application/x-ndjson'
+SECTIONS = ('pipes', 'queues', 'memory', 'analysis')
+COMPRESSIONS = ('gzip',)
+
+MESSAGE_BATCH = 500            # Messages copied per hold of a pipe's or queue's lock
+CHUNK_BYTES = 64 << 10         # NDJSON bytes handed to the server (and compressor) at a time
+SEGMENT_CHUNK_BYTES = 48 << 10  # Raw bytes of a mapped segment per record (64 KB as base64)
+
+
+class Stream:
+    """Endpoint result sent to the client chunk by chunk as chunks (an iterable of bytes) yields"""
+
+    def __init__(self, chunks, content_type, headers=None):
+        self.chunks = chunks
+        self.content_type = content_type
+        self.headers = headers or {}
+
+
+def export_records(service, sections=SECTIONS, batch=MESSAGE_BATCH):
+    """Every resource and its contents as one dict per NDJSON line.
+
+    Resources are visited one at a time and messages are copied in batches
+    through the managers' page cursors, each batch under a short hold of
+    the resource's lock, so the export never holds more than one batch and
+    never blocks a resource for the length of the download. The result is
+    a moving snapshot: messages consumed while the export runs are skipped,
+    and resources created after it passed their type are not included.
+    """
+    counts = dict.fromkeys(('pipes', 'pipeMessages', 'queues', 'queueMessages', 'memory'), 0)
+    yield {'type': 'header', 'format': FORMAT_VERSION, 'backend': service.backend,
+           'sections': list(sections), 'timestamp': datetime.now().timestamp() * 1000}
+
+    if 'pipes' in sections:
+        manager = service.pipe_manager
+        for pipe_id in manager.resource_locks.ids():
+            pipe = manager.describe_pipe(pipe_id, contents=False)
+            if pipe is None:
+                continue  # Deleted since the id list was taken
+            counts['pipes'] += 1
+            yield {'type': 'pipe', 'pipe': pipe}
+            for direction in ('AtoB', 'BtoA'):
+                position, more = None, True
+                while more:
+                    page = manager.page_messages(pipe_id, direction, position, batch)
+                    if not page.get('success'):
+                        break
+                    position, more = page['position'], page['hasMore']
+                    counts['pipeMessages'] += len(page['messages'])
+                    for message in page['messages']:
+                        yield {'type': 'pipe-message', 'pipeId': pipe_id, 'direction': direction, 'message': message}
+
+    if 'queues' in sections:
+        manager = service.queue_manager
+        for queue_id in manager.resource_locks.ids():
+            queue = manager.get_queue(queue_id, contents=False)
+            if queue is None:
+                continue
+            counts['queues'] += 1
+            yield {'type': 'queue', 'queue': queue}
+            cursor, more = None, True
+            while more:
+                page = manager.page_messages(queue_id, cursor, batch)
+                if not page.get('success'):
+                    break
+                cursor, more = page['cursor'], page['hasMore']
+                counts['queueMessages'] += len(page['messages'])
+                for message in page['messages']:
+                    yield {'type': 'queue-message', 'queueId': queue_id, 'message': message}
+
+    if 'memory' in sections:
+        manager = service.memory_manager
+        for memory_id in manager.resource_locks.ids():
+            # Dict segments carry their (size-bounded) document; mapped ones stream their bytes
+            memory = manager.get_memory(memory_id)
+            if memory is None:
+                continue
+            counts['memory'] += 1
+            yield {'type': 'memory', 'memory': memory}
+            if memory['kind'] != 'mapped':
+                continue
+            for offset in range(0, memory['currentSize'], SEGMENT_CHUNK_BYTES):
+                data = manager.read_extent(memory_id, offset, SEGMENT_CHUNK_BYTES)
+                if not data:
+                    break
+                yield {'type': 'memory-bytes', 'memoryId': memory_id, 'offset': offset,
+                       'data': base64.b64encode(data).decode()}
+
+    if 'analysis' in sections:
+        yield {'type': 'bottlenecks', 'bottlenecks': service.bottleneck_analyzer.get_bottlenecks()}
+        yield {'type': 'deadlocks', 'deadlocks': service.deadlock_detector.get_deadlocks()}
+
+    yield {'type': 'end', 'counts': counts, 'timestamp': datetime.now().timestamp() * 1000}
+
+
+def ndjson_chunks(records, compress=None, chunk_bytes=CHUNK_BYTES):
+    """Encode records as NDJSON in chunks of about chunk_bytes, gzip-compressed if asked.
+
+    The header line goes out on its own so the first byte leaves at once;
+    compressed chunks are sync-flushed so each one can be decoded on arrival.
+    """
+    encode = json.JSONEncoder(separators=(',', ':')).encode
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress == 'gzip' else None
+    parts, size, first = [], 0, True
+    for record in records:
+        line = (encode(record) + '\n').encode()
+        parts.append(line)
+        size += len(line)
+        if size >= chunk_bytes or first:
+            chunk = b''.join(parts)
+            parts, size, first = [], 0, False
+            yield (compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)) if compressor else chunk
+    chunk = b''.join(parts)
+    if compressor:
+        yield compressor.compress(chunk) + compressor.flush()
+    elif chunk:
+        yield chunk
@@ -0,0 +1,750 @@
+"""Offline bottleneck and deadlock analysis of a recorded trace (core/trace_recorder.py).
+
+The trace is read as column batches (read_columns) and replayed on a
+SimulatedClock - trace time, not wall time - so an hour of traffic is
+analyzed as fast as it can be decoded. Replay rebuilds what the live server
+knew when it ran its heuristics: pipe buffer and queue occupancy, lock
+holders and waiters, and latencies from FIFO-matching sends to reads and
+lock grants to writes. Lock events drive a DeadlockDetector exactly as
+IPCService does.
+
+Instead of re-running the heuristics on every event, each resource is
+evaluated once per tumbling window of window_ms, with the same functions the
+live BottleneckAnalyzer uses (pipe_bottlenecks, queue_bottlenecks,
+memory_bottlenecks, detect_generic_issues). Occupancy and lock queue length
+are the peaks seen in the window; memory read/write/conflict counts are per
+window. Segment utilization and fragmentation are not in the trace and are
+not reported.
+
+Pipe and queue events are not applied one by one: a batch's column slice is
+grouped by resource (a stable sort keeps trace order), and each group's
+per-window counts, byte sums, write shapes, occupancy peaks and FIFO latencies
+are reductions over its columns - prefix sums cut at the window edges, and
+prefix sums of the messages sent and requested for the matching. Memory
+events, which move lock state and drive the deadlock detector, and
+creates/deletes still go through the per-event handlers in trace order; the
+latencies they record reach the histograms a window at a time.
+"""
+from bisect import bisect_left, bisect_right
+from collections import Counter, deque
+from itertools import accumulate, chain, compress, repeat
+from operator import add, and_, call, itemgetter, le, lt, mul, not_, or_, sub, truediv
+
+from .bottleneck_analyzer import DEFAULT_THRESHOLDS, RESOURCE_WINDOW_MS, detect_generic_issues
+from .deadlock_detector import DeadlockDetector
+from .latency_histogram import LatencyHistogram
+from .pipe_bottlenecks import analyze_pipe_bottlenecks
+from .queue_bottlenecks import analyze_queue_bottlenecks
+from .memory_bottlenecks import analyze_memory_bottlenecks
+from .pipes import DEFAULT_BUFFER_CAPACITY
+from .trace_recorder import (OPERATIONS, OPERATION_CODES, RESOURCE_TYPES, RESOURCE_CODES, FAILED, SHARED, WAITING,
+                             BTOA, NO_INDEX, segment_paths, read_columns)
+
+# Capacities for resources created before recording started (the create endpoints' defaults)
+DEFAULT_CAPACITY = {'pipe': DEFAULT_BUFFER_CAPACITY, 'queue': 1000, 'memory': 1024}
+
+# Heuristics take lists of transfer / access dicts but only look at a few keys. A window
+# passes one shared dict per distinct shape, repeated, so nothing is built per event.
+ACCESS = {
+    'read': {'type': 'read', 'operation': 'read'},
+    'write': {'type': 'write', 'operation': 'write'}
+}
+
+SEND, READ = OPERATION_CODES['send'], OPERATION_CODES['read']
+TRANSFERS = frozenset((SEND, READ))
+# Events that start or end a resource's replay state; a window's slice is split at them
+LIFECYCLE = frozenset((OPERATION_CODES['create'], OPERATION_CODES['delete']))
+MEMORY = RESOURCE_CODES['memory']
+# Columns every reducer reads, gathered for each resource's group
+GROUPED = ('operation', 'size', 'count', 'flags')
+
+
+def _take(column, positions):
+    """Values of column at positions, a list of indexes"""
+    if len(positions) == 1:
+        return [column[positions[0]]]
+    return list(itemgetter(*positions)(column)) if positions else []
+
+
+def _trace_time(timestamps, time):
+    """Trace time at each event (SimulatedClock.advance over the column): the running maximum"""
+    clock = timestamps.tolist()
+    if clock[0] >= time and clock == sorted(clock):
+        return clock
+    clock = list(accumulate(clock, max, initial=time))
+    del clock[0]
+    return clock
+
+
+def _cuts(positions, edges):
+    """Index of the first of positions (ascending) in each window, given the window edges"""
+    return list(map(bisect_left, repeat(list(positions)), edges))
+
+
+def _window_totals(values, cuts):
+    """Sums of an integer column between consecutive cuts, from its prefix sums"""
+    totals = list(accumulate(values, initial=0))
+    return list(map(sub, _take(totals, cuts[1:]), _take(totals, cuts)))
+
+
+class SimulatedClock:
+    """'Now' during replay: the timestamp of the event being applied"""
+
+    def __init__(self):
+        self.time = 0.0
+
+    def now(self):
+        return self.time
+
+    def advance(self, timestamp):
+        # Events from concurrent requests can be recorded slightly out of order
+        if timestamp > self.time:
+            self.time = timestamp
+
+
+class TraceAnalyzer:
+    """Replays trace batches and collects windowed bottlenecks, latencies and deadlocks"""
+
+    def __init__(self, window_ms=RESOURCE_WINDOW_MS, thresholds=None):
+        self.window_ms = window_ms
+        self.thresholds = {**DEFAULT_THRESHOLDS, **(thresholds or {})}
+        self.clock = SimulatedClock()
+        self.deadlock_detector = DeadlockDetector(clock=self.clock.now)
+        self.resources = {}   # {(type, resourceId): replay state}
+        self.active = set()   # Resources with transfers in the current window
+        self.latency = {}     # {(kind, resourceId): LatencyHistogram}
+        self.recorded = {}    # {LatencyHistogram: [ms]} recorded by the handlers, flushed at window close
+        self.bottlenecks = []
+        self.events = 0
+        self.windows = 0
+        self.first = None
+        self.window_start = None
+        self.window_end = None
+        self._handlers = {
+            ('pipe', 'create'): self._create, ('queue', 'create'): self._create,
+            ('memory', 'create'): self._create,
+            ('pipe', 'delete'): self._delete, ('queue', 'delete'): self._delete,
+            ('memory', 'delete'): self._delete,
+            ('memory', 'write'): self._memory_write, ('memory', 'read'): self._memory_read,
+            ('memory', 'lock'): self._memory_lock, ('memory', 'unlock'): self._memory_unlock
+        }
+        # Dispatch by the trace's numeric codes
+        self._dispatch = {
+            (t, o): self._handlers.get((resource_type, op), self._ignore)
+            for t, resource_type in enumerate(RESOURCE_TYPES)
+            for o, op in enumerate(OPERATIONS)
+        }
+        # Reductions of one resource's events in a run, by type code (see WINDOW REDUCTIONS)
+        self._reducers = {
+            RESOURCE_CODES['pipe']: self._reduce_pipe,
+            RESOURCE_CODES['queue']: self._reduce_queue
+        }
+
+    def analyze_directory(self, directory, batch_events=65536):
+        for path in segment_paths(directory):
+            for ids, columns in read_columns(path, batch_events):
+                self.feed(ids, columns)
+        return self.report()
+
+    def feed(self, ids, columns):
+        """Apply one column batch, closing windows as trace time passes their end"""
+        count = len(columns['timestamp'])
+        if not count:
+            return
+        if self.window_end is None:
+            self._start(columns['timestamp'][0])
+        clock = _trace_time(columns['timestamp'], self.clock.time)
+        # Runs between creates/deletes are reduced as a whole; those events are applied on their own
+        start = 0
+        for position in compress(range(count), map(LIFECYCLE.__contains__, columns['operation'])):
+            if position > start:
+                self._apply_run(ids, columns, clock, start, position)
+            if clock[position] >= self.window_end:
+                self._close_window(clock[position])
+            self._replay(ids, columns, clock, [position])
+            start = position + 1
+        if count > start:
+            self._apply_run(ids, columns, clock, start, count)
+        self.clock.time = clock[-1]
+        self.events += count
+
+    def report(self):
+        """Evaluate the last window and summarize the whole trace"""
+        self._flush_recorded()
+        if self.window_end is not None and self.active:
+            self._evaluate_window()
+        by_issue = {}
+        by_resource = {}
+        for bottleneck in self.bottlenecks:
+            key = f"{bottleneck['type']}:{bottleneck['resourceId']}"
+            entry = by_resource.setdefault(key, {'type': bottleneck['type'], 'resourceId': bottleneck['resourceId'],
+                                                 'windows': 0, 'issues': {}})
+            entry['windows'] += 1
+            for issue in bottleneck['issues']:
+                summary = by_issue.setdefault(issue['type'], {'severity': issue['severity'], 'windows': 0,
+                                                              'resources': set(), 'first': bottleneck['windowStart'],
+                                                              'last': bottleneck['windowStart']})
+                summary['windows'] += 1
+                summary['resources'].add(key)
+                summary['last'] = bottleneck['windowStart']
+                entry['issues'][issue['type']] = entry['issues'].get(issue['type'], 0) + 1
+        for summary in by_issue.values():
+            summary['resources'] = len(summary['resources'])
+
+        return {
+            'trace': {
+                'events': self.events,
+                'start': self.first,
+                'end': self.clock.time if self.first is not None else None,
+                'durationMs': self.clock.time - self.first if self.first is not None else 0,
+                'windowMs': self.window_ms,
+                'windows': self.windows
+            },
+            'summary': {
+                'byIssue': by_issue,
+                'byResource': sorted(by_resource.values(), key=lambda r: -r['windows'])
+            },
+            'bottlenecks': self.bottlenecks,
+            'latency': {
+                f'{kind}:{resource_id}': {'type': kind, 'resourceId': resource_id, **histogram.summary()}
+                for (kind, resource_id), histogram in self.latency.items() if histogram
+            },
+            'deadlocks': self.deadlock_detector.get_deadlocks()
+        }
+
+    # ===== WINDOWS =====
+    def _apply_run(self, ids, columns, clock, start, end):
+        """Apply events start..end of a batch, none of them a create or delete"""
+        run = {name: column[start:end].tolist() for name, column in columns.items()}
+        now = run['now'] = clock[start:end]
+        # Window k of the run covers run positions edges[k]..edges[k + 1]
+        edges = [0]
+        window_end = self.window_end
+        position = bisect_left(now, window_end)
+        while position < len(now):
+            edges.append(position)
+            window_end = self._next_window(now[position], window_end)[1]
+            position = bisect_left(now, window_end, position)
+        edges.append(len(now))
+
+        # Group pipe and queue events by resource, each group's positions in trace order
+        is_memory = list(map(MEMORY.__eq__, run['resourceType']))
+        positions = list(compress(range(len(now)), map(not_, is_memory)))
+        span = len(ids)  # Keys are type * span + resource
+        keys = list(map(add, map(mul, _take(run['resourceType'], positions), repeat(span)),
+                        _take(run['resource'], positions)))
+        groups = {key: [] for key in set(keys)}
+        appends = {key: group.append for key, group in groups.items()}
+        deque(map(call, map(appends.__getitem__, keys), positions), maxlen=0)
+        updates = []
+        for key in sorted(groups):
+            type_code, resource = divmod(key, span)
+            group = {name: _take(run[name], groups[key]) for name in GROUPED}
+            group['position'] = groups[key]
+            update = self._reducers[type_code](ids[resource], group, run, ids, edges)
+            if update is not None:
+                updates.append(update)
+
+        # Then window by window: the updates, memory events in trace order (lock state and the
+        # deadlock detector), and the window's evaluation once trace time passes its end
+        memory = list(compress(range(start, end), is_memory))
+        cuts = [bisect_left(memory, start + edge) for edge in edges]
+        for window in range(len(edges) - 1):
+            if window:
+                self._close_window(now[edges[window]])
+            for apply, key, state, deltas in updates:
+                if deltas[window] is not None:
+                    apply(key, state, deltas[window])
+            if cuts[window] < cuts[window + 1]:
+                self._replay(ids, columns, clock, memory[cuts[window]:cuts[window + 1]])
+
+    def _replay(self, ids, columns, clock, positions):
+        """Apply the events at positions one by one, through the per-event handlers"""
+        dispatch = self._dispatch
+        clock_time = self.clock
+        for now, type_code, operation, resource, process, size, count, flags in zip(
+                map(clock.__getitem__, positions), *(
+                    map(columns[name].__getitem__, positions)
+                    for name in ('resourceType', 'operation', 'resource', 'process', 'size', 'count', 'flags'))):
+            clock_time.time = now
+            dispatch[type_code, operation](RESOURCE_TYPES[type_code], ids[resource],
+                                           ids[process] if process != NO_INDEX else None,
+                                           size, count, flags, now)
+
+    def _start(self, timestamp):
+        self.first = timestamp
+        self.clock.time = timestamp
+        self.window_start = timestamp
+        self.window_end = timestamp + self.window_ms
+
+    def _close_window(self, timestamp):
+        self._flush_recorded()
+        self._evaluate_window()
+        self.window_start, self.window_end = self._next_window(timestamp, self.window_end)
+
+    def _next_window(self, timestamp, window_end):
+        """(start, end) of the window timestamp falls in, after the one ending at window_end"""
+        # Skip over empty windows in one step
+        skipped = int((timestamp - window_end) // self.window_ms)
+        start = window_end + skipped * self.window_ms
+        return start, start + self.window_ms
+
+    def _evaluate_window(self):
+        self.windows += 1
+        now = self.window_end
+        for key in self.active:
+            state = self.resources[key]
+            window = state['window']
+            resource_type = key[0]
+            if resource_type == 'pipe' and window['count']:
+                bottleneck = self._evaluate_pipe(key[1], state, window, now)
+            elif resource_type == 'queue' and window['count']:
+                bottleneck = self._evaluate_queue(state, window)
+            elif resource_type == 'memory' and window['count']:
+                bottleneck = self._evaluate_memory(state, window, now)
+            else:
+                bottleneck = None  # Reads only: analyzed with the pipe's writes, like the live analyzer
+            if bottleneck and bottleneck['issues']:
+                self.bottlenecks.append({
+                    'type': resource_type,
+                    'resourceId': key[1],
+                    'windowStart': self.window_start,
+                    'timestamp': now,
+                    **bottleneck
+                })
+            if state.get('deleted'):
+                del self.resources[key]
+            else:
+                self._reset_window(state)
+        self.active = set()
+
+    def _metrics(self, window, latency_window=None):
+        """The window's SlidingWindow.metrics() equivalent"""
+        seconds = self.window_ms / 1000
+        latency_window = latency_window or window
+        return {
+            'transferRate': window['bytes'] / seconds,
+            'avgLatency': (latency_window['latencySum'] / latency_window['latencyCount']
+                           if latency_window['latencyCount'] else 0),
+            'latencyCount': latency_window['latencyCount'],
+            'frequency': window['count'] / seconds,
+            'totalSize': window['bytes'],
+            'count': window['count']
+        }
+
+    def _evaluate_pipe(self, resource_id, state, window, now):
+        # Enqueue -> dequeue latency comes from the read side, as in the live analyzer
+        read = state['read']
+        metrics = self._metrics(window, read if read['latencyCount'] else None)
+        transfers = []
+        for (writer, count, small), entries in window['shapes'].items():
+            transfers.extend([{'size': 0 if small else float('inf'), 'count': count, 'writerId': writer}] * entries)
+        extra = {
+            'bufferA_size': state['peak'][0],
+            'bufferB_size': state['peak'][1],
+            'buffer_capacity': state['capacity'],
+            'last_read_timestamps': dict(state['lastRead'])
+        }
+        history = {
+            'all_transfers': [{'type': 'pipe-read', 'resourceId': resource_id, 'timestamp': ts}
+                              for ts in state['recentReads']],
+            'resource_id': resource_id
+        }
+        issues = detect_generic_issues(metrics, self.thresholds)
+        issues.extend(analyze_pipe_bottlenecks(transfers, now, self.window_ms, extra, self.thresholds,
+                                               history_context=history))
+        return {'metrics': metrics, 'issues': issues}
+
+    def _evaluate_queue(self, state, window):
+        metrics = self._metrics(window)
+        issues = detect_generic_issues(metrics, self.thresholds)
+        # Producer side at peak occupancy; consumer side when a receive found the queue empty
+        issues.extend(analyze_queue_bottlenecks(None, None, self.window_ms, {
+            'queue_size': state['peak'], 'queue_max': state['capacity'],
+            'blocked_send': window['blockedSend'] > 0, 'blocked_recv': False
+        }, self.thresholds))
+        if window['blockedRecv']:
+            issues.extend(analyze_queue_bottlenecks(None, None, self.window_ms, {
+                'queue_size': 0, 'queue_max': state['capacity'],
+                'blocked_send': False, 'blocked_recv': True
+            }, self.thresholds))
+        return {'metrics': metrics, 'issues': issues}
+
+    def _evaluate_memory(self, state, window, now):
+        metrics = self._metrics(window)
+        waits = window['lockWait']
+        holders = state['holders']
+        # Waiters of a free lock are not contending (they have yet to retry)
+        oldest_wait_time = max((now - since for since in state['waiting'].values()), default=0) if holders else 0
+        mode = None
+        if holders:
+            mode = 'exclusive' if any(m == 'exclusive' for m, _ in holders.values()) else 'shared'
+        extra = {
+            'lock_wait_time': max(waits.percentile(99) or 0, oldest_wait_time),
+            'oldest_wait_time': oldest_wait_time,
+            'lock_queue_length': state['peakWaiting'],
+            'lock_mode': mode,
+            'shared_holders': len(holders) if mode == 'shared' else 0,
+            'access_history': [ACCESS[access] for access in state['accesses']],
+            'total_reads': window['reads'],
+            'total_writes': window['writes'],
+            'conflicts': window['conflicts'],
+            'memory_size': state['capacity'],
+            'used_memory': 0
+        }
+        transfers = [ACCESS['write']] * window['writes'] + [ACCESS['read']] * window['reads']
+        issues = detect_generic_issues(metrics, self.thresholds)
+        issues.extend(analyze_memory_bottlenecks(transfers, now, self.window_ms, extra, self.thresholds))
+        return {'metrics': metrics, 'issues': issues}
+
+    # ===== REPLAY STATE =====
+    @staticmethod
+    def _new_window():
+        return {'count': 0, 'bytes': 0, 'latencySum': 0.0, 'latencyCount': 0}
+
+    def _state(self, resource_type, resource_id, capacity=None):
+        key = (resource_type, resource_id)
+        state = self.resources.get(key)
+        if state is None:
+            state = {'capacity': capacity or DEFAULT_CAPACITY[resource_type]}
+            if resource_type == 'pipe':
+                state.update({
+                    'occupancy': [0, 0],        # AtoB, BtoA
+                    'inFlight': (([], []), ([], [])),  # (send timestamps, messages) per direction, FIFO
+                    'lastRead': {'AtoB': None, 'BtoA': None},
+                    'recentReads': deque(maxlen=10),
+                    'read': self._new_window()
+                })
+            elif resource_type == 'queue':
+                state.update({'occupancy': 0, 'inFlight': ([], [])})
+            else:
+                state.update({
+                    'holders': {},   # {process: (mode, grant timestamp)}
+                    'waiting': {},   # {process: first refused request timestamp}
+                    'accesses': deque(maxlen=20)
+                })
+            self.resources[key] = state
+            self._reset_window(state)
+        return state
+
+    def _reset_window(self, state):
+        window = self._new_window()
+        if 'holders' in state:
+            window.update({'reads': 0, 'writes': 0, 'conflicts': 0, 'lockWait': LatencyHistogram()})
+            state['peakWaiting'] = len(state['waiting'])
+        elif 'lastRead' in state:
+            window['shapes'] = {}  # {(writer, count, small): entries}
+            state['read'] = self._new_window()
+            state['peak'] = list(state['occupancy'])
+        else:
+            window.update({'blockedSend': 0, 'blockedRecv': 0})
+            state['peak'] = state['occupancy']
+        state['window'] = window
+
+    def _record(self, histogram, value):
+        self.recorded.setdefault(histogram, []).append(value)
+
+    def _flush_recorded(self):
+        """record_many() what the handlers recorded since the last flush, a histogram at a time"""
+        for histogram, values in self.recorded.items():
+            histogram.record_many(values)
+        self.recorded.clear()
+
+    def _histogram(self, kind, resource_id):
+        histogram = self.latency.get((kind, resource_id))
+        if histogram is None:
+            histogram = self.latency[(kind, resource_id)] = LatencyHistogram()
+        return histogram
+
+    @staticmethod
+    def _match(in_flight, occupancy, counts, reads, now):
+        """FIFO-match a run of sends and reads (counts > 0, in trace order) against in_flight.
+
+        With S the messages supplied and R those requested up to each event, a
+        read takes at most what was supplied, so the messages consumed so far
+        are R plus the running minimum of S - R (capped at 0). in_flight holds
+        send timestamps and messages, occupancy messages in all; the run's
+        sends are appended and what its reads consumed is dropped.
+        Returns the occupancy after each event, and the index, latency sum and
+        messages matched of each read that matched anything.
+        """
+        sent = list(map(mul, counts, map(not_, reads)))
+        supplied = list(accumulate(sent, initial=occupancy))
+        del supplied[0]
+        requested = list(accumulate(map(mul, counts, reads)))
+        available = list(map(sub, supplied, requested))
+        if min(available) >= 0:
+            consumed = requested  # No read ran short
+        else:
+            shortfall = accumulate(available, min, initial=0)
+            next(shortfall)
+            consumed = list(map(add, requested, shortfall))
+        levels = list(map(sub, supplied, consumed))
+        times, sizes = in_flight
+        times.extend(compress(now, sent))
+        sizes.extend(compress(sent, sent))
+        if consumed is requested and counts.count(1) == len(counts) and sizes.count(1) == len(sizes):
+            # Single messages throughout: the k-th read takes the k-th entry
+            indexes = list(compress(range(len(counts)), reads))
+            latencies = list(map(sub, _take(now, indexes), times[:len(indexes)]))
+            del times[:len(indexes)], sizes[:len(indexes)]
+            return levels, indexes, latencies, [1] * len(indexes)
+
+        # Prefix sums over the entries the reads reach, send times relative to the first
+        # one so large timestamps don't cancel out
+        bounds = list(accumulate(sizes, initial=0))
+        reached = bisect_left(bounds, consumed[-1])
+        del bounds[reached + 1:]
+        times = times[:reached]
+        base = times[0] if times else 0.0
+        weights = list(accumulate(map(mul, map(sub, times, repeat(base)), sizes[:reached]), initial=0.0))
+        times.append(base)  # A read that ends exactly at the last bound takes nothing from past it
+
+        # consumed never decreases, so the reads that matched anything are those where it grew;
+        # for each, the sum of send times up to where it stopped reading (upto) gives its latency sum
+        read_consumed = list(compress(consumed, reads))
+        grown = list(map(sub, read_consumed, [0] + read_consumed[:-1]))
+        indexes = list(compress(compress(range(len(counts)), reads), grown))
+        positions = list(compress(read_consumed, grown))
+        matched = list(compress(grown, grown))
+        entries = list(map(sub, map(bisect_right, repeat(bounds), positions), repeat(1)))
+        upto = list(map(add, _take(weights, entries),
+                        map(mul, map(sub, _take(times, entries), repeat(base)),
+                            map(sub, positions, _take(bounds, entries)))))
+        latencies = list(map(sub, map(mul, map(sub, _take(now, indexes), repeat(base)), matched),
+                             map(sub, upto, [0.0] + upto[:-1])))
+        taken = positions[-1] if positions else 0
+
+        # Drop what was read: whole entries, then part of the next one
+        entry = bisect_right(bounds, taken) - 1
+        del in_flight[0][:entry], in_flight[1][:entry]
+        if entry < reached:
+            in_flight[1][0] -= taken - bounds[entry]
+        return levels, indexes, latencies, matched
+
+    def _flow(self, kind, resource_id, in_flight, occupancy, group, run, selected, edges):
+        """FIFO-match the sends and reads of a group at indexes selected (counts > 0), split by window.
+
+        Latencies go straight into the resource's histogram. Returns per window
+        None, or (occupancy at its end, peak occupancy, latency sum, messages matched).
+        """
+        positions = _take(group['position'], selected)
+        reads = list(map(READ.__eq__, _take(group['operation'], selected)))
+        levels, indexes, latencies, matched = self._match(in_flight, occupancy, _take(group['count'], selected),
+                                                          reads, _take(run['now'], positions))
+        if len(matched) == sum(matched):
+            self._histogram(kind, resource_id).record_many(latencies)  # One message per read
+        elif matched:
+            self._histogram(kind, resource_id).record_many(list(map(truediv, latencies, matched)), matched)
+        cuts = _cuts(positions, edges)
+        match_cuts = _cuts(_take(positions, indexes), edges)
+        return [(levels[last - 1], max(levels[first:last]), sum(latencies[first_match:last_match]), messages)
+                if first < last else None
+                for first, last, first_match, last_match, messages in zip(
+                    cuts, cuts[1:], match_cuts, match_cuts[1:], _window_totals(matched, match_cuts))]
+
+    # ===== WINDOW REDUCTIONS =====
+    # A reducer takes one resource's group of a run (GROUPED columns plus run positions, all in
+    # trace order), the run's columns and the window edges, and returns (apply, key, state, per-window deltas), or
+    # None if nothing applies; apply(key, state, delta) adds a window's delta to the replay state
+    # when that window is current. Totals come from prefix sums cut at the window edges.
+    def _reduce_pipe(self, resource_id, group, run, ids, edges):
+        operations = group['operation']
+        sending = list(map(SEND.__eq__, operations))
+        reading = list(map(READ.__eq__, operations))
+        if not any(sending) and not any(reading):
+            return None
+        state = self._state('pipe', resource_id)
+        sends = list(compress(group['position'], sending))
+        received = list(compress(group['position'], reading))
+        send_cuts = _cuts(sends, edges)
+        read_cuts = _cuts(received, edges)
+        windows = range(len(edges) - 1)
+
+        # Write shapes of every window in one count, keyed by window
+        entries = [count or 1 for count in compress(group['count'], sending)]
+        sizes = list(compress(group['size'], sending))
+        small = map(le, map(truediv, sizes, entries), repeat(self.thresholds['small_write_size']))
+        shapes = [{} for _ in windows]
+        for (window, writer, messages, is_small), times in Counter(zip(
+                chain.from_iterable(map(repeat, windows, map(sub, send_cuts[1:], send_cuts))),
+                _take(run['process'], sends), entries, small)).items():
+            shapes[window][(ids[writer] if writer != NO_INDEX else None, messages, is_small)] = times
+
+        # The last 10 reads of each window, and its last read in each direction
+        read_times = _take(run['now'], received)
+        recent = [read_times[max(first, last - 10):last] for first, last in zip(read_cuts, read_cuts[1:])]
+        backward = list(map(and_, compress(group['flags'], reading), repeat(BTOA)))
+        last_reads = []
+        for direction in (list(map(not_, backward)), backward):
+            cuts = _cuts(compress(received, direction), edges)
+            times = list(compress(read_times, direction))
+            last_reads.append([times[last - 1] if first < last else None for first, last in zip(cuts, cuts[1:])])
+
+        flags = group['flags']
+        moving = [index for index in compress(range(len(operations)), group['count'])
+                  if operations[index] in TRANSFERS]
+        flows = []
+        for direction, selected in enumerate(([index for index in moving if not flags[index] & BTOA],
+                                              [index for index in moving if flags[index] & BTOA])):
+            if selected:
+                flows.append((direction, self._flow('pipe-read', resource_id, state['inFlight'][direction],
+                                                    state['occupancy'][direction], group, run, selected, edges)))
+
+        deltas = zip(_window_totals(entries, send_cuts), _window_totals(sizes, send_cuts), shapes,
+                     _window_totals([count or 1 for count in compress(group['count'], reading)], read_cuts),
+                     _window_totals(list(compress(group['size'], reading)), read_cuts), recent, *last_reads,
+                     [[(direction, flow[window]) for direction, flow in flows if flow[window] is not None]
+                      for window in windows])
+        touched = map(or_, map(lt, send_cuts, send_cuts[1:]), map(lt, read_cuts, read_cuts[1:]))
+        return self._apply_pipe, ('pipe', resource_id), state, [delta if any_events else None
+                                                                for delta, any_events in zip(deltas, touched)]
+
+    def _apply_pipe(self, key, state, delta):
+        count, size, shapes, read_count, read_size, recent, last_forward, last_backward, flows = delta
+        window = state['window']
+        window['count'] += count
+        window['bytes'] += size
+        window_shapes = window['shapes']
+        for shape, times in shapes.items():
+            window_shapes[shape] = window_shapes.get(shape, 0) + times
+        read = state['read']
+        read['count'] += read_count
+        read['bytes'] += read_size
+        state['recentReads'].extend(recent)
+        if last_forward is not None:
+            state['lastRead']['AtoB'] = last_forward
+        if last_backward is not None:
+            state['lastRead']['BtoA'] = last_backward
+        for direction, (occupancy, peak, latency, matched) in flows:
+            state['occupancy'][direction] = occupancy
+            state['peak'][direction] = max(state['peak'][direction], peak)
+            read['latencySum'] += latency
+            read['latencyCount'] += matched
+        self.active.add(key)
+
+    def _reduce_queue(self, resource_id, group, run, ids, edges):
+        # Queues deliver by priority; FIFO matching approximates each message's wait
+        selected = list(map(TRANSFERS.__contains__, group['operation']))
+        if not any(selected):
+            return None
+        state = self._state('queue', resource_id)
+        cuts = _cuts(compress(group['position'], selected), edges)
+        counts = list(compress(group['count'], selected))
+        reads = list(map(READ.__eq__, compress(group['operation'], selected)))
+        failed = map(bool, map(and_, compress(group['flags'], selected), repeat(FAILED)))
+        blocked_send = list(map(and_, failed, map(not_, reads)))
+        blocked_recv = list(map(and_, map(not_, counts), reads))  # Receives that found the queue empty
+        moving = list(compress(compress(range(len(selected)), selected), counts))
+        flow = self._flow('queue', resource_id, state['inFlight'], state['occupancy'], group, run, moving, edges) \
+            if moving else repeat(None)
+
+        deltas = zip(_window_totals([count or 1 for count in counts], cuts),
+                     _window_totals(list(compress(group['size'], selected)), cuts),
+                     _window_totals(blocked_send, cuts), _window_totals(blocked_recv, cuts), flow)
+        return self._apply_queue, ('queue', resource_id), state, [delta if first < last else None
+                                                                  for delta, first, last in zip(deltas, cuts, cuts[1:])]
+
+    def _apply_queue(self, key, state, delta):
+        count, size, blocked_send, blocked_recv, flow = delta
+        window = state['window']
+        window['count'] += count
+        window['bytes'] += size
+        window['blockedSend'] += blocked_send
+        window['blockedRecv'] += blocked_recv
+        if flow is not None:
+            occupancy, peak, latency, matched = flow
+            state['occupancy'] = occupancy
+            state['peak'] = max(state['peak'], peak)
+            window['latencySum'] += latency
+            window['latencyCount'] += matched
+        self.active.add(key)
+
+    # ===== EVENT HANDLERS: (resource type, id, process, size, count, flags, now) =====
+    def _ignore(self, *args):
+        pass
+
+    def _create(self, resource_type, resource_id, process_id, size, count, flags, now):
+        self.resources.pop((resource_type, resource_id), None)
+        self._state(resource_type, resource_id, size)
+
+    def _delete(self, resource_type, resource_id, process_id, size, count, flags, now):
+        key = (resource_type, resource_id)
+        if key in self.active:
+            self.resources[key]['deleted'] = True  # Evaluated, then dropped, when the window closes
+        else:
+            self.resources.pop(key, None)
+
+    def _memory_access(self, state, resource_id, access, size):
+        window = state['window']
+        window['count'] += 1
+        window['bytes'] += size
+        window[access + 's'] += 1
+        state['accesses'].append(access)
+        self.active.add(('memory', resource_id))
+
+    def _memory_write(self, resource_type, resource_id, process_id, size, count, flags, now):
+        state = self._state('memory', resource_id)
+        if flags & FAILED:
+            state['window']['conflicts'] += 1
+        else:
+            held = state['holders'].get(process_id)
+            if held is not None:
+                window = state['window']
+                window['latencySum'] += now - held[1]
+                window['latencyCount'] += 1
+                self._record(self._histogram('memory', resource_id), now - held[1])
+            self._memory_access(state, resource_id, 'write', size)
+        self.deadlock_detector.check_deadlock(resource_id, process_id, 'write')
+
+    def _memory_read(self, resource_type, resource_id, process_id, size, count, flags, now):
+        state = self._state('memory', resource_id)
+        if flags & FAILED:
+            return
+        if any(mode == 'exclusive' and holder != process_id for holder, (mode, _) in state['holders'].items()):
+            state['window']['conflicts'] += 1
+        self._memory_access(state, resource_id, 'read', size)
+
+    def _memory_lock(self, resource_type, resource_id, process_id, size, count, flags, now):
+        state = self._state('memory', resource_id)
+        if flags & WAITING:
+            state['waiting'].setdefault(process_id, now)
+            state['peakWaiting'] = max(state['peakWaiting'], len(state['waiting']))
+            self.deadlock_detector.check_deadlock(resource_id, process_id, 'lock')
+            return
+        if flags & FAILED:
+            return
+
+        since = state['waiting'].pop(process_id, None)
+        if since is not None:
+            wait = now - since
+            self._record(state['window']['lockWait'], wait)
+            self._record(self._histogram('lock-wait', resource_id), wait)
+
+        holders = state['holders']
+        held = holders.get(process_id)
+        if held is not None and held[0] == 'exclusive':
+            mode = 'exclusive'  # Re-entrant request by the writer keeps it exclusive
+        else:
+            mode = 'shared' if flags & SHARED else 'exclusive'
+        if mode == 'exclusive':
+            granted = held[1] if held is not None else now
+            holders.clear()
+            holders[process_id] = (mode, granted)
+        elif held is None:
+            holders[process_id] = (mode, now)
+        self.deadlock_detector.record_lock_acquisition(resource_id, process_id, mode)
+
+    def _memory_unlock(self, resource_type, resource_id, process_id, size, count, flags, now):
+        if flags & FAILED:
+            return
+        state = self._state('memory', resource_id)
+        held = state['holders'].pop(process_id, None)
+        if held is not None:
+            self._record(self._histogram('lock-hold', resource_id), now - held[1])
+            self.deadlock_detector.record_lock_release(resource_id, process_id)
+        elif state['waiting'].pop(process_id, None) is not None:
+            # Unlock by a process that was only queued: it withdrew its wait
+            self.deadlock_detector.record_wait_withdrawn(resource_id, process_id)
+        else:
+            self.deadlock_detector.record_lock_release(resource_id, process_id)
@@ -0,0 +1,373 @@
+"""Append-only binary trace of manager operations, for offline analysis.
+
+A trace is a directory of segment files (trace-000001.ipct, ...). Each
+segment starts with a FILE_HEADER and is followed by little-endian records:
+
+    DEFINE  <B x H I>  kind=2, id length, index, then the UTF-8 id
+    EVENT   <B B B B d I I Q I>  kind=1, operation, resource type, flags,
+            timestamp (ms), resource index, process index (NO_INDEX when
+            the operation has no process), size (bytes; the capacity for
+            'create'), count (messages moved - 0 for a rejected send or an
+            empty read)
+
+Resource and process ids are interned per segment: an id's DEFINE record
+precedes the first event that uses it, so every segment decodes on its own.
+The writer puts a group's DEFINE records ahead of its events, leaving long
+runs of fixed-size EVENT records that read_columns() slices into columns.
+A segment cut short by a crash reads back up to its last whole record.
+
+Both code lists are append-only: codes are part of the file format.
+"""
+import atexit
+import os
+import struct
+import sys
+import threading
+import time
+from array import array
+from collections import deque
+
+OPERATIONS = ('create', 'send', 'read', 'lock', 'unlock', 'write', 'delete')
+OPERATION_CODES = {op: code for code, op in enumerate(OPERATIONS)}
+RESOURCE_TYPES = ('pipe', 'queue', 'memory')
+RESOURCE_CODES = {resource_type: code for code, resource_type in enumerate(RESOURCE_TYPES)}
+
+# Event flags
+FAILED = 0x01   # Rejected: full buffer, empty queue, lock not held...
+SHARED = 0x02   # Lock requested in shared mode
+WAITING = 0x04  # Lock request queued rather than granted
+BTOA = 0x08     # Pipe operation in the B -> A direction
+
+MAGIC = b'IPCTRACE'
+VERSION = 1
+FILE_HEADER = struct.Struct('<8sHd')  # magic, version, segment start (ms)
+EVENT = struct.Struct('<BBBBdIIQI')
+DEFINE = struct.Struct('<BxHI')
+KIND_EVENT = 1
+KIND_DEFINE = 2
+NO_INDEX = 0xFFFFFFFF
+
+# EVENT fields as columns: (name, byte offset, array typecode); kind is always KIND_EVENT
+COLUMNS = (
+    ('operation', 1, 'B'), ('resourceType', 2, 'B'), ('flags', 3, 'B'), ('timestamp', 4, 'd'),
+    ('resource', 12, 'I'), ('process', 16, 'I'), ('size', 20, 'Q'), ('count', 28, 'I')
+)
+
+SEGMENT_PREFIX = 'trace-'
+SEGMENT_SUFFIX = '.ipct'
+
+GROUP_EVENTS = 8192  # Events encoded per write; segments rotate between groups
+MAX_ID_LENGTH = 1024  # Characters kept of a resource or process id (DEFINE stores 16-bit byte lengths)
+
+_now = time.time
+
+
+def segment_paths(directory):
+    """Segment files of a trace directory, oldest first"""
+    names = [n for n in os.listdir(directory) if n.startswith(SEGMENT_PREFIX) and n.endswith(SEGMENT_SUFFIX)]
+    return [os.path.join(directory, n) for n in sorted(names, key=_segment_number)]
+
+
+def read_segment(path):
+    """Yield the events of one segment as dicts"""
+    with open(path, 'rb') as f:
+        raw = f.read()
+    if len(raw) < FILE_HEADER.size:
+        return
+    magic, version, _ = FILE_HEADER.unpack_from(raw)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f'{path} is not a version {VERSION} IPC trace segment')
+
+    ids = []
+    offset = FILE_HEADER.size
+    while offset < len(raw):
+        kind = raw[offset]
+        if kind == KIND_DEFINE:
+            if offset + DEFINE.size > len(raw):
+                return
+            _, length, index = DEFINE.unpack_from(raw, offset)
+            end = offset + DEFINE.size + length
+            if end > len(raw):
+                return
+            ids.append(raw[offset + DEFINE.size:end].decode())
+            offset = end
+        elif kind == KIND_EVENT:
+            if offset + EVENT.size > len(raw):
+                return
+            _, op, resource_type, flags, timestamp, resource, process, size, count = EVENT.unpack_from(raw, offset)
+            offset += EVENT.size
+            yield {
+                'operation': OPERATIONS[op],
+                'resourceType': RESOURCE_TYPES[resource_type],
+                'resourceId': ids[resource],
+                'processId': ids[process] if process != NO_INDEX else None,
+                'timestamp': timestamp,
+                'size': size,
+                'count': count,
+                'flags': flags
+            }
+        else:
+            raise ValueError(f'{path}: unknown record kind {kind} at offset {offset}')
+
+
+def read_columns(path, batch_events=65536):
+    """Yield (ids, columns) batches of one segment without building a dict per event.
+
+    columns maps each COLUMNS name to an array of up to batch_events values;
+    resource and process columns index ids, the segment's id table (a list
+    that keeps growing as later batches define more ids).
+    """
+    with open(path, 'rb') as f:
+        raw = f.read()
+    if len(raw) < FILE_HEADER.size:
+        return
+    magic, version, _ = FILE_HEADER.unpack_from(raw)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f'{path} is not a version {VERSION} IPC trace segment')
+
+    ids = []
+    offset = FILE_HEADER.size
+    while offset < len(raw):
+        kind = raw[offset]
+        if kind == KIND_DEFINE:
+            if offset + DEFINE.size > len(raw):
+                return
+            _, length, index = DEFINE.unpack_from(raw, offset)
+            end = offset + DEFINE.size + length
+            if end > len(raw):
+                return
+            ids.append(raw[offset + DEFINE.size:end].decode())
+            offset = end
+        elif kind == KIND_EVENT:
+            # Length of the run of EVENT records: kind bytes sit one record apart
+            available = (len(raw) - offset) // EVENT.size
+            kinds = raw[offset:offset + min(available, batch_events) * EVENT.size:EVENT.size]
+            run = len(kinds) - len(kinds.lstrip(bytes([KIND_EVENT])))
+            if not run:
+                return  # Truncated last record
+            yield ids, _columns(raw[offset:offset + run * EVENT.size], run)
+            offset += run * EVENT.size
+        else:
+            raise ValueError(f'{path}: unknown record kind {kind} at offset {offset}')
+
+
+def _columns(run, count):
+    """Split count back-to-back EVENT records into one array per field, using strided slices"""
+    columns = {}
+    for name, offset, code in COLUMNS:
+        column = array(code)
+        width = column.itemsize
+        if width == 1:
+            column.frombytes(run[offset::EVENT.size])
+        else:
+            packed = bytearray(count * width)
+            for byte in range(width):
+                packed[byte::width] = run[offset + byte::EVENT.size]
+            column.frombytes(packed)
+            if sys.byteorder != 'little':
+                column.byteswap()
+        columns[name] = column
+    return columns
+
+
+def read_trace(directory):
+    """Yield every event of a trace directory in recording order"""
+    for path in segment_paths(directory):
+        yield from read_segment(path)
+
+
+def _trace_id(value):
+    """An id as a str of at most MAX_ID_LENGTH characters (request bodies can carry numbers or lists)"""
+    if value is None:
+        return None
+    if type(value) is not str:
+        value = str(value)
+    return value[:MAX_ID_LENGTH]
+
+
+def _segment_number(name):
+    stem = os.path.basename(name)[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)]
+    return int(stem) if stem.isdigit() else -1
+
+
+class TraceRecorder:
+    """Streams operations to rotating segment files from a background thread.
+
+    record() only timestamps the event and appends a tuple to a deque - no
+    encoding, locking or I/O on the request path. The writer thread wakes
+    every flush_ms, encodes the whole group and writes it with one call,
+    starting a new segment once the current one reaches segment_bytes. With max_segments set, the oldest
+    segments are deleted so the trace keeps a bounded window. If the writer
+    falls max_pending events behind, further events are dropped and counted;
+    an event that cannot be encoded is skipped and counted as failed, and
+    a failed write abandons its segment, so the writer thread keeps going.
+    """
+
+    def __init__(self, directory, segment_bytes=64 << 20, max_segments=0, flush_ms=200, max_pending=1 << 20):
+        if segment_bytes <= FILE_HEADER.size:
+            raise ValueError('segment_bytes is too small')
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.max_segments = max_segments
+        self.flush_ms = flush_ms
+        self.max_pending = max_pending
+        self._pending = deque()
+        self._stop = threading.Event()
+        self._write_lock = threading.Lock()  # One flush at a time: writer thread vs close()
+        self._thread = None
+        self._file = None
+        self._ids = {}  # Interned ids of the current segment
+        self._segment = max([_segment_number(p) for p in segment_paths(directory)] + [0])
+        self._segment_size = 0
+        self._drop_lock = threading.Lock()
+        self.events = 0
+        self.bytes = 0
+        self.dropped = 0
+        self.failed = 0
+
+    def record(self, operation, resource_type, resource_id, process_id=None, size=0, count=1, flags=0):
+        if len(self._pending) < self.max_pending:
+            # Ids from request bodies can be numbers, lists or huge strings; a plain str id costs two checks
+            if type(resource_id) is not str or len(resource_id) > MAX_ID_LENGTH:
+                resource_id = _trace_id(resource_id)
+            if process_id is not None and (type(process_id) is not str or len(process_id) > MAX_ID_LENGTH):
+                process_id = _trace_id(process_id)
+            # Seconds; the writer converts to ms
+            self._pending.append((operation, resource_type, flags, _now(), resource_id, process_id, size, count))
+        else:
+            with self._drop_lock:
+                self.dropped += 1
+
+    def record_at(self, timestamp, operation, resource_type, resource_id, process_id=None, size=0, count=1, flags=0):
+        """record() with an explicit timestamp (ms) - for importing or synthesizing traces"""
+        if len(self._pending) < self.max_pending:
+            if type(resource_id) is not str or len(resource_id) > MAX_ID_LENGTH:
+                resource_id = _trace_id(resource_id)
+            if process_id is not None and (type(process_id) is not str or len(process_id) > MAX_ID_LENGTH):
+                process_id = _trace_id(process_id)
+            self._pending.append((operation, resource_type, flags, timestamp / 1000, resource_id, process_id, size, count))
+        else:
+            with self._drop_lock:
+                self.dropped += 1
+
+    def flush(self):
+        """Encode and write everything recorded so far, GROUP_EVENTS events per write"""
+        with self._write_lock:
+            pending = self._pending
+            while pending:
+                if self._file is None:
+                    self._open_segment()
+                group = min(len(pending), GROUP_EVENTS)
+                defines = bytearray()
+                out = bytearray()
+                ids = self._ids
+                pack = EVENT.pack
+                written = 0
+                for _ in range(group):
+                    op, resource_type, flags, timestamp, resource_id, process_id, size, count = pending.popleft()
+                    known = len(ids)
+                    try:
+                        resource = ids.get(resource_id)
+                        if resource is None:
+                            resource = self._define(defines, resource_id)
+                        if process_id is None:
+                            process = NO_INDEX
+                        else:
+                            process = ids.get(process_id)
+                            if process is None:
+                                process = self._define(defines, process_id)
+                        out += pack(KIND_EVENT, OPERATION_CODES[op], RESOURCE_CODES[resource_type], flags,
+                                    timestamp * 1000, resource, process, size or 0, count)
+                    except (KeyError, TypeError, ValueError, struct.error):
+                        # Skip just this event; ids it defined would point nowhere in later groups
+                        self._forget(defines, known)
+                        self.failed += 1
+                        continue
+                    written += 1
+                try:
+                    self._file.write(defines + out)
+                    self._file.flush()
+                except OSError:
+                    # The segment may end in a torn record: continue in a new one, whose ids start over
+                    self.failed += written
+                    self._close_segment()
+                    raise
+                self._segment_size += len(defines) + len(out)
+                self.events += written
+                self.bytes += len(defines) + len(out)
+                if self._segment_size >= self.segment_bytes:
+                    self._close_segment()
+                    self._prune()
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+            atexit.register(self.close)
+
+    def close(self):
+        """Stop the writer thread and write out whatever is still pending"""
+        self._stop.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+        self.flush()
+        with self._write_lock:
+            self._close_segment()
+
+    def get_status(self):
+        return {
+            'enabled': True,
+            'directory': self.directory,
+            'segment': self._segment,
+            'segments': len(segment_paths(self.directory)),
+            'events': self.events,
+            'bytes': self.bytes,
+            'pending': len(self._pending),
+            'dropped': self.dropped,
+            'failed': self.failed
+        }
+
+    def _run(self):
+        interval = self.flush_ms / 1000
+        while not self._stop.wait(interval):
+            try:
+                self.flush()
+            except Exception as e:
+                # Keep serving requests; the group being written is lost, later ones retry
+                print(f'Trace write failed: {e!r}')
+
+    def _define(self, out, value):
+        raw = str(value).encode()
+        index = len(self._ids)
+        out += DEFINE.pack(KIND_DEFINE, len(raw), index)
+        out += raw
+        self._ids[value] = index
+        return index
+
+    def _forget(self, out, known):
+        """Undo the ids defined since there were known of them, DEFINE records included"""
+        ids = self._ids
+        while len(ids) > known:
+            value, _ = ids.popitem()
+            del out[len(out) - DEFINE.size - len(str(value).encode()):]
+
+    def _open_segment(self):
+        self._segment += 1
+        path = os.path.join(self.directory, f'{SEGMENT_PREFIX}{self._segment:06d}{SEGMENT_SUFFIX}')
+        self._file = open(path, 'xb')
+        self._file.write(FILE_HEADER.pack(MAGIC, VERSION, time.time() * 1000))
+        self._segment_size = FILE_HEADER.size
+        self._ids = {}
+
+    def _close_segment(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _prune(self):
+        if not self.max_segments:
+            return
+        paths = segment_paths(self.directory)
+        for path in paths[:max(0, len(paths) - self.max_segments)]:
+            os.remove(path)
@@ -0,0 +1,218 @@
+from array import array
+from itertools import compress
+
+DEFAULT_CAPACITY = 1_000_000
+
+# Bytes per entry: timestamp, size, count, latency, flags, resource, writer
+ENTRY_BYTES = sum(array(code).itemsize for code in 'dqIfBII')
+
+# The flags byte holds the interned type id and whether the entry measured a latency
+MEASURED = 0x80
+MAX_TYPES = MEASURED - 1
+_MEASURED_MASK = bytes(int(bool(flags & MEASURED)) for flags in range(256))
+
+
+def _type_mask(type_id):
+    return bytes(int(flags & MAX_TYPES == type_id) for flags in range(256))
+
+
+def _both(first, second):
+    """AND of two 0/1 byte masks of equal length, via one big-integer operation"""
+    if first is None:
+        return second
+    return (int.from_bytes(first, 'little') & int.from_bytes(second, 'little')).to_bytes(len(first), 'little')
+
+
+class Interner:
+    """Small integer ids for repeated strings (types, resource ids, process ids).
+
+    Ids are reference counted by the log entries that hold them and reused
+    once the last such entry is overwritten, so the table stays bounded by
+    the distinct values still in the log. Id 0 stands for None.
+    """
+
+    def __init__(self):
+        self._ids = {}
+        self._values = [None]
+        self._refs = [0]
+        self._free = []
+
+    def acquire(self, value):
+        if value is None:
+            return 0
+        index = self._ids.get(value)
+        if index is None:
+            if self._free:
+                index = self._free.pop()
+                self._values[index] = value
+            else:
+                index = len(self._values)
+                self._values.append(value)
+                self._refs.append(0)
+            self._ids[value] = index
+        self._refs[index] += 1
+        return index
+
+    def release(self, index):
+        if not index:
+            return
+        self._refs[index] -= 1
+        if not self._refs[index]:
+            del self._ids[self._values[index]]
+            self._values[index] = None
+            self._free.append(index)
+
+    def lookup(self, value):
+        """Id of value, or None if no entry in the log holds it"""
+        return self._ids.get(value)
+
+    def value(self, index):
+        return self._values[index]
+
+    def __len__(self):
+        return len(self._ids)
+
+    def clear(self):
+        self.__init__()
+
+
+class TransferLog:
+    """Fixed-capacity circular log of transfers, one typed array per column.
+
+    An entry costs ENTRY_BYTES (33) instead of a dict per transfer, so the
+    log can retain millions of events; the arrays grow on demand up to
+    capacity and then the oldest entries are overwritten in place. Windowed
+    queries binary-search the timestamp column and sum array slices, with
+    filters applied as 0/1 byte masks through itertools.compress - no
+    Python loop per entry. Not thread-safe: BottleneckAnalyzer holds its
+    lock. Entries are expected in (roughly) timestamp order.
+    """
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        if capacity < 1:
+            raise ValueError('capacity must be at least 1')
+        self.capacity = capacity
+        self.types = Interner()
+        self.resources = Interner()
+        self.writers = Interner()
+        self.clear()
+
+    def clear(self):
+        self.timestamps = array('d')
+        self.sizes = array('q')
+        self.counts = array('I')
+        self.latencies = array('f')  # Total over the entry's messages in ms, 0 when not measured
+        self.flags = array('B')      # Type id | MEASURED
+        self.resource_ids = array('I')
+        self.writer_ids = array('I')
+        self.types.clear()
+        self.resources.clear()
+        self.writers.clear()
+        self._next = 0  # Slot the next entry goes to once the log is full
+        self.appended = 0
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    @property
+    def nbytes(self):
+        return len(self) * ENTRY_BYTES
+
+    def append(self, timestamp, transfer_type, resource_id, size, latency=None, count=1, writer=None):
+        type_id = self.types.acquire(transfer_type)
+        if type_id > MAX_TYPES:
+            self.types.release(type_id)
+            raise ValueError(f'the transfer log holds at most {MAX_TYPES} transfer types')
+        try:
+            resource = self.resources.acquire(resource_id)
+            try:
+                writer_id = self.writers.acquire(writer)
+            except TypeError:
+                self.resources.release(resource)
+                raise
+        except TypeError:
+            # Unhashable id: the entry is rejected without leaking the references taken so far
+            self.types.release(type_id)
+            raise
+        flags = type_id if latency is None else type_id | MEASURED
+        latency = 0.0 if latency is None else latency * count
+        self.appended += 1
+        if len(self.timestamps) < self.capacity:
+            self.timestamps.append(timestamp)
+            self.sizes.append(size)
+            self.counts.append(count)
+            self.latencies.append(latency)
+            self.flags.append(flags)
+            self.resource_ids.append(resource)
+            self.writer_ids.append(writer_id)
+            return
+
+        slot = self._next
+        self._next = (slot + 1) % self.capacity
+        self.types.release(self.flags[slot] & MAX_TYPES)
+        self.resources.release(self.resource_ids[slot])
+        self.writers.release(self.writer_ids[slot])
+        self.timestamps[slot] = timestamp
+        self.sizes[slot] = size
+        self.counts[slot] = count
+        self.latencies[slot] = latency
+        self.flags[slot] = flags
+        self.resource_ids[slot] = resource
+        self.writer_ids[slot] = writer_id
+
+    def window(self, since, transfer_type=None, resource_id=None):
+        """Sums over entries with timestamp >= since, optionally for one type and/or resource"""
+        sums = {'entries': 0, 'count': 0, 'bytes': 0, 'latencySum': 0.0, 'latencyCount': 0, 'writers': []}
+        type_id = resource = None
+        if transfer_type is not None:
+            type_id = self.types.lookup(transfer_type)
+            if type_id is None:
+                return sums
+        if resource_id is not None:
+            resource = self.resources.lookup(resource_id)
+            if resource is None:
+                return sums
+
+        writers = set()
+        for start, end in self._ranges(since):
+            flags = self.flags[start:end].tobytes()
+            mask = None
+            if type_id is not None:
+                mask = flags.translate(_type_mask(type_id))
+            if resource is not None:
+                mask = _both(mask, bytes(map(resource.__eq__, self.resource_ids[start:end])))
+            select = (lambda values: values) if mask is None else (lambda values: compress(values, mask))
+
+            counts = self.counts[start:end]
+            sums['entries'] += (end - start) if mask is None else mask.count(1)
+            sums['count'] += sum(select(counts))
+            sums['bytes'] += sum(select(self.sizes[start:end]))
+            sums['latencySum'] += sum(select(self.latencies[start:end]))
+            sums['latencyCount'] += sum(compress(counts, _both(mask, flags.translate(_MEASURED_MASK))))
+            writers.update(select(self.writer_ids[start:end]))
+
+        writers.discard(0)
+        sums['writers'] = sorted(self.writers.value(index) for index in writers)
+        return sums
+
+    def _ranges(self, since):
+        """Physical [start, end) slices holding the entries from since onwards, oldest first"""
+        size = len(self.timestamps)
+        origin = self._next if size == self.capacity else 0
+        timestamps = self.timestamps
+
+        # Binary search over the logical (oldest-first) order
+        low, high = 0, size
+        while low < high:
+            middle = (low + high) // 2
+            if timestamps[(origin + middle) % size] < since:
+                low = middle + 1
+            else:
+                high = middle
+        if low == size:
+            return []
+
+        start = (origin + low) % size
+        if start < origin or origin == 0:
+            return [(start, origin or size)]
+        return [(start, size), (0, origin)]
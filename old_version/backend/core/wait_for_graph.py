@@ -0,0 +1,295 @@
+class WaitForGraph:
+    """Process wait-for graph with incremental cycle detection.
+
+    An edge u -> v means process u is blocked on a resource held by v. The
+    acyclic part of the graph is kept in a dynamic topological order
+    (Pearce-Kelly), so inserting an edge that agrees with the order is O(1)
+    and any other insertion only searches the nodes whose order lies between
+    the two endpoints; a waiter nobody waits on, or an owner that waits on
+    nobody, is simply moved to the front or back of the order. An edge that would close a cycle is reported and
+    parked as pending. While edges are pending, a new edge is also checked for cycles through them; a
+    removed edge only retries the pending edges it may have been blocking.
+    """
+
+    def __init__(self):
+        self._succ = {}  # {process: set of processes it waits on} - acyclic part
+        self._pred = {}
+        self._ord = {}   # {process: topological index}
+        self._next_ord = 0
+        self._min_ord = 0
+        self._pending = set()  # (u, v) edges that closed a cycle when added
+        self._pending_out = {}  # {u: set of v} over the pending edges
+        self._pending_in = {}
+
+    def __contains__(self, node):
+        return node in self._ord
+
+    def __len__(self):
+        return len(self._ord)
+
+    def has_edge(self, u, v):
+        return v in self._succ.get(u, ()) or (u, v) in self._pending
+
+    def edges(self):
+        for u, targets in self._succ.items():
+            for v in targets:
+                yield u, v
+        yield from self._pending
+
+    def add_edge(self, u, v):
+        """Insert u -> v. Returns the cycle it closes as [u, v, ...], else None."""
+        if self.has_edge(u, v):
+            return None
+        if u == v:
+            self._park(u, v)
+            return [u]
+        self._add_node(u)
+        self._add_node(v)
+
+        lower, upper = self._ord[v], self._ord[u]
+        if lower > upper:
+            # Edge already agrees with the topological order - nothing to search
+            self._link(u, v)
+            return self._pending_cycle(u, v)
+        if not self._pred[u]:
+            # Nobody waits on u (typical new waiter): move it ahead of every node
+            self._min_ord -= 1
+            self._ord[u] = self._min_ord
+            self._link(u, v)
+            return self._pending_cycle(u, v)
+        if not self._succ[v]:
+            # v waits on nobody (typical lock owner): move it behind every node
+            self._ord[v] = self._next_ord
+            self._next_ord += 1
+            self._link(u, v)
+            return self._pending_cycle(u, v)
+
+        forward, parents = self._search_forward(v, upper, target=u)
+        if forward is None:
+            self._park(u, v)
+            # Cycle starts at the new waiter: u -> v -> ... -> (back to u)
+            return [u] + self._path(parents, v, u)[:-1]
+
+        backward = self._search_backward(u, lower)
+        self._reorder(backward, forward)
+        self._link(u, v)
+        return self._pending_cycle(u, v)
+
+    def remove_edge(self, u, v):
+        if (u, v) in self._pending:
+            self._unpark(u, v)
+            return
+        if v not in self._succ.get(u, ()):
+            return
+        self._succ[u].discard(v)
+        self._pred[v].discard(u)
+        if not self._pending:
+            return
+        # A pending edge pu -> pv was kept out by a path pv -> ... -> pu. If that path ran
+        # through u -> v, pu is still reachable from v; no other pending edge can be unblocked
+        retry = [(pu, pv) for pu in self._reachable(v) for pv in self._pending_out.get(pu, ())]
+        for pu, pv in retry:
+            self._unpark(pu, pv)
+        for pu, pv in retry:
+            self.add_edge(pu, pv)
+
+    def remove_node(self, node):
+        for v in list(self._succ.get(node, ())):
+            self.remove_edge(node, v)
+        for u in list(self._pred.get(node, ())):
+            self.remove_edge(u, node)
+        for v in list(self._pending_out.get(node, ())):
+            self._unpark(node, v)
+        for u in list(self._pending_in.get(node, ())):
+            self._unpark(u, node)
+        self._succ.pop(node, None)
+        self._pred.pop(node, None)
+        self._ord.pop(node, None)
+
+    def prune(self, node):
+        """Forget node once no edge (pending included) touches it"""
+        if node not in self._ord or self._succ[node] or self._pred[node]:
+            return
+        if node in self._pending_out or node in self._pending_in:
+            return
+        del self._succ[node], self._pred[node], self._ord[node]
+
+    def find_cycle_from(self, start):
+        """Return a cycle through start over all edges (pending included), or []"""
+        adjacency = self._adjacency()
+        parents = {start: None}
+        stack = [start]
+        while stack:
+            node = stack.pop()
+            for nxt in adjacency.get(node, ()):
+                if nxt == start:
+                    return self._path(parents, start, node)
+                if nxt not in parents:
+                    parents[nxt] = node
+                    stack.append(nxt)
+        return []
+
+    def strongly_connected_components(self):
+        """All deadlocked groups at once: SCCs with a cycle (Tarjan, iterative)"""
+        adjacency = self._adjacency()
+        index = {}
+        low = {}
+        on_stack = set()
+        stack = []
+        components = []
+        counter = 0
+
+        for root in adjacency:
+            if root in index:
+                continue
+            work = [(root, iter(adjacency[root]))]
+            index[root] = low[root] = counter
+            counter += 1
+            stack.append(root)
+            on_stack.add(root)
+            while work:
+                node, children = work[-1]
+                advanced = False
+                for child in children:
+                    if child not in index:
+                        index[child] = low[child] = counter
+                        counter += 1
+                        stack.append(child)
+                        on_stack.add(child)
+                        work.append((child, iter(adjacency.get(child, ()))))
+                        advanced = True
+                        break
+                    if child in on_stack:
+                        low[node] = min(low[node], index[child])
+                if advanced:
+                    continue
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    low[parent] = min(low[parent], low[node])
+                if low[node] == index[node]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack.discard(member)
+                        component.append(member)
+                        if member == node:
+                            break
+                    if len(component) > 1 or node in adjacency.get(node, ()):
+                        components.append(component[::-1])
+        return components
+
+    def clear(self):
+        self._succ = {}
+        self._pred = {}
+        self._ord = {}
+        self._next_ord = 0
+        self._min_ord = 0
+        self._pending = set()
+        self._pending_out = {}
+        self._pending_in = {}
+
+    def _add_node(self, node):
+        if node not in self._ord:
+            self._ord[node] = self._next_ord
+            self._next_ord += 1
+            self._succ[node] = set()
+            self._pred[node] = set()
+
+    def _link(self, u, v):
+        self._succ[u].add(v)
+        self._pred[v].add(u)
+
+    def _search_forward(self, start, upper, target):
+        """Nodes reachable from start ordered below upper; (None, parents) if target is hit"""
+        parents = {start: None}
+        stack = [start]
+        while stack:
+            node = stack.pop()
+            for nxt in self._succ[node]:
+                if nxt == target:
+                    parents[nxt] = node
+                    return None, parents
+                if nxt not in parents and self._ord[nxt] < upper:
+                    parents[nxt] = node
+                    stack.append(nxt)
+        return list(parents), parents
+
+    def _search_backward(self, start, lower):
+        seen = {start}
+        stack = [start]
+        while stack:
+            node = stack.pop()
+            for prev in self._pred[node]:
+                if prev not in seen and self._ord[prev] > lower:
+                    seen.add(prev)
+                    stack.append(prev)
+        return list(seen)
+
+    def _reorder(self, backward, forward):
+        # Reuse the affected indices: everything that reaches u goes before everything v reaches
+        order = self._ord
+        backward.sort(key=order.__getitem__)
+        forward.sort(key=order.__getitem__)
+        slots = sorted(order[n] for n in backward + forward)
+        for node, slot in zip(backward + forward, slots):
+            order[node] = slot
+
+    def _park(self, u, v):
+        self._pending.add((u, v))
+        self._pending_out.setdefault(u, set()).add(v)
+        self._pending_in.setdefault(v, set()).add(u)
+
+    def _unpark(self, u, v):
+        self._pending.discard((u, v))
+        for index, key, value in ((self._pending_out, u, v), (self._pending_in, v, u)):
+            index[key].discard(value)
+            if not index[key]:
+                del index[key]
+
+    def _reachable(self, start):
+        """Nodes reachable from start over the acyclic part"""
+        seen = {start}
+        stack = [start]
+        while stack:
+            for nxt in self._succ[stack.pop()]:
+                if nxt not in seen:
+                    seen.add(nxt)
+                    stack.append(nxt)
+        return seen
+
+    def _pending_cycle(self, u, v):
+        """After linking u -> v: a cycle it closes through pending edges, as [u, v, ...], else None"""
+        if not self._pending:
+            return None
+        pending = self._pending_out
+        parents = {v: None}
+        stack = [v]
+        while stack:
+            node = stack.pop()
+            for nxt in (*self._succ[node], *pending.get(node, ())):
+                if nxt == u:
+                    return [u] + self._path(parents, v, node)
+                if nxt not in parents:
+                    parents[nxt] = node
+                    stack.append(nxt)
+        return None
+
+    def _adjacency(self):
+        adjacency = {u: list(targets) for u, targets in self._succ.items()}
+        for u, v in self._pending:
+            adjacency.setdefault(u, []).append(v)
+            adjacency.setdefault(v, [])
+        return adjacency
+
+    @staticmethod
+    def _path(parents, start, end):
+        """Walk the search tree back from end; returns [start, ..., end]"""
+        path = []
+        node = end
+        while node != start:
+            path.append(node)
+            node = parents[node]
+        path.append(start)
+        path.reverse()
+        return path
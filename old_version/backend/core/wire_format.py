@@ -0,0 +1,145 @@
+"""Compact binary encoding for WebSocket events.
+
+A binary WebSocket message is a sequence of little-endian records:
+
+    DEFINE  <B x H I>  kind=2, id length, index, then the UTF-8 resource id
+    EVENT   <B B B B I d I>  kind=1, event code, resource key, flags,
+            resource index, timestamp (ms), payload length, then the payload
+
+The event code indexes EVENT_TYPES (CUSTOM_EVENT for anything else, whose
+payload then carries the type name). The resource id found under
+RESOURCE_KEYS[key] is replaced by an index into a table interned once per
+server; a client learns each index from a DEFINE record sent just before the
+first event that uses it. The numeric 'timestamp' field moves into the header
+(flag TS_PRESENT). Whatever is left of the event data is the opaque payload,
+compact JSON.
+
+Both lists are append-only: codes are part of the wire format.
+"""
+import json
+import struct
+import threading
+
+ENCODINGS = ('json', 'binary')
+
+EVENT_TYPES = (
+    'PIPE_CREATED', 'PIPE_DATA_TRANSFER', 'PIPE_DATA_READ', 'PIPE_BATCH_TRANSFER', 'PIPE_BATCH_READ', 'PIPE_DELETED',
+    'QUEUE_CREATED', 'QUEUE_MESSAGE_SENT', 'QUEUE_MESSAGE_RECEIVED', 'QUEUE_BATCH_SENT', 'QUEUE_BATCH_RECEIVED',
+    'QUEUE_DELETED',
+    'MEMORY_CREATED', 'MEMORY_WRITE', 'MEMORY_READ', 'MEMORY_LOCKED', 'MEMORY_UNLOCKED', 'MEMORY_DELETED',
+    'ANALYSIS_RESET', 'SIMULATION_STARTED', 'STREAM_TICK'
+)
+EVENT_CODES = {event_type: code for code, event_type in enumerate(EVENT_TYPES)}
+CUSTOM_EVENT = 0xFF
+
+RESOURCE_KEYS = ('pipeId', 'queueId', 'memoryId', 'id')
+NO_RESOURCE = 0xFF
+NO_INDEX = 0xFFFFFFFF
+
+KIND_EVENT = 1
+KIND_DEFINE = 2
+TS_PRESENT = 0x01
+
+EVENT_HEADER = struct.Struct('<BBBBIdI')
+DEFINE_HEADER = struct.Struct('<BxHI')
+
+_compact = json.JSONEncoder(separators=(',', ':')).encode
+
+
+class ResourceInterner:
+    """Resource id <-> small integer index, shared by every binary client"""
+
+    def __init__(self):
+        self._index = {}
+        self._definitions = []
+        self._lock = threading.Lock()
+
+    def intern(self, resource_id):
+        """Return (index, DEFINE record) for the id, assigning an index on first sight"""
+        index = self._index.get(resource_id)
+        if index is None:
+            with self._lock:
+                index = self._index.get(resource_id)
+                if index is None:
+                    raw = str(resource_id).encode()
+                    index = len(self._definitions)
+                    self._definitions.append(DEFINE_HEADER.pack(KIND_DEFINE, len(raw), index) + raw)
+                    self._index[resource_id] = index
+        return index, self._definitions[index]
+
+
+class BinaryFrame:
+    """One encoded event; bytes_for() prepends the id definition for clients that lack it"""
+
+    __slots__ = ('record', 'index', 'definition')
+
+    def __init__(self, record, index=None, definition=None):
+        self.record = record
+        self.index = index
+        self.definition = definition
+
+    def bytes_for(self, known):
+        """Wire bytes for a client that has already been sent the indexes in known (updated)"""
+        if self.index is None or self.index in known:
+            return self.record
+        known.add(self.index)
+        return self.definition + self.record
+
+
+def encode_binary(event_type, data, interner):
+    code = EVENT_CODES.get(event_type, CUSTOM_EVENT)
+    key, index, definition = NO_RESOURCE, None, None
+    flags, timestamp = 0, 0.0
+    rest = data
+
+    if isinstance(data, dict):
+        rest = dict(data)
+        for key_code, name in enumerate(RESOURCE_KEYS):
+            if isinstance(rest.get(name), str):
+                key = key_code
+                index, definition = interner.intern(rest.pop(name))
+                break
+        if isinstance(rest.get('timestamp'), (int, float)) and not isinstance(rest['timestamp'], bool):
+            flags |= TS_PRESENT
+            timestamp = rest.pop('timestamp')
+
+    if code == CUSTOM_EVENT:
+        rest = {'type': event_type, 'data': rest}
+    payload = _compact(rest).encode() if rest != {} else b''
+    record = EVENT_HEADER.pack(KIND_EVENT, code, key, flags, NO_INDEX if index is None else index,
+                               timestamp, len(payload)) + payload
+    return BinaryFrame(record, index, definition)
+
+
+def decode_frames(buffer, table):
+    """Decode one binary message into [{'type', 'data'}]; table maps index -> id and is updated"""
+    events = []
+    view = memoryview(buffer)
+    offset = 0
+    while offset < len(view):
+        kind = view[offset]
+        if kind == KIND_DEFINE:
+            _, length, index = DEFINE_HEADER.unpack_from(view, offset)
+            offset += DEFINE_HEADER.size
+            table[index] = bytes(view[offset:offset + length]).decode()
+            offset += length
+            continue
+        if kind != KIND_EVENT:
+            raise ValueError(f'unknown record kind {kind} at offset {offset}')
+
+        _, code, key, flags, index, timestamp, length = EVENT_HEADER.unpack_from(view, offset)
+        offset += EVENT_HEADER.size
+        rest = json.loads(bytes(view[offset:offset + length])) if length else {}
+        offset += length
+
+        if code == CUSTOM_EVENT:
+            event_type, data = rest['type'], rest['data']
+        else:
+            event_type, data = EVENT_TYPES[code], rest
+        if isinstance(data, dict):
+            if key != NO_RESOURCE:
+                data[RESOURCE_KEYS[key]] = table[index]
+            if flags & TS_PRESENT:
+                data['timestamp'] = timestamp
+        events.append({'type': event_type, 'data': data})
+    return events
@@ -1,421 +1,82 @@
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, Response, request, jsonify, send_from_directory
 from flask_cors import CORS
 from flask_sock import Sock
 import uuid
-from datetime import datetime
-import json
 import os
 
-from core.pipes import PipeManager
-from core.message_queue import MessageQueueManager
-from core.shared_memory import SharedMemoryManager
-from core.deadlock_detector import DeadlockDetector
-from core.bottleneck_analyzer import BottleneckAnalyzer
+from core.ipc_service import IPCService, ROUTES
+from core.broadcaster import Broadcaster, STREAM_MODES
+from core.wire_format import ENCODINGS
+from core.trace_recorder import TraceRecorder
+from core.metrics_registry import CONTENT_TYPE as METRICS_CONTENT_TYPE
+from core.resource_views import respond
+from core.state_export import Stream
+from config import (WS_QUEUE_SIZE, WS_OVERFLOW_POLICY, WS_DEFAULT_MODE, WS_DEFAULT_ENCODING,
+                    WS_STREAM_TICK_MS, WS_STREAM_SAMPLES, IPC_BACKEND, LOCK_FAIRNESS,
+                    LOCK_WAIT_TIMEOUT_MS, TRACE_DIR, TRACE_SEGMENT_MB, TRACE_MAX_SEGMENTS, TRANSFER_LOG_CAPACITY,
+                    ROLLUP_MAX_SERIES, ANALYSIS_QUEUE_SIZE, ANALYSIS_BATCH_SIZE, ANALYSIS_INTERVAL_MS)
 
 app = Flask(__name__)
-CORS(app)
+app.json.compact = True  # No pretty-printing of API responses, even in debug mode
+CORS(app, expose_headers=['ETag'])
 sock = Sock(app)
 
 # Frontend directory
 FRONTEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'frontend')
 
-# Initialize IPC managers
-pipe_manager = PipeManager()
-queue_manager = MessageQueueManager()
-memory_manager = SharedMemoryManager()
-deadlock_detector = DeadlockDetector()
-bottleneck_analyzer = BottleneckAnalyzer()
-
-# WebSocket clients
-ws_clients = []
-
-# Broadcast helper
-def broadcast(event_type, data):
-    message = json.dumps({'type': event_type, 'data': data})
-    dead_clients = []
-    for client in ws_clients:
-        try:
-            client.send(message)
-        except:
-            dead_clients.append(client)
-    for client in dead_clients:
-        ws_clients.remove(client)
-
-# ===== PIPE ENDPOINTS =====
-@app.route('/api/pipes/create', methods=['POST'])
-def create_pipe():
-    try:
-        data = request.json
-        if not data or 'processA' not in data or 'processB' not in data:
-            return jsonify({'success': False, 'error': 'Missing required fields: processA and processB'}), 400
-        
-        pipe = pipe_manager.create_pipe(data['processA'], data['processB'])
-        broadcast('PIPE_CREATED', pipe)
-        return jsonify(pipe)
-    except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
-
-@app.route('/api/pipes/send', methods=['POST'])
-def send_pipe_data():
-    try:
-        data = request.json
-        if not data or 'pipeId' not in data or 'data' not in data or 'direction' not in data:
-            return jsonify({'success': False, 'error': 'Missing required fields: pipeId, data, and direction'}), 400
-        
-        result = pipe_manager.send_data(data['pipeId'], data['data'], data['direction'])
-        
-        if not result.get('success'):
-            return jsonify(result), 400
-
-        # Enrich pipe transfer with buffer stats and writer info for detailed bottleneck analysis
-        pipe = pipe_manager.get_pipe(data['pipeId'])
-        if pipe:
-            buffer_capacity = 100  # same as buffer_limit in PipeManager
-            extra = {
-                'bufferA_size': len(pipe['bufferA']),
-                'bufferB_size': len(pipe['bufferB']),
-                'buffer_capacity': buffer_capacity,
-                'writer_id': data.get('writerId') or data.get('processId'),
-                'direction': data['direction'],
-                'last_read_timestamps': pipe_manager.read_activity.get(data['pipeId'], {})
-            }
-        else:
-            extra = None
-
-        bottleneck_analyzer.record_transfer(
-            'pipe',
-            data['pipeId'],
-            len(str(data['data'])),
-            latency=0,
-            extra=extra
-        )
-        
-        broadcast('PIPE_DATA_TRANSFER', {
-            'pipeId': data['pipeId'],
-            'data': data['data'],
-            'direction': data['direction'],
-            'timestamp': datetime.now().timestamp() * 1000
-        })
-        
-        return jsonify(result)
-    except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
-
-@app.route('/api/pipes', methods=['GET'])
-def get_all_pipes():
-    return jsonify(pipe_manager.get_all_pipes())
-
-@app.route('/api/pipes/read', methods=['POST'])
-def read_pipe_data():
-    try:
-        data = request.json
-        if not data or 'pipeId' not in data or 'direction' not in data:
-            return jsonify({'success': False, 'error': 'Missing required fields: pipeId and direction'}), 400
-        
-        result = pipe_manager.read_data(data['pipeId'], data['direction'])
-        
-        if result.get('success'):
-            broadcast('PIPE_DATA_READ', {
-                'pipeId': data['pipeId'],
-                'message': result.get('message'),
-                'direction': data['direction'],
-                'timestamp': datetime.now().timestamp() * 1000
-            })
-        
-        return jsonify(result)
-    except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
-
-@app.route('/api/pipes/<pipe_id>', methods=['DELETE'])
-def delete_pipe(pipe_id):
-    try:
-        success = pipe_manager.delete_pipe(pipe_id)
-        if success:
-            broadcast('PIPE_DELETED', {'pipeId': pipe_id})
-            return jsonify({'success': True})
-        return jsonify({'success': False, 'error': 'Pipe not found'}), 404
-    except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
-
-# ===== MESSAGE QUEUE ENDPOINTS =====
-@app.route('/api/queues/create', methods=['POST'])
-def create_queue():
-    try:
-        data = request.json
-        if not data or 'name' not in data:
-            return jsonify({'success': False, 'error': 'Missing required field: name'}), 400
-        
-        queue = queue_manager.create_queue(data['name'], data.get('maxSize', 1000))
-        broadcast('QUEUE_CREATED', queue)
-        return jsonify(queue)
-    except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
-
-@app.route('/api/queues/send', methods=['POST'])
-def send_queue_message():
-    try:
-        data = request.json
-        if not data or 'queueId' not in data or 'message' not in data or 'sender' not in data:
-            return jsonify({'success': False, 'error': 'Missing required fields: queueId, message, and sender'}), 400
-        
-        result = queue_manager.send_message(data['queueId'], data['message'], data['sender'])
-
-        # Enrich queue transfer with occupancy and block information
-        queue = queue_manager.queues.get(data['queueId'])
-        queue_size = len(queue['messages']) if queue else 0
-        max_size = queue['maxSize'] if queue else 1
-        extra = {
-            'queue_size': queue_size,
-            'queue_max': max_size,
-            'blocked_send': bool(result.get('bottleneck')),
-            'blocked_recv': False
-        }
-
-        bottleneck_analyzer.record_transfer(
-            'queue',
-            data['queueId'],
-            len(str(data['message'])),
-            latency=0,
-            extra=extra
-        )
-        
-        broadcast('QUEUE_MESSAGE_SENT', {
-            'queueId': data['queueId'],
-            'message': data['message'],
-            'sender': data['sender'],
-            'timestamp': datetime.now().timestamp() * 1000
-        })
-        
-        return jsonify(result)
-    except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
-
-@app.route('/api/queues/receive', methods=['POST'])
-def receive_queue_message():
-    try:
-        data = request.json
-        if not data or 'queueId' not in data or 'receiver' not in data:
-            return jsonify({'success': False, 'error': 'Missing required fields: queueId and receiver'}), 400
-        
-        message = queue_manager.receive_message(data['queueId'], data['receiver'])
-
-        # Record queue receive characteristics for slow-producer detection
-        queue = queue_manager.queues.get(data['queueId'])
-        queue_size = queue['currentSize'] if queue_manager.get_queue(data['queueId']) else 0
-        max_size = queue['maxSize'] if queue else 1
-        blocked_recv = not message.get('success') and message.get('error') == 'Queue is empty'
-
-        extra = {
-            'queue_size': queue_size,
-            'queue_max': max_size,
-            'blocked_send': False,
-            'blocked_recv': blocked_recv
-        }
-
-        # Use size 0 for empty receive attempts, or message size if successful
-        msg_size = len(str(message.get('message', {}).get('data'))) if message.get('success') else 0
-        bottleneck_analyzer.record_transfer('queue', data['queueId'], msg_size, latency=0, extra=extra)
-
-        broadcast('QUEUE_MESSAGE_RECEIVED', {
-            'queueId': data['queueId'],
-            'message': message,
-            'receiver': data['receiver'],
-            'timestamp': datetime.now().timestamp() * 1000
-        })
-        
-        return jsonify(message)
-    except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
-
-@app.route('/api/queues', methods=['GET'])
-def get_all_queues():
-    return jsonify(queue_manager.get_all_queues())
-
-@app.route('/api/queues/<queue_id>', methods=['DELETE'])
-def delete_queue(queue_id):
-    try:
-        success = queue_manager.delete_queue(queue_id)
-        if success:
-            broadcast('QUEUE_DELETED', {'queueId': queue_id})
-            return jsonify({'success': True})
-        return jsonify({'success': False, 'error': 'Queue not found'}), 404
-    except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
-
-# ===== SHARED MEMORY ENDPOINTS =====
-@app.route('/api/shared-memory/create', methods=['POST'])
-def create_memory():
-    try:
-        data = request.json
-        if not data or 'name' not in data:
-            return jsonify({'success': False, 'error': 'Missing required field: name'}), 400
-        
-        memory = memory_manager.create_memory(data['name'], data.get('size', 1024))
-        broadcast('MEMORY_CREATED', memory)
-        return jsonify(memory)
-    except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
-
-@app.route('/api/shared-memory/write', methods=['POST'])
-def write_memory():
-    try:
-        data = request.json
-        if not data or 'memoryId' not in data or 'processId' not in data or 'data' not in data:
-            return jsonify({'success': False, 'error': 'Missing required fields: memoryId, processId, and data'}), 400
-        
-        result = memory_manager.write(data['memoryId'], data['processId'], data['data'])
-        
-        # Get bottleneck metrics for analysis
-        metrics = memory_manager.get_bottleneck_metrics(data['memoryId'])
-        if metrics:
-            metrics['operation'] = 'write'
-        
-        bottleneck_analyzer.record_transfer(
-            'memory',
-            data['memoryId'],
-            len(str(data['data'])),
-            extra=metrics
-        )
-        
-        # Check for deadlocks
-        deadlock = deadlock_detector.check_deadlock(data['memoryId'], data['processId'], 'write')
-
-        broadcast('MEMORY_WRITE', {
-            'memoryId': data['memoryId'],
-            'processId': data['processId'],
-            'data': data['data'],
-            'timestamp': datetime.now().timestamp() * 1000,
-            'deadlock': deadlock
-        })
-        
-        result['deadlock'] = deadlock
-        return jsonify(result)
-    except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500@app.route('/api/shared-memory/read', methods=['POST'])
-def read_memory():
-    try:
-        data = request.json
-        if not data or 'memoryId' not in data or 'processId' not in data:
-            return jsonify({'success': False, 'error': 'Missing required fields: memoryId and processId'}), 400
-        
-        result = memory_manager.read(data['memoryId'], data['processId'])
-        
-        # Get bottleneck metrics for analysis
-        metrics = memory_manager.get_bottleneck_metrics(data['memoryId'])
-        if metrics:
-            metrics['operation'] = 'read'
-        
-        bottleneck_analyzer.record_transfer(
-            'memory',
-            data['memoryId'],
-            len(str(result.get('data', {}))),
-            extra=metrics
-        )
-        
-        # Check for deadlocks
-        deadlock = deadlock_detector.check_deadlock(data['memoryId'], data['processId'], 'read')
-
-        broadcast('MEMORY_READ', {
-            'memoryId': data['memoryId'],
-            'processId': data['processId'],
-            'timestamp': datetime.now().timestamp() * 1000,
-            'deadlock': deadlock
-        })
-        
-        result['deadlock'] = deadlock
-        return jsonify(result)
-    except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500@app.route('/api/shared-memory/lock', methods=['POST'])
-def lock_memory():
-    try:
-        data = request.json
-        if not data or 'memoryId' not in data or 'processId' not in data:
-            return jsonify({'success': False, 'error': 'Missing required fields: memoryId and processId'}), 400
-        
-        result = memory_manager.acquire_lock(data['memoryId'], data['processId'])
-        
-        deadlock_detector.record_lock_acquisition(data['memoryId'], data['processId'])
-        
-        broadcast('MEMORY_LOCKED', {
-            'memoryId': data['memoryId'],
-            'processId': data['processId'],
-            'timestamp': datetime.now().timestamp() * 1000
-        })
-        
-        return jsonify(result)
-    except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
-
-@app.route('/api/shared-memory/unlock', methods=['POST'])
-def unlock_memory():
-    try:
-        data = request.json
-        if not data or 'memoryId' not in data or 'processId' not in data:
-            return jsonify({'success': False, 'error': 'Missing required fields: memoryId and processId'}), 400
-        
-        result = memory_manager.release_lock(data['memoryId'], data['processId'])
-        
-        deadlock_detector.record_lock_release(data['memoryId'], data['processId'])
-        
-        broadcast('MEMORY_UNLOCKED', {
-            'memoryId': data['memoryId'],
-            'processId': data['processId'],
-            'timestamp': datetime.now().timestamp() * 1000
-        })
-        
-        return jsonify(result)
-    except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
-
-@app.route('/api/shared-memory', methods=['GET'])
-def get_all_memory():
-    return jsonify(memory_manager.get_all_memory())
-
-@app.route('/api/shared-memory/<memory_id>', methods=['DELETE'])
-def delete_memory(memory_id):
-    try:
-        success = memory_manager.delete_memory(memory_id)
-        if success:
-            broadcast('MEMORY_DELETED', {'memoryId': memory_id})
-            return jsonify({'success': True})
-        return jsonify({'success': False, 'error': 'Memory segment not found'}), 404
-    except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
+# WebSocket fan-out: bounded per-client queues drained by per-client sender threads
+broadcaster = Broadcaster(max_queue=WS_QUEUE_SIZE, overflow_policy=WS_OVERFLOW_POLICY)
 
-# ===== ANALYSIS ENDPOINTS =====
-@app.route('/api/analysis/bottlenecks', methods=['GET'])
-def get_bottlenecks():
-    return jsonify(bottleneck_analyzer.get_bottlenecks())
+# Optional on-disk trace of every manager operation, written from its own thread
+trace = TraceRecorder(TRACE_DIR, TRACE_SEGMENT_MB << 20, TRACE_MAX_SEGMENTS) if TRACE_DIR else None
+if trace:
+    trace.start()
 
-@app.route('/api/analysis/deadlocks', methods=['GET'])
-def get_deadlocks():
-    return jsonify(deadlock_detector.get_deadlocks())
+# Endpoint logic lives in IPCService, shared with the asyncio server (async_server.py)
+service = IPCService(broadcaster, stream_tick_ms=WS_STREAM_TICK_MS, stream_samples=WS_STREAM_SAMPLES,
+                     backend=IPC_BACKEND, lock_fairness=LOCK_FAIRNESS,
+                     lock_wait_timeout_ms=LOCK_WAIT_TIMEOUT_MS, trace=trace,
+                     transfer_log_capacity=TRANSFER_LOG_CAPACITY, rollup_max_series=ROLLUP_MAX_SERIES,
+                     analysis_queue_size=ANALYSIS_QUEUE_SIZE, analysis_batch_size=ANALYSIS_BATCH_SIZE,
+                     analysis_interval_ms=ANALYSIS_INTERVAL_MS)
+service.event_stream.start()
+service.analysis.start()
 
-@app.route('/api/analysis/reset', methods=['POST'])
-def reset_analysis():
-    try:
-        bottleneck_analyzer.reset()
-        deadlock_detector.reset()
-        broadcast('ANALYSIS_RESET', {})
-        return jsonify({'success': True})
-    except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
+# Initialize IPC managers
+pipe_manager = service.pipe_manager
+queue_manager = service.queue_manager
+memory_manager = service.memory_manager
+deadlock_detector = service.deadlock_detector
+bottleneck_analyzer = service.bottleneck_analyzer
+event_stream = service.event_stream
+analysis = service.analysis
+broadcast = service.broadcast
+
+# ===== REST ENDPOINTS =====
+def make_view(method, name):
+    handler = getattr(service, name)
+    
+    def view(**params):
+        args = list(params.values())
+        if method == 'POST':
+            args.append(request.get_json(silent=True))
+        elif method == 'GET':
+            args.append(request.args.to_dict())
+        body, status, headers = respond(*handler(*args), request.headers.get('If-None-Match'))
+        if status == 304:
+            return Response(status=304, headers=headers)
+        if isinstance(body, Stream):
+            return Response(body.chunks, status, headers=body.headers, content_type=body.content_type)
+        if isinstance(body, str):
+            return Response(body, status, content_type=METRICS_CONTENT_TYPE)
+        return jsonify(body), status, headers
+    
+    view.__name__ = name
+    return view
 
-# ===== PROCESS SIMULATION ENDPOINTS =====
-@app.route('/api/simulation/start', methods=['POST'])
-def start_simulation():
-    try:
-        data = request.json
-        if not data or 'scenario' not in data:
-            return jsonify({'success': False, 'error': 'Missing required field: scenario'}), 400
-        
-        scenario = data.get('scenario')
-        broadcast('SIMULATION_STARTED', {'scenario': scenario})
-        return jsonify({'success': True, 'scenario': scenario})
-    except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
+for method, path, name in ROUTES:
+    app.add_url_rule(path.replace('{', '<').replace('}', '>'), view_func=make_view(method, name), methods=[method])
 
-# WebSocket endpoint
 # ===== FRONTEND ROUTES =====
 @app.route('/')
 def serve_frontend():
@@ -425,24 +86,28 @@ def serve_frontend():
 def serve_static(filename):
     return send_from_directory(FRONTEND_DIR, filename)
 
-# ===== WEBSOCKET =====
 # ===== WEBSOCKET =====
 @sock.route('/ws')
 def websocket(ws):
-    ws_clients.append(ws)
-    print(f'Client connected. Total clients: {len(ws_clients)}')
+    # Mode and encoding can be picked at connect time (?mode=stream&encoding=binary) or
+    # switched later with a {"type": "SUBSCRIBE", "mode": ..., "encoding": ...} message
+    mode = request.args.get('mode', WS_DEFAULT_MODE)
+    encoding = request.args.get('encoding', WS_DEFAULT_ENCODING)
+    broadcaster.add_client(ws, mode if mode in STREAM_MODES else 'events',
+                           encoding if encoding in ENCODINGS else 'json')
+    print(f'Client connected. Total clients: {broadcaster.client_count()}')
     
     try:
         while True:
             data = ws.receive()
             if data is None:
                 break
+            service.handle_client_message(ws, data)
     except Exception as e:
         print(f'WebSocket error: {e}')
     finally:
-        if ws in ws_clients:
-            ws_clients.remove(ws)
-        print(f'Client disconnected. Total clients: {len(ws_clients)}')
+        broadcaster.remove_client(ws)
+        print(f'Client disconnected. Total clients: {broadcaster.client_count()}')
 
 if __name__ == '__main__':
     print('IPC Debugger server starting...')
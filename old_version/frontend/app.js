@@ -1,6 +1,8 @@
 // API Base URL
 const API_URL = 'http://localhost:5000/api';
 const WS_URL = 'ws://localhost:5000/ws';
+// 'json' (default) or 'binary' - compact frames, see backend/core/wire_format.py
+const WS_ENCODING = 'json';
 
 // State
 let ws = null;
@@ -11,7 +13,9 @@ let notifications = [];
 
 // WebSocket Connection
 function connectWebSocket() {
-    ws = new WebSocket(WS_URL);
+    ws = new WebSocket(`${WS_URL}?encoding=${WS_ENCODING}`);
+    ws.binaryType = 'arraybuffer';
+    resourceTable = [];
     
     ws.onopen = () => {
         console.log('WebSocket connected');
@@ -30,11 +34,67 @@ function connectWebSocket() {
     };
     
     ws.onmessage = (event) => {
-        const data = JSON.parse(event.data);
-        handleWebSocketMessage(data);
+        if (typeof event.data === 'string') {
+            handleWebSocketMessage(JSON.parse(event.data));
+        } else {
+            decodeBinaryFrames(event.data).forEach(handleWebSocketMessage);
+        }
     };
 }
 
+// Binary event decoding - keep these tables in sync with backend/core/wire_format.py
+const EVENT_TYPES = [
+    'PIPE_CREATED', 'PIPE_DATA_TRANSFER', 'PIPE_DATA_READ', 'PIPE_BATCH_TRANSFER', 'PIPE_BATCH_READ', 'PIPE_DELETED',
+    'QUEUE_CREATED', 'QUEUE_MESSAGE_SENT', 'QUEUE_MESSAGE_RECEIVED', 'QUEUE_BATCH_SENT', 'QUEUE_BATCH_RECEIVED',
+    'QUEUE_DELETED',
+    'MEMORY_CREATED', 'MEMORY_WRITE', 'MEMORY_READ', 'MEMORY_LOCKED', 'MEMORY_UNLOCKED', 'MEMORY_DELETED',
+    'ANALYSIS_RESET', 'SIMULATION_STARTED', 'STREAM_TICK'
+];
+const RESOURCE_KEYS = ['pipeId', 'queueId', 'memoryId', 'id'];
+const textDecoder = new TextDecoder();
+let resourceTable = [];  // Interned resource ids, per connection
+
+function decodeBinaryFrames(buffer) {
+    const view = new DataView(buffer);
+    const events = [];
+    let offset = 0;
+    
+    while (offset < view.byteLength) {
+        const kind = view.getUint8(offset);
+        if (kind === 2) {
+            // DEFINE: kind, pad, id length (u16), index (u32), id bytes
+            const length = view.getUint16(offset + 2, true);
+            const index = view.getUint32(offset + 4, true);
+            resourceTable[index] = textDecoder.decode(new Uint8Array(buffer, offset + 8, length));
+            offset += 8 + length;
+            continue;
+        }
+        
+        // EVENT: kind, code, key, flags, index (u32), timestamp (f64), payload length (u32), payload
+        const code = view.getUint8(offset + 1);
+        const key = view.getUint8(offset + 2);
+        const flags = view.getUint8(offset + 3);
+        const index = view.getUint32(offset + 4, true);
+        const timestamp = view.getFloat64(offset + 8, true);
+        const length = view.getUint32(offset + 16, true);
+        offset += 20;
+        let rest = length ? JSON.parse(textDecoder.decode(new Uint8Array(buffer, offset, length))) : {};
+        offset += length;
+        
+        let type = EVENT_TYPES[code];
+        if (code === 0xFF) {
+            type = rest.type;
+            rest = rest.data;
+        }
+        if (rest && typeof rest === 'object') {
+            if (key !== 0xFF) rest[RESOURCE_KEYS[key]] = resourceTable[index];
+            if (flags & 1) rest.timestamp = timestamp;
+        }
+        events.push({ type, data: rest });
+    }
+    return events;
+}
+
 function updateConnectionStatus(connected) {
     const indicator = document.getElementById('statusIndicator');
     const text = document.getElementById('statusText');
@@ -64,8 +124,12 @@ function getNotificationMessage(data) {
     const messages = {
         'PIPE_CREATED': `Pipe created between processes`,
         'PIPE_DATA_TRANSFER': `Data transferred via pipe`,
+        'PIPE_BATCH_TRANSFER': `${data.data?.sent ?? 0} messages transferred via pipe`,
+        'PIPE_BATCH_READ': `${data.data?.count ?? 0} messages read from pipe`,
         'QUEUE_MESSAGE_SENT': `Message sent to queue`,
         'QUEUE_MESSAGE_RECEIVED': `Message received from queue`,
+        'QUEUE_BATCH_SENT': `${data.data?.sent ?? 0} messages sent to queue`,
+        'QUEUE_BATCH_RECEIVED': `${data.data?.count ?? 0} messages received from queue`,
         'MEMORY_WRITE': data.data?.deadlock?.detected ? '⚠️ Deadlock detected!' : `Memory written`,
         'MEMORY_LOCKED': `Memory locked`,
         'MEMORY_UNLOCKED': `Memory unlocked`
@@ -369,7 +433,7 @@ function renderMemories() {
             <div style="background: white; padding: 15px; border-radius: 8px; margin-bottom: 15px;">
                 <div style="display: flex; justify-content: space-between; padding: 8px 0; border-bottom: 1px solid #f0f0f0;"><span style="font-weight: 600; color: #666;">Size:</span><span>${mem.size} bytes</span></div>
                 <div style="display: flex; justify-content: space-between; padding: 8px 0; border-bottom: 1px solid #f0f0f0;"><span style="font-weight: 600; color: #666;">Utilization:</span><span>${mem.utilization.toFixed(1)}%</span></div>
-                <div style="display: flex; justify-content: space-between; padding: 8px 0;"><span style="font-weight: 600; color: #666;">Lock Status:</span><span class="badge ${mem.lock.isLocked ? 'badge-danger' : 'badge-success'}">${mem.lock.isLocked ? '🔒 Locked by ' + mem.lock.owner : '🔓 Unlocked'}</span></div>
+                <div style="display: flex; justify-content: space-between; padding: 8px 0;"><span style="font-weight: 600; color: #666;">Lock Status:</span><span class="badge ${mem.lock.isLocked ? 'badge-danger' : 'badge-success'}">${!mem.lock.isLocked ? '🔓 Unlocked' : mem.lock.mode === 'shared' ? '📖 Shared by ' + mem.lock.readers.join(', ') : '🔒 Locked by ' + mem.lock.owner}</span></div>
             </div>
             ${mem.lock.waitingProcesses.length > 0 ? `<div style="background: #fff3cd; color: #856404; padding: 10px 15px; border-radius: 8px; margin: 10px 0; border-left: 4px solid #ffc107;"><strong>⏳ Waiting:</strong> ${mem.lock.waitingProcesses.join(', ')}</div>` : ''}
             <div style="display: grid; grid-template-columns: repeat(4, 1fr); gap: 10px; margin-bottom: 15px;">
@@ -587,7 +651,7 @@ function renderDeadlocks(data) {
                     <span style="color: #666; font-size: 0.85rem;">${new Date(d.timestamp).toLocaleTimeString()}</span>
                 </div>
                 <div style="margin-bottom: 10px;"><strong>Cycle:</strong> ${d.processes.join(' → ')} → ${d.processes[0]}</div>
-                <div><strong>Resources:</strong>${d.resources.map(r => `<div style="padding: 5px 0; color: #666;">• ${r.resourceId} (Owner: ${r.owner}, Waiting: ${r.waitingProcess})</div>`).join('')}</div>
+                <div><strong>Resources:</strong>${d.resources.map(r => `<div style="padding: 5px 0; color: #666;">• ${r.resourceId} (Owner: ${r.owner ?? Object.keys(r.holders || {}).join(', ')}, Waiting: ${r.waitingProcess})</div>`).join('')}</div>
             </div>
         `).join('');
     }